@@ -184,8 +184,8 @@ class AbrechnungLogic( IccLogic ):
                     xea.buchungsdatum = tz.buchungsdatum
                     xea.buchungstext = tz.buchungstext
                     self._eaData.updateEinAusZahlung( xea )
-                    if delta != 0:
-                        EinAusWriteDispatcher.inst().ea_updated.emit( xea, delta )
+                    # auch bei delta == 0 melden, damit der EinAusCache Buchungsdatum und -text fortschreibt
+                    EinAusWriteDispatcher.inst().ea_updated.emit( xea, delta )
             else:
                 # Neue Teilzahlung
                 # Aus dem tz-Objekt ein EinAus-Objekt machen, dann an _eaData übergeben zum Insert
@@ -248,18 +248,21 @@ class AbrechnungLogic( IccLogic ):
         :param xabrechnungen: Liste zu löschender Abrechnungen
         :return:
         """
+        # erst die Teilzahlungen auf alle Abrechnungen in Tabelle einaus löschen - gesammelt in einem Batch:
+        tzlist = [tz for xabr in xabrechnungen for tz in xabr.teilzahlungen]
+        try:
+            self._eaData.deleteEinAusZahlungen( [tz.ea_id for tz in tzlist] )
+        except Exception as ex:
+            self._eaData.rollback()
+            raise Exception( str(ex) + "\nBetroffene Teilzahlungen: \n'%s'" %
+                             "\n".join( [tz.toString( printWithClassname=True ) for tz in tzlist] ) )
         for xabr in xabrechnungen:
-            # erst die Teilzahlungen auf diese Abrechnung in Tabelle einaus löschen:
-            for tz in xabr.teilzahlungen:
-                try:
-                    self._eaData.deleteEinAusZahlung( tz.ea_id )
-                except Exception as ex:
-                    self._eaData.rollback()
-                    raise Exception( str(ex) +
-                                     "\nBetroffene Teilzahlung: \n'%s'" % tz.toString( printWithClassname=True ) )
             # jetzt die Abrechnung in nk_abrechnung bzw. hg_abrechnung löschen: (Methode hat eigenen try-catch-Block)
             self.deleteAbrechnung( xabr )
         self._commit()
+        if tzlist:
+            EinAusWriteDispatcher.inst().ea_deleted.emit( [tz.ea_id for tz in tzlist], self.getEinAusArt_display(),
+                                                          sum( tz.betrag for tz in tzlist )*(-1) )
         # jetzt die Anzeige aktualisieren:
         for xabr in xabrechnungen:
             xabr.abr_id = 0
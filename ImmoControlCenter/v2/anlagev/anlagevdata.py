@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 from v2.icc.constants import EinAusArt
 from v2.icc.iccdata import IccData
@@ -90,3 +90,82 @@ class AnlageVData( IccData ):
         if tpllist and len( tpllist ) > 0 and tpllist[0][0] is not None:
             sonstkosten = int( round( tpllist[0][0], 0 ) )
         return sonstkosten
+
+    ###########  Abfragen für alle Masterobjekte (AnlageVLogic.getAnlageVDataAlle())  ###########
+    def getAfaAlle( self ) -> Dict[str, int]:
+        """
+        :return: key: master_name, value: AfA
+        """
+        sql = "select master_name, afa from masterobjekt "
+        return {row[0]: row[1] for row in self.read( sql )}
+
+    def getEntnahmeRuecklagenAlle( self, vj:int ) -> Dict[str, int]:
+        """
+        :return: key: master_name, value: Summe der Entnahmen aus den Rücklagen lt. Hausgeldabrechnungen für <vj>
+        """
+        sql = "select mo.master_name, sum( entnahme_rue ) " \
+              "from hg_abrechnung hga " \
+              "inner join mietobjekt mo on mo.mobj_id = hga.mobj_id " \
+              "where hga.ab_jahr = ? " \
+              "group by mo.master_name "
+        return {row[0]: int( round( row[1], 0 ) ) for row in self.read( sql, (vj,) ) if row[1] is not None}
+
+    def getVerteilteAufwaendeAlle( self, vj:int ) -> Dict[str, List[XEinAus]]:
+        """
+        Wie getVerteilteAufwaende(), aber für alle Masterobjekte und nur für die Jahre, die in <vj> noch
+        (anteilig) zu berücksichtigen sind (<vj> - 4 bis <vj>).
+        :return: key: master_name, value: XEinAus-Objekte, nach jahr absteigend sortiert
+        """
+        sql = "select master_name, jahr, betrag, verteilt_auf, mobj_id, debi_kredi, leistung, buchungsdatum, " \
+              "buchungstext " \
+              "from einaus " \
+              "where ea_art = ? " \
+              "and verteilt_auf > 1 " \
+              "and jahr between ? and ? " \
+              "order by master_name, jahr desc"
+        dic:Dict[str, List[XEinAus]] = dict()
+        for x in self.readAllGetObjectList( sql, XEinAus, (EinAusArt.REPARATUR.dbvalue, vj-4, vj) ):
+            dic.setdefault( x.master_name, list() ).append( x )
+        return dic
+
+    def getGrundsteuerVersicherungenDivAllgAlle( self, year:int ) -> Dict[str, Dict]:
+        """
+        Wie getGrundsteuerVersicherungenDivAllg(), aber für alle Masterobjekte.
+        :return: key: master_name, value: Dictionary mit den Summen je ea_art (gs, vers, allg)
+        """
+        sql = "select master_name, ea_art, sum(betrag) as summe " \
+              "from einaus " \
+              "where jahr = ? " \
+              "and ea_art in ('vers', 'gs', 'allg') " \
+              "group by master_name, ea_art "
+        dic:Dict[str, Dict] = dict()
+        for master_name, ea_art, summe in self.read( sql, (year,) ):
+            dic.setdefault( master_name, dict() )[ea_art] = int( round( summe, 0 ) )
+        return dic
+
+    def getReiseUndSonstigeKostenAlle( self, year:int ) -> Dict[str, Tuple[int, int]]:
+        """
+        Wie getReisekosten() und getSonstigeKostenOhneReisekosten(), aber für alle Masterobjekte.
+        :return: key: master_name, value: (Reisekosten, sonstige Kosten ohne Reisekosten)
+        """
+        sql = "select master_name, " \
+              "sum( case when reise_id > 0 then betrag end ), " \
+              "sum( case when reise_id is NULL or reise_id = 0 then betrag end ) " \
+              "from einaus " \
+              "where jahr = ? and ea_art = ? " \
+              "group by master_name "
+        dic:Dict[str, Tuple[int, int]] = dict()
+        for master_name, reisekosten, sonstige in self.read( sql, (year, EinAusArt.SONSTIGE_KOSTEN.dbvalue) ):
+            dic[master_name] = ( int( round( reisekosten, 0 ) ) if reisekosten is not None else 0,
+                                 int( round( sonstige, 0 ) ) if sonstige is not None else 0 )
+        return dic
+
+    def getMietobjektIdsAlle( self ) -> Dict[str, List[str]]:
+        """
+        :return: key: master_name, value: die mobj_id's seiner Mietobjekte (sortiert wie in getMietobjekte())
+        """
+        sql = "select master_name, mobj_id from mietobjekt order by mobj_id "
+        dic:Dict[str, List[str]] = dict()
+        for master_name, mobj_id in self.read( sql ):
+            dic.setdefault( master_name, list() ).append( mobj_id )
+        return dic
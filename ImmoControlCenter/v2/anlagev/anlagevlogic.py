@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple, Callable
 
 import datehelper
 from base.basetablemodel import SumTableModel
@@ -58,15 +58,90 @@ class AnlageVLogic:
         """
         Liefert eine Liste von XAnlageV-Interfaces.
         Für jedes Masterobjekt ist ein XAnlageV-Objekt in der Liste enthalten.
+        Anders als getAnlageVData() werden die Werte aller Masterobjekte auf einmal ermittelt: je Kennzahl mit
+        einem gruppierenden Select bzw. mit einem einzigen Durchlauf über die Zahlungen des Veranlagungsjahres
+        (EinAusCache) und die Soll-Mieten und -Hausgelder. Die Ergebnisse sind dieselben wie die von
+        getAnlageVData() (s. testAnlageVDataAlle()).
         :return:
         """
         masterobjects = self._avdata.getMasterobjekte()
+        afaDict = self._avdata.getAfaAlle()
+        entnahmeRueDict = self._avdata.getEntnahmeRuecklagenAlle( self._vj )
+        vertAufwDict = self._avdata.getVerteilteAufwaendeAlle( self._vj )
+        hauskostenDict = self._avdata.getGrundsteuerVersicherungenDivAllgAlle( self._vj )
+        reiseUndSonstigeDict = self._avdata.getReiseUndSonstigeKostenAlle( self._vj )
+        mobjIdsDict = self._avdata.getMietobjektIdsAlle()
+        erhaltgVollDict, summenDict, anzahlDict = self._summiereZahlungen()
+        sollNkvDict = self._summiereSollJeMietobjekt( self._sollmieten, lambda sm: sm.nkv )
+        sollRueZuFueDict = self._summiereSollJeMietobjekt( self._sollhausgelder, lambda shg: shg.ruezufue )
+        bruttomiete = EinAusArt.BRUTTOMIETE.display
+        nka = EinAusArt.NEBENKOSTEN_ABRECHNG.display
+        hgv = EinAusArt.HAUSGELD_VORAUS.display
+        hga = EinAusArt.HAUSGELD_ABRECHNG.display
         l = list()
         for master in masterobjects:
-            xav = self.getAnlageVData( master.master_name )
-            l.append( xav )
+            master_name = master.master_name
+            x = XAnlageV()
+            x.vj = self._vj
+            x.master_name = master_name
+            x.afa = afaDict[master_name]
+            x.erhaltg_voll = int( round( erhaltgVollDict.get( master_name, 0 ), 0 ) )
+            x.entnahme_rue = entnahmeRueDict.get( master_name, 0 )
+            self._provideVerteilteAufwaende( vertAufwDict.get( master_name, list() ), x )
+            self._provideAllgemeineHauskosten( hauskostenDict.get( master_name, dict() ), x )
+            x.reisekosten, x.sonstige = reiseUndSonstigeDict.get( master_name, (0, 0) )
+            # wie in getAnlageVData() wird je Wohnung gerundet und dann auf den master aufsummiert
+            for mobj_id in mobjIdsDict.get( master_name, list() ):
+                bruttoMiete = int( round( summenDict.get( (bruttomiete, mobj_id), 0 ), 0 ) )
+                x.bruttoMiete += bruttoMiete
+                x.anzahlMonate += anzahlDict.get( (bruttomiete, mobj_id), 0 )
+                nkv = int( round( sollNkvDict.get( mobj_id, 0 ), 0 ) )
+                x.nettoMiete += bruttoMiete - nkv
+                x.nkv += nkv
+                x.nka += int( round( summenDict.get( (nka, mobj_id), 0 ), 0 ) )
+                x.hgv_netto += int( round( summenDict.get( (hgv, mobj_id), 0 ) ) ) - \
+                               int( round( sollRueZuFueDict.get( mobj_id, 0 ), 0 ) )
+                x.hga += int( round( summenDict.get( (hga, mobj_id), 0 ), 0 ) )
+            l.append( x )
         return l
 
+    def _summiereZahlungen( self ) -> (Dict[str, float], Dict[Tuple[str, str], float], Dict[Tuple[str, str], int]):
+        """
+        Summiert die Zahlungen des Veranlagungsjahres in einem Durchlauf über den EinAusCache:
+            - die sofort und voll abzusetzenden Erhaltungsaufwände je master_name
+            - Bruttomieten, Nebenkostenabrechnungen, Hausgeldvorauszahlungen und Hausgeldabrechnungen
+              je (ea_art, mobj_id), dazu die Anzahl der Zahlungen.
+        Die Reihenfolge der Additionen ist dieselbe wie bei den Einzelabfragen, die Summen sind also bitgleich.
+        :return: erhaltgVollDict, summenDict, anzahlDict
+        """
+        rep = EinAusArt.REPARATUR.display
+        eaArten = ( EinAusArt.BRUTTOMIETE.display, EinAusArt.NEBENKOSTEN_ABRECHNG.display,
+                    EinAusArt.HAUSGELD_VORAUS.display, EinAusArt.HAUSGELD_ABRECHNG.display )
+        erhaltgVollDict:Dict[str, float] = dict()
+        summenDict:Dict[Tuple[str, str], float] = dict()
+        anzahlDict:Dict[Tuple[str, str], int] = dict()
+        for ea in self._eadata.getJahr( self._vj ).iterZahlungen():
+            if ea.ea_art == rep:
+                if ea.verteilt_auf == 1:
+                    erhaltgVollDict[ea.master_name] = erhaltgVollDict.get( ea.master_name, 0 ) + ea.betrag
+            elif ea.ea_art in eaArten:
+                key = ( ea.ea_art, ea.mobj_id )
+                summenDict[key] = summenDict.get( key, 0 ) + ea.betrag
+                anzahlDict[key] = anzahlDict.get( key, 0 ) + 1
+        return erhaltgVollDict, summenDict, anzahlDict
+
+    def _summiereSollJeMietobjekt( self, sollList:List[XSollMiete or XSollHausgeld],
+                                   getBetrag:Callable[[XSollMiete or XSollHausgeld], float] ) -> Dict[str, float]:
+        """
+        Liefert je mobj_id die Summe der Soll-Beträge (nkv bzw. ruezufue) der Monate, in denen die Soll-Sätze
+        im Veranlagungsjahr gültig waren. Ungerundet, wie in getJahresSollNkv() bzw. getJahresSollNettoHausgeld().
+        """
+        dic:Dict[str, float] = dict()
+        for soll in sollList:
+            months = datehelper.getNumberOfMonths( soll.von, soll.bis, self._vj )
+            dic[soll.mobj_id] = dic.get( soll.mobj_id, 0 ) + months * getBetrag( soll )
+        return dic
+
     def getAnlageVData( self, master_name:str ) -> XAnlageV:
         """
         Liefert das AnlageVTableModel für alle Mietobjekte eines MasterObjekts
@@ -80,8 +155,8 @@ class AnlageVLogic:
         # Aufwände, die für das ganze steuerliche Objekt (master_objekt, repr.durch master_name) ermittelt werden
         x.afa = self._avdata.getAfa( master_name )
         # Erhalt.-Aufwände, die sofort und voll abgesetzt werden:
-        xealist = self._eadata.getEinAusZahlungen( EinAusArt.REPARATUR.display, self._vj,
-                                                   "and master_name = '%s' and verteilt_auf = 1 " % master_name )
+        xealist = self._eadata.getEinAusZahlungen( EinAusArt.REPARATUR.display, self._vj, master_name=master_name,
+                                                   verteilt_auf=1 )
         x.erhaltg_voll = int( round( sum( [xea.betrag for xea in xealist] ), 0 ) )
         x.entnahme_rue = self._avdata.getEntnahmeRuecklagen( master_name, self._vj )
         # zu verteilende Erhaltungsaufwände:
@@ -121,6 +196,9 @@ class AnlageVLogic:
         """
         #vertAufwDictList: List[Dict] = self._avdata.getVerteilteAufwaende( master_name )
         vertAufwaende: List[XEinAus] = self._avdata.getVerteilteAufwaende( master_name )
+        self._provideVerteilteAufwaende( vertAufwaende, xav )
+
+    def _provideVerteilteAufwaende( self, vertAufwaende:List[XEinAus], xav:XAnlageV ):
         # Achtung:
         # da sind auch Aufwände dabei,
         #    - die aus einem Jahr > Vj stammen, die erst nächstes Vj berücksichtigt werden dürfen
@@ -153,14 +231,17 @@ class AnlageVLogic:
 
     def provideAllgemeineHauskosten( self, master_name:str, xav:XAnlageV ):
         dic = self._avdata.getGrundsteuerVersicherungenDivAllg( master_name, self._vj )
+        self._provideAllgemeineHauskosten( dic, xav )
+
+    @staticmethod
+    def _provideAllgemeineHauskosten( dic:Dict, xav:XAnlageV ):
         xav.grundsteuer = dic.get( EinAusArt.GRUNDSTEUER.dbvalue, 0 )
         xav.versicherungen = dic.get( EinAusArt.VERSICHERUNG.dbvalue, 0 )
         xav.divAllgHk = dic.get( EinAusArt.ALLGEMEINE_KOSTEN.dbvalue, 0 )
 
     def getJahresBruttomiete( self, mobj_id:str ) -> (int, int):
-        addWhere = "and mobj_id = '%s'" % mobj_id
         xealist:List[XEinAus] = \
-            self._eadata.getEinAusZahlungen( EinAusArt.BRUTTOMIETE.display, self._vj, addWhere )
+            self._eadata.getEinAusZahlungen( EinAusArt.BRUTTOMIETE.display, self._vj, mobj_id=mobj_id )
         monate = len( xealist )
         summe = 0
         for xea in xealist:
@@ -194,14 +275,13 @@ class AnlageVLogic:
         """
         ##year = self._vj - 1
         nkaList:List[XEinAus] = \
-            self._eadata.getEinAusZahlungen( EinAusArt.NEBENKOSTEN_ABRECHNG.display, self._vj, "and mobj_id = '%s' "
-            % mobj_id )
+            self._eadata.getEinAusZahlungen( EinAusArt.NEBENKOSTEN_ABRECHNG.display, self._vj, mobj_id=mobj_id )
         nka = int( round( sum([xea.betrag for xea in nkaList]), 0 ) )
         return nka
 
     def getBruttoHausgeld( self, mobj_id:str ) -> int:
-        ealist:List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.HAUSGELD_VORAUS.display, self._vj, "and mobj_id = '%s' "
-                                                  % mobj_id)
+        ealist:List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.HAUSGELD_VORAUS.display, self._vj,
+                                                                mobj_id=mobj_id )
         brutto = int( round( sum( [x.betrag for x in ealist] ) ) )
         return brutto
 
@@ -230,14 +310,13 @@ class AnlageVLogic:
         """
         #year = self._vj - 1
         hgaList:List[XEinAus] = \
-            self._eadata.getEinAusZahlungen( EinAusArt.HAUSGELD_ABRECHNG.display, self._vj, "and mobj_id = '%s' "
-            % mobj_id )
+            self._eadata.getEinAusZahlungen( EinAusArt.HAUSGELD_ABRECHNG.display, self._vj, mobj_id=mobj_id )
         hga = int( round( sum([xea.betrag for xea in hgaList]), 0 ) )
         return hga
 
     def getReparaturenEinzeln( self, master_name:str ) -> SumTableModel or None:
         ealist:List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.REPARATUR.display, self._vj,
-                                                                "and master_name = '%s' " % master_name )
+                                                                master_name=master_name )
         ealist = [ea for ea in ealist if ea.verteilt_auf == 1]
         if len( ealist ) == 0:
             return None
@@ -258,14 +337,14 @@ class AnlageVLogic:
         :return:  SumTableModel
         """
         gslist: List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.GRUNDSTEUER.display, self._vj,
-                                                                 "and master_name = '%s' " % master_name )
+                                                                 master_name=master_name )
         verslist: List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.VERSICHERUNG.display, self._vj,
-                                                                 "and master_name = '%s' " % master_name )
+                                                                 master_name=master_name )
         allglist: List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.ALLGEMEINE_KOSTEN.display, self._vj,
-                                                                   "and master_name = '%s' " % master_name )
+                                                                   master_name=master_name )
         hgvlist = self._getHgvListOhneRueZuFue( master_name )
         hgalist: List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.HAUSGELD_ABRECHNG.display, self._vj,
-                                                                      "and master_name = '%s' " % master_name )
+                                                                      master_name=master_name )
         geslist = gslist + verslist + allglist + hgvlist + hgalist
         tm = SumTableModel( geslist, self._vj, ("betrag",) )
         tm.setKeyHeaderMappings2( ("master_name", "debi_kredi", "leistung", "ea_art", "buchungsdatum", "buchungstext", "betrag"),
@@ -275,7 +354,7 @@ class AnlageVLogic:
     def _getHgvListOhneRueZuFue( self, master_name:str ) -> List[XEinAus]:
         # Bruttozahlungen ermitteln:
         hgvlist: List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.HAUSGELD_VORAUS.display, self._vj,
-                                                                  "and master_name = '%s' " % master_name )
+                                                                  master_name=master_name )
         # Anhand der Soll-Zahlungen die Netto-Zahlungen ohne RüZuFü ermitteln:
         mobj_list: List[XMietobjekt] = self._avdata.getMietobjekte( master_name )
         nettoHg = 0
@@ -303,8 +382,7 @@ class AnlageVLogic:
         reise_ealist = self._getReisekostenEinzeln( master_name )
         # second Übrige
         sonst_ealist = self._eadata.getEinAusZahlungen( EinAusArt.SONSTIGE_KOSTEN.display, self._vj,
-                                                        "and master_name = '%s' and (reise_id is NULL or reise_id = 0)"
-                                                        % master_name )
+                                                        master_name=master_name, reise_id=None )
         ealist = list()
         if reise_ealist:
             ealist += reise_ealist
@@ -322,8 +400,8 @@ class AnlageVLogic:
         reiselogic = GeschaeftsreiseLogic()
         reisen:List[XGeschaeftsreise] = reiselogic.getGeschaeftsreisen( master_name, self._vj )
         ea_reisen:List[XEinAus] = self._eadata.getEinAusZahlungen( EinAusArt.SONSTIGE_KOSTEN.display,
-                                                                   self._vj,
-                                                                   "and master_name = '%s' and reise_id > 0 " % master_name )
+                                                                   self._vj, master_name=master_name )
+        ea_reisen = [ea for ea in ea_reisen if ea.reise_id]
         ealist:List[XEinAus] = list()
         for reise in reisen:
             for ea in ea_reisen:
@@ -364,4 +442,151 @@ class AnlageVLogic:
 def test():
     log = AnlageVLogic( 2022 )
     tm:AnlageVTableModel = log.getAnlageVTableModel( "NK_Kleist" )
-    print( tm )
\ No newline at end of file
+    print( tm )
+
+
+def testAnlageVDataAlle( vj:int=2022, pathToDatabase:str=None ):
+    """
+    Regressionstest für AnlageVLogic.getAnlageVDataAlle(): vergleicht für jedes Masterobjekt jedes Feld des
+    XAnlageV-Objekts mit dem Ergebnis der Einzelabfragen (getAnlageVData()) und gibt für beide Wege Laufzeit und
+    Anzahl der Selects aus.
+    Ohne <pathToDatabase> wird eine Fixture-Datenbank mit Zufallsdaten (fester Seed) angelegt, sonst wird eine
+    KOPIE der angegebenen Datenbank (z.B. immo.db) geprüft.
+    Muss in einem eigenen Prozess laufen: die Datenbankverbindung der Anwendung wird erst hier geöffnet.
+    """
+    import os
+    import random
+    import sqlite3
+    import tempfile
+    import time
+    from base.databasecommon2 import DatabaseCommon
+    from v2.einaus.einauscache import EinAusCache
+    import v2.icc.iccdata as iccdata
+    if DatabaseCommon._sqliteCon:
+        raise Exception( "testAnlageVDataAlle(): Die Datenbankverbindung ist schon geöffnet.\n"
+                         "Der Test muss in einem eigenen Prozess laufen." )
+    tmpdir = tempfile.TemporaryDirectory()
+    try:
+        path = os.path.join( tmpdir.name, "anlagev_fixture.db" )
+        con = sqlite3.connect( path )
+        if pathToDatabase:
+            src = sqlite3.connect( pathToDatabase )
+            src.backup( con )
+            src.close()
+        else:
+            con.executescript(
+                "create table masterobjekt ( master_id integer primary key, master_name text, lfdnr integer, "
+                "strasse_hnr text, plz text, ort text, gesamt_wfl integer, anz_whg integer, afa_wie_vj text, "
+                "afa integer, afa_proz real, hauswart text, hauswart_telefon text, hauswart_mailto text, heizung text, "
+                "angeschafft_am text, veraeussert_am text, bemerkung text, aktiv integer );"
+                "create table mietobjekt ( mobj_id text, master_name text, whg_bez text, qm integer, "
+                "container_nr text, bemerkung text );"
+                "create table mietverhaeltnis ( id integer primary key, mv_id text, mobj_id text );"
+                "create table sollmiete ( sm_id integer primary key, mv_id text, von text, bis text, netto real, "
+                "nkv real, bemerkung text );"
+                "create table verwaltung ( vwg_id integer primary key, master_name text, vw_id text, weg_name text, "
+                "von text, bis text, vw_ap text );"
+                "create table sollhausgeld ( shg_id integer primary key, vwg_id integer, mobj_id text, von text, "
+                "bis text, netto real, ruezufue real, bemerkung text );"
+                "create table hg_abrechnung ( hga_id integer primary key, mobj_id text, ab_jahr integer, "
+                "entnahme_rue real );"
+                "create table einaus ( ea_id integer primary key, master_name text, mobj_id text, debi_kredi text, "
+                "leistung text, sab_id integer, hga_id integer, nka_id integer, reise_id integer, jahr integer, "
+                "monat text, betrag real, ea_art text, verteilt_auf integer, umlegbar text, buchungsdatum text, "
+                "buchungstext text, write_time text );" )
+            random.seed( 4711 )
+            monate = ( "jan", "feb", "mrz", "apr", "mai", "jun", "jul", "aug", "sep", "okt", "nov", "dez" )
+            betrag = lambda von, bis: round( random.uniform( von, bis ), 2 )
+            einaus = list()
+            for m in range( 12 ):
+                master_name = "Master_%02d" % m
+                et = m % 3 == 0 # Eigentumswohnungen: mit Verwaltung und Soll-Hausgeld
+                con.execute( "insert into masterobjekt ( master_name, afa, aktiv ) values ( ?, ?, ? )",
+                             (master_name, random.randint( 0, 9000 ), 0 if m == 11 else 1) )
+                if et:
+                    con.execute( "insert into verwaltung ( master_name, vw_id, weg_name ) values ( ?, ?, ? )",
+                                 (master_name, "vw_%d" % m, "WEG %s" % master_name) )
+                    vwg_id = con.execute( "select max( vwg_id ) from verwaltung" ).fetchone()[0]
+                for w in range( random.randint( 0 if m == 10 else 1, 6 ) ):
+                    mobj_id = "%s_whg%d" % (master_name.lower(), w)
+                    con.execute( "insert into mietobjekt ( mobj_id, master_name ) values ( ?, ? )",
+                                 (mobj_id, master_name) )
+                    # Mieterwechsel zum 1. eines zufälligen Monats im Vj
+                    wechsel = random.randint( 2, 12 ) if w % 2 else 0
+                    for n, (von, bis) in enumerate( [("%d-01-01" % (vj-3), "%d-%02d-01" % (vj, wechsel)),
+                                                     ("%d-%02d-01" % (vj, wechsel), None)] if wechsel
+                                                    else [("%d-01-01" % (vj-3), None)] ):
+                        mv_id = "%s_mieter%d" % (mobj_id, n)
+                        con.execute( "insert into mietverhaeltnis ( mv_id, mobj_id ) values ( ?, ? )",
+                                     (mv_id, mobj_id) )
+                        if bis:
+                            bis = con.execute( "select date( ?, '-1 day' )", (bis,) ).fetchone()[0]
+                        con.execute( "insert into sollmiete ( mv_id, von, bis, netto, nkv ) values ( ?, ?, ?, ?, ? )",
+                                     (mv_id, von, bis, betrag( 300, 900 ), betrag( 50, 250 )) )
+                    if et:
+                        con.execute( "insert into sollhausgeld ( vwg_id, mobj_id, von, bis, netto, ruezufue ) "
+                                     "values ( ?, ?, ?, ?, ?, ? )",
+                                     (vwg_id, mobj_id, "%d-01-01" % (vj-2), "%d-06-30" % vj, betrag( 150, 300 ),
+                                      betrag( 20, 80 )) )
+                        con.execute( "insert into sollhausgeld ( vwg_id, mobj_id, von, bis, netto, ruezufue ) "
+                                     "values ( ?, ?, ?, NULL, ?, ? )",
+                                     (vwg_id, mobj_id, "%d-07-01" % vj, betrag( 150, 300 ), betrag( 20, 80 )) )
+                        con.execute( "insert into hg_abrechnung ( mobj_id, ab_jahr, entnahme_rue ) values ( ?, ?, ? )",
+                                     (mobj_id, vj, betrag( 0, 500 ) if w % 2 else None) )
+                    for jahr in range( vj-1, vj+2 ):
+                        for monat in monate:
+                            # Teilzahlungen in manchen Monaten
+                            for t in range( random.choice( (0, 1, 1, 1, 2) ) ):
+                                einaus.append( (master_name, mobj_id, "bruttomiete", jahr, monat,
+                                                betrag( 300, 1100 ), None, None) )
+                            if et:
+                                einaus.append( (master_name, mobj_id, "hgv", jahr, monat, -betrag( 170, 380 ),
+                                                None, None) )
+                        einaus.append( (master_name, mobj_id, "nka", jahr, "mrz", betrag( -400, 400 ), None, None) )
+                        if et:
+                            einaus.append( (master_name, mobj_id, "hga", jahr, "mai", betrag( -600, 600 ), None, None) )
+                for jahr in range( vj-6, vj+2 ):
+                    for i in range( random.randint( 0, 4 ) ):
+                        einaus.append( (master_name, None, "rep", jahr, random.choice( monate ), -betrag( 50, 9000 ),
+                                        random.choice( (1, 1, 2, 3, 4, 5) ), None) )
+                    for ea_art in ( "gs", "vers", "allg", "sonst" ):
+                        for i in range( random.randint( 0, 3 ) ):
+                            reise_id = random.choice( (None, None, 0, len( einaus )) ) if ea_art == "sonst" else None
+                            einaus.append( (master_name, None, ea_art, jahr, random.choice( monate ),
+                                            -betrag( 10, 900 ), None, reise_id) )
+            con.executemany( "insert into einaus ( master_name, mobj_id, ea_art, jahr, monat, betrag, verteilt_auf, "
+                             "reise_id ) values ( ?, ?, ?, ?, ?, ?, ?, ? )", einaus )
+            con.commit()
+        con.close()
+        iccdata.DATABASE = path
+        logic = AnlageVLogic( vj )
+        selects = list()
+        DatabaseCommon._sqliteCon.set_trace_callback( lambda sql: selects.append( sql ) if sql.lower().lstrip()
+                                                      .startswith( "select" ) else None )
+        master_names = [master.master_name for master in logic._avdata.getMasterobjekte()]
+        EinAusCache.inst().invalidate()
+        selects.clear()
+        t = time.perf_counter()
+        einzeln = [logic.getAnlageVData( master_name ) for master_name in master_names]
+        print( "Einzelabfragen:    %.1f ms, %d Selects" % ((time.perf_counter() - t)*1000, len( selects )) )
+        EinAusCache.inst().invalidate()
+        selects.clear()
+        t = time.perf_counter()
+        alle = logic.getAnlageVDataAlle()
+        print( "getAnlageVDataAlle: %.1f ms, %d Selects" % ((time.perf_counter() - t)*1000, len( selects )) )
+        DatabaseCommon._sqliteCon.set_trace_callback( None )
+
+        def werte( x:XAnlageV ) -> Dict:
+            # verteil_aufwand_im_vj_angefallen wird ungerundet summiert (Reihenfolge der Summanden ist nicht festgelegt)
+            return {k: round( v, 2 ) if isinstance( v, float ) else v for k, v in x.__dict__.items()}
+        assert [x.master_name for x in alle] == master_names
+        errors = ["%s.%s: einzeln %s, alle %s" % (xe.master_name, k, v, werte( xa )[k])
+                  for xe, xa in zip( einzeln, alle ) for k, v in werte( xe ).items() if werte( xa )[k] != v]
+        assert not errors, "\n".join( errors )
+        print( "ok (%d Masterobjekte)" % len( alle ) )
+    finally:
+        # die Verbindung der Anwendung hält die Fixture-Datenbank offen; erst schließen, dann löschen
+        if DatabaseCommon._sqliteCon:
+            DatabaseCommon._sqliteCon.close()
+            DatabaseCommon._sqliteCon = None
+        tmpdir.cleanup()
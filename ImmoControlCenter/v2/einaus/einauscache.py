@@ -0,0 +1,227 @@
+import copy
+from typing import List, Dict, Callable, Any, Iterable, Set
+
+from v2.einaus.einauswritedispatcher import EinAusWriteDispatcher
+from v2.icc.constants import EinAusArt
+from v2.icc.interfaces import XEinAus
+
+# Spalten, nach denen die Zahlungen eines Jahres indiziert werden
+INDEXED_ATTRIBUTES = ( "ea_art", "monat", "mobj_id", "debi_kredi", "master_name", "sab_id", "hga_id", "nka_id",
+                       "reise_id" )
+
+
+#################   EinAusJahr   #################################
+class EinAusJahr:
+    """
+    Alle Zahlungen eines Jahres aus Tabelle einaus, je Spalte in INDEXED_ATTRIBUTES indiziert.
+    Die gehaltenen XEinAus-Objekte verlassen diese Klasse nie: find() liefert Kopien, damit Änderungen der
+    Aufrufer (z.B. das Verdichten von Zahlungen) den Cache nicht verfälschen.
+    Die Zahlungen sind genau so, wie sie ein Select auf Tabelle einaus liefert (ea_art als display-Wert, s.
+    EinAusData._mapDbValueToDisplay()), NULL-Werte also als None und leere Strings als "".
+    """
+    def __init__( self, jahr:int, xlist:Iterable[XEinAus] ):
+        self.jahr = jahr
+        self._byId:Dict[int, XEinAus] = dict()
+        # key: Spaltenname, value: Dictionary (key: Spaltenwert, value: Zahlungen mit diesem Wert, key: ea_id)
+        self._index:Dict[str, Dict[Any, Dict[int, XEinAus]]] = {attr: dict() for attr in INDEXED_ATTRIBUTES}
+        for x in xlist:
+            self._add( x )
+
+    def add( self, x:XEinAus ):
+        """
+        Nimmt <x> auf; eine vorhandene Zahlung mit gleicher ea_id wird ersetzt.
+        <x> muss aus der Datenbank gelesen sein (s. EinAusCache.getJahr()), nicht vom Aufrufer eines Inserts oder
+        Updates stammen: dessen Werte können von den gespeicherten abweichen (z.B. "" statt NULL).
+        """
+        self.remove( x.ea_id )
+        self._add( x )
+
+    def _add( self, x:XEinAus ):
+        self._byId[x.ea_id] = x
+        for attr in INDEXED_ATTRIBUTES:
+            self._index[attr].setdefault( getattr( x, attr ), dict() )[x.ea_id] = x
+
+    def remove( self, ea_id:int ) -> bool:
+        x = self._byId.pop( ea_id, None )
+        if x is None:
+            return False
+        for attr in INDEXED_ATTRIBUTES:
+            bucket = self._index[attr].get( getattr( x, attr ) )
+            if bucket is not None:
+                bucket.pop( ea_id, None )
+        return True
+
+    def contains( self, ea_id:int ) -> bool:
+        return ea_id in self._byId
+
+    def find( self, **criteria ) -> List[XEinAus]:
+        """
+        Liefert Kopien aller Zahlungen, deren Spalten den Werten in <criteria> entsprechen,
+        z.B. find( ea_art=EinAusArt.BRUTTOMIETE.display, monat="jan", mobj_id="thomasmann" ).
+        Gesucht wird in der kleinsten der über <criteria> indizierten Mengen.
+        """
+        return [copy.copy( x ) for x in self._select( criteria )]
+
+    def getSumme( self, **criteria ) -> float:
+        """
+        Liefert die Summe der Beträge aller Zahlungen, die <criteria> entsprechen (siehe find())
+        """
+        return sum( x.betrag for x in self._select( criteria ) )
+
+    def iterZahlungen( self ) -> Iterable[XEinAus]:
+        """
+        Liefert die gehaltenen Zahlungen selbst, NUR zum Lesen (Summen, Zählungen).
+        """
+        return self._byId.values()
+
+    def _select( self, criteria:Dict[str, Any] ) -> List[XEinAus]:
+        buckets = [self._index[attr].get( value, dict() ) for attr, value in criteria.items()
+                   if attr in INDEXED_ATTRIBUTES]
+        candidates = min( buckets, key=len ).values() if buckets else self._byId.values()
+        return [x for x in candidates if all( getattr( x, attr ) == value for attr, value in criteria.items() )]
+
+
+#################   EinAusCache   #################################
+class EinAusCache:
+    """
+    Hält die Zahlungen der bereits abgefragten Jahre im Speicher (siehe EinAusJahr), damit Monatswechsel und
+    Detailanzeigen keine Datenbankzugriffe mehr brauchen.
+    Der Cache wird über die Signale des EinAusWriteDispatchers fortgeschrieben; wer in Tabelle einaus schreibt,
+    muss also (wie bisher schon für die Summenfelder) den EinAusWriteDispatcher informieren.
+    Eingefügte und geänderte Zahlungen werden beim nächsten Zugriff mit einem Select über ihre ea_ids gelesen,
+    damit der Cache dieselben Werte hält wie die Datenbank.
+    """
+    __instance = None
+    def __init__( self ):
+        if EinAusCache.__instance:
+            raise Exception( "EinAusCache is a Single. It may only be instantiated once." )
+        EinAusCache.__instance = self
+        self._jahre:Dict[int, EinAusJahr] = dict()
+        self._pending:Set[int] = set() # ea_ids der eingefügten bzw. geänderten Zahlungen, die noch zu lesen sind
+        self.loads = 0 # Anzahl der Jahre, die aus der Datenbank gelesen wurden
+        dispatcher = EinAusWriteDispatcher.inst()
+        dispatcher.ea_inserted.connect( self.onEinAusInserted )
+        dispatcher.ea_updated.connect( self.onEinAusUpdated )
+        dispatcher.ea_deleted.connect( self.onEinAusDeleted )
+
+    @staticmethod
+    def inst() -> __instance:
+        if EinAusCache.__instance is None:
+            EinAusCache()
+        return EinAusCache.__instance
+
+    def getJahr( self, jahr:int, load:Callable[[int], List[XEinAus]],
+                 loadByIds:Callable[[List[int]], List[XEinAus]] ) -> EinAusJahr:
+        """
+        Liefert die Zahlungen des Jahres <jahr>. Ist das Jahr noch nicht im Cache, wird es mit <load> gelesen.
+        Seit dem letzten Zugriff eingefügte oder geänderte Zahlungen werden vorher mit <loadByIds> gelesen und in
+        ihre Jahre übernommen.
+        """
+        if self._pending:
+            ea_ids = list( self._pending )
+            self._pending.clear()
+            for x in loadByIds( ea_ids ):
+                ej = self._jahre.get( x.jahr )
+                if ej is not None:
+                    ej.add( x )
+        ej = self._jahre.get( jahr )
+        if ej is None:
+            ej = EinAusJahr( jahr, load( jahr ) )
+            self._jahre[jahr] = ej
+            self.loads += 1
+        return ej
+
+    def invalidate( self, jahr:int=None ):
+        """
+        Verwirft das Jahr <jahr> bzw. alle Jahre (jahr = None); sie werden beim nächsten Zugriff neu gelesen.
+        """
+        if jahr is None:
+            self._jahre.clear()
+            self._pending.clear()
+        else:
+            self._jahre.pop( jahr, None )
+
+    def onEinAusInserted( self, x:XEinAus ):
+        if x.jahr in self._jahre:
+            self._pending.add( x.ea_id )
+
+    def onEinAusUpdated( self, x:XEinAus, delta ):
+        # das Jahr kann sich geändert haben
+        for jahr in self._jahre.values():
+            jahr.remove( x.ea_id )
+        self.onEinAusInserted( x )
+
+    def onEinAusDeleted( self, ea_id_list:List[int], ea_art:str, delta ):
+        for ea_id in ea_id_list:
+            self._pending.discard( ea_id )
+            for jahr in self._jahre.values():
+                if jahr.remove( ea_id ):
+                    break
+
+
+################  TEST TEST TEST   ###########################
+def testEinAusCache( jahr:int=2022 ):
+    """
+    Vergleicht die Abfragen über den EinAusCache mit den entsprechenden Selects (Ergebnis und Laufzeit)
+    für alle Monate und Mietobjekte des Jahres <jahr>.
+    Verglichen werden die kompletten Objekte, auch nach dem Einfügen einer Zahlung mit leeren Werten
+    (wird anschließend zurückgerollt).
+    """
+    import time
+    from v2.einaus.einausdata import EinAusData
+    from v2.icc.constants import iccMonthShortNames
+    from v2.icc.interfaces import XEinAus
+    def toDicts( xlist:List[XEinAus] ) -> List[Dict]:
+        return sorted( (x.__dict__ for x in xlist), key=lambda d: d["ea_id"] )
+    def readJahr() -> List[XEinAus]:
+        # so hat getEinAuszahlungenJahr() die Zahlungen vor Einführung des EinAusCache gelesen
+        sql = "select ea_id, master_name, coalesce(mobj_id, '') as mobj_id, " \
+              "coalesce(debi_kredi, '') as debi_kredi, coalesce(leistung, '') as leistung, " \
+              "sab_id, hga_id, nka_id, reise_id, jahr, monat, betrag, ea_art, " \
+              "coalesce(verteilt_auf, '') as verteilt_auf, umlegbar, " \
+              "coalesce( buchungsdatum, '') as buchungsdatum, coalesce(buchungstext, '') as buchungstext, " \
+              "write_time " \
+              "from einaus " \
+              "where jahr = ? "
+        xlist = data.readAllGetObjectList( sql, XEinAus, (jahr,) )
+        data._mapDbValueToDisplay( xlist )
+        return xlist
+    data = EinAusData()
+    sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, " \
+          "jahr, monat, betrag, ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
+          "from einaus " \
+          "where jahr = ? and monat = ? and mobj_id = ? and ea_art = ? "
+    mobj_ids = [row[0] for row in data.read( "select distinct mobj_id from einaus where jahr = ? and mobj_id > '' ",
+                                         (jahr,) )]
+    ea_art = EinAusArt.BRUTTOMIETE
+    t = time.perf_counter()
+    old = list()
+    for monat in iccMonthShortNames:
+        for mobj_id in mobj_ids:
+            xlist = data.readAllGetObjectList( sql, XEinAus, (jahr, monat, mobj_id, ea_art.dbvalue) )
+            data._mapDbValueToDisplay( xlist )
+            old.append( toDicts( xlist ) )
+    print( "Selects:   %.1f ms" % ((time.perf_counter() - t)*1000) )
+    EinAusCache.inst().invalidate()
+    t = time.perf_counter()
+    new = [toDicts( data.getEinAuszahlungen2( ea_art.display, jahr, monat, mobj_id ) )
+           for monat in iccMonthShortNames for mobj_id in mobj_ids]
+    print( "EinAusCache (inkl. Laden des Jahres): %.1f ms" % ((time.perf_counter() - t)*1000) )
+    assert old == new and EinAusCache.inst().loads >= 1
+    assert toDicts( data.getEinAuszahlungenJahr( jahr ) ) == toDicts( readJahr() )
+    assert round( data.getEinnahmenSumme( jahr ), 2 ) == \
+           round( data.read( "select coalesce(sum(betrag), 0) from einaus where jahr = ? and betrag > 0 ",
+                             (jahr,) )[0][0], 2 )
+    # Zahlung mit leeren Werten: der Cache muss sie so halten, wie sie gespeichert wurde (NULL statt "" bzw. 0)
+    x = XEinAus()
+    x.master_name = "__testEinAusCache__"
+    x.jahr, x.monat, x.betrag, x.ea_art = jahr, "jan", -1.0, EinAusArt.ALLGEMEINE_KOSTEN.display
+    data.insertEinAusZahlung( x )
+    EinAusCache.inst().onEinAusInserted( x )
+    try:
+        cached = data.getJahr( jahr ).find( ea_id=x.ea_id )
+        assert toDicts( cached ) == toDicts( data.getEinAusZahlungenByIds( [x.ea_id] ) )
+        assert toDicts( data.getEinAuszahlungenJahr( jahr ) ) == toDicts( readJahr() )
+    finally:
+        data.rollback()
+    print( "ok" )
@@ -79,9 +79,10 @@ class EinAusController( IccController ):
         c = SammelabgabeController()
         einauslist:List[XEinAus] = c.processSammelabgabe( self._jahr )
         if einauslist and len( einauslist ) > 0:
-            tm:EinAusTableModel = self._tv.model()
+            # EinAusWriteDispatcher informieren, damit der EinAusCache, die Summenfelder und
+            # (über onEinAusInserted) die tableview "Alle Zahlungen" aktualisiert werden
             for ea in einauslist:
-                tm.addObject( ea )
+                EinAusWriteDispatcher.inst().einaus_inserted( ea )
 
     def onNewEinAus( self ):
         """
@@ -152,8 +153,12 @@ class EinAusController( IccController ):
         if self._jahr == x.jahr:
             tm:EinAusTableModel = self._tv.model()
             x2 = tm.getElementByUniqueKeyValue( "ea_id", x.ea_id )
-            if x != x2:
-                x2.updateFromOther( x )
+            if x2:
+                if x != x2:
+                    x2.updateFromOther( x )
+                # auch wenn x2 schon geändert ist (x2 is x): das Model hält die Werte spaltenweise vor
+                # und muss über die Änderung informiert werden
+                tm.objectUpdatedExternally( x2 )
 
     def onDeleteEinAus( self, rows:List[int] ):
         """
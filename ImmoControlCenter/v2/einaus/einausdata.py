@@ -1,9 +1,10 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import datehelper
 #from v2.einaus.einauswritedispatcher import EinAusWriteDispatcher
+from v2.einaus.einauscache import EinAusCache, EinAusJahr
 
 from v2.icc.constants import EinAusArt, Umlegbar
-from v2.icc.iccdata import IccData, DbAction
+from v2.icc.iccdata import IccData, DbAction, WriteBatch
 from v2.icc.interfaces import XEinAus, XLetzteBuchung
 
 
@@ -113,49 +114,84 @@ class EinAusData( IccData ):
         :return:
         """
         x = self.getEinAusZahlung( ea_id )
-        sql = "delete from einaus where ea_id = %d" % ea_id
+        sql = "delete from einaus where ea_id = ?"
         self.writeAndLog( sql, DbAction.DELETE, "einaus", "ea_id", ea_id,
-                          newvalues=None, oldvalues=x.toString( printWithClassname=True )  )
+                          newvalues=None, oldvalues=x.toString( printWithClassname=True ), params=(ea_id,) )
         #self._dispatch.einaus_deleted( ea_id )
 
+    def deleteEinAusZahlungen( self, ea_ids:List[int] ):
+        """
+        Löscht mehrere Zahlungen aus <einaus>.
+        Die alten Zustände (für writelog) werden mit einem einzigen Select gelesen, Löschungen und Log-Einträge
+        gesammelt per executemany geschrieben (siehe IccData.writeBatchAndLog()).
+        Macht keinen Commit.
+        :param ea_ids:
+        :return:
+        """
+        if len( ea_ids ) == 0: return
+        xlist = self.getEinAusZahlungenByIds( ea_ids )
+        batch = WriteBatch( "delete from einaus where ea_id = ?", DbAction.DELETE, "einaus", "ea_id" )
+        for x in xlist:
+            batch.add( (x.ea_id,), x.ea_id, newvalues=None, oldvalues=x.toString( printWithClassname=True ) )
+        self.writeBatchAndLog( batch )
+
+    def getJahr( self, jahr:int ) -> EinAusJahr:
+        """
+        Liefert alle Zahlungen des Jahres <jahr> aus dem EinAusCache; beim ersten Zugriff auf ein Jahr werden sie
+        mit einem einzigen Select gelesen.
+        """
+        return EinAusCache.inst().getJahr( jahr, self._readEinAuszahlungenJahr, self.getEinAusZahlungenByIds )
+
+    def _readEinAuszahlungenJahr( self, jahr:int ) -> List[XEinAus]:
+        sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, " \
+              "jahr, monat, betrag, " \
+              "ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
+              "from einaus " \
+              "where jahr = ? " \
+              "order by ea_id "
+        xlist = self.readAllGetObjectListFast( sql, XEinAus, (jahr,) )
+        self._mapDbValueToDisplay( xlist )
+        return xlist
+
     def getEinnahmenSumme( self, jahr:int ) -> float:
         """ Liefert die Summe aller Einnahmen (betrag > 0) im Jahr <jahr>"""
-        sql = "select sum(betrag) as sum_ein " \
-              "from einaus " \
-              "where jahr = %d " \
-              "and betrag > 0 " % jahr
-        d = self.readOneGetDict( sql )
-        summe = d["sum_ein"]
-        return 0 if not summe else summe
+        return sum( x.betrag for x in self.getJahr( jahr ).iterZahlungen() if x.betrag > 0 )
 
     def getAuszahlungenSummeOhneHGV( self, jahr:int ) -> float:
         """ Liefert die Summe aller Auszahlungen (= negative Beträge) OHNE HG-Vorausz. im Jahr <jahr>"""
-        sql = "select sum(betrag) as sum_aus from einaus " \
-             "where jahr = %d " \
-             "and betrag < 0 " \
-             "and ea_art != '%s' " % ( jahr, EinAusArt.HAUSGELD_VORAUS.dbvalue )
-        d = self.readOneGetDict( sql )
-        summe = d["sum_aus"]
-        return 0 if not summe else summe
+        return sum( x.betrag for x in self.getJahr( jahr ).iterZahlungen()
+                    if x.betrag < 0 and x.ea_art != EinAusArt.HAUSGELD_VORAUS.display )
 
     def getHGVAuszahlungenSumme( self, jahr:int ) -> float:
         """ Liefert die Summe der HGV-Zahlungen im Jahr <jahr>"""
-        sql = "select sum(betrag) as sum_hgv from einaus " \
-              "where jahr = %d " \
-              "and ea_art = '%s' " % (jahr, EinAusArt.HAUSGELD_VORAUS.dbvalue)
-        d = self.readOneGetDict( sql )
-        summe = d["sum_hgv"]
-        return 0 if not summe else summe
+        return self.getJahr( jahr ).getSumme( ea_art=EinAusArt.HAUSGELD_VORAUS.display )
 
     def getEinAusZahlung( self, ea_id:int ) -> XEinAus:
         sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, jahr, monat, " \
               "betrag, ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
               "from einaus " \
-              "where ea_id = %d " % ea_id
-        x = self.readOneGetObject( sql, XEinAus )
+              "where ea_id = ? "
+        x = self.readOneGetObject( sql, XEinAus, (ea_id,) )
         self._mapDbValueToDisplay( (x,) )
         return x
 
+    def getEinAusZahlungenByIds( self, ea_ids:List[int] ) -> List[XEinAus]:
+        """
+        Liefert die Zahlungen mit den IDs <ea_ids> (in beliebiger Reihenfolge).
+        """
+        xlist = list()
+        chunksize = 500 # Sqlite begrenzt die Anzahl der Platzhalter je Statement
+        for i in range( 0, len( ea_ids ), chunksize ):
+            chunk = tuple( ea_ids[i:i+chunksize] )
+            placeholders = ", ".join( "?" * len( chunk ) )
+            sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, " \
+                  "jahr, monat, betrag, ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
+                  "from einaus " \
+                  "where ea_id in (%s) " % placeholders
+            xlist += self.readAllGetObjectListFast( sql, XEinAus, chunk )
+        self._mapDbValueToDisplay( xlist )
+        return xlist
+
     def getEaIdAndBetragByForeignKey( self, foreignKeyName:str, foreignKeyValue:int ) -> Dict:
         """
         :param foreignKeyName:
@@ -164,48 +200,51 @@ class EinAusData( IccData ):
         """
         sql = "select ea_id, betrag " \
               "from einaus " \
-              "where %s = %d " % (foreignKeyName, foreignKeyValue )
-        dic = self.readOneGetDict( sql )
+              "where %s = ? " % foreignKeyName # Spaltenname, kann nicht als Parameter gebunden werden
+        dic = self.readOneGetDict( sql, (foreignKeyValue,) )
         return dic
 
     def getEinAuszahlungenJahr( self, jahr:int ) -> List[XEinAus]:
         """
-        Liefert alle Ein- und Auszahlungen im jahr <jahr>
+        Liefert alle Ein- und Auszahlungen im jahr <jahr>.
+        NULL-Werte in mobj_id, debi_kredi, leistung, verteilt_auf, buchungsdatum und buchungstext werden als ""
+        geliefert (wie mit coalesce() gelesen), alle anderen Spalten so, wie sie gespeichert sind.
         :param jahr: z.B. 2022
         :return:
         """
-        sql = "select ea_id, master_name, coalesce(mobj_id, '') as mobj_id, coalesce(debi_kredi, '') as debi_kredi, " \
-              "coalesce(leistung, '') as leistung, " \
-              "sab_id, hga_id, nka_id, reise_id, jahr, monat, betrag, ea_art, " \
-              "coalesce(verteilt_auf, '') as verteilt_auf, umlegbar, " \
-              "coalesce( buchungsdatum, '') as buchungsdatum, coalesce(buchungstext, '') as buchungstext, " \
-              "write_time " \
-              "from einaus " \
-              "where jahr = %d "  % jahr
-        xlist = self.readAllGetObjectList( sql, XEinAus )
-        self._mapDbValueToDisplay( xlist )
+        xlist = self.getJahr( jahr ).find()
+        for x in xlist:
+            for attr in ( "mobj_id", "debi_kredi", "leistung", "verteilt_auf", "buchungsdatum", "buchungstext" ):
+                if getattr( x, attr ) is None:
+                    setattr( x, attr, "" )
         return xlist
 
-    def getEinAusZahlungen( self, ea_art_display:str, jahr: int, additionalWhereClause="" ) -> List[XEinAus]:
+    def getEinAusZahlungen( self, ea_art_display:str, jahr: int, additionalWhereClause="",
+                            additionalParams:Tuple=(), **criteria ) -> List[XEinAus]:
         """
         Liefert eine nicht sortierte Liste von XEinAus-Objekten, die den gegebenen Kriterien genügen
         :param ea_art_display: erwartet wird hier der display-Wert der versch. EinAusArten, z.B. "Bruttomiete"
         :param jahr: yyyy
-        :param additionalWhereClause: optionale zusätzliche Selektionsbedingung ( z.B. "and sab_id > 0")
+        :param additionalWhereClause: optionale zusätzliche Selektionsbedingung ( z.B. "and sab_id > 0"
+                                      oder "and mobj_id = ? "). Nur dann wird die Datenbank gelesen.
+        :param additionalParams: die Werte für die Platzhalter in <additionalWhereClause>
+        :param criteria: zusätzliche Gleichheitsbedingungen, die aus dem EinAusCache bedient werden
+                         (z.B. mobj_id="thomasmann", master_name="SB_Kaiser")
         :return:  List[XEinAus]
         """
+        if not additionalWhereClause:
+            return self.getJahr( jahr ).find( ea_art=ea_art_display, **criteria )
         ea_art_db = EinAusArt.getDbValue( ea_art_display )
         sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, " \
               "jahr, monat, betrag, " \
               "ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
               "from einaus " \
-              "where jahr = %d " \
-              "and ea_art = '%s' " % ( jahr, ea_art_db )
-        if additionalWhereClause:
-            sql += additionalWhereClause
-        xlist = self.readAllGetObjectList( sql, XEinAus )
+              "where jahr = ? " \
+              "and ea_art = ? "
+        sql += additionalWhereClause
+        xlist = self.readAllGetObjectListFast( sql, XEinAus, (jahr, ea_art_db) + tuple( additionalParams ) )
         self._mapDbValueToDisplay( xlist )
-        return xlist
+        return [x for x in xlist if all( getattr( x, attr ) == value for attr, value in criteria.items() )]
 
     # def getAnzahlEinAus( self, ea_art_display:str, jahr: int, additionalWhereClause="" ) -> int:
     #     ea_art_db = EinAusArt.getDbValue( ea_art_display )
@@ -225,18 +264,7 @@ class EinAusData( IccData ):
         :param mobj_id: z.B. "thomasmann"
         :return: List[XEinAus]
         """
-        ea_art_db = EinAusArt.getDbValue( ea_art_display )
-        sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sabid, hga_id, nka_id, reise_id, " \
-              "jahr, monat, betrag, " \
-              "ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
-              "from einaus " \
-              "where jahr = %d " \
-              "and monat = '%s' " \
-              "and mobj_id = '%s' " \
-              "and ea_art = '%s' " % (jahr, monat, mobj_id, ea_art_db)
-        xlist = self.readAllGetObjectList( sql, XEinAus )
-        self._mapDbValueToDisplay( xlist )
-        return xlist
+        return self.getJahr( jahr ).find( ea_art=ea_art_display, monat=monat, mobj_id=mobj_id )
 
     def getEinAuszahlungen3( self, ea_art_display:str, jahr:int, monat:str, debikredi:str ) -> List[XEinAus]:
         """
@@ -247,40 +275,24 @@ class EinAusData( IccData ):
         :param debikredi: ID des Mieters oder Name der WEG oder Firma
         :return: List[XEinAus]
         """
-        ea_art_db = EinAusArt.getDbValue( ea_art_display )
-        sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, " \
-              "jahr, monat, betrag, " \
-              "ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
-              "from einaus " \
-              "where jahr = %d " \
-              "and monat = '%s' " \
-              "and debi_kredi = '%s' " \
-              "and ea_art = '%s' " % (jahr, monat, debikredi, ea_art_db)
-        xlist = self.readAllGetObjectList( sql, XEinAus )
-        self._mapDbValueToDisplay( xlist )
-        return xlist
+        return self.getJahr( jahr ).find( ea_art=ea_art_display, monat=monat, debi_kredi=debikredi )
 
     def getEinAuszahlungen4( self, sab_id:int, jahr:int, monat:str ) -> List[XEinAus]:
         """
-        Liefert eine Liste von XEinAus-Objekten, die den gegebenen Kriterien genügen
+        Liefert eine Liste von XEinAus-Objekten, die den gegebenen Kriterien genügen, jeweils mit der
+        Vertragsnummer (vnr) des SollAbschlags
         :param sab_id: SollAbschlag-ID
         :param jahr: yyyy
         :param monat: z.B. "jan", "mrz",... siehe iccMonthShortNames
-        :param mv_id: ID des Mieters
         :return: List[XEinAus]
         """
-        sql = "select ea.ea_id, ea.master_name, ea.mobj_id, ea.debi_kredi, ea.leistung, ea.sab_id, ea.hga_id, " \
-              "ea.nka_id, ea.reise_id, " \
-              "ea.jahr, ea.monat, ea.betrag, " \
-              "ea.ea_art, ea.verteilt_auf, ea.umlegbar, ea.buchungsdatum, ea.buchungstext, ea.write_time," \
-              "sab.vnr " \
-              "from einaus ea " \
-              "inner join sollabschlag sab on sab.sab_id = ea.sab_id " \
-              "where ea.jahr = %d " \
-              "and ea.monat = '%s' " \
-              "and ea.sab_id = %d " % (jahr, monat, sab_id )
-        xlist = self.readAllGetObjectList( sql, XEinAus )
-        self._mapDbValueToDisplay( xlist )
+        xlist = self.getJahr( jahr ).find( sab_id=sab_id, monat=monat )
+        if xlist:
+            d = self.readOneGetDict( "select vnr from sollabschlag where sab_id = ? ", (sab_id,) )
+            if not d:
+                return list() # wie beim inner join auf sollabschlag
+            for x in xlist:
+                x.vnr = d["vnr"]
         return xlist
 
     def getEinAuszahlungen5( self, ea_art_display: str, jahr: int, monat: str, debikredi: str, mobj_id:str ) -> List[XEinAus]:
@@ -293,26 +305,14 @@ class EinAusData( IccData ):
         :param mobj_id: ID des Mietobjekts
         :return: List[XEinAus]
         """
-        ea_art_db = EinAusArt.getDbValue( ea_art_display )
-        sql = "select ea_id, master_name, mobj_id, debi_kredi, leistung, sab_id, hga_id, nka_id, reise_id, " \
-              "jahr, monat, betrag, " \
-              "ea_art, verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time " \
-              "from einaus " \
-              "where jahr = %d " \
-              "and monat = '%s' " \
-              "and debi_kredi = '%s' " \
-              "and mobj_id = '%s' " \
-              "and ea_art = '%s' " % (jahr, monat, debikredi, mobj_id, ea_art_db)
-        xlist = self.readAllGetObjectList( sql, XEinAus )
-        self._mapDbValueToDisplay( xlist )
-        return xlist
+        return self.getJahr( jahr ).find( ea_art=ea_art_display, monat=monat, debi_kredi=debikredi, mobj_id=mobj_id )
 
     def getEinAuszahlungenByHgaId( self, hga_id:int ) -> List[XEinAus]:
         sql = "select ea_id, master_name, debi_kredi, hga_id, jahr, monat, betrag, " \
               "ea_art, buchungsdatum, buchungstext, write_time " \
               "from einaus " \
-              "where hga_id = %d " % hga_id
-        xlist = self.readAllGetObjectList( sql, XEinAus )
+              "where hga_id = ? "
+        xlist = self.readAllGetObjectListFast( sql, XEinAus, (hga_id,) )
         self._mapDbValueToDisplay( xlist )
         return xlist
 
@@ -320,8 +320,8 @@ class EinAusData( IccData ):
         sql = "select ea_id, master_name, debi_kredi, hga_id, jahr, monat, betrag, " \
               "ea_art, buchungsdatum, buchungstext, write_time " \
               "from einaus " \
-              "where nka_id = %d " % nka_id
-        xlist = self.readAllGetObjectList( sql, XEinAus )
+              "where nka_id = ? "
+        xlist = self.readAllGetObjectListFast( sql, XEinAus, (nka_id,) )
         self._mapDbValueToDisplay( xlist )
         return xlist
 
@@ -226,6 +226,9 @@ class EinAusDialogController( QObject ):
         if msg:
             return msg
         else:
+            # Die gespeicherte Zahlung melden, bevor self._x für die nächste Zahlung zurückgesetzt wird.
+            # (Die letzte Zahlung wird nach "OK" von processNewEinAus() gemeldet.)
+            EinAusWriteDispatcher.inst().einaus_inserted( copy.copy( self._x ) )
             self._resetDialog()
             return  ""
 
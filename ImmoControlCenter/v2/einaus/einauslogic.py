@@ -3,14 +3,14 @@ from typing import List, Dict
 import datehelper
 from v2.einaus.einausdata import EinAusData
 from v2.icc.constants import iccMonthShortNames, EinAusArt, Umlegbar
-from v2.icc.icclogic import IccTableModel, IccLogic
+from v2.icc.icclogic import IccColumnarTableModel, IccLogic
 from v2.icc.interfaces import XEinAus, XSummen, XLetzteBuchung
 
 
 #################   EinAusTableModel   ############################
-class EinAusTableModel( IccTableModel):
+class EinAusTableModel( IccColumnarTableModel ):
     def __init__( self, rowlist:List[XEinAus], jahr ):
-        IccTableModel.__init__( self, rowlist, jahr )
+        IccColumnarTableModel.__init__( self, rowlist, jahr )
         self.setKeyHeaderMappings2(
             ("master_name", "mobj_id", "debi_kredi", "leistung", "buchungsdatum", "jahr", "monat", "ea_art", "verteilt_auf",
              "betrag", "buchungstext", "write_time" ),
@@ -19,6 +19,7 @@ class EinAusTableModel( IccTableModel):
         )
         self._colBuchungsdatum = 4
         self._colWriteTime = 11
+        self.setUniqueKeys( ("ea_id",) )
 
     def getBuchungsdatumColumnIdx( self ) -> int:
         return self._colBuchungsdatum
@@ -78,14 +79,15 @@ class EinAusLogic(IccLogic):
         tm = EinAusTableModel( l, jahr )
         return tm
 
-    def getZahlungen( self, ea_art_display:str, jahr:int, additionalWhereClause="" ) -> List[XEinAus]:
+    def getZahlungen( self, ea_art_display:str, jahr:int, additionalWhereClause="", **criteria ) -> List[XEinAus]:
         """
         Liefert alle Zahlungen der Art <ea_art> im Jahr <jahr>
         :param ea_art_display:
         :param jahr:
+        :param criteria: zusätzliche Gleichheitsbedingungen, z.B. reise_id=12 (siehe EinAusData.getEinAusZahlungen())
         :return:
         """
-        return self._einausData.getEinAusZahlungen( ea_art_display, jahr, additionalWhereClause )
+        return self._einausData.getEinAusZahlungen( ea_art_display, jahr, additionalWhereClause, **criteria )
 
     def getZahlung( self, ea_id:int ) -> XEinAus:
         return self._einausData.getEinAusZahlung( ea_id )
@@ -247,8 +249,7 @@ class EinAusLogic(IccLogic):
         self._einausData.deleteEinAusZahlung( ea_id )
 
     def deleteZahlungen( self, xlist:List[XEinAus] ):
-        for x in xlist:
-            self._einausData.deleteEinAusZahlung( x.ea_id )
+        self._einausData.deleteEinAusZahlungen( [x.ea_id for x in xlist] )
         self._einausData.commit()
 
     def commit( self ):
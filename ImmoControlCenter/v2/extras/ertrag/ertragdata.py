@@ -1,44 +1,37 @@
 from typing import List, Iterable
 
 import datehelper
+from v2.einaus.einausdata import EinAusData
 from v2.icc.constants import EinAusArt
 from v2.icc.iccdata import IccData
 from v2.icc.interfaces import XEinAus
 
 
 class ErtragData( IccData ):
+    """
+    Die Zahlungen aus Tabelle einaus werden nicht mehr je Summe per Select ermittelt, sondern aus dem
+    EinAusCache (siehe EinAusData.getJahr()): ein Select je Jahr statt mehrerer je Masterobjekt.
+    """
     def __init__( self ):
         IccData.__init__( self )
+        self._eadata = EinAusData()
+
+    def _getSumme( self, master_name:str, jahr:int, ea_arten_db:Iterable[str] ) -> float:
+        ea_jahr = self._eadata.getJahr( jahr )
+        return sum( ea_jahr.getSumme( master_name=master_name, ea_art=EinAusArt.getDisplay( ea_art_db ) )
+                    for ea_art_db in ea_arten_db )
 
     def getSummeEinzahlungen( self, master_name:str, jahr:int ) -> int:
-        sql = "select sum(betrag) " \
-              "from einaus " \
-              "where master_name = '%s' " \
-              "and jahr = %d " \
-              "and ea_art in ( '%s', '%s' ) " \
-              % (master_name, jahr, EinAusArt.BRUTTOMIETE.dbvalue, EinAusArt.NEBENKOSTEN_ABRECHNG.dbvalue)
-        tuplelist = self.read( sql )
-        summe = tuplelist[0][0]
+        summe = self._getSumme( master_name, jahr,
+                                (EinAusArt.BRUTTOMIETE.dbvalue, EinAusArt.NEBENKOSTEN_ABRECHNG.dbvalue) )
         return int( round( summe ) ) if summe else 0
 
     def getAnzahlVermieteteMonate( self, master_name:str, jahr:int ) -> int:
-        sql = "select count(*) " \
-              "from einaus " \
-              "where master_name = '%s' " \
-              "and jahr = %d " \
-              "and ea_art = '%s' " % (master_name, jahr, EinAusArt.BRUTTOMIETE.dbvalue)
-        tuplelist = self.read( sql )
-        summe = tuplelist[0][0]
-        return int( round( summe ) ) if summe else 0.0
+        return len( self._eadata.getJahr( jahr ).find( master_name=master_name,
+                                                       ea_art=EinAusArt.BRUTTOMIETE.display ) )
 
     def getSumme( self, master_name:str, jahr:int, ea_art_db:str ) -> int:
-        sql = "select sum(betrag) " \
-              "from einaus " \
-              "where master_name = '%s' " \
-              "and jahr = %d " \
-              "and ea_art = '%s' " % (master_name, jahr, ea_art_db )
-        tuplelist = self.read( sql )
-        summe = tuplelist[0][0]
+        summe = self._getSumme( master_name, jahr, (ea_art_db,) )
         return int( round( summe ) ) if summe else 0
 
     # def getReparaturenEinzeln( self, master_name:str, jahr:int ) -> List[XEinAus]:
@@ -52,38 +45,25 @@ class ErtragData( IccData ):
 
     def getEinAusEinzeln( self, master_name: str, jahr: int, ea_art_db_list: Iterable[str] ) -> List[XEinAus]:
         """
-        Liefert die Ein-/Auszahlungen der gewünschten EinAusArten.
+        Liefert die Ein-/Auszahlungen der gewünschten EinAusArten, sortiert nach ea_art, debi_kredi und betrag.
         :param master_name:
         :param jahr:
         :param ea_art_db_list:
-        :return: Eine Liste mit XEinAus-Objekten. Wurde keine Ausgabe gefunden, wird eine leere Liste
-                zurückgegeben.
+        :return: Eine Liste mit XEinAus-Objekten (ea_art als db-Wert). Wurde keine Ausgabe gefunden,
+                wird eine leere Liste zurückgegeben.
         """
-        ea_arten_db = ""
-        for ea_art_db in ea_art_db_list:
-            ea_arten_db += "'"
-            ea_arten_db += ea_art_db
-            ea_arten_db += "'"
-            ea_arten_db += ","
-        ea_arten_db = ea_arten_db[:-1]
-        sql = "select  master_name, mobj_id, ea_art, leistung, debi_kredi, buchungstext, buchungsdatum, betrag " \
-              "from einaus " \
-              "where master_name = '%s' " \
-              "and jahr = %d " \
-              "and ea_art in (%s) " \
-              "order by ea_art, debi_kredi, betrag " % (master_name, jahr, ea_arten_db)
-        l = self.readAllGetObjectList( sql, XEinAus )
+        ea_jahr = self._eadata.getJahr( jahr )
+        l = list()
+        for ea_art_db in dict.fromkeys( ea_art_db_list ):
+            for x in ea_jahr.find( master_name=master_name, ea_art=EinAusArt.getDisplay( ea_art_db ) ):
+                x.ea_art = ea_art_db
+                l.append( x )
+        l.sort( key=lambda x: (x.ea_art, x.debi_kredi or "", x.betrag) )
         return l
 
     def getSummeHausgeld( self, master_name:str, jahr:int ) -> int:
-        sql = "select sum(betrag) " \
-              "from einaus " \
-              "where master_name = '%s' " \
-              "and jahr = %d " \
-              "and ea_art in ('%s', '%s') " \
-              % ( master_name, jahr, EinAusArt.HAUSGELD_VORAUS.dbvalue, EinAusArt.HAUSGELD_ABRECHNG.dbvalue )
-        tuplelist = self.read( sql )
-        summe = tuplelist[0][0]
+        summe = self._getSumme( master_name, jahr,
+                                (EinAusArt.HAUSGELD_VORAUS.dbvalue, EinAusArt.HAUSGELD_ABRECHNG.dbvalue) )
         return int( round( summe ) ) if summe else 0
 
     def getNettomieteAktuell( self, master_name:str ) -> float:
@@ -177,7 +177,7 @@ class GeschaeftsreiseLogic:
         """
         self._data.updateGeschaeftsreise( x )
         ea_logic = EinAusLogic()
-        xea_alt = ea_logic.getZahlungen( EinAusArt.SONSTIGE_KOSTEN.display, x.jahr, "and reise_id=%d" % x.reise_id )[0]
+        xea_alt = ea_logic.getZahlungen( EinAusArt.SONSTIGE_KOSTEN.display, x.jahr, reise_id=x.reise_id )[0]
         ea_id = xea_alt.ea_id
         xea_neu = self._createXeinausFromXgeschaeftsreise( x )
         xea_neu.ea_id = ea_id
@@ -1,10 +1,13 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Any
 
 import datehelper
-from base.databasecommon2 import DatabaseCommon
+from base.databasecommon2 import DatabaseCommon, SqlParams
+from base.dbmigration import DbMigrator
 from v2.icc.constants import EinAusArt, Umlegbar
 
 from v2.icc.definitions import DATABASE
+from v2.icc.iccmigrations import ICC_MIGRATIONS
+from v2.icc.sollintervallindex import SollIndexCache
 from v2.icc.interfaces import XHandwerkerKurz, XMietverhaeltnisKurz, XVerwaltung, XMasterobjekt, XMietobjekt, \
     XKreditorLeistung, XLeistung, XVerwalter, XVerwalter2
 
@@ -14,12 +17,73 @@ class DbAction:
     UPDATE = "update"
     DELETE = "delete"
 
+class WriteBatch:
+    """
+    Sammelt gleichartige Schreibzugriffe - also Aufrufe desselben parametrisierten Statements, z.B.
+    "delete from einaus where ea_id = ?" - zusammen mit den Angaben für ihre writelog-Einträge.
+    Ausgeführt werden sie mit IccData.writeBatchAndLog().
+    """
+    def __init__( self, sql:str, action:str, table:str, id_name:str ):
+        """
+        :param sql: das für jede Row auszuführende Statement mit Platzhaltern
+        :param action: insert, update, delete - gem. class DbAction
+        :param table: der Name der Tabelle, die vom Schreibvorgang betroffen ist. Für Log-Zwecke
+        :param id_name: der Name der Id in <table>
+        """
+        self.sql = sql
+        self.action = action
+        self.table = table
+        self.id_name = id_name
+        self._rows:List[Tuple] = list() # je Row: (params, id_value, newvalues, oldvalues)
+
+    def add( self, params:SqlParams, id_value:int or str=0, newvalues:str=None, oldvalues:str=None ):
+        """
+        Fügt dem Batch eine Row hinzu.
+        :param params: die Werte für die Platzhalter in self.sql
+        :param id_value: der Wert der Id der betroffenen Row; 0 im Insert-Fall.
+        :param newvalues: die Werte im String-Format, mit denen der Insert/Update erfolgt. None bei Delete
+        :param oldvalues: die Werte vor dem Update bzw. Delete. None bei Insert
+        """
+        self._rows.append( (params, id_value, newvalues, oldvalues) )
+
+    def getParamsList( self ) -> List[SqlParams]:
+        return [row[0] for row in self._rows]
+
+    def getIdValues( self ) -> List[Any]:
+        return [row[1] for row in self._rows]
+
+    def getLogValues( self ) -> List[Tuple]:
+        """
+        :return: je Row ein Tupel (params, newvalues, oldvalues)
+        """
+        return [(row[0], row[2], row[3]) for row in self._rows]
+
+    def __len__( self ):
+        return len( self._rows )
+
 class IccData( DatabaseCommon ):
     """
     Enthält die DB-Zugriffe für Miet- UND Masterobjekte
     """
+    _WRITELOG_INSERT = "insert into writelog " \
+                       "(trans_id, sql, action, table_name, id_name, id_value, newvalues, oldvalues, timestamp) " \
+                       "values " \
+                       "( ?, ?, ?, ?, ?, ?, ?, ?, ? )"
+    _migrated = False # die Migrationen werden mit der ersten Instanz einmal je Anwendungslauf ausgeführt
+
     def __init__(self):
         self._dbCommon = DatabaseCommon.__init__( self, DATABASE )
+        if not IccData._migrated:
+            IccData._migrated = True
+            DbMigrator( self._sqliteCon ).migrate( ICC_MIGRATIONS )
+
+    def rollback( self ):
+        DatabaseCommon.rollback( self )
+        # Alle Data-Klassen teilen sich eine Connection: egal über welche Data-Klasse zurückgerollt wird,
+        # der EinAusCache und die Soll-Indexe können schon Sätze enthalten, die es nach dem Rollback nicht mehr gibt.
+        from v2.einaus.einauscache import EinAusCache # muss hier importiert werden wegen Gefahr des Zirkelbezugs
+        EinAusCache.inst().invalidate()
+        SollIndexCache.inst().invalidate()
 
     def getIccTabellen( self ) -> List[str]:
         sql = "select name from sqlite_master where type = 'table' order by name"
@@ -64,11 +128,12 @@ class IccData( DatabaseCommon ):
         """
         sql = "select id, mv_id, mobj_id, von, bis " \
               "from mietverhaeltnis " \
-              "where substr(von, 0, 5) <= '%s' " \
-              "and (bis is NULL or bis = '' or substr(bis, 0, 5) >= '%s') " % (jahr, jahr)
+              "where substr(von, 0, 5) <= ? " \
+              "and (bis is NULL or bis = '' or substr(bis, 0, 5) >= ?) "
         if orderby:
-            sql += "order by %s " % (orderby)
-        return self.readAllGetObjectList( sql, XMietverhaeltnisKurz )
+            sql += "order by %s " % (orderby) # Spaltenname, kann nicht als Parameter gebunden werden
+        # substr() liefert Text, deshalb muss auch das Jahr als Text verglichen werden:
+        return self.readAllGetObjectList( sql, XMietverhaeltnisKurz, (str( jahr ), str( jahr )) )
 
     def getKreditoren( self ) -> List[str]:
         sql = "select distinct kreditor from kreditorleistung order by kreditor "
@@ -78,18 +143,18 @@ class IccData( DatabaseCommon ):
     def existsKreditor( self, master_name:str, kreditor:str ) -> bool:
         sql = "select count(*) as cnt " \
               "from kreditorleistung " \
-              "where master_name = '%s' " \
-              "and kreditor = '%s' " % ( master_name, kreditor )
-        tuplelist = self.read( sql )
+              "where master_name = ? " \
+              "and kreditor = ? "
+        tuplelist = self.read( sql, (master_name, kreditor) )
         return tuplelist[0][0] > 0
 
     def existsKreditorLeistung( self, master_name:str, kreditor:str, leistung:str ) -> bool:
         sql = "select count(*) as cnt " \
               "from kreditorleistung " \
-              "where master_name = '%s' " \
-              "and kreditor = '%s' " \
-              "and leistung = '%s' " % ( master_name, kreditor, leistung )
-        tuplelist = self.read( sql )
+              "where master_name = ? " \
+              "and kreditor = ? " \
+              "and leistung = ? "
+        tuplelist = self.read( sql, (master_name, kreditor, leistung) )
         return tuplelist[0][0] > 0
 
     def getHandwerkerKurz( self, orderby:str=None ) -> List[XHandwerkerKurz]:
@@ -115,8 +180,8 @@ class IccData( DatabaseCommon ):
         return xlist
 
     def getMastername( self, mobj_id:str ) -> str:
-        sql = "select master_name from mietobjekt where mobj_id = '%s' " % mobj_id
-        tpl:List[Tuple] = self.read( sql )
+        sql = "select master_name from mietobjekt where mobj_id = ? "
+        tpl:List[Tuple] = self.read( sql, (mobj_id,) )
         if len( tpl ) == 0:
             return ""
         return tpl[0][0]
@@ -125,16 +190,16 @@ class IccData( DatabaseCommon ):
         # Wird vom Dialog "Neue Zahlung anlegen" benutzt
         sql = "select mobj_id, whg_bez, qm, container_nr, bemerkung " \
               "from mietobjekt " \
-              "where master_name = '%s' " \
-              "order by mobj_id " % master_name
-        xlist = self.readAllGetObjectList( sql, XMietobjekt )
+              "where master_name = ? " \
+              "order by mobj_id "
+        xlist = self.readAllGetObjectList( sql, XMietobjekt, (master_name,) )
         return xlist
 
     def getVerwaltung( self, vwg_id:int ) -> XVerwaltung:
         sql = "select vwg_id, master_name, vw_id, weg_name, von, bis " \
               "from verwaltung " \
-              "where vwg_id = %d " % vwg_id
-        return self.readOneGetObject( sql, XVerwaltung )
+              "where vwg_id = ? "
+        return self.readOneGetObject( sql, XVerwaltung, (vwg_id,) )
 
     def getVerwaltungen( self, jahr:int ) -> List[XVerwaltung]:
         minbis = "%d-%02d-%02d" % (jahr, 1, 1)
@@ -142,10 +207,10 @@ class IccData( DatabaseCommon ):
         sql = "select vwg_id, master_name, " \
               "vw_id, coalesce(weg_name, '') as weg_name, von, coalesce(bis, '') as bis " \
               "from verwaltung " \
-              "where (bis is NULL or bis = '' or bis >= '%s') " \
-              "and not von > '%s' " \
-              "order by weg_name asc " % ( minbis, maxvon )
-        l: List[XVerwaltung] = self.readAllGetObjectList( sql, XVerwaltung )
+              "where (bis is NULL or bis = '' or bis >= ?) " \
+              "and not von > ? " \
+              "order by weg_name asc "
+        l: List[XVerwaltung] = self.readAllGetObjectList( sql, XVerwaltung, (minbis, maxvon) )
         return l
 
     def getVerwalterNameTelMailto( self, master_name:str ) -> Dict or None:
@@ -157,10 +222,10 @@ class IccData( DatabaseCommon ):
         sql = "select vw.name, vw.telefon_1, mailto " \
               "from verwalter vw " \
               "inner join verwaltung vwg on vwg.vw_id = vw.vw_id " \
-              "where vwg.master_name = '%s' " \
+              "where vwg.master_name = ? " \
               "and vwg.von <= CURRENT_DATE " \
-              "and (vwg.bis is NULL or vwg.bis = '' or vwg.bis >= CURRENT_DATE )" % master_name
-        return self.readOneGetDict( sql )
+              "and (vwg.bis is NULL or vwg.bis = '' or vwg.bis >= CURRENT_DATE )"
+        return self.readOneGetDict( sql, (master_name,) )
 
     def getVerwalterDetails( self, vw_id:str ) -> XVerwalter:
         """
@@ -175,8 +240,8 @@ class IccData( DatabaseCommon ):
         sql = "select vw_id, name, strasse, plz_ort, telefon_1, telefon_2, mailto, ansprechpartner_1, ansprechpartner_2, " \
               "bemerkung " \
               "from verwalter " \
-              "where vw_id = '%s' " % vw_id
-        return self.readOneGetObject( sql, XVerwalter )
+              "where vw_id = ? "
+        return self.readOneGetObject( sql, XVerwalter, (vw_id,) )
 
     def getVerwalterDetails2( self, vw_id:str, master_name:str ) -> XVerwalter2:
         """
@@ -190,34 +255,34 @@ class IccData( DatabaseCommon ):
               "vwg.vwg_id, vwg.vw_ap " \
               "from verwalter vw " \
               "inner join verwaltung vwg on vwg.vw_id = vw.vw_id " \
-              "where vw.vw_id = '%s' " \
-              "and vwg.master_name = '%s' " \
+              "where vw.vw_id = ? " \
+              "and vwg.master_name = ? " \
               "and vwg.von <= CURRENT_DATE " \
-              "and (vwg.bis is NULL or vwg.bis = '' or vwg.bis >= CURRENT_DATE) " % (vw_id, master_name)
-        return self.readOneGetObject( sql, XVerwalter2 )
+              "and (vwg.bis is NULL or vwg.bis = '' or vwg.bis >= CURRENT_DATE) "
+        return self.readOneGetObject( sql, XVerwalter2, (vw_id, master_name) )
 
     def getAnschaffungsUndVerkaufsdatum( self, mobj_id:str ) -> [str, str]:
         sql = "select master.angeschafft_am, master.veraeussert_am " \
               "from masterobjekt master " \
               "inner join mietobjekt mobj on mobj.master_name = master.master_name " \
-              "where mobj.mobj_id = '%s' " % mobj_id
-        d = self.readOneGetDict( sql )
+              "where mobj.mobj_id = ? "
+        d = self.readOneGetDict( sql, (mobj_id,) )
         veraeussert_am = "" if not d["veraeussert_am"] else d["veraeussert_am" ]
         return [d["angeschafft_am"], veraeussert_am]
 
     def getAnschaffungsUndVerkaufsdatum2( self, master_name:str ) -> [str, str]:
         sql = "select angeschafft_am, veraeussert_am " \
               "from masterobjekt " \
-              "where master_name = '%s' " % master_name
-        d = self.readOneGetDict( sql )
+              "where master_name = ? "
+        d = self.readOneGetDict( sql, (master_name,) )
         veraeussert_am = "" if not d["veraeussert_am"] else d["veraeussert_am" ]
         return [d["angeschafft_am"], veraeussert_am]
 
     def getKreditorLeistungen( self, master_name:str ) -> List[XKreditorLeistung]:
         sql = "select kredleist_id, master_name, kreditor, leistung, umlegbar, ea_art, bemerkung " \
               "from kreditorleistung " \
-              "where master_name = '%s' " % master_name
-        l: List[XKreditorLeistung] = self.readAllGetObjectList( sql, XKreditorLeistung )
+              "where master_name = ? "
+        l: List[XKreditorLeistung] = self.readAllGetObjectList( sql, XKreditorLeistung, (master_name,) )
         for leist in l:
             leist.ea_art = EinAusArt.getDisplay( leist.ea_art )
         return l
@@ -225,9 +290,9 @@ class IccData( DatabaseCommon ):
     def getLeistungen( self, master_name:str, kreditor:str ) -> List[XLeistung]:
         sql = "select leistung, umlegbar, ea_art " \
               "from kreditorleistung " \
-              "where master_name = '%s' " \
-              "and kreditor = '%s' " % (master_name, kreditor)
-        l: List[XKreditorLeistung] = self.readAllGetObjectList( sql, XKreditorLeistung )
+              "where master_name = ? " \
+              "and kreditor = ? "
+        l: List[XKreditorLeistung] = self.readAllGetObjectList( sql, XKreditorLeistung, (master_name, kreditor) )
         for leist in l:
             leist.ea_art = EinAusArt.getDisplay( leist.ea_art )
         return l
@@ -244,8 +309,8 @@ class IccData( DatabaseCommon ):
                                    "betrag": 0.0, "buchungsdatum":"1900-01-01", "write_time": "1900-01-01:00.00.00"}
         sql = "select debi_kredi, leistung, betrag, buchungsdatum, write_time " \
               "from einaus " \
-              "where write_time = '%s' " % write_time
-        d = self.readOneGetDict( sql )
+              "where write_time = ? "
+        d = self.readOneGetDict( sql, (write_time,) )
         return d
 
     def getLetzteBuchung( self ) -> Dict:
@@ -275,8 +340,8 @@ class IccData( DatabaseCommon ):
         # aktuellen Satz holen wg WriteLog:
         sql = "select telefon_1, telefon_2, mailto " \
               "from verwalter " \
-              "where vw_id = '%s'" % vw_id
-        oldD = self.readOneGetDict(sql)
+              "where vw_id = ?"
+        oldD = self.readOneGetDict( sql, (vw_id,) )
         sql = "update verwalter " \
               "set telefon_1 = '%s', " \
               "telefon_2 = '%s', " \
@@ -290,8 +355,8 @@ class IccData( DatabaseCommon ):
 
     def updateVerwaltungAnsprechpartner(self, vwg_id:int, vw_ap:str):
         # aktuellen Satz holen wg WriteLog:
-        sql = "select vw_ap from verwaltung where vwg_id = %d" % vwg_id
-        oldAp = self.readOneGetDict( sql )
+        sql = "select vw_ap from verwaltung where vwg_id = ?"
+        oldAp = self.readOneGetDict( sql, (vwg_id,) )
         sql = "update verwaltung " \
               "set vw_ap = '%s' " \
               "where vwg_id = %d " % (vw_ap, vwg_id)
@@ -302,10 +367,11 @@ class IccData( DatabaseCommon ):
         return rowsAffected
 
     def writeAndLog( self, sql: str, action:str, table:str, id_name:str, id_value:int or str,
-                     newvalues:str=None, oldvalues:str=None ) -> int:
+                     newvalues:str=None, oldvalues:str=None, params:SqlParams=() ) -> int:
         """
         Führt <sql> aus.
         Veranlasst einen Log-Eintrag in Tabelle <writelog>
+        Für mehrere gleichartige Schreibzugriffe siehe writeBatchAndLog().
         :param sql: die auszuführende Query. Wird im Anschluss in <writelog> eingetragen.
         :param action:  insert, update, delete - gem. class DbAction
         :param table: der Name der Tabelle, die vom Schreibvorgang betroffen ist. Für Log-Zwecke
@@ -315,40 +381,71 @@ class IccData( DatabaseCommon ):
         :param newvalues: die Werte im String-Format, mit denen der Insert/Update erfolgt. Z.B. ermittelt mit
                           XBase.toString()
         :param oldvalues: die Werte vor dem Update. None bei Insert
-        :param commit:
+        :param params: die Werte für die Platzhalter in <sql>
         :return:
         """
         try:
-            ret = self.write( sql )
+            ret = self.write( sql, params )
         except Exception as ex:
             msg = "Exception\n" + str(ex) + "\nbei Ausführung des Statements\n" + sql + "\n"
             raise Exception( msg )
         if action == DbAction.INSERT:
             id_value = ret
-        self._writeLog( sql, action, table, id_name, id_value, newvalues, oldvalues )
+        self._writeLog( sql, action, table, id_name, id_value, newvalues, oldvalues, params )
         return ret
 
+    def writeBatchAndLog( self, batch:WriteBatch ) -> List[int or str]:
+        """
+        Führt alle in <batch> gesammelten Schreibzugriffe aus und trägt sie in Tabelle <writelog> ein.
+        Update- und Delete-Statements werden ebenso wie die writelog-Inserts mit je einem executemany ausgeführt.
+        Inserts werden einzeln ausgeführt, weil sonst die vergebenen Ids nicht zu ermitteln sind; das vorbereitete
+        Statement wird dabei aus dem Statement-Cache wiederverwendet.
+        Alle Schreibzugriffe erfolgen in derselben Transaktion (Trans-Id) und - wie bei write() - OHNE COMMIT.
+        :param batch: die gesammelten Schreibzugriffe
+        :return: je Row die Id: im Insert-Fall die neu vergebene, sonst die in <batch> angegebene.
+        """
+        if len( batch ) == 0:
+            return list()
+        paramsList = batch.getParamsList()
+        try:
+            if batch.action == DbAction.INSERT:
+                ids = [self.write( batch.sql, params ) for params in paramsList]
+            else:
+                self.writeMany( batch.sql, paramsList )
+                ids = batch.getIdValues()
+        except Exception as ex:
+            msg = "Exception\n" + str(ex) + "\nbei Ausführung des Statements\n" + batch.sql + "\n"
+            raise Exception( msg )
+        ts = datehelper.getCurrentTimestampIso()
+        transId = self.getTransactionId()
+        logrows = list()
+        for id_value, (params, newvalues, oldvalues) in zip( ids, batch.getLogValues() ):
+            logrows.append( (transId, self._getLogSql( batch.sql, params ), batch.action, batch.table, batch.id_name,
+                             id_value, newvalues, oldvalues, ts) )
+        try:
+            self.writeMany( IccData._WRITELOG_INSERT, logrows )
+        except Exception as ex:
+            msg = "Exception\n" + str(ex) + "\nbei Ausführung des Statements\n" + IccData._WRITELOG_INSERT + "\n"
+            raise Exception( msg )
+        return ids
+
+    @staticmethod
+    def _getLogSql( sql:str, params:SqlParams ) -> str:
+        """
+        Liefert den SQL-Text, der in <writelog> eingetragen wird: bei parametrisierten Statements inkl. der Parameter.
+        """
+        return sql + " -- params: " + str( params ) if params else sql
+
     def _writeLog( self, sql:str, action:str, table:str, id_name:str, id_value:int or str,
-                   newvalues:str=None, oldvalues:str=None ):
-        sql = sql.replace( "'", "\"" )
-        if newvalues:
-            newvalues = newvalues.replace( "'", "\"" )
-        if oldvalues:
-            oldvalues = oldvalues.replace( "'", "\"" )
+                   newvalues:str=None, oldvalues:str=None, params:SqlParams=() ):
         ts = datehelper.getCurrentTimestampIso()
         transId = self.getTransactionId()
-        if isinstance( id_value, str ):
-            id_value = "'" + id_value + "'"
-        sql2 = "insert into writelog " \
-              "(trans_id, sql, action, table_name, id_name, id_value, newvalues, oldvalues, timestamp) " \
-              "values " \
-              "( %d,      '%s', '%s',  '%s',         '%s',    %s,     '%s',        '%s',      '%s' )" \
-              % (transId, sql, action, table,     id_name, id_value, newvalues, oldvalues,    ts )
+        logrow = (transId, self._getLogSql( sql, params ), action, table, id_name, id_value, newvalues, oldvalues, ts)
         try:
-            self.write( sql2 )
+            self.write( IccData._WRITELOG_INSERT, logrow )
         except Exception as ex:
-            print( "Fehler beim write in Tabelle writelog. SQL:\n%s" % sql2 )
-            msg = "Exception\n" + str(ex) + "\nbei Ausführung des Statements\n" + sql2 + "\n"
+            print( "Fehler beim write in Tabelle writelog. Werte:\n%s" % str( logrow ) )
+            msg = "Exception\n" + str(ex) + "\nbei Ausführung des Statements\n" + IccData._WRITELOG_INSERT + "\n"
             raise Exception( msg )
 
 ########################################################################################
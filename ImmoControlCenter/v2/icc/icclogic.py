@@ -1,7 +1,7 @@
 from typing import List, Iterable, Dict
 
 import datehelper
-from base.basetablemodel import BaseTableModel, SumTableModel
+from base.basetablemodel import BaseTableModel, SumTableModel, ColumnarTableModel
 from base.interfaces import XBase
 from v2.icc.iccdata import IccData
 
@@ -13,6 +13,14 @@ class IccTableModel( BaseTableModel ):
     def __init__( self, rowList:List[XBase]=None, jahr:int=None ):
         BaseTableModel.__init__( self, rowList, jahr )
 
+######################   IccColumnarTableModel   ################
+class IccColumnarTableModel( ColumnarTableModel ):
+    """
+    IccTableModel für große Datenmengen (Sortieren und Filtern über Indexlisten, s. ColumnarTableModel).
+    """
+    def __init__( self, rowList:List[XBase]=None, jahr:int=None ):
+        ColumnarTableModel.__init__( self, rowList, jahr )
+
 ######################   IccSumTableModel   #####################
 class IccSumTableModel( SumTableModel ):
     def __init__( self, objectList:List[XBase], jahr:int, colsToSum:Iterable[str] ):
@@ -0,0 +1,87 @@
+from typing import List, Tuple
+
+from base.dbmigration import Migration, DbMigrator
+
+# Versionen des Schemas von immo.db. Neue Migrationen werden hinten angefügt, bestehende nie geändert.
+ICC_MIGRATIONS:List[Migration] = [
+    Migration( 1, "Indizes für die häufigen Zugriffe auf einaus", (
+        # Laden eines Jahres in den EinAusCache, Selects nach jahr, ea_art, monat und mobj_id bzw. debi_kredi
+        "create index if not exists einaus_jahr_ea_art_monat on einaus ( jahr, ea_art, monat, mobj_id, debi_kredi )",
+        # Abschläge eines SollAbschlags je Jahr und Monat
+        "create index if not exists einaus_sab_id on einaus ( sab_id, jahr, monat )",
+        # Teilzahlungen einer Abrechnung bzw. Zahlung einer Geschäftsreise (mit betrag für
+        # EinAusData.getEaIdAndBetragByForeignKey(), ea_id ist die rowid)
+        "create index if not exists einaus_hga_id on einaus ( hga_id, betrag )",
+        "create index if not exists einaus_nka_id on einaus ( nka_id, betrag )",
+        "create index if not exists einaus_reise_id on einaus ( reise_id, betrag )",
+        # Summen je Masterobjekt, Jahr und EinAusArt (AnlageV, Ertragsübersicht)
+        "create index if not exists einaus_master_jahr_ea_art on einaus "
+        "( master_name, jahr, ea_art, reise_id, betrag )",
+        # letzte Buchung
+        "create index if not exists einaus_write_time on einaus ( write_time )",
+    ) ),
+]
+
+# Die häufigen Abfragen auf einaus in der Form, in der sie die Data-Klassen absetzen (sql, params).
+# Keine davon darf die Tabelle vollständig durchlaufen (siehe testHotQueriesUseIndexes()).
+ICC_HOT_QUERIES:List[Tuple[str, Tuple]] = [
+    ( "select * from einaus where jahr = ? ", (2022,) ),
+    ( "select * from einaus where jahr = ? and ea_art = ? ", (2022, "bruttomiete") ),
+    ( "select * from einaus where jahr = ? and monat = ? and mobj_id = ? and ea_art = ? ",
+      (2022, "jan", "thomasmann", "bruttomiete") ),
+    ( "select * from einaus where jahr = ? and monat = ? and debi_kredi = ? and ea_art = ? ",
+      (2022, "jan", "mueller_hans", "hgv") ),
+    ( "select * from einaus where jahr = ? and monat = ? and sab_id = ? ", (2022, "jan", 1) ),
+    ( "select * from einaus where hga_id = ? ", (1,) ),
+    ( "select * from einaus where nka_id = ? ", (1,) ),
+    ( "select ea_id, betrag from einaus where reise_id = ? ", (1,) ),
+    ( "select ea_art, sum(betrag) as summe from einaus where master_name = ? and jahr = ? "
+      "and ea_art in ('vers', 'gs', 'allg') group by ea_art ", ("SB_Kaiser", 2022) ),
+    ( "select sum(betrag) as summe from einaus where master_name = ? and jahr = ? and ea_art = ? "
+      "and reise_id > 0 ", ("SB_Kaiser", 2022, "sonst") ),
+    ( "select max(write_time) as write_time from einaus ", () ),
+]
+
+
+################  TEST TEST TEST   ###########################
+def testHotQueriesUseIndexes( pathToDatabase:str=None ):
+    """
+    Prüft mit EXPLAIN QUERY PLAN, dass keine der ICC_HOT_QUERIES die Tabelle einaus vollständig durchläuft.
+    Ohne <pathToDatabase> wird eine Datenbank im Speicher mit den Spalten von einaus angelegt und mit
+    Testdaten gefüllt (damit ANALYZE Statistiken erzeugt), sonst wird eine KOPIE der angegebenen Datenbank geprüft.
+    """
+    import random
+    import sqlite3
+    con = sqlite3.connect( ":memory:" )
+    if pathToDatabase:
+        src = sqlite3.connect( pathToDatabase )
+        src.backup( con )
+        src.close()
+    else:
+        con.execute( "create table einaus ( ea_id integer primary key, master_name text, mobj_id text, "
+                     "debi_kredi text, leistung text, sab_id integer, hga_id integer, nka_id integer, "
+                     "reise_id integer, jahr integer, monat text, betrag real, ea_art text, verteilt_auf integer, "
+                     "umlegbar text, buchungsdatum text, buchungstext text, write_time text )" )
+        random.seed( 4711 )
+        # wie in immo.db: nur wenige Zahlungen haben eine sab_id, hga_id, nka_id bzw. reise_id
+        rows = [( "M%d" % (i%12), "mobj%d" % (i%30), "debi%d" % (i%50), random.randint( 2015, 2023 ),
+                  ("jan", "feb", "mrz", "apr")[i%4], random.uniform( -500, 500 ),
+                  ("bruttomiete", "hgv", "allg", "rep", "sonst")[i%5],
+                  i%40 if i%10 == 0 else None, i if i%200 == 1 else None, i if i%200 == 2 else None,
+                  i if i%97 == 0 else None )
+                for i in range( 20000 )]
+        con.executemany( "insert into einaus ( master_name, mobj_id, debi_kredi, jahr, monat, betrag, ea_art, "
+                         "sab_id, hga_id, nka_id, reise_id ) values ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )", rows )
+        con.commit()
+    migrator = DbMigrator( con )
+    print( "Migrationen: ", migrator.migrate( ICC_MIGRATIONS ), " Version: ", migrator.getVersion() )
+    assert migrator.migrate( ICC_MIGRATIONS ) == [] # zweiter Lauf: nichts mehr zu tun
+    errors = list()
+    for sql, params in ICC_HOT_QUERIES:
+        print( sql, "\n    ", migrator.explainQueryPlan( sql, params ) )
+        fullScans = migrator.getFullScans( sql, params )
+        if fullScans:
+            errors.append( "%s: %s" % (sql, fullScans) )
+    con.close()
+    assert not errors, "\n".join( errors )
+    print( "ok" )
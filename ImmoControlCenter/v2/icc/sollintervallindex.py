@@ -0,0 +1,202 @@
+from bisect import bisect_right
+from typing import List, Dict, Callable, Any, Iterable
+
+
+#################   SollIntervallIndex   #################################
+class SollIntervallIndex:
+    """
+    Index über die Gültigkeitsintervalle (von, bis) einer Soll-Tabelle (sollmiete, sollhausgeld), je Schlüssel
+    (z.B. mv_id bzw. mobj_id) nach <von> sortiert.
+    Die Frage "welches Soll galt am ..." wird mit einer binären Suche über die von-Daten beantwortet.
+    Annahme: die Intervalle eines Schlüssels überschneiden sich nicht (das stellen die Logic-Klassen sicher).
+    Ein leeres bzw. fehlendes <bis> bedeutet "unbefristet".
+    Die gehaltenen Objekte sind nur zum Lesen gedacht; wer ein Objekt ändern will, muss es kopieren.
+    """
+    def __init__( self, xlist:Iterable[Any], getKey:Callable[[Any], Any] ):
+        """
+        :param xlist: die Soll-Objekte, jedes mit den Attributen <von> und <bis> (yyyy-mm-dd)
+        :param getKey: liefert zu einem Soll-Objekt den Schlüssel, unter dem es indiziert wird
+        """
+        # key: Schlüssel, value: Soll-Objekte, aufsteigend nach von sortiert
+        self._intervalle:Dict[Any, List[Any]] = dict()
+        for x in xlist:
+            self._intervalle.setdefault( getKey( x ), list() ).append( x )
+        # key: Schlüssel, value: die von-Daten von _intervalle[key] (für bisect)
+        self._vons:Dict[Any, List[str]] = dict()
+        for key, intervalle in self._intervalle.items():
+            intervalle.sort( key=lambda x: x.von )
+            self._vons[key] = [x.von for x in intervalle]
+        # key: Jahr, value: die am Ersten jedes Monats gültigen Soll-Objekte (siehe getAlleJeMonat())
+        self._jahre:Dict[int, List[List[Any]]] = dict()
+
+    def getKeys( self ) -> Iterable[Any]:
+        return self._intervalle.keys()
+
+    def find( self, key:Any, maxVon:str, minBis:str=None ) -> List[Any]:
+        """
+        Liefert die Soll-Objekte zu <key>, die mit dem Zeitraum <minBis> bis <maxVon> überlappen, also
+        von <= maxVon und (bis leer oder bis >= minBis).
+        Ohne <minBis> wird nach den am Tag <maxVon> gültigen Soll-Objekten gesucht.
+        :return: die gefundenen Soll-Objekte, jüngstes zuerst. Leere Liste, wenn es keines gibt.
+        """
+        if minBis is None:
+            minBis = maxVon
+        intervalle = self._intervalle.get( key )
+        if not intervalle:
+            return list()
+        # alle Intervalle vor idx beginnen spätestens an maxVon.
+        # Da sie sich nicht überschneiden, sind auch ihre bis-Daten aufsteigend sortiert:
+        # rückwärts suchen, bis das erste Intervall vor minBis endet.
+        idx = bisect_right( self._vons[key], maxVon )
+        found = list()
+        while idx > 0:
+            idx -= 1
+            x = intervalle[idx]
+            if x.bis and x.bis < minBis:
+                break
+            found.append( x )
+        return found
+
+    def getSollAm( self, key:Any, datum:str ) -> Any or None:
+        """
+        Liefert das am Tag <datum> gültige Soll-Objekt zu <key> bzw. None.
+        """
+        found = self.find( key, datum )
+        return found[0] if found else None
+
+    def getLetztesBis( self, key:Any, datum:str ) -> Any or None:
+        """
+        Liefert das jüngste Soll-Objekt zu <key>, das spätestens am Tag <datum> beginnt - unabhängig davon,
+        ob es an <datum> noch gültig ist. None, wenn es keines gibt.
+        """
+        vons = self._vons.get( key )
+        if not vons:
+            return None
+        idx = bisect_right( vons, datum )
+        return self._intervalle[key][idx-1] if idx > 0 else None
+
+    def getLetztes( self, key:Any ) -> Any or None:
+        """
+        Liefert das jüngste Soll-Objekt zu <key> (es kann auch in der Zukunft beginnen) bzw. None.
+        """
+        intervalle = self._intervalle.get( key )
+        return intervalle[-1] if intervalle else None
+
+    def getAlleAm( self, datum:str ) -> List[Any]:
+        """
+        Liefert alle am Tag <datum> gültigen Soll-Objekte, über alle Schlüssel.
+        """
+        retlist = list()
+        for key in self._intervalle.keys():
+            retlist.extend( self.find( key, datum ) )
+        return retlist
+
+    def getAlleJeMonat( self, jahr:int ) -> List[List[Any]]:
+        """
+        Liefert für jeden Monat des Jahres <jahr> die am Ersten des Monats gültigen Soll-Objekte
+        (Index 0 = Januar, ... 11 = Dezember). Die 12 Listen werden je Jahr nur einmal ermittelt.
+        Annahme: Sollwerte ändern sich ausschließlich zum Ersten eines Monats.
+        """
+        monate = self._jahre.get( jahr )
+        if monate is None:
+            monate = [self.getAlleAm( "%d-%02d-01" % (jahr, monat) ) for monat in range( 1, 13 )]
+            self._jahre[jahr] = monate
+        return monate
+
+
+#################   SollIndexCache   #################################
+class SollIndexCache:
+    """
+    Hält je Soll-Tabelle (sollmiete, sollhausgeld) einen SollIntervallIndex für die Dauer der Sitzung.
+    Ein Index wird beim ersten Zugriff mit einem einzigen Select aufgebaut und verworfen, sobald in die
+    zugehörige Tabelle geschrieben (oder zurückgerollt) wird - das erledigen die Data-Klassen.
+    """
+    __instance = None
+    def __init__( self ):
+        if SollIndexCache.__instance:
+            raise Exception( "SollIndexCache is a Single. It may only be instantiated once." )
+        SollIndexCache.__instance = self
+        self._indexe:Dict[str, SollIntervallIndex] = dict()
+        self.loads = 0 # Anzahl der Indexe, die aus der Datenbank aufgebaut wurden
+
+    @staticmethod
+    def inst() -> __instance:
+        if SollIndexCache.__instance is None:
+            SollIndexCache()
+        return SollIndexCache.__instance
+
+    def getIndex( self, table:str, load:Callable[[], List[Any]], getKey:Callable[[Any], Any] ) -> SollIntervallIndex:
+        """
+        Liefert den Index für Tabelle <table>. Gibt es ihn noch nicht, wird er aus den Objekten aufgebaut,
+        die <load> liefert.
+        """
+        index = self._indexe.get( table )
+        if index is None:
+            index = SollIntervallIndex( load(), getKey )
+            self._indexe[table] = index
+            self.loads += 1
+        return index
+
+    def invalidate( self, table:str=None ):
+        """
+        Verwirft den Index für <table> bzw. alle Indexe (table = None)
+        """
+        if table is None:
+            self._indexe.clear()
+        else:
+            self._indexe.pop( table, None )
+
+
+################  TEST TEST TEST   ###########################
+def testSollIntervallIndex():
+    """
+    Vergleicht SollIntervallIndex mit der bisherigen Filterung über datehelper.isWithin
+    (wie in MieteLogic.getSollMieten) - Ergebnis und Laufzeit für alle 12 Monate mehrerer Jahre.
+    """
+    import random
+    import time
+    import datehelper
+    from v2.icc.interfaces import XSollMiete
+
+    random.seed( 4711 )
+    smlist = list()
+    for i in range( 300 ):
+        # je Mieter aufeinanderfolgende Intervalle, jeweils vom Ersten bis zum Monatsletzten
+        jahr, monat = random.randint( 2012, 2020 ), random.randint( 1, 12 )
+        for n in range( random.randint( 1, 5 ) ):
+            x = XSollMiete()
+            x.sm_id = len( smlist ) + 1
+            x.mv_id = "mieter_%d" % i
+            x.von = "%d-%02d-01" % (jahr, monat)
+            jahr += random.randint( 0, 2 )
+            monat = random.randint( 1, 12 )
+            if "%d-%02d-01" % (jahr, monat) <= x.von:
+                jahr += 1
+            x.bis = datehelper.addDaysToIsoString( "%d-%02d-01" % (jahr, monat), -1 )
+            x.netto = float( random.randint( 300, 1200 ) )
+            smlist.append( x )
+        if random.randint( 0, 2 ) > 0:
+            smlist[-1].bis = "" # unbefristet
+    random.shuffle( smlist )
+
+    def getSollMietenOld( jahr:int, monatIdx:int ) -> List[XSollMiete]:
+        check = "%d-%02d-%02d" % (jahr, monatIdx+1, 1)
+        return [x for x in smlist if datehelper.isWithin( check, x.von, x.bis )]
+
+    jahre = range( 2014, 2024 )
+    t = time.perf_counter()
+    old = [sorted( x.sm_id for x in getSollMietenOld( jahr, m ) ) for jahr in jahre for m in range( 12 )]
+    print( "isWithin:          %.1f ms" % ((time.perf_counter() - t)*1000) )
+    t = time.perf_counter()
+    index = SollIntervallIndex( smlist, lambda x: x.mv_id )
+    new = [sorted( x.sm_id for x in index.getAlleJeMonat( jahr )[m] ) for jahr in jahre for m in range( 12 )]
+    print( "SollIntervallIndex: %.1f ms" % ((time.perf_counter() - t)*1000) )
+    assert old == new
+    # Überlappung mit einem Monat (wie SollHausgeldData.getSollHausgeldAm()): Wechsel im Monat liefert beide
+    for key in index.getKeys():
+        for x in index.find( key, "2018-06-30", "2018-06-01" ):
+            assert x.von <= "2018-06-30" and (not x.bis or x.bis >= "2018-06-01")
+    x = smlist[0]
+    assert index.getSollAm( x.mv_id, x.von ) is x and index.getLetztesBis( x.mv_id, x.von ) is x
+    assert index.getSollAm( x.mv_id, "2000-01-01" ) is None and index.getSollAm( "gibtsnicht", x.von ) is None
+    print( "ok" )
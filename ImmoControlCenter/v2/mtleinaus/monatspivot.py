@@ -0,0 +1,132 @@
+from typing import List, Dict, Any, Iterable, Callable
+
+from v2.icc.constants import iccMonthShortNames
+from v2.icc.interfaces import XEinAus, XMtlZahlung
+from v2.mtleinaus.mtleinaustablemodels import MtlEinAusTableModel
+
+# key: Monatskürzel ("jan", ...), value: Monatsindex (0 bis 11)
+MONAT_IDX:Dict[str, int] = {monat: idx for idx, monat in enumerate( iccMonthShortNames )}
+
+
+#################   MonatsPivot   #################################
+class MonatsPivot:
+    """
+    Verdichtet die Einzelzahlungen eines Jahres in einem Durchlauf zu Monatswerten je Schlüssel
+    (Schlüssel x 12 Monate), z.B. je Mieter (debi_kredi) oder je SollAbschlag (sab_id).
+    Teilzahlungen desselben Schlüssels im selben Monat werden addiert.
+    """
+    def __init__( self, ealist:Iterable[XEinAus], getKey:Callable[[XEinAus], Any] ):
+        """
+        :param ealist: die zu verdichtenden Zahlungen
+        :param getKey: liefert zu einer Zahlung den Schlüssel, unter dem sie verdichtet wird
+        """
+        self._werte:Dict[Any, List[float]] = dict()
+        for ea in ealist:
+            key = getKey( ea )
+            werte = self._werte.get( key )
+            if werte is None:
+                werte = [0.0] * 12
+                self._werte[key] = werte
+            werte[MONAT_IDX[ea.monat]] += ea.betrag
+
+    def getKeys( self ) -> Iterable[Any]:
+        return self._werte.keys()
+
+    def getMonatswerte( self, key:Any ) -> List[float] or None:
+        """
+        Liefert die 12 Monatswerte zu <key> bzw. None, wenn es zu <key> keine Zahlungen gibt.
+        """
+        return self._werte.get( key )
+
+    def provideMonatswerte( self, xmz:XMtlZahlung, key:Any ) -> bool:
+        """
+        Überträgt die Monatswerte zu <key> in <xmz> und errechnet dessen Summe.
+        :return: False, wenn es zu <key> keine Zahlungen gibt (<xmz> bleibt dann unverändert).
+        """
+        werte = self._werte.get( key )
+        if werte is None:
+            return False
+        for idx, wert in enumerate( werte ):
+            xmz.setMonthValue( idx, wert )
+        xmz.computeSum()
+        return True
+
+
+#################   Soll-Spalte   #################################
+def createSollDict( sollList:Iterable[Any], getKey:Callable[[Any], Any], getSoll:Callable[[Any], float] ) \
+        -> Dict[Any, float]:
+    """
+    Liefert die Sollwerte aus <sollList> je Schlüssel. Gibt es zu einem Schlüssel mehrere Sollwerte,
+    gilt der erste.
+    """
+    sollDict = dict()
+    for soll in sollList:
+        sollDict.setdefault( getKey( soll ), getSoll( soll ) )
+    return sollDict
+
+def joinSoll( rows:Iterable[XMtlZahlung], sollDict:Dict[Any, float], getKey:Callable[[XMtlZahlung], Any],
+              model:MtlEinAusTableModel=None ) -> int:
+    """
+    Setzt in jeder Zeile von <rows> die Soll-Spalte auf den Wert aus <sollDict> (0, wenn es keinen gibt).
+    Ist <model> angegeben, wird es über jede geänderte Zeile informiert (Anzeige und Summenzeile).
+    :return: die Anzahl der geänderten Zeilen
+    """
+    changed = 0
+    for row in rows:
+        soll = sollDict.get( getKey( row ), 0 )
+        if soll != row.soll:
+            row.soll = soll
+            changed += 1
+            if model:
+                model.objectUpdatedExternally( row )
+    return changed
+
+
+################  TEST TEST TEST   ###########################
+def testMonatsPivot():
+    """
+    Vergleicht MonatsPivot mit dem bisherigen geschachtelten Durchlauf (je Mieter alle Zahlungen,
+    wie in MieteLogic._provideZahlungen) - Ergebnis und Laufzeit.
+    """
+    import random
+    import time
+    from v2.icc.interfaces import XMtlMiete
+
+    def provideZahlungenOld( mzlist:List[XMtlMiete], einausList:List[XEinAus] ):
+        for mz in mzlist:
+            for ea in einausList:
+                if ea.debi_kredi == mz.mv_id:
+                    mz.__dict__[ea.monat] += ea.betrag
+                    mz.summe += ea.betrag
+
+    random.seed( 4711 )
+    ealist = list()
+    for i in range( 6000 ):
+        ea = XEinAus()
+        ea.debi_kredi = "mieter_%d" % (i%250)
+        ea.monat = iccMonthShortNames[random.randint( 0, 11 )]
+        ea.betrag = round( random.uniform( 100, 900 ), 2 )
+        ealist.append( ea )
+    mzlist = list()
+    for i in range( 250 ):
+        mz = XMtlMiete()
+        mz.mv_id = "mieter_%d" % i
+        mzlist.append( mz )
+    t = time.perf_counter()
+    provideZahlungenOld( mzlist, ealist )
+    print( "geschachtelt: %.1f ms" % ((time.perf_counter() - t)*1000) )
+    t = time.perf_counter()
+    pivot = MonatsPivot( ealist, lambda ea: ea.debi_kredi )
+    for mz in mzlist:
+        mz2 = XMtlMiete()
+        pivot.provideMonatswerte( mz2, mz.mv_id )
+    print( "MonatsPivot:  %.1f ms" % ((time.perf_counter() - t)*1000) )
+    for mz in mzlist:
+        mz2 = XMtlMiete()
+        assert pivot.provideMonatswerte( mz2, mz.mv_id )
+        assert all( round( mz.getMonthValue( m ), 2 ) == round( mz2.getMonthValue( m ), 2 ) for m in range( 12 ) )
+        assert round( mz.summe, 2 ) == round( mz2.summe, 2 )
+    mz = mzlist[7]
+    assert joinSoll( [mz], {"mieter_7": 500.0}, lambda x: x.mv_id ) == 1 and mz.soll == 500.0
+    assert joinSoll( [mz], dict(), lambda x: x.mv_id ) == 1 and mz.soll == 0
+    print( "ok" )
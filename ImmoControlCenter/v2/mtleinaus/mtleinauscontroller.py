@@ -248,6 +248,7 @@ class MtlEinAusController( IccController ):
                     # die in Summe die Monatszahlung ergeben:
                     xlist:List[XEinAus] = eatm.getAllElements()
                     self._updateZahlung( x, xlist, row )
+                    eatm.objectUpdatedExternally( x )
                 except Exception as ex:
                     box = ErrorBox( "Fehler beim Ändern einer Monatszahlung", str( ex ), x.toString( True ) )
                     box.exec_()
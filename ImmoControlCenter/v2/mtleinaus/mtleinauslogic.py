@@ -14,6 +14,7 @@ from v2.icc.interfaces import XMtlZahlung, XEinAus, XMietverhaeltnisKurz, XSollM
 from v2.mtleinaus.abschlagdata import AbschlagData
 from v2.mtleinaus.hausgelddata import HausgeldData
 from v2.mtleinaus.mietedata import MieteData
+from v2.mtleinaus.monatspivot import MonatsPivot, createSollDict, joinSoll
 
 
 ################  MtlEinAusLogic  ############################
@@ -31,7 +32,8 @@ class MtlEinAusLogic( IccLogic ):
     Konkret: in der Tabelle einaus gibt es nur einzelne Zahlungen. Für die Anzeige in der Miet- u. HG-Tableview
     müssen aber Monatswerte angezeigt werden, welche sich möglicherweise aus mehreren Einzelzahlungen zusammensetzen.
     MtlEinAusLogic bzw. ihre erbenden Klassen sind dafür verantwortlich, die Einzelzahlungen auf Monatswerte zu
-    verdichten.
+    verdichten (in einem Durchlauf mit MonatsPivot) und die Sollwerte des eingestellten Monats per Dictionary
+    zuzuordnen (createSollDict(), joinSoll()). Bei einem Monatswechsel wird nur die Soll-Spalte neu zugeordnet.
     Stellt abstrakte Methoden bereit, die von den erbenden Klassen MieteLogic und HausgeldLogic implementiert werden
     müssen.
     """
@@ -196,31 +198,10 @@ class MtlEinAusLogic( IccLogic ):
             lastMon = iccMonthShortNames[11]
         return firstMon, lastMon
 
-    def getCondensedEinAusList( self, einausList: List[XEinAus] ) -> List[XEinAus]:
-        """
-        Verdichtet die übergebene <einausList> auf debi_kredi, d.h., alle Beträge in den in <einausList> enthaltenen
-        XEinAus-Objekten, die sich auf den gleichen debi_kredi beziehen, werden auf *ein* XeinAus-Objekt addiert;
-        die anderen XEinAus-Objekte des gleichen debi_kredi werden gelöscht.
-        So erhält man je debi_kredi und monat (und mobj_id) ein einziges XEinAus-Objekt.
-        :param einausList: Liste mit den zu verdichtenden XEinAus-Objekten.
-        :return: die verdichtete, *also geänderte* einausList
-        """
-        einausList = sorted( einausList, key=lambda x: x.debi_kredi )
-        for ea in einausList:
-            for ea2 in einausList:
-                if not ea == ea2 \
-                and ea.monat == ea2.monat \
-                and ea.master_name == ea2.master_name \
-                and ea.mobj_id == ea2.mobj_id  \
-                and ea.debi_kredi == ea2.debi_kredi:
-                    ea.betrag += ea2.betrag
-                    einausList.remove( ea2 )
-        return einausList
-
     @abstractmethod
     def selectedMonthChanged( self, model:MtlEinAusTableModel, newMonthIdx:int ):
         """
-        im Model müssen neue Sollwerte angelegt werden.
+        im Model müssen neue Sollwerte angelegt werden (nur die Soll-Spalte, die Monatswerte bleiben).
         :param model:
         :param newMonthIdx:
         :return:
@@ -260,23 +241,16 @@ class MieteLogic( MtlEinAusLogic ):
         :return:
         """
         einausList: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.BRUTTOMIETE.display, jahr )
-        # Annahme: in einausList können mehrere Zahlungsvorgänge eines Debitors/Kreditors sein, die den gleichen Monat
-        # betreffen.
-        # Deshalb muss die einausList zunächst auf Monate verdichtet werden,
-        # und vor dem Verdichten wird sie nach Mietern (Debitoren) sortiert.
-        einausList = self.getCondensedEinAusList( einausList )
-        # einausList enthält nun je Mieter (Debitor) und Monat ein XEinAus-Objekt und ist nach Mietern sortiert.
-        # Nicht für jeden Monat muss ein XEinAus-Objekt vorhanden sein.
-
-        # Die Liste der XEinAus-Objekte muss nun in eine Liste von XMtlZahlung-Objekte umgewandelt werden (für das
-        # TableModel).
-        # Dafür müssen wir zuerst eine Liste der in <jahr> aktiven Mietverhältnisse holen:
+        # In einausList können mehrere Zahlungsvorgänge eines Mieters (Debitors) sein, die den gleichen Monat
+        # betreffen. Sie werden je Mieter und Monat addiert:
+        pivot = MonatsPivot( einausList, lambda ea: ea.debi_kredi )
+        # Für die Umwandlung in XMtlMiete-Objekte (für das TableModel) brauchen wir die Liste der in <jahr>
+        # aktiven Mietverhältnisse:
         mvlist: List[XMietverhaeltnisKurz] = self._getUniqueMietverhaeltnisse( jahr )
-        # je XMietverhaeltnisKurz-Objekt in mvlist ein XMtlZahlung-OBjekt anlegen und in die XMtlZahlung-Liste packen:
+        # je XMietverhaeltnisKurz-Objekt in mvlist ein XMtlMiete-Objekt anlegen und mit den Monatswerten versorgen:
         mietelist:List[XMtlMiete] = self._convertMietVhToMtlZahlg( mvlist, jahr )
-        # die XMtlZahlung-Objekte in mzlist müssen jetzt noch mit den Zahlungsdaten versorgt werden:
-        self._provideZahlungen( mietelist, einausList )
-        #self.provideSollMieten( jahr, constants.iccMonthShortNames[checkmonatIdx], mietelist )
+        for mz in mietelist:
+            pivot.provideMonatswerte( mz, mz.mv_id )
         self.provideSollMieten( jahr, checkmonatIdx, mietelist )
         return mietelist
 
@@ -291,30 +265,26 @@ class MieteLogic( MtlEinAusLogic ):
         :param mzlist: die Liste mit XMtlZahlung-Objekten, die mit den Sollwerten für <jahr>/<monat> aktualisiert werden soll
         :return: die aktualisierte <mzlist>
         """
-        smlist: List[XSollMiete] = self.getSollMieten( jahr, monatIdx )
-        for mz in mzlist:
-            for sm in smlist:
-                if sm.mv_id == mz.mv_id and sm.mobj_id == mz.mobj_id:
-                    mz.soll = sm.brutto
-                    break
+        self._joinSollMieten( jahr, monatIdx, mzlist )
         return mzlist
 
+    def _joinSollMieten( self, jahr:int, monatIdx:int, mzlist:List[XMtlMiete], model:MieteTableModel=None ):
+        sollDict = createSollDict( self.getSollMieten( jahr, monatIdx ), lambda sm: (sm.mv_id, sm.mobj_id),
+                                   lambda sm: sm.brutto )
+        joinSoll( mzlist, sollDict, lambda mz: (mz.mv_id, mz.mobj_id), model )
+
     def getSollMieten( self, jahr: int, monatIdx:int ) -> List[XSollMiete]:
         """
         Liefert alle Sollmieten, die im Jahr <jahr> und Monat <monat> gültig waren.
         Annahme: Sollmieten ändern sich ausschließlich zum 1. eines Moants
+        Die Sollmieten aller 12 Monate werden beim ersten Zugriff auf <jahr> aus dem Sollmiete-Index ermittelt,
+        ein Monatswechsel braucht keinen Datenbankzugriff.
+        Die gelieferten Objekte dürfen nicht geändert werden.
         :param jahr:
         :param monatIdx: Monatsindex. Januar = 0, Dezember = 11
         :return:
         """
-        check = "%d-%02d-%02d" % (jahr, monatIdx+1, 1)
-        sollmietedata = SollmieteData()
-        l:List[XSollMiete] = sollmietedata.getSollMieten( jahr )
-        retlist:List[XSollMiete] = list()
-        for x in l:
-            if datehelper.isWithin( check, x.von, x.bis ):
-                retlist.append( x )
-        return retlist
+        return list( SollmieteData().getSollmieteIndex().getAlleJeMonat( jahr )[monatIdx] )
 
     def _convertMietVhToMtlZahlg( self, mvlist: List[XMietverhaeltnisKurz], jahr: int ) -> List[XMtlMiete]:
         mietelist: List[XMtlMiete] = list()
@@ -326,46 +296,12 @@ class MieteLogic( MtlEinAusLogic ):
             mietelist.append( x )
         return mietelist
 
-    def _provideZahlungen( self, mzlist: List[XMtlMiete], einausList: List[XEinAus] ) -> None:
-        """
-        Versorgt jedes XMtlZahlung-Objekt in <mzlist> mit den Zahlungsdaten der korrespondierenden
-        XEinAus-Objekte aus <einausList>.
-        :param mzlist:
-        :param einausList:
-        :return:
-        """
-        def getZahlungen( key: str, value: str ) -> List[XEinAus]:
-            # key ist "debi_kredi"
-            retlist = list()
-            for x in einausList:
-                if x.__dict__[key] == value:
-                    retlist.append( x )
-            return retlist
-
-        key = "debi_kredi"
-        for mz in mzlist:
-            ealist: List[XEinAus] = getZahlungen( key, mz.mv_id )
-            for ea in ealist:
-                mz.__dict__[ea.monat] += ea.betrag
-                mz.summe += ea.betrag
-
     def _getUniqueMietverhaeltnisse( self, jahr: int ) -> List[XMietverhaeltnisKurz]:
         data = IccData()
         return data.getMietverhaeltnisseKurz( jahr, orderby="mv_id" )
 
     def selectedMonthChanged( self, model: MieteTableModel, newMonthIdx: int ):
-        # todo
-        sollmieteListe:List[XSollMiete] = self.getSollMieten( model.getJahr(), newMonthIdx )
-        rowlist:List[XMtlMiete] = model.rowList
-        for mtlmiete in rowlist:
-            found = False
-            for sm in sollmieteListe:
-                if sm.mv_id == mtlmiete.mv_id:
-                    mtlmiete.soll = sm.brutto
-                    found = True
-                    break
-            if not found:
-                mtlmiete.soll = 0
+        self._joinSollMieten( model.getJahr(), newMonthIdx, model.rowList, model )
 
 
 #####################  HausgeldLogic ############################
@@ -375,48 +311,13 @@ class HausgeldLogic( MtlEinAusLogic ):
         self._hausgeldData = HausgeldData()
 
     def createHausgeldzahlungenModel( self, jahr: int, checkmonatIdx:int=None ) -> HausgeldTableModel:
-        def condense( eaList:List[XEinAus] ) -> List[XEinAus]:
-            """
-            Fasst etwaige Teilzahlungen eines Monats für eine Kombination Master, Mietobjekt, WEG zu EINER Monatszahlung
-            (einem EinAus-Objekt) zusammen.
-            :param eaList:
-            :return:
-            """
-            def makeKey( master_name, mobj_id, debi_kredi ):
-                key = master_name
-                if mobj_id:
-                    key += mobj_id
-                if debi_kredi:
-                    key += debi_kredi
-                return key
-
-            einausList = sorted( eaList, key=lambda x: makeKey( x.master_name, x.mobj_id, x.debi_kredi ) )
-            for ea1 in einausList:
-                for ea2 in einausList:
-                    if not ea1 == ea2 \
-                    and ea1.monat == ea2.monat \
-                    and ea1.master_name == ea2.master_name \
-                    and ea1.mobj_id == ea2.mobj_id \
-                    and ea1.debi_kredi == ea2.debi_kredi:
-                        ea1.betrag += ea2.betrag
-                        einausList.remove( ea2 )
-            return einausList
         xhglist = self._hausgeldData.getMtlHausgeldListe( jahr )
         ea_list:List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.HAUSGELD_VORAUS.display, jahr )
-        ## debug ##
-        # for ea in ea_list:
-        #     if ea.debi_kredi.startswith( "WEG Thomas" ) or \
-        #         ea.mobj_id.startswith( "thomasmann" ):
-        #         ea.print()
-        ## debug ende ##
-        ea_list = condense( ea_list )
+        # Teilzahlungen eines Monats für ein Mietobjekt werden zu EINER Monatszahlung zusammengefasst
+        pivot = MonatsPivot( ea_list, lambda ea: ea.mobj_id )
         for xhg in xhglist:
             self._provideFirstLastSollHgZahlung( xhg, jahr )
-            # die ea_ist ist sortiert nach master_name, mobj_id, debi_kredi (WEG-Name)
-            for ea in ea_list:
-                if ea.mobj_id == xhg.mobj_id:
-                    xhg.__dict__[ea.monat] = ea.betrag
-                    xhg.computeSum()
+            pivot.provideMonatswerte( xhg, xhg.mobj_id )
         self._provideSollHausgelder( jahr, checkmonatIdx, xhglist )
         tm = HausgeldTableModel( xhglist, jahr, checkmonatIdx )
         return tm
@@ -432,13 +333,11 @@ class HausgeldLogic( MtlEinAusLogic ):
         return True
 
 
-    def _provideSollHausgelder( self, jahr:int, monatIdx:int, xhglist:List[XMtlHausgeld] ) -> List[XMtlHausgeld]:
-        sollHgList = self.getSollHausgelder( jahr, monatIdx )
-        for hg in xhglist:
-            for soll in sollHgList:
-                if soll.weg_name == hg.weg_name and soll.mobj_id == hg.mobj_id:
-                    hg.soll = soll.brutto
-                    break
+    def _provideSollHausgelder( self, jahr:int, monatIdx:int, xhglist:List[XMtlHausgeld],
+                                model:HausgeldTableModel=None ) -> List[XMtlHausgeld]:
+        sollDict = createSollDict( self.getSollHausgelder( jahr, monatIdx ), lambda shg: (shg.weg_name, shg.mobj_id),
+                                   lambda shg: shg.brutto )
+        joinSoll( xhglist, sollDict, lambda hg: (hg.weg_name, hg.mobj_id), model )
         return xhglist
 
     @staticmethod
@@ -446,18 +345,13 @@ class HausgeldLogic( MtlEinAusLogic ):
         """
         Liefert alle Soll-Hausgelder, die im Jahr <jahr> und Monat <monat> gültig waren.
         Annahme: Hausgelder ändern sich ausschließlich zum 1. eines Moants
+        Wie bei MieteLogic.getSollMieten() kommen die Soll-Hausgelder aus dem Index.
+        Die gelieferten Objekte dürfen nicht geändert werden.
         :param jahr:
         :param monatIdx: Monatsindex. Januar = 0, Dezember = 11
         :return:
         """
-        check = "%d-%02d-%02d" % (jahr, monatIdx+1, 1)
-        shgdata = SollHausgeldData()
-        l:List[XSollHausgeld] = shgdata.getSollHausgelder( jahr )
-        retlist:List[XSollHausgeld] = list()
-        for x in l:
-            if datehelper.isWithin( check, x.von, x.bis ):
-                retlist.append( x )
-        return retlist
+        return list( SollHausgeldData().getSollHausgeldIndex().getAlleJeMonat( jahr )[monatIdx] )
 
     def getHausgeldvorauszahlungen( self, mobj_id:str, debikredi:str, year:int, monthIdx:int ) -> EinAusTableModel:
         """
@@ -476,9 +370,8 @@ class HausgeldLogic( MtlEinAusLogic ):
     def getDebiKrediKey( self ) -> Any:
         return "weg_name"
 
-    def selectedMonthChanged( self, model: MtlEinAusTableModel, newMonthIdx: int ):
-        # todo
-        pass
+    def selectedMonthChanged( self, model: HausgeldTableModel, newMonthIdx: int ):
+        self._provideSollHausgelder( model.getJahr(), newMonthIdx, model.rowList, model )
 
 #####################  AbschlagLogic ############################
 class AbschlagLogic( MtlEinAusLogic ):
@@ -487,12 +380,12 @@ class AbschlagLogic( MtlEinAusLogic ):
         self._abschlagData = AbschlagData()
 
     def createAbschlagzahlungenModel( self, jahr: int, checkmonatIdx:int=None ) -> AbschlagTableModel:
-        zlist_allg: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.ALLGEMEINE_KOSTEN.display, jahr, "and sab_id > 0 " )
-        zlist_sonst: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.SONSTIGE_KOSTEN.display, jahr, "and sab_id > 0 " )
-        zlist_vers: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.VERSICHERUNG.display, jahr, "and sab_id > 0 " )
-        zlist_gs: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.GRUNDSTEUER.display, jahr, "and sab_id > 0 " )
-        zlist = zlist_allg + zlist_sonst + zlist_vers + zlist_gs
-        zlist = self._getCondensedEinAusList( zlist ) # zlist enthält für jede sab_id und jeden Monat genau 1 XEinAus-Objekt
+        zlist_allg: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.ALLGEMEINE_KOSTEN.display, jahr )
+        zlist_sonst: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.SONSTIGE_KOSTEN.display, jahr )
+        zlist_vers: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.VERSICHERUNG.display, jahr )
+        zlist_gs: List[XEinAus] = self._ealogic.getZahlungen( EinAusArt.GRUNDSTEUER.display, jahr )
+        zlist = [z for z in zlist_allg + zlist_sonst + zlist_vers + zlist_gs if z.sab_id] # nur Abschlagszahlungen
+        pivot = MonatsPivot( zlist, lambda z: z.sab_id ) # je sab_id und Monat die Summe der Zahlungen
         sollAbschlagList:List[XSollAbschlag] = self._abschlagData.getSollabschlaege( jahr )
         # die XEinAus-Liste in XMtlAbschlag-Liste umwandeln:
         xablist:List[XMtlAbschlag] = list()
@@ -509,36 +402,12 @@ class AbschlagLogic( MtlEinAusLogic ):
             xab.leistung = sollabschlag.leistung
             xab.vonMonat, xab.bisMonat = self.getMonthIntervallForCurrentYear( jahr, sollabschlag.von, sollabschlag.bis )
             #self._completeData( xab, xab.sab_id, jahr, checkmonatIdx+1, sollAbschlagList )
-            # dem XMtlAbschlag-Objekt die einzelnen Zahlungen zuordnen
-            for xea in zlist:
-                if xea.sab_id == xab.sab_id:
-                   xab.__dict__[xea.monat] = xea.betrag
-            xab.computeSum()
+            # dem XMtlAbschlag-Objekt die Monatswerte zuordnen
+            pivot.provideMonatswerte( xab, xab.sab_id )
             xablist.append( xab )
         tm = AbschlagTableModel( xablist, jahr, checkmonatIdx )
         return tm
 
-    @staticmethod
-    def _getCondensedEinAusList( einausList: List[XEinAus] ) -> List[XEinAus]:
-        """
-        Verdichtet die übergebene <einausList> auf sab_id, d.h., alle Beträge in den in <einausList> enthaltenen
-        XEinAus-Objekten, die sich auf die gleichen sab_id beziehen, werden auf *ein* XeinAus-Objekt addiert;
-        die anderen XEinAus-Objekte der gleichen sab_id werden gelöscht.
-        So erhält man je sab_id und monat ein einziges XEinAus-Objekt.
-        :param einausList: Liste mit den zu verdichtenden XEinAus-Objekten.
-        :return: die verdichtete, *also geänderte* einausList
-        """
-        einausList = sorted( einausList, key=lambda x: x.sab_id )
-        for ea in einausList:
-            for ea2 in einausList:
-                if not ea == ea2 \
-                        and ea.monat == ea2.monat \
-                        and ea.sab_id == ea2.sab_id:
-                    ea.betrag += ea2.betrag
-                    einausList.remove( ea2 )
-        return einausList
-
-
     def _completeData___( self, xab:XMtlAbschlag, sab_id:int,
                        jahr:int, monat:int, sollAbschlagList:List[XSollAbschlag] ) -> None:
         """
@@ -41,6 +41,10 @@ class MtlEinAusTableModel( IccSumTableModel ):
 
     def getMtlZahlung( self, mobj_id:str, debi_kredi:str ) -> XMtlZahlung:
         debi_kredi_key = self.getDebiKrediKey()
+        if debi_kredi_key in self.getUniqueKeys():
+            xmz = self.getElementByUniqueKeyValue( debi_kredi_key, debi_kredi )
+            if xmz and xmz.mobj_id == mobj_id:
+                return xmz
         for xmz in self.rowList:
             if xmz.mobj_id == mobj_id and xmz.__dict__[debi_kredi_key] == debi_kredi:
                 return xmz
@@ -191,6 +195,7 @@ class MtlEinAusTableModel( IccSumTableModel ):
 class MieteTableModel( MtlEinAusTableModel ):
     def __init__( self, rowList:List[XMtlMiete], jahr:int, editableMonthIdx:int ):
         MtlEinAusTableModel.__init__( self, rowList, jahr, editableMonthIdx, ( "soll", "summe" ) )
+        self.setUniqueKeys( ("mv_id",) )
 
     def getForegroundBrush( self, indexrow: int, indexcolumn: int ) -> QBrush or None:
         brush = super().getForegroundBrush( indexrow, indexcolumn )
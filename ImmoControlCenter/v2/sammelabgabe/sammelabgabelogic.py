@@ -80,14 +80,20 @@ class SammelabgabeLogic( IccLogic ):
         ealist = list()
         ealogic = EinAusLogic()
         l: List[XGrundbesitzabgabe] = self._data.getSammelabgaben( jahr )
-        for x in l:
-            # eine Grundbesitzabgabe enthält 3 Beträge: Grundsteuer, Abwasser, Straßenreinigung.
-            # Für jede Grundbesitzabgabe legen wir eine Zahlung der ea_art "Grundsteuer" und
-            # eine Zahlung der ea_art "Allgemeine Hauskosten" an. Letztere umfasst die Summe aus
-            # Abwasser- und Straßenreinigungs-Betrag.
-            trySaveGrundsteuer()
-            trySaveAbgaben()
+        try:
+            for x in l:
+                # eine Grundbesitzabgabe enthält 3 Beträge: Grundsteuer, Abwasser, Straßenreinigung.
+                # Für jede Grundbesitzabgabe legen wir eine Zahlung der ea_art "Grundsteuer" und
+                # eine Zahlung der ea_art "Allgemeine Hauskosten" an. Letztere umfasst die Summe aus
+                # Abwasser- und Straßenreinigungs-Betrag.
+                trySaveGrundsteuer()
+                trySaveAbgaben()
+        except Exception as ex:
+            # keine halbe Sammelabgabe stehen lassen (sie würde mit dem nächsten Commit gespeichert)
+            ealogic.rollback()
+            raise ex
         ealogic.commit()
+        # Der Aufrufer muss den EinAusWriteDispatcher über die angelegten Zahlungen informieren.
         return ealist
 
     def _createXEinAusKopfdaten( self, x:XGrundbesitzabgabe, jahr:int, buchungsdatum:str ) -> XEinAus:
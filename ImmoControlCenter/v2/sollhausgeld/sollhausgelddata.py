@@ -3,12 +3,27 @@ from typing import List, Dict
 import datehelper
 from v2.icc.iccdata import IccData, DbAction
 from v2.icc.interfaces import XSollHausgeld
+from v2.icc.sollintervallindex import SollIndexCache, SollIntervallIndex
 
 
 class SollHausgeldData( IccData ):
     def __init__(self):
         IccData.__init__( self )
 
+    def getSollHausgeldIndex( self ) -> SollIntervallIndex:
+        """
+        Liefert den Index über alle Soll-Hausgelder (mit vw_id und weg_name), Schlüssel ist die mobj_id.
+        Er wird beim ersten Zugriff mit einem Select aufgebaut und nach jedem Schreibzugriff auf
+        sollhausgeld neu aufgebaut.
+        """
+        return SollIndexCache.inst().getIndex( "sollhausgeld", self._readSollHausgelderFuerIndex,
+                                               lambda x: x.mobj_id )
+
+    def _readSollHausgelderFuerIndex( self ) -> List[XSollHausgeld]:
+        sql = self._getSelectClauseMitVerwaltungJoin()
+        sql += "order by s.mobj_id, s.von "
+        return self.readAllGetObjectList( sql, XSollHausgeld )
+
     def getAllSollHausgelder( self ) -> List[XSollHausgeld]:
         sql = "select shg.shg_id, shg.vwg_id, shg.mobj_id, vwg.vw_id, vwg.weg_name, shg.von, shg.bis, " \
               "shg.netto, shg.ruezufue, shg.bemerkung " \
@@ -159,6 +174,7 @@ class SollHausgeldData( IccData ):
               "(   %d,          '%s',      '%s',    %s,    %.2f,       %.2f,       %s)" % \
               ( xsh.vwg_id, xsh.mobj_id, xsh.von,   bis, xsh.netto, xsh.ruezufue, bemerkung )
         rc = self.writeAndLog( sql, DbAction.INSERT, "sollhausgeld", "shg_id", 0, xsh.toString( printWithClassname=True ) )
+        SollIndexCache.inst().invalidate( "sollhausgeld" )
         return rc
 
     def updateSollHausgeld( self, xsh:XSollHausgeld ) -> int:
@@ -181,6 +197,7 @@ class SollHausgeldData( IccData ):
                                        xsh.netto, xsh.ruezufue, bemerkung, xsh.shg_id )
         rc = self.writeAndLog( sql, DbAction.UPDATE, "sollhausgeld", "shg_id", xsh.shg_id,
                                xsh.toString(printWithClassname=True), currentX.toString( printWithClassname=True ) )
+        SollIndexCache.inst().invalidate( "sollhausgeld" )
         return rc
 
     def deleteSollHausgeld( self, shg_id:int ):
@@ -188,6 +205,7 @@ class SollHausgeldData( IccData ):
         sql = "delete from sollhausgeld where shg_id = '%d' " % shg_id
         self.writeAndLog( sql, DbAction.DELETE, "sollhausgeld", "shg_id", shg_id,
                           newvalues=None, oldvalues=currentX.toString( printWithClassname=True ) )
+        SollIndexCache.inst().invalidate( "sollhausgeld" )
 
 def test2():
     data = SollHausgeldData()
@@ -28,18 +28,27 @@ class SollHausgeldLogic( IccLogic ):
         tm = SollHausgeldTableModel( sollhglist )
         return tm
 
-    def getCurrentSollHausgeld( self, mobj_id:str ) -> XSollHausgeld:
-        x:XSollHausgeld = self._data.getCurrentSollHausgeld( mobj_id )
-        return x
+    def getCurrentSollHausgeld( self, mobj_id:str ) -> XSollHausgeld or None:
+        """
+        Liefert das heute gültige Soll-Hausgeld aus dem Soll-Hausgeld-Index
+        (siehe SollHausgeldData.getSollHausgeldIndex()) - als Kopie.
+        """
+        x:XSollHausgeld = self._data.getSollHausgeldIndex().getSollAm( mobj_id, datehelper.getTodayAsIsoString() )
+        return copy.copy( x ) if x else None
 
     def getSollHausgeldAm( self, mobj_id:str, jahr: int, monthNumber: int ) -> XSollHausgeld or None:
         """
+        Liefert das Soll-Hausgeld, das im Monat <monthNumber> (zumindest teilweise) gültig war.
+        Wird aus dem Soll-Hausgeld-Index ermittelt - als Kopie.
         :param mobj_id:
         :param jahr:
         :param monthNumber: 1 -> Januar,..., 12 -> Dezember
         :return:
         """
-        return self._data.getSollHausgeldAm( mobj_id, jahr, monthNumber )
+        minbis = "%d-%02d-01" % (jahr, monthNumber)
+        maxvon = "%d-%02d-%02d" % (jahr, monthNumber, datehelper.getNumberOfDays( monthNumber ))
+        found = self._data.getSollHausgeldIndex().find( mobj_id, maxvon, minbis )
+        return copy.copy( found[0] ) if found else None
 
     def getFolgeSollHausgeld( self, currentX: XSollHausgeld ) -> XSollHausgeld:
         """
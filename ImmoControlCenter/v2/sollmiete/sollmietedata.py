@@ -5,12 +5,21 @@ from datehelper import getNumberOfDays
 from v2.icc.constants import getMonthIdxFromShortName
 from v2.icc.iccdata import IccData, DbAction
 from v2.icc.interfaces import XSollMiete
+from v2.icc.sollintervallindex import SollIndexCache, SollIntervallIndex
 
 
 class SollmieteData( IccData ):
     def __init__( self ):
         IccData.__init__( self )
 
+    def getSollmieteIndex( self ) -> SollIntervallIndex:
+        """
+        Liefert den Index über alle Sollmieten, Schlüssel ist die mv_id.
+        Er wird beim ersten Zugriff mit getAlleSollMieten() aufgebaut und nach jedem Schreibzugriff auf
+        sollmiete neu aufgebaut.
+        """
+        return SollIndexCache.inst().getIndex( "sollmiete", self.getAlleSollMieten, lambda x: x.mv_id )
+
     def getAlleSollMieten( self ) -> List[XSollMiete]:
         sql = "select sm.sm_id, sm.mv_id, sm.von, coalesce(sm.bis, '') as bis, " \
               "sm.netto, sm.nkv, (sm.netto + sm.nkv) as brutto, " \
@@ -142,6 +151,7 @@ class SollmieteData( IccData ):
               "(mv_id, von, bis, netto, nkv, bemerkung ) " \
               "values( '%s', '%s', %s, %.2f, %.2f, '%s' ) " % (x.mv_id, x.von, bis, x.netto, x.nkv, x.bemerkung)
         lastRowId = self.write( sql )
+        SollIndexCache.inst().invalidate( "sollmiete" )
         x.sm_id = self.getMaxId( "sollmiete", "sm_id" )
         return lastRowId
 
@@ -163,13 +173,16 @@ class SollmieteData( IccData ):
               "nkv = %.2f, " \
               "bemerkung = '%s' " \
               "where sm_id = %d" % (x.von, bis, x.netto, x.nkv, x.bemerkung, x.sm_id)
-        return self.write( sql )
+        rc = self.write( sql )
+        SollIndexCache.inst().invalidate( "sollmiete" )
+        return rc
 
     def deleteSollmiete( self, sm_id:int ):
         currentX = self.getSollmiete( sm_id )
         sql = "delete from sollmiete where sm_id = %d " % sm_id
         self.writeAndLog( sql, DbAction.DELETE, "sollmiete", "shg_id", sm_id,
                           newvalues=None, oldvalues=currentX.toString( printWithClassname=True ) )
+        SollIndexCache.inst().invalidate( "sollmiete" )
 
     def terminateSollmiete( self, sm_id:int, bis:str ) -> int:
         """
@@ -181,7 +194,9 @@ class SollmieteData( IccData ):
         sql = "update sollmiete " \
               "set bis = '%s' " \
               "where sm_id = %d " % ( bis, sm_id )
-        return self.write( sql )
+        rc = self.write( sql )
+        SollIndexCache.inst().invalidate( "sollmiete" )
+        return rc
 
 def test():
    data = SollmieteData()
@@ -82,19 +82,28 @@ class SollmieteLogic:
         """
         Liefert die aktuelle Sollmiete, die auch inaktiv sein kann.
         Sie kann NICHT in der Zukunft liegen.
+        Wird aus dem Sollmiete-Index ermittelt (siehe SollmieteData.getSollmieteIndex()).
         :param mv_id:
-        :return:
+        :return: eine Kopie der Sollmiete aus dem Index
         """
-        return self._db.getAktuelleSollmiete( mv_id )
+        x:XSollMiete = self._db.getSollmieteIndex().getLetztesBis( mv_id, datehelper.getTodayAsIsoString() )
+        if not x:
+            raise Exception( "SollmieteLogic.getAktuelleSollmiete:\nZu '%s' keine aktuelle Sollmiete gefunden." % mv_id )
+        return copy.copy( x )
 
     def getSollmieteAm( self, mv_id:str, jahr:int, monthNumber:int ) -> XSollMiete or None:
         """
+        Liefert die Sollmiete, die im ganzen Monat <monthNumber> gültig war.
+        Wird aus dem Sollmiete-Index ermittelt (siehe SollmieteData.getSollmieteIndex()).
         :param mv_id:
         :param jahr:
         :param monthNumber: 1 -> Januar,..., 12 -> Dezember
-        :return:
+        :return: eine Kopie der Sollmiete aus dem Index oder None
         """
-        return self._db.getSollmieteAm( mv_id, jahr, monthNumber )
+        von = "%4d-%.2d-01" % ( jahr, monthNumber )
+        bis = "%4d-%.2d-%d" % ( jahr, monthNumber, datehelper.getNumberOfDays( monthNumber ) )
+        found = self._db.getSollmieteIndex().find( mv_id, von, bis )
+        return copy.copy( found[0] ) if found else None
 
     def validate( self, xsm:XSollMiete ) -> str:
         if not xsm.mv_id:
@@ -0,0 +1,121 @@
+import copy
+import sys
+import traceback
+from typing import List, Dict
+
+from PySide2.QtCore import QObject, Signal, QRunnable, Slot, QThreadPool
+
+from data.finance.quotefetcher import QuoteFetcher
+from imon.enums import Period, Interval
+from interface.interfaces import XDepotPosition, XDelta
+from logic.investmonitorlogic import InvestMonitorLogic
+
+
+class DepotRefreshSignals( QObject ):
+    position_refreshed = Signal( object, int ) # die aktualisierte Kopie einer XDepotPosition, Generation
+    finished = Signal( int ) # Generation
+    error = Signal( tuple )
+
+##############################################################
+class DepotRefreshJob( QRunnable ):
+    """
+    Holt in einem Thread des QThreadPool Historien und FastInfo für die übergebenen Depotpositionen.
+    Jede Position wird gemeldet, sobald ihre FastInfo eingetroffen ist.
+    Die übergebenen Positionen werden nicht verändert: gemeldet wird jeweils eine aktualisierte Kopie.
+    """
+    def __init__( self, logic:InvestMonitorLogic, poslist:List[XDepotPosition], deltas:Dict[str, List[XDelta]],
+                  period:Period, interval:Interval, generation:int ):
+        super( DepotRefreshJob, self ).__init__()
+        self._logic = logic
+        self._poslist = poslist
+        self._deltas = deltas
+        self._period = period
+        self._interval = interval
+        self._generation = generation
+        self._cancelled = False
+        self.signals = DepotRefreshSignals()
+
+    def cancel( self ):
+        self._cancelled = True
+
+    @Slot()
+    def run( self ):
+        try:
+            self._refresh()
+        except:
+            traceback.print_exc()
+            exctype, value = sys.exc_info()[:2]
+            self.signals.error.emit( (exctype, value, traceback.format_exc()) )
+        finally:
+            self.signals.finished.emit( self._generation )
+
+    def _refresh( self ):
+        tickers = [deppos.ticker for deppos in self._poslist]
+        histories = self._logic.getHistorySeries( tickers, self._period, self._interval )
+        if self._cancelled:
+            return
+        for quote in QuoteFetcher().iterQuotes( tickers ):
+            if self._cancelled:
+                return
+            for deppos in [x for x in self._poslist if x.ticker == quote.ticker]:
+                if deppos.ticker not in histories:
+                    print( deppos.ticker, " not found in DataFrame closeDf" )
+                    continue
+                x = copy.copy( deppos )
+                closeHist, dividends = histories[x.ticker]
+                self._logic.provideMarketData( x, closeHist, dividends, quote, self._deltas.get( x.wkn, list() ),
+                                               self._period, self._interval )
+                self.signals.position_refreshed.emit( x, self._generation )
+
+##############################################################
+class DepotRefreshService( QObject ):
+    """
+    Aktualisiert die Marktdaten (Historien, Kurse, Dividenden) von Depotpositionen im Hintergrund.
+    Jede fertige Position wird mit position_refreshed gemeldet, das Ende der Aktualisierung mit refresh_finished.
+    Wird refresh() erneut aufgerufen, bevor die vorige Aktualisierung fertig ist, wird diese abgebrochen;
+    Ergebnisse abgebrochener Aktualisierungen werden nicht mehr gemeldet.
+    """
+    position_refreshed = Signal( object ) # XDepotPosition
+    refresh_finished = Signal()
+
+    def __init__( self, logic:InvestMonitorLogic ):
+        QObject.__init__( self )
+        self._logic = logic
+        self._threadpool = QThreadPool()
+        self._job:DepotRefreshJob = None
+        self._generation = 0
+
+    def refresh( self, poslist:List[XDepotPosition], period:Period, interval:Interval ):
+        """
+        Startet die Aktualisierung von <poslist> für <period> und <interval>.
+        Muss im GUI-Thread aufgerufen werden (die Orders werden hier aus der DB gelesen).
+        """
+        self.cancel()
+        self._generation += 1
+        deltas = self._logic.getDeltasByWkn( {deppos.wkn for deppos in poslist} )
+        job = DepotRefreshJob( self._logic, list( poslist ), deltas, period, interval, self._generation )
+        job.signals.position_refreshed.connect( self.onPositionRefreshed )
+        job.signals.finished.connect( self.onJobFinished )
+        job.signals.error.connect( self.onJobError )
+        self._job = job
+        self._threadpool.start( job )
+
+    def cancel( self ):
+        if self._job:
+            self._job.cancel()
+            self._job = None
+
+    def isRefreshing( self ) -> bool:
+        return self._job is not None
+
+    def onPositionRefreshed( self, x:XDepotPosition, generation:int ):
+        if generation == self._generation:
+            self.position_refreshed.emit( x )
+
+    def onJobFinished( self, generation:int ):
+        if generation == self._generation and self._job:
+            self._job = None
+            self.refresh_finished.emit()
+
+    def onJobError( self, tuple ):
+        print( "DepotRefreshService: Something went wrong: ", tuple )
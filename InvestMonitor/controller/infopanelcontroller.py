@@ -12,6 +12,7 @@ from base.basetableview import BaseTableView
 from base.dynamicattributeui import DynamicAttributeView, DynamicAttributeDialog
 from base.interfaces import XBaseUI, VisibleAttribute
 from base.messagebox import ErrorBox, InfoBox
+from data.finance.quotefetcher import Quote
 from data.finance.tickerhistory import Period, Interval, SeriesName
 from generictable_stuff.okcanceldialog import OkDialog, OkCancelDialog
 from gui.infopanel import InfoPanel, AbgeltungssteuerDlg
@@ -54,6 +55,13 @@ class InfoPanelController( QObject ):
     def getModel( self ) -> XDepotPosition:
         return self._x
 
+    def setModel( self, x:XDepotPosition ):
+        """
+        Ersetzt die Depotposition, z.B. durch die im Hintergrund aktualisierte Kopie, und zeigt sie an.
+        """
+        self._x = x
+        self.refreshAfterPeriodIntervalHasChanged( x.history_period, x.history_interval )
+
     def onShowDetails( self ):
         details:XDetail = self._logic.getDetails( self._x )
         detailsUI = XBaseUI( details )
@@ -169,6 +177,7 @@ class InfoPanelController( QObject ):
             dlg.setAbgeltungssteuer( steuer )
         self._computeAbgeltSteuerDlg = dlg = AbgeltungssteuerDlg( self._x.wkn, self._x.kurs_aktuell, self._x.stueck )
         dlg.compute_steuer.connect( computeSteuer )
+        dlg.setSteuerKurve( *self._logic.getAbgeltungssteuerKurve( self._x.wkn, self._x.kurs_aktuell, self._x.stueck ) )
         dlg.show()
 
     def updateAnteilAnSummeGesamtwerte( self, anteil:int ):
@@ -196,6 +205,16 @@ class InfoPanelController( QObject ):
         self._logic.updateKursAndDivYield( self._x )
         self._infoPanel.updateKursAktuell( self._x.kurs_aktuell, self._x.dividend_yield )
 
+    def applyQuote( self, quote:Quote ) -> int:
+        """
+        Übernimmt einen neuen Kurs in die Depotposition und in die Anzeige.
+        :return: die Änderung des aktuellen Gesamtwerts der Depotposition
+        """
+        delta = self._logic.updateKursAndDivYield( self._x, quote )
+        self._infoPanel.updateKursAktuell( self._x.kurs_aktuell, self._x.dividend_yield )
+        self._infoPanel.updateOrderRelatedData()
+        return delta
+
     def isInfoPanelSelected( self ) -> bool:
         return self._infoPanel.isSelected()
 
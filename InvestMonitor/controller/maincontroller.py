@@ -11,11 +11,14 @@ from base.basetablefunctions import BaseTableFunctions
 from base.basetablemodel import SumTableModel, BaseTableModel
 from base.basetableview import BaseTableView
 from base.messagebox import InfoBox
+from controller.depotrefreshservice import DepotRefreshService
 from controller.infopanelcontroller import InfoPanelController
+from controller.quotepollingservice import QuotePollingService
+from data.finance.quotefetcher import Quote
 from generictable_stuff.okcanceldialog import OkDialog, OkCancelDialog
 from gui.infopanel import InfoPanel
 from gui.mainwindow import MainWindow
-from imon.definitions import DEFAULT_PERIOD, DEFAULT_INTERVAL, DEFAULT_INFOPANEL_ORDER
+from imon.definitions import DEFAULT_PERIOD, DEFAULT_INTERVAL, DEFAULT_INFOPANEL_ORDER, QUOTE_POLLING_INTERVAL
 from imon.enums import InfoPanelOrder, Period, Interval, SortDirection
 from interface.interfaces import XDepotPosition, XDelta
 from logic.investmonitorlogic import InvestMonitorLogic
@@ -146,8 +149,15 @@ class MainController( QObject ):
         self._summeKaeufe = 0
         self._summeDividendPaid = 0
         self._sumDividendPaidCurrentYear = 0
+        self._period:Period = DEFAULT_PERIOD
+        self._interval:Interval = DEFAULT_INTERVAL
         self._threadpool = QThreadPool()
         self._dlgDividenden:OkCancelDialog = None
+        self._refreshService = DepotRefreshService( self._logic )
+        self._refreshService.position_refreshed.connect( self.onDepotPositionRefreshed )
+        self._refreshService.refresh_finished.connect( self.onDepotRefreshFinished )
+        self._quotePolling = QuotePollingService( interval=QUOTE_POLLING_INTERVAL )
+        self._quotePolling.quotes_updated.connect( self.onQuotesUpdated )
 
     def createMainWindow( self ) -> MainWindow:
         self._mainWin = MainWindow()
@@ -161,17 +171,13 @@ class MainController( QObject ):
         self._mainWin.show_orders.connect( self.onShowOrders )
         self._mainWin.show_dividends_period.connect( lambda: self.onShowDividends( self._mainWin.getToolBar().getPeriod() ) )
         self._mainWin.show_dividends_curr_year.connect( lambda: self.onShowDividends( Period.currentYear ) )
-        poslist = self._logic.getDepotPositions( DEFAULT_PERIOD, DEFAULT_INTERVAL, MainController.IS_TEST )
-        for xdepotpos in poslist:
-            self._summeGesamtwerte += xdepotpos.gesamtwert_aktuell
-            self._summeKaeufe += xdepotpos.einstandswert_restbestand
-            self._summeDividendPaid += xdepotpos.dividend_paid_period
-        if self._summeKaeufe > 0:
-            delta = round( (self._summeGesamtwerte - self._summeKaeufe) / self._summeKaeufe * 100, 1 )
+        # Die Positionen werden zunächst ohne Marktdaten angezeigt (kein Netzzugriff);
+        # Historien, Kurse und Dividenden liefert der DepotRefreshService nach.
+        if MainController.IS_TEST:
+            poslist = self._logic.getDepotPositions( DEFAULT_PERIOD, DEFAULT_INTERVAL, MainController.IS_TEST )
         else:
-            delta = 0.0
-        self._mainWin.getToolBar().setSummen( self._summeKaeufe, self._summeGesamtwerte, delta )
-        self._mainWin.getToolBar().setDividendPaid( self._summeDividendPaid )
+            poslist = self._logic.getDepotPositionsWithoutMarketData()
+        self._updateSummen( poslist )
         for xdepotpos in poslist:
             xdepotpos.anteil_an_summe_gesamtwerte = self._computeAnteilAnSummeGesamtwerte( xdepotpos )
             infopanelctrl = InfoPanelController()
@@ -186,15 +192,98 @@ class MainController( QObject ):
         h = rect.bottom() - rect.top()
         self._mainWin.resize( QSize( w, h ) )
         self._mainWin.setInfoPanelOrder( DEFAULT_INFOPANEL_ORDER )
+        if MainController.IS_TEST:
+            self._showAnalytics()
+        else:
+            self._refreshService.refresh( poslist, DEFAULT_PERIOD, DEFAULT_INTERVAL )
         return self._mainWin
 
+    def _updateSummen( self, poslist:List[XDepotPosition] ):
+        self._summeGesamtwerte = sum( [x.gesamtwert_aktuell for x in poslist] )
+        self._summeKaeufe = sum( [x.einstandswert_restbestand for x in poslist] )
+        self._summeDividendPaid = sum( [x.dividend_paid_period for x in poslist] )
+        self._showSummen()
+        self._mainWin.getToolBar().setDividendPaid( self._summeDividendPaid )
+
+    def _showSummen( self ):
+        if self._summeKaeufe > 0:
+            delta = round( (self._summeGesamtwerte - self._summeKaeufe) / self._summeKaeufe * 100, 1 )
+        else:
+            delta = 0.0
+        self._mainWin.getToolBar().setSummen( self._summeKaeufe, self._summeGesamtwerte, delta )
+
+    def _showAnalytics( self ):
+        """
+        Zeigt die Kennzahlen des Portfolios (Renditen, Drawdown) für die eingestellte Periode in der Toolbar.
+        Die Historien aller Positionen müssen geladen sein; die Kennzahlen liefert der PortfolioAnalyticsCache,
+        solange weder eine Order eingefügt wurde noch die Positionen neue Historien erhalten haben.
+        Während einer Aktualisierung passen die Historien nicht zusammen; dann zeigt onDepotRefreshFinished() sie an.
+        """
+        if self._refreshService.isRefreshing():
+            return
+        try:
+            analytics = self._logic.getPortfolioAnalytics( self.getAllDepotPositions(), self._period, self._interval )
+        except Exception as ex:
+            print( "MainController._showAnalytics(): getPortfolioAnalytics() throws Exception\n%s" % str( ex ) )
+            return
+        self._mainWin.getToolBar().setAnalytics( analytics.rendite_twr, analytics.rendite_irr, analytics.max_drawdown )
+
+    def _updateAnteile( self ):
+        """
+        Aktualisiert die Anteile an der Summe der Gesamtwerte; angefasst werden nur die InfoPanels,
+        deren (gerundeter) Anteil sich geändert hat.
+        """
+        for ctrl in self._infoPanelCtrlList:
+            deppos = ctrl.getModel()
+            anteil = self._computeAnteilAnSummeGesamtwerte( deppos )
+            if anteil != deppos.anteil_an_summe_gesamtwerte:
+                ctrl.updateAnteilAnSummeGesamtwerte( anteil )
+
+    def onDepotPositionRefreshed( self, x:XDepotPosition ):
+        """
+        Der DepotRefreshService hat die Marktdaten einer Depotposition geliefert: das zugehörige InfoPanel
+        wird sofort damit versorgt, die Summen in der Toolbar werden nachgezogen.
+        """
+        for ctrl in self._infoPanelCtrlList:
+            if ctrl.getModel().wkn == x.wkn:
+                x.anteil_an_summe_gesamtwerte = ctrl.getModel().anteil_an_summe_gesamtwerte
+                ctrl.setModel( x )
+                break
+        self._updateSummen( self.getAllDepotPositions() )
+
+    def onDepotRefreshFinished( self ):
+        """
+        Alle Depotpositionen sind aktualisiert: Anteile an der Gesamtsumme neu berechnen und neu sortieren.
+        """
+        self._updateAnteile()
+        self._showAnalytics()
+        self.onChangeSortOrder( self._sortOrder )
+        if QUOTE_POLLING_INTERVAL > 0 and not self._quotePolling.isActive():
+            self._quotePolling.start( [ctrl.getModel().ticker for ctrl in self._infoPanelCtrlList] )
+
+    def onQuotesUpdated( self, quotes:Dict[str, Quote] ):
+        """
+        Der QuotePollingService hat neue Kurse geliefert. Alle betroffenen InfoPanels werden versorgt und
+        in einem Zug neu gezeichnet; die Summe der Gesamtwerte wird um die Änderungen fortgeschrieben.
+        """
+        self._mainWin.setUpdatesEnabled( False )
+        delta = 0
+        for ctrl in self._infoPanelCtrlList:
+            quote = quotes.get( ctrl.getModel().ticker )
+            if quote:
+                delta += ctrl.applyQuote( quote )
+        if delta != 0:
+            self._summeGesamtwerte += delta
+            self._showSummen()
+            self._updateAnteile()
+        self._mainWin.setUpdatesEnabled( True )
+
     def onSummeGesamtwerteChanged( self, delta:int ):
+        # eine Order wurde eingefügt - die Kennzahlen werden mit den neuen Beständen errechnet
         self._summeGesamtwerte += delta
-        self._mainWin.getToolBar().setSummen( self._summeGesamtwerte )
-        for ipc in self._infoPanelCtrlList:
-            deppos = ipc.getModel()
-            anteil = self._computeAnteilAnSummeGesamtwerte( deppos )
-            ipc.updateAnteilAnSummeGesamtwerte( anteil )
+        self._showSummen()
+        self._updateAnteile()
+        self._showAnalytics()
 
     def _computeAnteilAnSummeGesamtwerte( self, deppos:XDepotPosition ) -> int:
         if self._summeGesamtwerte > 0:
@@ -316,16 +405,12 @@ class MainController( QObject ):
         ########################################################################################
 
     def onPeriodIntervalChanged( self, period:Period, interval:Interval ):
-        self._mainWin.setCursor( Qt.WaitCursor )
+        # Aktualisierung im Hintergrund; eine noch laufende Aktualisierung (vorige Periode) wird abgebrochen.
+        # Die InfoPanels werden einzeln versorgt (onDepotPositionRefreshed).
         poslist: List[XDepotPosition] = [ctrl.getModel() for ctrl in self._infoPanelCtrlList]
-        self._logic.provideTickerHistories( poslist, period, interval )
-        self._summeDividendPaid = 0
-        for ctrl in self._infoPanelCtrlList:
-            ctrl.refreshAfterPeriodIntervalHasChanged( period, interval )
-            deppos = ctrl.getModel()
-            self._summeDividendPaid += deppos.dividend_paid_period
-        self._mainWin.getToolBar().setDividendPaid( self._summeDividendPaid )
-        self._mainWin.setCursor( Qt.ArrowCursor )
+        self._period = period
+        self._interval = interval
+        self._refreshService.refresh( poslist, period, interval )
 
     def onChangeSortOrder( self, order:InfoPanelOrder ):
         self._sortOrder = order
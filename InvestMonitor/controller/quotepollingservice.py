@@ -0,0 +1,155 @@
+import sys
+import traceback
+from typing import List, Dict
+
+from PySide2.QtCore import QObject, Signal, QRunnable, Slot, QThreadPool, QTimer
+
+from data.finance.quotefetcher import Quote
+from data.finance.quotesource import QuoteSource, FastInfoQuoteSource
+
+
+class QuotePollingSignals( QObject ):
+    result = Signal( object ) # Dict[str, Quote]
+    error = Signal( tuple )
+
+##############################################################
+class QuotePollingJob( QRunnable ):
+    """
+    Fragt die Kurse aller Ticker gruppenweise bei der QuoteSource ab und meldet sie gesammelt mit einem Signal.
+    """
+    def __init__( self, source:QuoteSource, tickers:List[str], batchSize:int ):
+        super( QuotePollingJob, self ).__init__()
+        self._source = source
+        self._tickers = tickers
+        self._batchSize = batchSize
+        self.signals = QuotePollingSignals()
+
+    @Slot()
+    def run( self ):
+        try:
+            quotes:Dict[str, Quote] = dict()
+            for i in range( 0, len( self._tickers ), self._batchSize ):
+                quotes.update( self._source.getQuotes( self._tickers[i:i + self._batchSize] ) )
+        except:
+            traceback.print_exc()
+            exctype, value = sys.exc_info()[:2]
+            self.signals.error.emit( (exctype, value, traceback.format_exc()) )
+        else:
+            self.signals.result.emit( quotes )
+
+##############################################################
+class QuotePollingService( QObject ):
+    """
+    Fragt in festem Takt die aktuellen Kurse aller übergebenen Ticker ab.
+    - Die Abfrage läuft im QThreadPool, die Ticker werden in Gruppen von <batchSize> abgefragt.
+    - Je Takt wird genau einmal quotes_updated gesendet, mit den gültigen Kursen aller Ticker.
+    - Schlägt ein Takt fehl (Exception oder kein einziger gültiger Kurs), wird der Abstand bis zum nächsten
+      Takt verdoppelt, höchstens bis MAX_BACKOFF_FACTOR * interval. Nach einem erfolgreichen Takt gilt
+      wieder <interval>.
+    - Ist eine Abfrage beim nächsten Takt noch nicht fertig, wird dieser Takt ausgelassen.
+    """
+    quotes_updated = Signal( object ) # Dict[str, Quote], nur gültige Kurse
+    MAX_BACKOFF_FACTOR = 16
+
+    def __init__( self, source:QuoteSource=None, interval:int=60, batchSize:int=10 ):
+        """
+        :param source: Kursquelle. Default: FastInfoQuoteSource
+        :param interval: Abstand zwischen zwei Abfragen in Sekunden
+        :param batchSize: Anzahl Ticker je Anfrage an die Kursquelle
+        """
+        QObject.__init__( self )
+        self._source = source if source else FastInfoQuoteSource()
+        self._interval = interval
+        self._batchSize = batchSize
+        self._tickers:List[str] = list()
+        self._failures = 0
+        self._job:QuotePollingJob = None
+        self._threadpool = QThreadPool()
+        self._timer = QTimer( self )
+        self._timer.setSingleShot( True )
+        self._timer.timeout.connect( self.onTimer )
+
+    def start( self, tickers:List[str] ):
+        self._tickers = list( dict.fromkeys( tickers ) )
+        self._failures = 0
+        self._timer.start( self._interval*1000 )
+
+    def stop( self ):
+        self._timer.stop()
+
+    def isActive( self ) -> bool:
+        return self._timer.isActive() or self._job is not None
+
+    def setInterval( self, interval:int ):
+        self._interval = interval
+        if self._timer.isActive():
+            self._timer.start( self._getCurrentInterval()*1000 )
+
+    def getCurrentInterval( self ) -> int:
+        """
+        Liefert den Abstand bis zur nächsten Abfrage in Sekunden, unter Berücksichtigung des Backoff.
+        """
+        return self._getCurrentInterval()
+
+    def _getCurrentInterval( self ) -> int:
+        return self._interval*min( 2**self._failures, self.MAX_BACKOFF_FACTOR )
+
+    def onTimer( self ):
+        if self._job is not None or not self._tickers:
+            self._timer.start( self._getCurrentInterval()*1000 )
+            return
+        job = QuotePollingJob( self._source, self._tickers, self._batchSize )
+        job.signals.result.connect( self.onJobResult )
+        job.signals.error.connect( self.onJobError )
+        self._job = job
+        self._threadpool.start( job )
+
+    def onJobResult( self, quotes:Dict[str, Quote] ):
+        self._job = None
+        valid = {ticker: quote for ticker, quote in quotes.items() if quote.isValid()}
+        self._failures = 0 if valid else self._failures + 1
+        self._timer.start( self._getCurrentInterval()*1000 )
+        if valid:
+            self.quotes_updated.emit( valid )
+
+    def onJobError( self, tuple ):
+        print( "QuotePollingService: Something went wrong: ", tuple )
+        self._job = None
+        self._failures += 1
+        self._timer.start( self._getCurrentInterval()*1000 )
+
+
+################  TEST TEST TEST   ###########################
+def testQuotePollingService():
+    """
+    Pollt drei Ticker im Sekundentakt gegen eine ReplayQuoteSource; beim dritten Takt liefert die Quelle
+    keinen gültigen Kurs, der Takt danach kommt deshalb erst nach zwei Sekunden.
+    """
+    import time
+    from PySide2.QtCore import QCoreApplication
+    from data.finance.quotesource import ReplayQuoteSource
+
+    class FlakySource( ReplayQuoteSource ):
+        def getQuotes( self, tickers:List[str] ) -> Dict[str, Quote]:
+            if self.requests == 4: # 3. Takt (2 Anfragen je Takt)
+                self.requests += 1
+                raise Exception( "Netz nicht erreichbar" )
+            return ReplayQuoteSource.getQuotes( self, tickers )
+
+    app = QCoreApplication()
+    prices = {"A.DE": [(10.0, 9.0), (10.5, 9.0), (11.0, 9.0)], "B.L": [(20.0, 20.0)], "C.DE": [(30.0, 31.0)]}
+    service = QuotePollingService( FlakySource( prices, {"B.L": "USD"} ), interval=1, batchSize=2 )
+    ticks = list()
+    t = time.perf_counter()
+    def onQuotes( quotes:Dict[str, Quote] ):
+        ticks.append( (round( time.perf_counter() - t ), {k: q.last_price for k, q in quotes.items()}) )
+        if len( ticks ) == 3:
+            app.quit()
+    service.quotes_updated.connect( onQuotes )
+    service.start( ["A.DE", "B.L", "C.DE", "A.DE"] )
+    app.exec_()
+    for tick in ticks:
+        print( tick )
+    assert [tick[0] for tick in ticks] == [1, 2, 5]
+    assert ticks[2][1]["A.DE"] == 11.0
+    print( "ok" )
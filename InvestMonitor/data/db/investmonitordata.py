@@ -1,13 +1,20 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Tuple
 
 from base.databasecommon2 import DatabaseCommon
+from base.dbmigration import DbMigrator
+from data.db.investmonitormigrations import INVESTMONITOR_MIGRATIONS
 from interface.interfaces import XDepotPosition, XDelta
 from imon.definitions import DATABASE
 
 
 class InvestMonitorData( DatabaseCommon ):
+    _migrated = False # die Migrationen werden mit der ersten Instanz einmal je Anwendungslauf ausgeführt
+
     def __init__( self ):
         DatabaseCommon.__init__( self, DATABASE )
+        if not InvestMonitorData._migrated:
+            InvestMonitorData._migrated = True
+            DbMigrator( self._sqliteCon ).migrate( INVESTMONITOR_MIGRATIONS )
 
     def getDepotPositions( self ) -> List[XDepotPosition]:
         sql = "select pos.id, isin, ticker, wkn, basic_index, name, gattung, ter, waehrung, flag_acc, beschreibung, " \
@@ -48,6 +55,17 @@ class InvestMonitorData( DatabaseCommon ):
         deltalist = self.readAllGetObjectList( sql, XDelta )
         return deltalist
 
+    def getAllKaeufe( self ) -> List[XDelta]:
+        """
+        Liefert die Kauf-Orders aller WKN, sortiert nach WKN und Kaufdatum aufsteigend
+        """
+        sql = "select id, wkn, delta_stck, delta_datum, preis_stck, verkauft_stck, bemerkung " \
+              "from delta " \
+              "where delta_stck > 0 " \
+              "order by wkn, delta_datum asc, id asc "
+        deltalist = self.readAllGetObjectList( sql, XDelta )
+        return deltalist
+
     def getAllDeltas( self, distributingOnly=False, flag_displ=1 ) -> List[XDelta]:
         sql = "select delta.id, delta.delta_stck, delta.delta_datum, delta.preis_stck, " \
               "delta.verkauft_stck, delta.verkaufskosten, " \
@@ -79,12 +97,12 @@ class InvestMonitorData( DatabaseCommon ):
         dictlist = self.readAllGetDict( sql )
         return dictlist
 
-    def insertDelta( self, delta:XDelta ):
+    def insertDelta( self, delta:XDelta ) -> int:
         """
         Der Insert ist entweder ein Kauf oder ein Verkauf.
         Das Feld verkauft_stck spielt beim Insert nie eine Rolle, deswegen bleibt es hier unberücksichtigt
         :param delta:
-        :return:
+        :return: die id des eingefügten Satzes
         """
         if not delta.bemerkung: bemerkung = "NULL"
         else: bemerkung = "'%s'" % delta.bemerkung
@@ -93,7 +111,7 @@ class InvestMonitorData( DatabaseCommon ):
               "values " \
               "( '%s', %d, '%s', %.3f, %.2f, %s )" % ( delta.wkn, delta.delta_stck, delta.delta_datum, delta.preis_stck,
                                                        delta.verkaufskosten, bemerkung )
-        self.write( sql )
+        return self.write( sql )
 
     def updateDelta( self, delta:XDelta ):
         if not delta.bemerkung: bemerkung = "NULL"
@@ -115,6 +133,13 @@ class InvestMonitorData( DatabaseCommon ):
               "where id = %d " % (verkauft_stck, delta_id)
         self.write( sql )
 
+    def updateDeltasVerkaufteStuecke( self, changes:Iterable[Tuple[int, int]] ):
+        """
+        Ändert verkauft_stck in mehreren Sätzen mit einem einzigen vorbereiteten Statement.
+        :param changes: je Satz (verkauft_stck, id)
+        """
+        self.writeMany( "update delta set verkauft_stck = ? where id = ? ", changes )
+
 def test():
     data = InvestMonitorData()
     li = data.getAllWknAndTickers( distributingOnly=True )
@@ -0,0 +1,60 @@
+from typing import List, Tuple
+
+from base.dbmigration import Migration, DbMigrator
+
+# Versionen des Schemas von invest.db. Neue Migrationen werden hinten angefügt, bestehende nie geändert.
+INVESTMONITOR_MIGRATIONS:List[Migration] = [
+    Migration( 1, "Index für die Orders einer WKN", (
+        "create index if not exists delta_wkn_datum on delta ( wkn, delta_datum )",
+    ) ),
+]
+
+# Die häufigen Abfragen auf delta in der Form, in der sie InvestMonitorData absetzt (sql, params).
+# Keine davon darf die Tabelle delta vollständig durchlaufen (siehe testHotQueriesUseIndexes()).
+INVESTMONITOR_HOT_QUERIES:List[Tuple[str, Tuple]] = [
+    ( "select * from delta where wkn = ? order by delta_datum desc ", ("A0RPWH",) ),
+    ( "select * from delta where wkn = ? and delta_stck > 0 order by delta_datum asc ", ("A0RPWH",) ),
+    ( "select delta.id, delta.delta_stck, delta.delta_datum, dp.name from delta delta "
+      "inner join depotposition dp on dp.wkn = delta.wkn where dp.flag_displ = ? ", (1,) ),
+]
+
+
+################  TEST TEST TEST   ###########################
+def testHotQueriesUseIndexes( pathToDatabase:str=None ):
+    """
+    Prüft mit EXPLAIN QUERY PLAN, dass keine der INVESTMONITOR_HOT_QUERIES die Tabelle delta vollständig durchläuft.
+    Ohne <pathToDatabase> wird eine Datenbank im Speicher mit den benötigten Spalten angelegt und mit Testdaten
+    gefüllt, sonst wird eine KOPIE der angegebenen Datenbank geprüft.
+    """
+    import random
+    import sqlite3
+    con = sqlite3.connect( ":memory:" )
+    if pathToDatabase:
+        src = sqlite3.connect( pathToDatabase )
+        src.backup( con )
+        src.close()
+    else:
+        con.execute( "create table depotposition ( id integer primary key, wkn text, name text, flag_displ integer )" )
+        con.execute( "create table delta ( id integer primary key, wkn text, delta_stck integer, delta_datum text, "
+                     "preis_stck real, verkauft_stck integer, verkaufskosten real, bemerkung text )" )
+        random.seed( 4711 )
+        con.executemany( "insert into depotposition ( wkn, name, flag_displ ) values ( ?, ?, ? )",
+                         [("W%d" % i, "Position %d" % i, i%5 > 0) for i in range( 60 )] )
+        con.executemany( "insert into delta ( wkn, delta_stck, delta_datum, preis_stck, verkauft_stck ) "
+                         "values ( ?, ?, ?, ?, 0 )",
+                         [("W%d" % (i%60), random.randint( -50, 100 ) or 1,
+                           "%d-%02d-%02d" % (random.randint( 2015, 2023 ), random.randint( 1, 12 ),
+                                             random.randint( 1, 28 )), random.uniform( 10, 200 ))
+                          for i in range( 10000 )] )
+        con.commit()
+    migrator = DbMigrator( con )
+    print( "Migrationen: ", migrator.migrate( INVESTMONITOR_MIGRATIONS ), " Version: ", migrator.getVersion() )
+    errors = list()
+    for sql, params in INVESTMONITOR_HOT_QUERIES:
+        print( sql, "\n    ", migrator.explainQueryPlan( sql, params ) )
+        fullScans = migrator.getFullScans( sql, params, table="delta" )
+        if fullScans:
+            errors.append( "%s: %s" % (sql, fullScans) )
+    con.close()
+    assert not errors, "\n".join( errors )
+    print( "ok" )
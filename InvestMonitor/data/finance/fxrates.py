@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Callable, Tuple
+
+import numpy
+import requests
+from pandas import Series, DatetimeIndex
+
+import datehelper
+from data.finance.historystore import HistoryStore, getPeriodStart
+from imon.enums import Period, Interval
+
+
+def loadLatestRates() -> Dict[str, float]:
+    """
+    Holt die aktuellen Wechselkurse bezogen auf einen US-Dollar (key: Währung, value: Wert eines Dollars in
+    dieser Währung)
+    """
+    response = requests.get( FxRates.URL, timeout=10 )
+    dic = json.loads( response.content )
+    return dic["rates"]
+
+
+class FxRates:
+    """
+    Wechselkurse und Währungsumrechnung.
+    - Die aktuellen Kurse werden in einer JSON-Datei zwischengespeichert und erst nach <ttl> Sekunden neu geholt.
+      Ist die Quelle nicht erreichbar, wird mit den gespeicherten (veralteten) Kursen gerechnet.
+    - Historische Tageskurse werden über den HistoryStore (Ticker wie "USDEUR=X") geholt und gespeichert.
+    - Series werden als Ganzes umgerechnet (ein NumPy-Produkt statt einer Umrechnung je Wert).
+    Unterwährungen wie GBp (Pence) werden in ihre Hauptwährung umgerechnet.
+    """
+    URL = "https://api.exchangerate-api.com/v4/latest/USD"
+    TTL = 12*3600
+    SUBUNITS = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ZAc": ("ZAR", 0.01), "ILA": ("ILS", 0.01)}
+
+    def __init__( self, pathToCache:str=None, loadRates:Callable[[], Dict[str, float]]=None, ttl:int=TTL,
+                  historyStore:HistoryStore=None ):
+        """
+        :param pathToCache: JSON-Datei für die aktuellen Kurse. None: Kurse werden nur im Speicher gehalten.
+        :param loadRates: liefert die aktuellen Kurse bezogen auf einen US-Dollar. Default: loadLatestRates
+        :param ttl: Gültigkeitsdauer der gespeicherten aktuellen Kurse in Sekunden
+        :param historyStore: Speicher für historische Tageskurse. None: keine historischen Kurse verfügbar.
+        """
+        self._pathToCache = pathToCache
+        self._loadRates = loadRates if loadRates else loadLatestRates
+        self._ttl = ttl
+        self._historyStore = historyStore
+        self._lock = threading.Lock()
+        self._oneDollarRates:Dict[str, float] = None
+        self._timestamp = 0.0
+        self._historicalRates:Dict[Tuple[str, str], Tuple[str, Series]] = dict() # (von, nach) -> (Tag, Kurse)
+
+    def getRate( self, fromCurrency:str, toCurrency:str="EUR" ) -> float:
+        """
+        Liefert den aktuellen Kurs, mit dem ein Betrag in <fromCurrency> multipliziert werden muss, um den
+        Betrag in <toCurrency> zu erhalten.
+        """
+        fromCurrency, fromFactor = self._getMainCurrency( fromCurrency )
+        toCurrency, toFactor = self._getMainCurrency( toCurrency )
+        if fromCurrency == toCurrency:
+            return fromFactor/toFactor
+        rates = self._getOneDollarRates()
+        try:
+            return rates[toCurrency]/rates[fromCurrency]*fromFactor/toFactor
+        except KeyError as ex:
+            raise Exception( "FxRates.getRate(): kein Kurs für Währung %s verfügbar." % str( ex ) )
+
+    def convert( self, amount:float, fromCurrency:str, toCurrency:str="EUR" ) -> float:
+        return amount*self.getRate( fromCurrency, toCurrency )
+
+    def convertSeries( self, series:Series, fromCurrency:str, toCurrency:str="EUR",
+                       historical:bool=False ) -> Series:
+        """
+        Rechnet alle Werte von <series> um und liefert sie als neue Series mit demselben Index.
+        NaN-Werte werden als 0 geliefert.
+        :param historical: True: jeder Wert wird mit dem Tageskurs seines Datums umgerechnet,
+                           False: alle Werte werden mit dem aktuellen Kurs umgerechnet.
+        """
+        values = series.to_numpy( dtype=float )
+        if historical and self._historyStore and len( series ) > 0:
+            rates = self._getRatesForIndex( series.index, fromCurrency, toCurrency )
+        else:
+            rates = self.getRate( fromCurrency, toCurrency )
+        converted = values*rates
+        converted[numpy.isnan( values )] = 0
+        return Series( converted, series.index )
+
+    def getHistoricalRates( self, fromCurrency:str, toCurrency:str, start:str ) -> Series:
+        """
+        Liefert die Tageskurse von <fromCurrency> nach <toCurrency> ab <start> (ISO-Format).
+        Index: Tage ohne Zeitzone, aufsteigend. Innerhalb eines Tages wird die Series nur einmal gelesen.
+        """
+        if not self._historyStore:
+            raise Exception( "FxRates.getHistoricalRates(): kein HistoryStore für historische Kurse angegeben." )
+        fromCurrency, fromFactor = self._getMainCurrency( fromCurrency )
+        toCurrency, toFactor = self._getMainCurrency( toCurrency )
+        today = datehelper.getCurrentDateIso()
+        key = (fromCurrency, toCurrency)
+        cached = self._historicalRates.get( key )
+        if cached is None or cached[0] != today or (len( cached[1] ) > 0 and cached[1].index[0] > start):
+            period = self._getPeriodCovering( start, today )
+            df = self._historyStore.getHistoryByPeriod( "%s%s=X" % key, period, Interval.oneDay )
+            rates = df["Close"].dropna()
+            if rates.index.tz is not None:
+                rates.index = rates.index.tz_localize( None )
+            cached = (today, rates)
+            self._historicalRates[key] = cached
+        return cached[1][start:]*(fromFactor/toFactor)
+
+    def _getRatesForIndex( self, index:DatetimeIndex, fromCurrency:str, toCurrency:str ) -> numpy.ndarray:
+        days = index.tz_localize( None ) if index.tz is not None else index
+        days = days.normalize()
+        rates = self.getHistoricalRates( fromCurrency, toCurrency, days.min().strftime( "%Y-%m-%d" ) )
+        if len( rates ) == 0:
+            return numpy.full( len( index ), self.getRate( fromCurrency, toCurrency ) )
+        # für Tage ohne Kurs (Wochenende, Feiertag) gilt der letzte bekannte Kurs
+        aligned = rates.reindex( rates.index.union( days ) ).ffill().bfill().reindex( days )
+        return aligned.to_numpy( dtype=float )
+
+    @staticmethod
+    def _getPeriodCovering( start:str, today:str ) -> Period:
+        for period in (Period.oneYear, Period.twoYears, Period.fiveYears, Period.tenYears):
+            if getPeriodStart( period, today ) <= start:
+                return period
+        return Period.max
+
+    @staticmethod
+    def _getMainCurrency( currency:str ) -> (str, float):
+        return FxRates.SUBUNITS.get( currency, (currency, 1.0) )
+
+    def _getOneDollarRates( self ) -> Dict[str, float]:
+        with self._lock:
+            if self._oneDollarRates is None and self._pathToCache:
+                self._readCache()
+            if self._oneDollarRates is None or time.time() - self._timestamp > self._ttl:
+                try:
+                    self._oneDollarRates = self._loadRates()
+                    self._timestamp = time.time()
+                    self._writeCache()
+                except Exception as ex:
+                    if self._oneDollarRates is None:
+                        raise ex
+                    print( "FxRates: Aktualisierung der Wechselkurse fehlgeschlagen, "
+                           "es wird mit den gespeicherten Kursen gerechnet: ", str( ex ) )
+                    self._timestamp = time.time() # nicht bei jedem Aufruf erneut versuchen
+            return self._oneDollarRates
+
+    def _readCache( self ):
+        if not os.path.exists( self._pathToCache ):
+            return
+        try:
+            with open( self._pathToCache, "r" ) as f:
+                dic = json.load( f )
+            self._oneDollarRates = dic["rates"]
+            self._timestamp = dic["timestamp"]
+        except Exception as ex:
+            print( "FxRates: ", self._pathToCache, " nicht lesbar: ", str( ex ) )
+
+    def _writeCache( self ):
+        if not self._pathToCache:
+            return
+        with open( self._pathToCache, "w" ) as f:
+            json.dump( {"timestamp": self._timestamp, "rates": self._oneDollarRates}, f )
+
+
+################  TEST TEST TEST   ###########################
+def testFxRates( nseries=40, years=5 ):
+    """
+    Rechnet <nseries> tägliche Kurs-Series über <years> Jahre in Euro um: einmal Wert für Wert wie bisher
+    (TickerHistory.convertToEuro je Wert), einmal mit FxRates.convertSeries.
+    """
+    import math
+    import pandas
+    import tempfile
+    from data.finance.historystore import FakeHistoryProvider
+
+    fakeRates = {"USD": 1.0, "EUR": 0.9, "GBP": 0.8, "CHF": 0.88}
+    loads = [0]
+    def loadRates():
+        loads[0] += 1
+        return fakeRates
+    path = os.path.join( tempfile.mkdtemp(), "fxrates.json" )
+    fx = FxRates( path, loadRates )
+    index = pandas.bdate_range( end="2024-03-15", periods=years*260, tz="Europe/London" )
+    seriesList = [Series( numpy.linspace( 100, 200, len( index ) ), index ) for _ in range( nseries )]
+    for s in seriesList:
+        s.iloc[::50] = numpy.nan
+
+    t = time.perf_counter()
+    oldResults = [[0 if math.isnan( v ) else fx.convert( v/100, "GBP" ) for v in s.values] for s in seriesList]
+    print( "je Wert:    %.1f ms" % ((time.perf_counter() - t)*1000) )
+    t = time.perf_counter()
+    newResults = [fx.convertSeries( s, "GBp" ) for s in seriesList]
+    print( "vektoriell: %.1f ms" % ((time.perf_counter() - t)*1000) )
+    assert all( numpy.allclose( old, new.values ) for old, new in zip( oldResults, newResults ) )
+    assert FxRates( path, loadRates ).convert( 10, "USD" ) == 9.0 and loads[0] == 1 # Kurse aus der Datei
+
+    store = HistoryStore( ":memory:", FakeHistoryProvider() )
+    fx = FxRates( None, loadRates, historyStore=store )
+    converted = fx.convertSeries( seriesList[0][-300:], "USD", historical=True )
+    assert len( converted ) == 300 and not converted.isna().any()
+    print( "ok" )
@@ -0,0 +1,419 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Callable, Iterable
+
+import pandas
+import yfinance
+from pandas import DataFrame
+
+import datehelper
+from imon.enums import Period, Interval
+
+
+#####################   HistoryProvider   ##########################
+class HistoryProvider:
+    """
+    Schnittstelle zur Datenquelle der Kurshistorien.
+    Der HistoryStore holt über einen HistoryProvider nur die Daten, die er noch nicht lokal gespeichert hat.
+    Geliefert werden DataFrames im Format von yfinance.Ticker.history(): DatetimeIndex (ggf. mit Zeitzone),
+    Spalten Open, High, Low, Close, Volume, Dividends, Stock Splits.
+    """
+    def getHistoryByPeriod( self, ticker:str, period:Period, interval:Interval ) -> DataFrame:
+        raise NotImplementedError( "HistoryProvider.getHistoryByPeriod()" )
+
+    def getHistoryByDates( self, ticker:str, interval:Interval, start:str, end:str=None ) -> DataFrame:
+        """
+        :param start: erster zu liefernder Tag (ISO-Format)
+        :param end: Tag NACH dem letzten zu liefernden Tag (ISO-Format). None: bis heute.
+        """
+        raise NotImplementedError( "HistoryProvider.getHistoryByDates()" )
+
+    def getHistoriesByPeriod( self, tickers:List[str], period:Period, interval:Interval ) -> Dict[str, DataFrame]:
+        """
+        Liefert die Historien mehrerer Ticker (key: ticker). Ticker, deren Abruf fehlschlägt, fehlen im Ergebnis.
+        Default: die Einzelabrufe laufen parallel. Quellen, die mehrere Ticker mit einer Anfrage liefern können,
+        überschreiben diese Methode.
+        """
+        return self._fetchParallel( tickers, lambda ticker: self.getHistoryByPeriod( ticker, period, interval ) )
+
+    def getHistoriesByDates( self, tickers:List[str], interval:Interval, start:str,
+                             end:str=None ) -> Dict[str, DataFrame]:
+        """
+        Wie getHistoriesByPeriod(), aber für den Zeitraum <start> bis <end> (siehe getHistoryByDates()).
+        """
+        return self._fetchParallel( tickers, lambda ticker: self.getHistoryByDates( ticker, interval, start, end ) )
+
+    @staticmethod
+    def _fetchParallel( tickers:List[str], fetch:Callable[[str], DataFrame],
+                        maxWorkers:int=8 ) -> Dict[str, DataFrame]:
+        def fetchOne( ticker:str ) -> DataFrame or None:
+            try:
+                return fetch( ticker )
+            except Exception as ex:
+                print( "HistoryProvider: ", ticker, ": Abruf der Historie fehlgeschlagen: ", str( ex ) )
+                return None
+        if len( tickers ) == 1:
+            results = [fetchOne( tickers[0] )]
+        else:
+            with ThreadPoolExecutor( max_workers=min( maxWorkers, max( 1, len( tickers ) ) ) ) as executor:
+                results = list( executor.map( fetchOne, tickers ) )
+        return {ticker: df for ticker, df in zip( tickers, results ) if df is not None}
+
+class YFinanceHistoryProvider( HistoryProvider ):
+    """
+    Liefert die Kurshistorien über das Netz von yfinance.
+    Mehrere Ticker werden mit einem einzigen Download geholt (yfinance.Tickers).
+    """
+    def getHistoryByPeriod( self, ticker:str, period:Period, interval:Interval ) -> DataFrame:
+        yf_ticker = yfinance.Ticker( ticker )
+        return yf_ticker.history( period=period.value, interval=interval.value )
+
+    def getHistoryByDates( self, ticker:str, interval:Interval, start:str, end:str=None ) -> DataFrame:
+        yf_ticker = yfinance.Ticker( ticker )
+        return yf_ticker.history( interval=interval.value, start=start, end=end )
+
+    def getHistoriesByPeriod( self, tickers:List[str], period:Period, interval:Interval ) -> Dict[str, DataFrame]:
+        if len( tickers ) == 1:
+            return {tickers[0]: self.getHistoryByPeriod( tickers[0], period, interval )}
+        df = yfinance.Tickers( tickers ).history( period=period.value, interval=interval.value )
+        return splitTickers( df, tickers )
+
+    def getHistoriesByDates( self, tickers:List[str], interval:Interval, start:str,
+                             end:str=None ) -> Dict[str, DataFrame]:
+        if len( tickers ) == 1:
+            return {tickers[0]: self.getHistoryByDates( tickers[0], interval, start, end )}
+        df = yfinance.Tickers( tickers ).history( interval=interval.value, start=start, end=end )
+        return splitTickers( df, tickers )
+
+def splitTickers( df:DataFrame, tickers:List[str] ) -> Dict[str, DataFrame]:
+    """
+    Zerlegt das Ergebnis von yfinance.Tickers.history() (Spalten-MultiIndex (Spaltenname, Ticker)) in je einen
+    DataFrame pro Ticker. Zeilen, die für einen Ticker nur aus NaN bestehen (die Daten anderer Ticker), entfallen.
+    """
+    if len( df ) == 0:
+        return dict()
+    if not isinstance( df.columns, pandas.MultiIndex ):
+        return {tickers[0]: df}
+    present = set( df.columns.get_level_values( 1 ) )
+    return {ticker: df.xs( ticker, axis=1, level=1 ).dropna( how="all" ) for ticker in tickers if ticker in present}
+
+class FakeHistoryProvider( HistoryProvider ):
+    """
+    Erzeugt reproduzierbare Kurshistorien ohne Netzzugriff (Tests, Benchmarks, Offline-Betrieb).
+    Der Kurs eines Tickers an einem Tag hängt nur von Ticker und Datum ab, so dass ein Abruf in Teilstücken
+    dasselbe liefert wie ein Abruf am Stück.
+    <latency> simuliert die Antwortzeit eines Netzzugriffs (in Sekunden).
+    """
+    def __init__( self, latency:float=0.0, getToday:Callable[[], str]=None ):
+        self._latency = latency
+        self._getToday = getToday if getToday else datehelper.getCurrentDateIso
+        self.calls = 0
+
+    def getHistoryByPeriod( self, ticker:str, period:Period, interval:Interval ) -> DataFrame:
+        today = self._getToday()
+        return self._createHistory( ticker, interval, getPeriodStart( period, today ), today )
+
+    def getHistoryByDates( self, ticker:str, interval:Interval, start:str, end:str=None ) -> DataFrame:
+        last = datehelper.addDaysToIsoString( end, -1 ) if end else self._getToday()
+        return self._createHistory( ticker, interval, start, last )
+
+    def getHistoriesByPeriod( self, tickers:List[str], period:Period, interval:Interval ) -> Dict[str, DataFrame]:
+        # wie yfinance.Tickers: ein Abruf für alle Ticker
+        self._wait()
+        today = self._getToday()
+        return {ticker: self._createHistory( ticker, interval, getPeriodStart( period, today ), today, wait=False )
+                for ticker in tickers}
+
+    def getHistoriesByDates( self, tickers:List[str], interval:Interval, start:str,
+                             end:str=None ) -> Dict[str, DataFrame]:
+        self._wait()
+        last = datehelper.addDaysToIsoString( end, -1 ) if end else self._getToday()
+        return {ticker: self._createHistory( ticker, interval, start, last, wait=False ) for ticker in tickers}
+
+    def _wait( self ):
+        self.calls += 1
+        if self._latency > 0:
+            time.sleep( self._latency )
+
+    def _createHistory( self, ticker:str, interval:Interval, first:str, last:str, wait:bool=True ) -> DataFrame:
+        if wait:
+            self._wait()
+        if not first:
+            first = datehelper.addYears( datehelper.getDateFromIsoString( last ), -10 ).isoformat()
+        freq = {Interval.oneWeek: "W-MON", Interval.oneMonth: "MS", Interval.threeMonths: "QS"}.get( interval, "B" )
+        sliceStart = getSliceStart( first, interval )
+        dates = [d.strftime( "%Y-%m-%d" ) for d in pandas.date_range( sliceStart, last, freq=freq )]
+        seed = int( hashlib.md5( ticker.encode() ).hexdigest()[:6], 16 )
+        closes = [round( 50 + (seed % 50) + 10*math.sin( (seed + self._getDayNumber( d ))/20 ), 2 ) for d in dates]
+        dividends = [0.25 if d[5:7] in ("03", "06", "09", "12") and d[8:10] <= "07" else 0.0 for d in dates]
+        df = DataFrame( {"Open": closes, "High": [c*1.01 for c in closes], "Low": [c*0.99 for c in closes],
+                         "Close": closes, "Volume": [float( 1000 + seed % 1000 )]*len( dates ),
+                         "Dividends": dividends, "Stock Splits": [0.0]*len( dates )},
+                        index=pandas.DatetimeIndex( dates, name="Date" ).tz_localize( "Europe/Berlin" ) )
+        return df
+
+    @staticmethod
+    def _getDayNumber( isodate:str ) -> int:
+        return datehelper.getDateFromIsoString( isodate ).toordinal()
+
+
+#####################   Perioden   ##########################
+def getPeriodStart( period:Period, today:str ) -> str:
+    """
+    Liefert den ersten Tag (ISO-Format), den eine Abfrage mit <period> am Tag <today> umfasst.
+    Für Period.max wird "" geliefert (= ohne Beschränkung).
+    """
+    d = datehelper.getDateFromIsoString( today )
+    if period == Period.max:
+        return ""
+    if period == Period.currentYear:
+        return today[:4] + "-01-01"
+    days = {Period.oneDay: 1, Period.fiveDays: 5}
+    months = {Period.oneMonth: 1, Period.threeMonths: 3, Period.sixMonths: 6}
+    years = {Period.oneYear: 1, Period.twoYears: 2, Period.threYears: 3, Period.fiveYears: 5, Period.tenYears: 10}
+    if period in days:
+        d = datehelper.addDays( d, -days[period] )
+    elif period in months:
+        d = datehelper.addMonths( d, -months[period] )
+    elif period in years:
+        d = datehelper.addYears( d, -years[period] )
+    else:
+        raise Exception( "getPeriodStart(): Periode '%s' wird nicht unterstützt." % period.value )
+    return datehelper.getIsoStringFromDate( d )
+
+def getSliceStart( start:str, interval:Interval ) -> str:
+    """
+    Liefert das Datum der Zeile, in die der Tag <start> bei <interval> fällt.
+    (Wochenzeilen sind auf den Montag datiert, Monatszeilen auf den Monatsersten usw.)
+    """
+    if not start:
+        return start
+    if interval == Interval.oneWeek:
+        d = datehelper.getDateFromIsoString( start )
+        return datehelper.addDaysToIsoString( start, -d.weekday() )
+    if interval == Interval.oneMonth:
+        return start[:8] + "01"
+    if interval == Interval.threeMonths:
+        month = (int( start[5:7] ) - 1)//3*3 + 1
+        return "%s-%02d-01" % (start[:4], month)
+    return start
+
+
+#####################   HistoryStore   ##########################
+class HistoryStore:
+    """
+    Lokaler, persistenter Speicher für Kurshistorien (SQLite), je Ticker und Interval.
+    - Ist eine Anfrage durch die gespeicherten Daten abgedeckt und wurde heute schon aktualisiert,
+      wird sie ohne Netzzugriff beantwortet (hit).
+    - Ist sie abgedeckt, aber seit dem letzten Abruf ein Tag vergangen, werden nur die Zeilen ab der
+      letzten gespeicherten Zeile nachgeholt (tail). Ältere Zeilen ändern sich nicht mehr.
+    - Sonst wird die angefragte Periode komplett geholt und gespeichert (miss).
+    Intraday-Intervalle werden nicht gespeichert, sondern immer direkt beim Provider angefragt.
+    Ist der Provider nicht erreichbar, werden die gespeicherten Daten geliefert.
+    """
+    COLUMNS = ("Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits")
+    STORED_INTERVALS = (Interval.oneDay, Interval.fiveDays, Interval.oneWeek, Interval.oneMonth, Interval.threeMonths)
+
+    def __init__( self, pathToDatabase:str, provider:HistoryProvider=None, getToday:Callable[[], str]=None ):
+        """
+        :param pathToDatabase: Pfad zur SQLite-Datei, ":memory:" für einen flüchtigen Speicher
+        :param provider: Datenquelle für fehlende Zeilen. Default: YFinanceHistoryProvider
+        :param getToday: liefert das aktuelle Datum im ISO-Format. Default: datehelper.getCurrentDateIso
+        """
+        self._provider = provider if provider else YFinanceHistoryProvider()
+        self._getToday = getToday if getToday else datehelper.getCurrentDateIso
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect( pathToDatabase, check_same_thread=False )
+        self._createTables()
+        self.hits = 0
+        self.misses = 0
+        self.tails = 0
+
+    def _createTables( self ):
+        self._con.execute( "create table if not exists history ( "
+                           "ticker text not null, interval text not null, date text not null, "
+                           "open real, high real, low real, close real, volume real, dividends real, splits real, "
+                           "primary key ( ticker, interval, date ) ) without rowid" )
+        self._con.execute( "create table if not exists history_meta ( "
+                           "ticker text not null, interval text not null, "
+                           "covered_from text not null, last_fetch text not null, tz text, "
+                           "primary key ( ticker, interval ) )" )
+        self._con.commit()
+
+    def close( self ):
+        self._con.close()
+
+    def getProvider( self ) -> HistoryProvider:
+        return self._provider
+
+    def getStatistics( self ) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "tails": self.tails}
+
+    def resetStatistics( self ):
+        self.hits = self.misses = self.tails = 0
+
+    def getHistoryByPeriod( self, ticker:str, period:Period, interval:Interval ) -> DataFrame:
+        """
+        Liefert die Historie von <ticker> für <period> und <interval> im Format von yfinance.Ticker.history().
+        """
+        if interval not in HistoryStore.STORED_INTERVALS:
+            self.misses += 1
+            return self._provider.getHistoryByPeriod( ticker, period, interval )
+        start = self._update( [ticker], period, interval )
+        with self._lock:
+            return self._readHistory( ticker, interval, getSliceStart( start, interval ) )
+
+    def getHistoriesByPeriod( self, tickers:Iterable[str], period:Period, interval:Interval ) -> DataFrame:
+        """
+        Liefert die Historien mehrerer Ticker im Format von yfinance.Tickers.history():
+        Spalten-MultiIndex (Spaltenname, Ticker), Index ohne Zeitzone.
+        Was im Speicher fehlt, wird für alle Ticker zusammen beim Provider angefragt (siehe _update()).
+        """
+        tickers = list( dict.fromkeys( tickers ) )
+        if not tickers:
+            return DataFrame()
+        if interval not in HistoryStore.STORED_INTERVALS:
+            self.misses += len( tickers )
+            dfdict = self._provider.getHistoriesByPeriod( tickers, period, interval )
+        else:
+            start = self._update( tickers, period, interval )
+            sliceStart = getSliceStart( start, interval )
+            with self._lock:
+                dfdict = {ticker: self._readHistory( ticker, interval, sliceStart ) for ticker in tickers}
+        for df in dfdict.values():
+            if df.index.tz is not None:
+                df.index = df.index.tz_localize( None )
+        if not dfdict:
+            return DataFrame()
+        df = pandas.concat( dfdict, axis=1 ).swaplevel( 0, 1, axis=1 ).sort_index( axis=1, level=0, sort_remaining=False )
+        df.index.name = "Date"
+        return df
+
+    def _update( self, tickers:List[str], period:Period, interval:Interval ) -> str:
+        """
+        Bringt die gespeicherten Historien von <tickers> auf den Stand von heute: fehlende Perioden (misses)
+        werden mit einer Anfrage für alle betroffenen Ticker geholt, fehlende Zeilen am Ende (tails) mit einer
+        Anfrage je letzter gespeicherter Zeile.
+        Die Anfragen laufen ohne Lock, andere Threads können solange aus dem Speicher lesen.
+        :return: der erste Tag von <period>
+        """
+        today = self._getToday()
+        start = getPeriodStart( period, today )
+        misses:List[str] = list()
+        tails:Dict[str, List[str]] = dict() # key: letzte gespeicherte Zeile, value: die Ticker
+        with self._lock:
+            for ticker in tickers:
+                meta = self._con.execute( "select covered_from, last_fetch from history_meta "
+                                          "where ticker = ? and interval = ? ", (ticker, interval.value) ).fetchone()
+                if meta is None or (meta[0] and (not start or start < meta[0])):
+                    misses.append( ticker )
+                elif meta[1] < today:
+                    last = self._con.execute( "select max(date) from history where ticker = ? and interval = ? ",
+                                              (ticker, interval.value) ).fetchone()[0]
+                    tails.setdefault( last, list() ).append( ticker )
+                else:
+                    self.hits += 1
+            self.misses += len( misses )
+            self.tails += sum( len( group ) for group in tails.values() )
+        fetched = dict()
+        if misses:
+            fetched = self._fetch( misses, lambda: self._provider.getHistoriesByPeriod( misses, period, interval ) )
+        end = datehelper.addDaysToIsoString( today, 1 )
+        fetchedTails:Dict[str, Dict[str, DataFrame]] = dict()
+        for last, group in tails.items():
+            fetchedTails[last] = self._fetch( group, lambda: self._provider.getHistoriesByDates( group, interval,
+                                                                                                 last, end ) )
+        with self._lock:
+            for ticker, df in fetched.items():
+                if len( df ) > 0:
+                    self._con.execute( "delete from history where ticker = ? and interval = ? ",
+                                       (ticker, interval.value) )
+                    self._writeRows( ticker, interval, df )
+                    self._writeMeta( ticker, interval, start, today, df )
+            # die letzte gespeicherte Zeile kann unvollständig gewesen sein (laufende Woche, laufender Monat)
+            for last, dfdict in fetchedTails.items():
+                for ticker, df in dfdict.items():
+                    if len( df ) > 0:
+                        self._con.execute( "delete from history where ticker = ? and interval = ? and date >= ? ",
+                                           (ticker, interval.value, last) )
+                        self._writeRows( ticker, interval, df )
+                        self._con.execute( "update history_meta set last_fetch = ? where ticker = ? and interval = ? ",
+                                           (today, ticker, interval.value) )
+            self._con.commit()
+        return start
+
+    @staticmethod
+    def _fetch( tickers:List[str], fetch:Callable[[], Dict[str, DataFrame]] ) -> Dict[str, DataFrame]:
+        """
+        Führt die Anfrage <fetch> aus. Schlägt sie fehl, werden die gespeicherten Daten von <tickers> geliefert.
+        """
+        try:
+            return fetch()
+        except Exception as ex:
+            print( "HistoryStore: ", ", ".join( tickers ), ": Abruf der Historien fehlgeschlagen: ", str( ex ) )
+            return dict()
+
+    def _writeRows( self, ticker:str, interval:Interval, df:DataFrame ):
+        dates = df.index.strftime( "%Y-%m-%d" )
+        columns = [df[col].astype( float ) if col in df.columns else [0.0]*len( df ) for col in HistoryStore.COLUMNS]
+        rows = [(ticker, interval.value, d) + tuple( None if math.isnan( v ) else v for v in values )
+                for d, *values in zip( dates, *columns )]
+        self._con.executemany( "insert or replace into history "
+                               "( ticker, interval, date, open, high, low, close, volume, dividends, splits ) "
+                               "values ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )", rows )
+
+    def _writeMeta( self, ticker:str, interval:Interval, start:str, today:str, df:DataFrame ):
+        tz = str( df.index.tz ) if df.index.tz is not None else None
+        self._con.execute( "insert or replace into history_meta ( ticker, interval, covered_from, last_fetch, tz ) "
+                           "values ( ?, ?, ?, ?, ? )", (ticker, interval.value, start, today, tz) )
+
+    def _readHistory( self, ticker:str, interval:Interval, start:str ) -> DataFrame:
+        rows = self._con.execute( "select date, open, high, low, close, volume, dividends, splits from history "
+                                  "where ticker = ? and interval = ? and date >= ? "
+                                  "order by date ", (ticker, interval.value, start) ).fetchall()
+        tz = self._con.execute( "select tz from history_meta where ticker = ? and interval = ? ",
+                                (ticker, interval.value) ).fetchone()
+        index = pandas.DatetimeIndex( [row[0] for row in rows], name="Date" )
+        if tz and tz[0]:
+            index = index.tz_localize( tz[0] )
+        return DataFrame( [row[1:] for row in rows], index=index, columns=list( HistoryStore.COLUMNS ), dtype=float )
+
+
+################  TEST TEST TEST   ###########################
+def testHistoryStore( ntickers=40, latency=0.3 ):
+    """
+    Simuliert den Start von InvestMonitor mit <ntickers> Depotpositionen gegen einen FakeHistoryProvider
+    mit <latency> Sekunden Antwortzeit je Abruf.
+    """
+    import os, tempfile
+    today = ["2024-03-14"]
+    getToday = lambda: today[0]
+    tickers = ["TICK%d.DE" % i for i in range( ntickers )]
+    path = os.path.join( tempfile.mkdtemp(), "tickerhistory.db" )
+
+    def start( title:str ) -> DataFrame:
+        provider = FakeHistoryProvider( latency, getToday )
+        store = HistoryStore( path, provider, getToday )
+        t = time.perf_counter()
+        df = store.getHistoriesByPeriod( tickers, Period.oneYear, Interval.oneWeek )
+        print( "%-32s %7.3f s  provider calls: %d  %s" %
+               (title, time.perf_counter() - t, provider.calls, store.getStatistics()) )
+        store.close()
+        return df
+
+    start( "erster Start (leerer Speicher):" )
+    df = start( "zweiter Start, selber Tag:" )
+    today[0] = "2024-03-19"
+    dfTail = start( "Start fünf Tage später:" )
+    expected = FakeHistoryProvider( 0, getToday ).getHistoryByPeriod( tickers[0], Period.oneYear, Interval.oneWeek )
+    assert list( dfTail["Close"][tickers[0]] ) == list( expected["Close"] )
+    assert len( df["Close"].columns ) == ntickers
+    store = HistoryStore( path, FakeHistoryProvider( 0, getToday ), getToday )
+    dfHalf = store.getHistoryByPeriod( tickers[0], Period.sixMonths, Interval.oneWeek )
+    assert store.getStatistics()["hits"] == 1 and len( dfHalf ) < len( expected )
+    store.close()
+    print( "ok" )
@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List
+
+import yfinance
+from pandas import DataFrame
+import pandas
+
+from data.finance.fxrates import loadLatestRates
+from data.finance.historystore import HistoryProvider, YFinanceHistoryProvider
+from imon.enums import Period, Interval
+
+
+#####################   MarketDataProvider   ##########################
+class MarketDataProvider( HistoryProvider ):
+    """
+    Gemeinsame Schnittstelle aller Marktdatenquellen: Historien (siehe HistoryProvider), FastInfo und
+    Wechselkurse. Wird mit TickerHistory.setMarketDataProvider() für die ganze Anwendung eingesetzt.
+    """
+    def getFastInfo( self, ticker:str ):
+        """
+        Liefert ein Objekt mit den Attributen currency, last_price und previous_close
+        (z.B. yfinance.scrapers.quote.FastInfo)
+        """
+        raise NotImplementedError( "MarketDataProvider.getFastInfo()" )
+
+    def getFxRates( self ) -> Dict[str, float]:
+        """
+        Liefert die aktuellen Wechselkurse bezogen auf einen US-Dollar (key: Währung)
+        """
+        raise NotImplementedError( "MarketDataProvider.getFxRates()" )
+
+class YFinanceMarketDataProvider( YFinanceHistoryProvider, MarketDataProvider ):
+    """
+    Historien und FastInfo von yfinance, Wechselkurse von exchangerate-api.com
+    """
+    def getFastInfo( self, ticker:str ):
+        return yfinance.Ticker( ticker ).fast_info
+
+    def getFxRates( self ) -> Dict[str, float]:
+        return loadLatestRates()
+
+class RecordedFastInfo:
+    """
+    Die aufgezeichneten Felder einer FastInfo
+    """
+    def __init__( self, currency:str, last_price:float, previous_close:float ):
+        self.currency = currency
+        self.last_price = last_price
+        self.previous_close = previous_close
+
+
+#####################   Aufzeichnung   ##########################
+class MarketDataRecording:
+    """
+    Verzeichnis mit aufgezeichneten Antworten einer Marktdatenquelle:
+    - index.json: key der Anfrage -> Dateiname der aufgezeichneten Historie
+    - <n>.pkl: aufgezeichnete Historien (DataFrame)
+    - fastinfo.json: key: Ticker, value: currency, last_price, previous_close
+    - fxrates.json: die Wechselkurse bezogen auf einen US-Dollar
+    """
+    def __init__( self, directory:str ):
+        self._directory = directory
+        self._lock = threading.Lock()
+        os.makedirs( directory, exist_ok=True )
+        self._index:Dict[str, str] = self._readJson( "index.json" )
+        self._fastInfos:Dict[str, Dict] = self._readJson( "fastinfo.json" )
+        self._fxRates:Dict[str, float] = self._readJson( "fxrates.json" )
+
+    @staticmethod
+    def getHistoryKey( ticker:str, interval:Interval, period:Period=None, start:str=None, end:str=None ) -> str:
+        if period:
+            return "|".join( ("period", ticker, period.value, interval.value) )
+        return "|".join( ("dates", ticker, interval.value, start or "", end or "") )
+
+    def getHistory( self, key:str ) -> DataFrame:
+        filename = self._index.get( key )
+        if not filename:
+            raise Exception( "MarketDataRecording: keine Aufzeichnung für '%s' in %s." % (key, self._directory) )
+        return pandas.read_pickle( os.path.join( self._directory, filename ) )
+
+    def putHistory( self, key:str, df:DataFrame ):
+        with self._lock:
+            filename = self._index.get( key, "%d.pkl" % len( self._index ) )
+            df.to_pickle( os.path.join( self._directory, filename ) )
+            self._index[key] = filename
+            self._writeJson( "index.json", self._index )
+
+    def getFastInfo( self, ticker:str ) -> RecordedFastInfo:
+        dic = self._fastInfos.get( ticker )
+        if not dic:
+            raise Exception( "MarketDataRecording: keine FastInfo für '%s' in %s." % (ticker, self._directory) )
+        return RecordedFastInfo( dic["currency"], dic["last_price"], dic["previous_close"] )
+
+    def putFastInfo( self, ticker:str, fastInfo ):
+        with self._lock:
+            self._fastInfos[ticker] = {"currency": str( fastInfo.currency ), "last_price": fastInfo.last_price,
+                                       "previous_close": fastInfo.previous_close}
+            self._writeJson( "fastinfo.json", self._fastInfos )
+
+    def getFxRates( self ) -> Dict[str, float]:
+        if not self._fxRates:
+            raise Exception( "MarketDataRecording: keine Wechselkurse in %s." % self._directory )
+        return self._fxRates
+
+    def putFxRates( self, rates:Dict[str, float] ):
+        with self._lock:
+            self._fxRates = rates
+            self._writeJson( "fxrates.json", rates )
+
+    def _readJson( self, filename:str ) -> Dict:
+        path = os.path.join( self._directory, filename )
+        if not os.path.exists( path ):
+            return dict()
+        with open( path, "r" ) as f:
+            return json.load( f )
+
+    def _writeJson( self, filename:str, dic:Dict ):
+        with open( os.path.join( self._directory, filename ), "w" ) as f:
+            json.dump( dic, f, indent=1 )
+
+class RecordingMarketDataProvider( MarketDataProvider ):
+    """
+    Reicht alle Anfragen an <provider> weiter und zeichnet die Antworten in <directory> auf.
+    """
+    def __init__( self, provider:MarketDataProvider, directory:str ):
+        self._provider = provider
+        self._recording = MarketDataRecording( directory )
+
+    def getHistoryByPeriod( self, ticker:str, period:Period, interval:Interval ) -> DataFrame:
+        df = self._provider.getHistoryByPeriod( ticker, period, interval )
+        self._recording.putHistory( MarketDataRecording.getHistoryKey( ticker, interval, period=period ), df )
+        return df
+
+    def getHistoryByDates( self, ticker:str, interval:Interval, start:str, end:str=None ) -> DataFrame:
+        df = self._provider.getHistoryByDates( ticker, interval, start, end )
+        self._recording.putHistory( MarketDataRecording.getHistoryKey( ticker, interval, start=start, end=end ), df )
+        return df
+
+    def getHistoriesByPeriod( self, tickers:List[str], period:Period, interval:Interval ) -> Dict[str, DataFrame]:
+        # eine Anfrage an <provider>, aufgezeichnet wird je Ticker (wie bei getHistoryByPeriod())
+        dfdict = self._provider.getHistoriesByPeriod( tickers, period, interval )
+        for ticker, df in dfdict.items():
+            self._recording.putHistory( MarketDataRecording.getHistoryKey( ticker, interval, period=period ), df )
+        return dfdict
+
+    def getHistoriesByDates( self, tickers:List[str], interval:Interval, start:str,
+                             end:str=None ) -> Dict[str, DataFrame]:
+        dfdict = self._provider.getHistoriesByDates( tickers, interval, start, end )
+        for ticker, df in dfdict.items():
+            self._recording.putHistory( MarketDataRecording.getHistoryKey( ticker, interval, start=start, end=end ), df )
+        return dfdict
+
+    def getFastInfo( self, ticker:str ):
+        fastInfo = self._provider.getFastInfo( ticker )
+        self._recording.putFastInfo( ticker, fastInfo )
+        return fastInfo
+
+    def getFxRates( self ) -> Dict[str, float]:
+        rates = self._provider.getFxRates()
+        self._recording.putFxRates( rates )
+        return rates
+
+class ReplayMarketDataProvider( MarketDataProvider ):
+    """
+    Beantwortet alle Anfragen aus einer Aufzeichnung (siehe RecordingMarketDataProvider), ohne Netzzugriff.
+    <latency> simuliert die Antwortzeit einer Anfrage in Sekunden.
+    Anfragen, die nicht aufgezeichnet wurden, führen zu einer Exception.
+    """
+    def __init__( self, directory:str, latency:float=0.0 ):
+        self._recording = MarketDataRecording( directory )
+        self._latency = latency
+        self.calls = 0
+
+    def getHistoryByPeriod( self, ticker:str, period:Period, interval:Interval ) -> DataFrame:
+        self._wait()
+        return self._recording.getHistory( MarketDataRecording.getHistoryKey( ticker, interval, period=period ) )
+
+    def getHistoryByDates( self, ticker:str, interval:Interval, start:str, end:str=None ) -> DataFrame:
+        self._wait()
+        return self._recording.getHistory( MarketDataRecording.getHistoryKey( ticker, interval, start=start, end=end ) )
+
+    def getFastInfo( self, ticker:str ) -> RecordedFastInfo:
+        self._wait()
+        return self._recording.getFastInfo( ticker )
+
+    def getFxRates( self ) -> Dict[str, float]:
+        self._wait()
+        return self._recording.getFxRates()
+
+    def _wait( self ):
+        self.calls += 1
+        if self._latency > 0:
+            time.sleep( self._latency )
+
+
+################  TEST TEST TEST   ###########################
+def testRecordAndReplay():
+    """
+    Zeichnet die Antworten eines FakeHistoryProvider auf und spielt sie wieder ab.
+    """
+    import tempfile
+    from data.finance.historystore import FakeHistoryProvider
+
+    class FakeMarketDataProvider( FakeHistoryProvider, MarketDataProvider ):
+        def getFastInfo( self, ticker:str ):
+            return RecordedFastInfo( "USD", 101.0, 100.0 )
+
+        def getFxRates( self ) -> Dict[str, float]:
+            return {"USD": 1.0, "EUR": 0.9}
+
+    directory = tempfile.mkdtemp()
+    recorder = RecordingMarketDataProvider( FakeMarketDataProvider(), directory )
+    df = recorder.getHistoryByPeriod( "A.DE", Period.oneYear, Interval.oneWeek )
+    recorder.getFastInfo( "A.DE" )
+    recorder.getFxRates()
+    replay = ReplayMarketDataProvider( directory, latency=0.01 )
+    assert replay.getHistoryByPeriod( "A.DE", Period.oneYear, Interval.oneWeek ).equals( df )
+    assert replay.getFastInfo( "A.DE" ).last_price == 101.0 and replay.getFxRates()["EUR"] == 0.9
+    try:
+        replay.getHistoryByPeriod( "B.DE", Period.oneYear, Interval.oneWeek )
+        raise AssertionError( "B.DE wurde nicht aufgezeichnet" )
+    except Exception as ex:
+        print( ex )
+    print( "ok" )
@@ -0,0 +1,157 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from typing import List, Dict, Callable, Iterable, Iterator
+
+from yfinance.scrapers.quote import FastInfo
+
+from data.finance.tickerhistory import TickerHistory
+
+
+class Quote:
+    """
+    Die für eine Depotposition benötigten Felder der yfinance-FastInfo eines Tickers.
+    Die Felder der FastInfo werden lazy geladen (jeder Zugriff kann ein Netzzugriff sein), deshalb werden sie
+    vom QuoteFetcher im Worker-Thread ausgelesen und hier abgelegt.
+    """
+    def __init__( self, ticker:str ):
+        self.ticker = ticker
+        self.fastInfo:FastInfo = None
+        self.currency = ""
+        self.last_price:float = None
+        self.previous_close:float = None
+        self.error = "" # Fehlermeldung, wenn die FastInfo nicht ermittelt werden konnte
+
+    def isValid( self ) -> bool:
+        return self.last_price is not None and not self.error
+
+
+class QuoteFetcher:
+    """
+    Ermittelt FastInfo, Währung und Vortagesschluss für mehrere Ticker parallel.
+    - Jeder Ticker wird je Aufruf nur einmal abgefragt, auch wenn er mehrfach übergeben wird.
+    - Höchstens <maxWorkers> Abfragen laufen gleichzeitig.
+    - Schlägt eine Abfrage fehl, wird sie bis zu <retries> mal wiederholt.
+    - Nach <timeout> Sekunden wird nicht länger gewartet; die noch offenen Ticker werden mit Fehler geliefert.
+    Die Laufzeit eines Aufrufs richtet sich damit nach dem langsamsten Ticker, nicht nach der Summe aller.
+    """
+    MAX_WORKERS = 16
+    TIMEOUT = 20.0
+    RETRIES = 2
+    RETRY_DELAY = 0.5
+
+    def __init__( self, getFastInfo:Callable[[str], FastInfo]=None, maxWorkers:int=MAX_WORKERS,
+                  timeout:float=TIMEOUT, retries:int=RETRIES ):
+        """
+        :param getFastInfo: Funktion, die zu einem Ticker die FastInfo liefert. Default: TickerHistory.getFastInfo
+        """
+        self._getFastInfo = getFastInfo if getFastInfo else TickerHistory.getFastInfo
+        self._maxWorkers = maxWorkers
+        self._timeout = timeout
+        self._retries = retries
+
+    def fetchQuote( self, ticker:str ) -> Quote:
+        return self.fetchQuotes( (ticker,) )[ticker]
+
+    def fetchQuotes( self, tickers:Iterable[str] ) -> Dict[str, Quote]:
+        """
+        Liefert zu jedem der übergebenen Ticker ein Quote-Objekt (key: ticker).
+        Nicht ermittelbare Ticker werden mit Quote.error geliefert.
+        """
+        return {quote.ticker: quote for quote in self.iterQuotes( tickers )}
+
+    def iterQuotes( self, tickers:Iterable[str] ) -> Iterator[Quote]:
+        """
+        Liefert die Quote-Objekte der übergebenen Ticker in der Reihenfolge, in der die Abfragen fertig werden.
+        Nicht ermittelbare Ticker werden mit Quote.error geliefert.
+        """
+        tickers = list( dict.fromkeys( tickers ) )
+        if not tickers:
+            return
+        # auch ein einzelner Ticker läuft über den Executor, damit für ihn derselbe Timeout gilt
+        executor = ThreadPoolExecutor( max_workers=min( self._maxWorkers, len( tickers ) ) )
+        futures = {executor.submit( self._fetch, ticker ): ticker for ticker in tickers}
+        pending = set( tickers )
+        try:
+            for future in as_completed( futures, timeout=self._timeout ):
+                pending.discard( futures[future] )
+                yield future.result()
+        except TimeoutError:
+            for ticker in [ticker for ticker in tickers if ticker in pending]:
+                quote = Quote( ticker )
+                quote.error = "Timeout nach %.1f Sekunden" % self._timeout
+                yield quote
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown( wait=False ) # hängende Abfragen laufen im Hintergrund aus
+
+    def fetchCurrencies( self, tickers:Iterable[str] ) -> Dict[str, str]:
+        """
+        Liefert die Handelswährungen der übergebenen Ticker (key: ticker).
+        Bereits bekannte Währungen werden nicht erneut abgefragt.
+        """
+        tickers = list( dict.fromkeys( tickers ) )
+        missing = [ticker for ticker in tickers if not TickerHistory.getCachedCurrency( ticker )]
+        self.fetchQuotes( missing )
+        return {ticker: TickerHistory.getCachedCurrency( ticker ) for ticker in tickers}
+
+    def _fetch( self, ticker:str ) -> Quote:
+        quote = Quote( ticker )
+        for attempt in range( self._retries + 1 ):
+            if attempt > 0:
+                time.sleep( self.RETRY_DELAY*attempt )
+            try:
+                fastInfo = self._getFastInfo( ticker )
+                if not fastInfo:
+                    quote.error = "No FastInfo available"
+                    continue
+                quote.currency = str( fastInfo.currency )
+                quote.last_price = fastInfo.last_price
+                quote.fastInfo = fastInfo
+                quote.error = ""
+                break
+            except Exception as ex:
+                quote.error = str( ex )
+        if not quote.isValid():
+            return quote
+        TickerHistory.setCachedCurrency( ticker, quote.currency )
+        try:
+            # wegen des lazy loading der fast_info geht das hin und wieder schief
+            quote.previous_close = quote.fastInfo.previous_close
+        except Exception as ex:
+            print( ticker, ": Zugriff auf Feld previous_close nicht möglich." )
+        return quote
+
+
+################  TEST TEST TEST   ###########################
+def testQuoteFetcher( ntickers=40, latency=0.3 ):
+    """
+    Vergleicht die Laufzeit der parallelen Abfrage von <ntickers> Tickern mit einer simulierten FastInfo-Abfrage
+    von <latency> Sekunden mit der seriellen Abfrage.
+    """
+    class FakeFastInfo:
+        def __init__( self, ticker:str ):
+            time.sleep( latency )
+            self.currency = "USD" if ticker.endswith( ".L" ) else "EUR"
+            self.last_price = 100.0
+            self.previous_close = 99.0
+
+    tickers = ["TICK%d.%s" % (i, "L" if i % 2 else "DE") for i in range( ntickers )]
+    t = time.perf_counter()
+    for ticker in tickers:
+        FakeFastInfo( ticker )
+    print( "seriell:  %.3f s" % (time.perf_counter() - t) )
+    t = time.perf_counter()
+    quotes = QuoteFetcher( FakeFastInfo ).fetchQuotes( tickers + tickers )
+    print( "parallel: %.3f s" % (time.perf_counter() - t) )
+    assert len( quotes ) == ntickers and all( q.isValid() and q.previous_close == 99.0 for q in quotes.values() )
+    t = time.perf_counter()
+    currencies = QuoteFetcher( FakeFastInfo ).fetchCurrencies( tickers )
+    print( "Währungen (bekannt): %.3f s" % (time.perf_counter() - t) )
+    assert currencies[tickers[1]] == "USD"
+    quotes = QuoteFetcher( FakeFastInfo, timeout=latency/2 ).fetchQuotes( ["SLOW1", "SLOW2"] )
+    assert all( q.error for q in quotes.values() )
+    t = time.perf_counter()
+    quote = QuoteFetcher( FakeFastInfo, timeout=latency/2 ).fetchQuote( "SLOW3" )
+    assert quote.error and time.perf_counter() - t < latency
+    print( "ok" )
@@ -0,0 +1,59 @@
+import time
+from typing import List, Dict, Tuple
+
+from data.finance.quotefetcher import Quote, QuoteFetcher
+
+
+class QuoteSource:
+    """
+    Liefert aktuelle Kurse für eine Gruppe von Tickern (eine Anfrage je Gruppe).
+    """
+    def getQuotes( self, tickers:List[str] ) -> Dict[str, Quote]:
+        raise NotImplementedError( "QuoteSource.getQuotes()" )
+
+class FastInfoQuoteSource( QuoteSource ):
+    """
+    Kurse aus der yfinance-FastInfo, die Ticker einer Gruppe werden parallel abgefragt.
+    """
+    def __init__( self, quoteFetcher:QuoteFetcher=None ):
+        self._quoteFetcher = quoteFetcher if quoteFetcher else QuoteFetcher()
+
+    def getQuotes( self, tickers:List[str] ) -> Dict[str, Quote]:
+        return self._quoteFetcher.fetchQuotes( tickers )
+
+class ReplayQuoteSource( QuoteSource ):
+    """
+    Spielt vorgegebene Kursfolgen ab, ohne Netzzugriff (Tests, Benchmarks).
+    Die n-te Anfrage eines Tickers liefert den n-ten Wert seiner Folge; ist die Folge zu Ende,
+    wird ihr letzter Wert wiederholt.
+    """
+    def __init__( self, prices:Dict[str, List[Tuple[float, float]]], currencies:Dict[str, str]=None,
+                  latency:float=0.0 ):
+        """
+        :param prices: key: Ticker, value: Folge von (last_price, previous_close)
+        :param currencies: key: Ticker, value: Währung. Nicht enthaltene Ticker: EUR
+        :param latency: simulierte Antwortzeit je Anfrage in Sekunden
+        """
+        self._prices = prices
+        self._currencies = currencies if currencies else dict()
+        self._latency = latency
+        self._calls:Dict[str, int] = dict()
+        self.requests = 0
+
+    def getQuotes( self, tickers:List[str] ) -> Dict[str, Quote]:
+        self.requests += 1
+        if self._latency > 0:
+            time.sleep( self._latency )
+        quotes = dict()
+        for ticker in tickers:
+            quote = Quote( ticker )
+            series = self._prices.get( ticker )
+            if series:
+                n = self._calls.get( ticker, 0 )
+                self._calls[ticker] = n + 1
+                quote.last_price, quote.previous_close = series[min( n, len( series ) - 1 )]
+                quote.currency = self._currencies.get( ticker, "EUR" )
+            else:
+                quote.error = "Ticker '%s' nicht in den Aufzeichnungen." % ticker
+            quotes[ticker] = quote
+        return quotes
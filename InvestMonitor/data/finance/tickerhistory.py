@@ -11,6 +11,10 @@ from pandas import DataFrame, Series
 from yfinance.scrapers.quote import FastInfo
 
 import datehelper
+from data.finance.fxrates import FxRates
+from data.finance.historystore import HistoryStore
+from data.finance.marketdata import MarketDataProvider
+from imon.definitions import HISTORY_DATABASE, FX_RATES_CACHE
 from imon.enums import Period, Interval, SeriesName
 
 
@@ -23,30 +27,12 @@ def getOneYearAgo() -> str:
 import requests
 import json
 class CurrencyConverter:
-    url = "https://api.exchangerate-api.com/v4/latest/USD"
-    rel_keys = "EUR, GBP, CHF"
-    one_dollar_conversions:Dict = None
-
-    @staticmethod
-    def _loadCurrencies():
-        CurrencyConverter.one_dollar_conversions = dict()
-        response = requests.get( CurrencyConverter.url )
-        dic = json.loads( response.content )
-        rates = dic["rates"]
-        rel_keys = "USD, EUR, GBP, CHF"
-        for key, value in rates.items():
-            if key in rel_keys:
-                CurrencyConverter.one_dollar_conversions[key] = value
-
+    """
+    Umrechnung mit den aktuellen Kursen von TickerHistory.getFxRates()
+    """
     @staticmethod
     def convert( amount:float, fromCurrency:str, toCurrency:str="EUR" ) -> float:
-        if not CurrencyConverter.one_dollar_conversions:
-            CurrencyConverter._loadCurrencies()
-        oneDollarInFromCurrency = CurrencyConverter.one_dollar_conversions[fromCurrency]
-        oneDollarInToCurrency = CurrencyConverter.one_dollar_conversions[toCurrency]
-        vh = oneDollarInToCurrency/oneDollarInFromCurrency
-        amountInToCurrency = vh * amount
-        return amountInToCurrency
+        return TickerHistory.getFxRates().convert( amount, fromCurrency, toCurrency )
 
 def testConversion():
     eur = CurrencyConverter.convert( 1, "USD" )
@@ -64,11 +50,62 @@ class TickerHistory:
     oneYearAgo = getOneYearAgo()
     default_period:Period = Period.oneYear
     default_interval:Interval = Interval.oneWeek
+    _historyStore:HistoryStore = None
+    _currencies:Dict[str, str] = dict() # Handelswährungen der bereits abgefragten Ticker
+    _fxRates:FxRates = None
+    _marketDataProvider:MarketDataProvider = None # None: yfinance
     # currConverter = CurrencyConverter()
     # forex_curr_converter = CurrencyRates()
 
+    @staticmethod
+    def getHistoryStore() -> HistoryStore:
+        """
+        Liefert den lokalen Speicher der Kurshistorien. Wird beim ersten Aufruf mit HISTORY_DATABASE und
+        yfinance als Datenquelle angelegt, sofern nicht vorher setHistoryStore() aufgerufen wurde.
+        """
+        if not TickerHistory._historyStore:
+            TickerHistory._historyStore = HistoryStore( HISTORY_DATABASE )
+        return TickerHistory._historyStore
+
+    @staticmethod
+    def setHistoryStore( store:HistoryStore ) -> None:
+        """
+        Ersetzt den lokalen Speicher der Kurshistorien, z.B. durch einen mit FakeHistoryProvider für Tests.
+        """
+        TickerHistory._historyStore = store
+
+    @staticmethod
+    def getFxRates() -> FxRates:
+        """
+        Liefert die Wechselkurse. Die aktuellen Kurse werden in FX_RATES_CACHE zwischengespeichert,
+        historische Kurse im HistoryStore.
+        """
+        if not TickerHistory._fxRates:
+            TickerHistory._fxRates = FxRates( FX_RATES_CACHE, historyStore=TickerHistory.getHistoryStore() )
+        return TickerHistory._fxRates
+
+    @staticmethod
+    def setFxRates( fxRates:FxRates ) -> None:
+        TickerHistory._fxRates = fxRates
+
+    @staticmethod
+    def setMarketDataProvider( provider:MarketDataProvider, pathToHistoryDb:str=":memory:" ) -> None:
+        """
+        Stellt Historien, FastInfo und Wechselkurse auf <provider> um, z.B. auf einen RecordingMarketDataProvider
+        zum Aufzeichnen oder einen ReplayMarketDataProvider für Benchmarks ohne Netzzugriff.
+        Historien werden in einem neuen HistoryStore unter <pathToHistoryDb> gespeichert, Wechselkurse nicht
+        in FX_RATES_CACHE; bereits ermittelte Handelswährungen werden vergessen.
+        """
+        store = HistoryStore( pathToHistoryDb, provider=provider )
+        TickerHistory._marketDataProvider = provider
+        TickerHistory._historyStore = store
+        TickerHistory._fxRates = FxRates( None, loadRates=provider.getFxRates, historyStore=store )
+        TickerHistory._currencies.clear()
+
     @staticmethod
     def getFastInfo( ticker:str ) -> FastInfo:
+        if TickerHistory._marketDataProvider:
+            return TickerHistory._marketDataProvider.getFastInfo( ticker )
         yf_ticker = yfinance.Ticker( ticker )
         fast_info = yf_ticker.fast_info
         # while fast_info is None:
@@ -77,17 +114,39 @@ class TickerHistory:
 
     @staticmethod
     def getCurrency( ticker:str ) -> str:
-        fi = TickerHistory.getFastInfo( ticker )
-        return fi.currency
+        currency = TickerHistory.getCachedCurrency( ticker )
+        if not currency:
+            fi = TickerHistory.getFastInfo( ticker )
+            currency = str( fi.currency )
+            TickerHistory.setCachedCurrency( ticker, currency )
+        return currency
+
+    @staticmethod
+    def getCachedCurrency( ticker:str ) -> str:
+        """
+        Liefert die Währung von <ticker>, wenn sie schon einmal ermittelt wurde, sonst "".
+        Die Handelswährung eines Tickers ändert sich nicht, sie muss deshalb nur einmal abgefragt werden.
+        """
+        return TickerHistory._currencies.get( ticker, "" )
+
+    @staticmethod
+    def setCachedCurrency( ticker:str, currency:str ) -> None:
+        TickerHistory._currencies[ticker] = currency
 
     @staticmethod
     def convertToEuro( value, fromCurr: str ) -> float:
-        curr = fromCurr
-        if curr == "GBp":
-            value /= 100
-            curr = "GBP"
-        eur = CurrencyConverter.convert( value, curr )
-        return eur
+        """
+        Rechnet <value> in Euro um. Unterwährungen wie GBp (Pence) werden berücksichtigt.
+        """
+        return TickerHistory.getFxRates().convert( value, fromCurr )
+
+    @staticmethod
+    def convertSeriesToEuro( series:Series, fromCurr:str, historical:bool=False ) -> Series:
+        """
+        Rechnet alle Werte von <series> in Euro um (NaN -> 0).
+        :param historical: True: mit dem Tageskurs des jeweiligen Datums, False: mit dem aktuellen Kurs
+        """
+        return TickerHistory.getFxRates().convertSeries( series, fromCurr, historical=historical )
 
     @staticmethod
     def getTickerHistoryByPeriod( ticker: str,
@@ -99,9 +158,7 @@ class TickerHistory:
                 Intraday data cannot extend last 60 days
         :return:
         """
-        yf_ticker = yfinance.Ticker( ticker )
-        df = yf_ticker.history( period.value, interval.value )
-        return df
+        return TickerHistory.getHistoryStore().getHistoryByPeriod( ticker, period, interval )
 
     @staticmethod
     def getTickerHistoryByDates( ticker: str, interval:Interval = default_interval,
@@ -132,9 +189,7 @@ class TickerHistory:
         """
         if len( tickers ) == 1:
             return TickerHistory.getTickerHistoryByPeriod( tickers[0], period, interval )
-        yf_tickers = yfinance.Tickers( tickers )
-        df = yf_tickers.history( period.value, interval.value )
-        return df
+        return TickerHistory.getHistoryStore().getHistoriesByPeriod( tickers, period, interval )
 
     @staticmethod
     def getTickerHistoriesByDates( tickers: List[str], interval: Interval = default_interval,
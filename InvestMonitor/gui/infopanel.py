@@ -1,8 +1,10 @@
+import time
 from typing import List, Callable
 
 import matplotlib
 from PySide2.QtCore import QSize, Signal, Qt
 from PySide2.QtGui import QFont
+from pandas import Series
 
 from base.baseqtderivates import BaseGridLayout, BaseLabel, BaseEdit, IntEdit, FloatEdit, HLine, \
     BaseButton, BaseComboBox, HistoryButton, BaseDialogWithButtons, BaseButtonDefinition, ButtonIdent
@@ -16,6 +18,7 @@ from PySide2.QtWidgets import QApplication, QHBoxLayout, QFrame, QWidget
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT #as NavigationToolbar
 from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 #import pandas as pd
 
 class AbgeltungssteuerDlg( BaseDialogWithButtons ):
@@ -42,6 +45,9 @@ class AbgeltungssteuerDlg( BaseDialogWithButtons ):
         self._ieStueck.setFixedWidth( 70 )
         self._ieSteuer = IntEdit( isReadOnly=True )
         self._ieSteuer.setFixedWidth( 70 )
+        self._kurveFigure = Figure( figsize=(4, 2), dpi=80 )
+        self._kurveCanvas = FigureCanvasQTAgg( self._kurveFigure )
+        self._kurveCanvas.setVisible( False )
         self._createMainWidget()
         self._dataToGui()
         self.setMainWidget( self._mainWidget )
@@ -71,6 +77,10 @@ class AbgeltungssteuerDlg( BaseDialogWithButtons ):
         c = 2
         l.addWidget( BaseLabel( "€" ), r, c )
 
+        r += 1
+        c = 0
+        l.addWidget( self._kurveCanvas, r, c, 1, 3 )
+
     def _dataToGui( self ):
         self._lblKurs.setValue( self._kurs )
         self._ieStueck.setValue( self._max_stck )
@@ -79,6 +89,20 @@ class AbgeltungssteuerDlg( BaseDialogWithButtons ):
     def setAbgeltungssteuer( self, steuer:int ):
         self._ieSteuer.setIntValue( steuer )
 
+    def setSteuerKurve( self, stueck:List[int], steuer:List[int] ):
+        """
+        Zeigt die Abgeltungssteuer in Abhängigkeit von der Anzahl zu verkaufender Anteile.
+        """
+        self._kurveFigure.clear()
+        axes = self._kurveFigure.add_subplot( 111 )
+        axes.plot( stueck, steuer )
+        axes.axhline( 0, color="gray", linewidth=0.5 )
+        axes.set_xlabel( "Anteile" )
+        axes.set_ylabel( "Steuer (€)" )
+        self._kurveFigure.tight_layout()
+        self._kurveCanvas.setVisible( True )
+        self._kurveCanvas.draw_idle()
+
     def onComputeBtnClicked( self ):
         self.compute_steuer.emit( self._ieStueck.getIntValue() )
 
@@ -143,6 +167,14 @@ class NavigationToolbar(NavigationToolbar2QT):
 
 ##############################################################
 class MplCanvas(FigureCanvasQTAgg):
+    """
+    Zeichenfläche für den Kursverlauf eines InfoPanels.
+    - Gezeichnet wird erst, wenn die Zeichenfläche sichtbar ist: liegt sie außerhalb des sichtbaren Bereichs
+      (z.B. im ScrollArea des MainWindow), wird das Zeichnen bis zum nächsten paintEvent aufgeschoben.
+    - Figure, Axes und Linie werden wiederverwendet; neue Daten werden in die vorhandene Linie eingesetzt.
+    - Bleiben die Achsengrenzen gleich, wird nur die Linie auf den gespeicherten Hintergrund gezeichnet (Blitting).
+    drawCount und drawTime (Sekunden) summieren die vollständigen Zeichenvorgänge.
+    """
     def __init__(self, width=5, height=4, dpi=100):
         self._width = width
         self._height = height
@@ -152,17 +184,70 @@ class MplCanvas(FigureCanvasQTAgg):
         super(MplCanvas, self).__init__( self._figure )
 
         self.toolbar = NavigationToolbar( self, self )
+        self._line:Line2D = None
+        self._background = None # Hintergrund der Achsen ohne Linie, für Blitting
+        self._dirty = True # ein Zeichnen wurde aufgeschoben, weil die Zeichenfläche nicht sichtbar war
+        self.drawCount = 0
+        self.drawTime = 0.0
+        self.mpl_connect( "draw_event", self._onDraw )
 
     def clear( self ):
-        self._figure.clear()
-        self._figure = Figure( figsize=(self._width, self._height), dpi=self._dpi )
-        self.figure = self._figure
-        self.axes = self._figure.add_subplot( 111 )
+        self.axes.cla()
+        self._line = None
+        self._background = None
+
+    def setHistory( self, series:Series ):
+        """
+        Zeigt <series> als Linie an. Die vorhandene Linie wird weiterverwendet.
+        """
+        index = series.index
+        if getattr( index, "tz", None ) is not None:
+            index = index.tz_localize( None )
+        xvalues, yvalues = index.to_numpy(), series.to_numpy( dtype=float )
+        if self._line is None:
+            self._line, = self.axes.plot( xvalues, yvalues, animated=True )
+            self.axes.grid( True )
+            self.draw_idle()
+            return
+        limits = (self.axes.get_xlim(), self.axes.get_ylim())
+        self._line.set_data( xvalues, yvalues )
+        self.axes.relim()
+        self.axes.autoscale_view()
+        if self._background is not None and not self._dirty and self._isOnScreen() \
+                and limits == (self.axes.get_xlim(), self.axes.get_ylim()):
+            self.restore_region( self._background )
+            self.axes.draw_artist( self._line )
+            self.blit( self.axes.bbox )
+        else:
+            self.draw_idle()
 
     def draw( self ):
+        t = time.perf_counter()
         super().draw()
-        rend = self.get_renderer()
-        self._figure.draw( rend )
+        self.drawTime += time.perf_counter() - t
+        self.drawCount += 1
+        self._dirty = False
+
+    def draw_idle( self ):
+        if self._isOnScreen():
+            super().draw_idle()
+        else:
+            self._dirty = True
+
+    def paintEvent( self, event ):
+        if self._dirty:
+            self.draw()
+        super().paintEvent( event )
+
+    def _isOnScreen( self ) -> bool:
+        return self.isVisible() and not self.visibleRegion().isEmpty()
+
+    def _onDraw( self, event ):
+        # die Linie ist "animated", wird also von Figure.draw() nicht gezeichnet:
+        # Hintergrund ohne Linie merken, dann die Linie darüber zeichnen
+        self._background = self.copy_from_bbox( self.axes.bbox )
+        if self._line is not None:
+            self.axes.draw_artist( self._line )
 
     def refresh( self ):
         super().resize( self._width, self._height )
@@ -522,10 +607,7 @@ class InfoPanel( QFrame ):
         self._x = x
         self._dataToGui()
         self._btnUpdateGraph.setEnabled( False )
-        self._mplCanvas.clear()
         self._plot()
-        self._mplCanvas.draw()
-        self._mplCanvas.refresh()
 
     def _dataToGui( self ):
         x = self._x
@@ -603,7 +685,7 @@ class InfoPanel( QFrame ):
     def _plot( self ):
         try:
             # kann schiefgehen im TEST-Betrieb und kann dann ignoriert werden
-            self._x.history.plot( ax=self._mplCanvas.axes, grid=True )
+            self._mplCanvas.setHistory( self._x.history )
         except:
             pass
 
@@ -616,6 +698,12 @@ class InfoPanel( QFrame ):
         self._btnUpdateGraph.setEnabled( False )
         self.update_graph.emit( period, interval )
 
+    def getDrawStatistics( self ) -> (int, float):
+        """
+        Liefert die Anzahl der vollständigen Zeichenvorgänge des Graphen und deren Dauer in Sekunden
+        """
+        return self._mplCanvas.drawCount, self._mplCanvas.drawTime
+
     def setPosition( self, row:int, col:int ):
         self._row = row
         self._col = col
@@ -671,4 +759,47 @@ def test():
     ip.setDepotPosition( x )
     #ip.setSelected2()
     ip.show()
-    app.exec_()
\ No newline at end of file
+    app.exec_()
+
+
+def testDrawTimes( npanels=40 ):
+    """
+    Zeigt <npanels> InfoPanels in einer ScrollArea und gibt aus, wie viele Graphen tatsächlich gezeichnet wurden
+    und wie lange das Zeichnen je Panel gedauert hat.
+    """
+    import pandas
+    from PySide2.QtWidgets import QScrollArea, QGridLayout
+    app = QApplication()
+    container = QWidget()
+    grid = QGridLayout( container )
+    panels = list()
+    index = pandas.date_range( end="2024-03-11", periods=52, freq="W-MON" )
+    for i in range( npanels ):
+        x = XDepotPosition()
+        x.wkn = "WKN%d" % i
+        x.history_period = Period.oneYear
+        x.history_interval = Interval.oneWeek
+        x.history = Series( [100 + i + (j % 7) for j in range( len( index ) )], index )
+        ip = InfoPanel()
+        ip.setDepotPosition( x )
+        grid.addWidget( ip, i // 3, i % 3 )
+        panels.append( ip )
+    scroll = QScrollArea()
+    scroll.setWidget( container )
+    scroll.resize( 1800, 1000 )
+    scroll.show()
+    t = time.perf_counter()
+    app.processEvents()
+    print( "Anzeige: %.3f s" % (time.perf_counter() - t) )
+    stats = [ip.getDrawStatistics() for ip in panels]
+    drawn = [s for s in stats if s[0] > 0]
+    print( "gezeichnet: %d von %d Panels, je Panel %.1f ms" %
+           (len( drawn ), npanels, sum( s[1] for s in drawn )/max( len( drawn ), 1 )*1000) )
+    # Periodenwechsel: gleiche Achsen -> Blitting, sonst Neuzeichnen nur der sichtbaren Panels
+    t = time.perf_counter()
+    for ip in panels:
+        x = ip.getModel()
+        x.history = x.history*1.001
+        ip.changeModel( x )
+    app.processEvents()
+    print( "Aktualisierung aller Panels: %.3f s" % (time.perf_counter() - t) )
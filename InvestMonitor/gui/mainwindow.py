@@ -6,7 +6,7 @@ from PySide2.QtWidgets import QMainWindow, QScrollArea, QWidget, QApplication, Q
     QAction, QMenuBar
 
 from base.baseqtderivates import BaseGridLayout, BaseToolBar, SearchField, BaseComboBox, BaseLabel, Separator, \
-    BaseButton, BaseWidget, BaseEdit, IntEdit
+    BaseButton, BaseWidget, BaseEdit, IntEdit, FloatEdit
 from base.dragndrop import DragWidgetsContainer
 from base.enumhelper import getEnumValues, getEnumFromValue
 from gui.infopanel import InfoPanel
@@ -108,6 +108,26 @@ class IMonToolBar( BaseToolBar ):
         self.addWidget( self._delta )
         self.addWidget( BaseLabel( "%  " ) )
         self.addSeparator()
+        # Kennzahlen des Portfolios in der eingestellten Periode
+        self.addWidget( BaseLabel( " TWR: " ) )
+        self._renditeTwr = FloatEdit( isReadOnly=True )
+        self._renditeTwr.setFixedWidth( 55 )
+        self._renditeTwr.setToolTip( "Zeitgewichtete Rendite des Depots in der eingestellten Periode" )
+        self.addWidget( self._renditeTwr )
+        self.addWidget( BaseLabel( "%  " ) )
+        self.addWidget( BaseLabel( "IRR: " ) )
+        self._renditeIrr = FloatEdit( isReadOnly=True )
+        self._renditeIrr.setFixedWidth( 55 )
+        self._renditeIrr.setToolTip( "Geldgewichtete Rendite p.a. (interner Zinsfuß) in der eingestellten Periode" )
+        self.addWidget( self._renditeIrr )
+        self.addWidget( BaseLabel( "%  " ) )
+        self.addWidget( BaseLabel( "Max. DD: " ) )
+        self._maxDrawdown = FloatEdit( isReadOnly=True )
+        self._maxDrawdown.setFixedWidth( 55 )
+        self._maxDrawdown.setToolTip( "Größter Rückgang der Wertentwicklung vom Höchststand in der eingestellten Periode" )
+        self.addWidget( self._maxDrawdown )
+        self.addWidget( BaseLabel( "%  " ) )
+        self.addSeparator()
 
         self._searchField = SearchField()
         self._searchField.setPlaceholderText( "Suche nach WKN oder ISIN oder Ticker" )
@@ -198,6 +218,14 @@ class IMonToolBar( BaseToolBar ):
         self._btnUpdateAllInfoPanels.setEnabled( False )
         self.period_interval_changed.emit( period, interval )
 
+    def setAnalytics( self, renditeTwr:float, renditeIrr:float or None, maxDrawdown:float ):
+        self._renditeTwr.setValue( renditeTwr )
+        if renditeIrr is None:
+            self._renditeIrr.clear()
+        else:
+            self._renditeIrr.setValue( renditeIrr )
+        self._maxDrawdown.setValue( maxDrawdown )
+
     def setDividendPaid( self, val:int ):
         self._lblDividendPaid.setValue( val )
 
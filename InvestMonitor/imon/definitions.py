@@ -6,8 +6,11 @@ ROOT_DIR = os.path.dirname( os.path.abspath( __file__ ) )
 print( ROOT_DIR )
 DATABASE_DIR = ROOT_DIR
 DATABASE = ROOT_DIR + "/invest.db"
+HISTORY_DATABASE = DATABASE_DIR + "/tickerhistory.db"
+FX_RATES_CACHE = DATABASE_DIR + "/fxrates.json"
 ICON_DIR = ROOT_DIR + "/images/"
 
 DEFAULT_PERIOD = Period.oneYear
 DEFAULT_INTERVAL = Interval.oneWeek
-DEFAULT_INFOPANEL_ORDER = InfoPanelOrder.DeltaKursAsc
\ No newline at end of file
+DEFAULT_INFOPANEL_ORDER = InfoPanelOrder.DeltaKursAsc
+QUOTE_POLLING_INTERVAL = 60 # Sekunden zwischen zwei Kursabfragen; 0: keine automatische Kursabfrage
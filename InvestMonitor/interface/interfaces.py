@@ -110,3 +110,23 @@ class XDetail(XBase):
         self.bank = ""
         self.depot_nr = ""
         self.depot_vrrkto = ""
+
+class XPortfolioAnalytics( XBase ):
+    """
+    Kennzahlen über alle übergebenen Depotpositionen für eine Periode und ein Intervall
+    (siehe logic.analytics.computePortfolioAnalytics()).
+    Alle Werte in Euro bzw. in Prozent.
+    """
+    def __init__( self, valuedict:Dict=None ):
+        XBase.__init__( self )
+        self.history_period = Period.unknown
+        self.history_interval = Interval.unknown
+        self.gesamtwert:Series = None # Summe der Werte aller Positionen je Datum (Bestand am Ende des Tages * Kurs)
+        self.dividenden = 0 # Summe der Dividenden, die während der Periode auf die Bestände gezahlt wurden
+        self.rendite_twr = 0.0 # zeitgewichtete Rendite (Kursentwicklung + Dividenden, ohne Ein- und Auszahlungen)
+        self.rendite_irr = None # geldgewichtete Rendite p.a. (interner Zinsfuß); None: nicht ermittelbar
+        self.max_drawdown = 0.0 # größter Rückgang der zeitgewichteten Wertentwicklung vom Höchststand (<= 0)
+        self.volatilitaet:Series = None # rollierende Volatilität p.a. der Perioden-Renditen
+        self.korrelation:DataFrame = None # Korrelationsmatrix der Kursrenditen, Index und Spalten: Ticker
+        if valuedict:
+            self.setFromDict( valuedict )
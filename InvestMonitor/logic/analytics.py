@@ -0,0 +1,252 @@
+from typing import List, Dict, Tuple
+
+import numpy
+import pandas
+from numpy.lib.stride_tricks import sliding_window_view
+from pandas import DataFrame, Series
+
+from imon.enums import Period, Interval
+from interface.interfaces import XDepotPosition, XPortfolioAnalytics
+from logic.holdings import OrderIndex
+
+SECONDS_PER_YEAR = 365.25*24*3600
+
+
+def computePortfolioAnalytics( poslist:List[XDepotPosition], orderIndex:OrderIndex, period:Period,
+                               interval:Interval, window:int=None ) -> XPortfolioAnalytics:
+    """
+    Errechnet die Kennzahlen des Portfolios aus den Kurshistorien (deppos.history, in Euro) und den Orders.
+    Die Historien werden einmal auf ein gemeinsames Datumsraster gebracht; Werte, Renditen und Kennzahlen
+    werden dann für alle Positionen zugleich auf den Matrizen (Datum x Position) berechnet.
+    Macht keine DB-Zugriffe.
+    :param poslist: Depotpositionen mit history (und ggf. dividends) für <period> und <interval>
+    :param orderIndex: die Orders aller Positionen in <poslist>
+    :param window: Anzahl der Perioden für die rollierende Volatilität. None: etwa ein Vierteljahr
+    """
+    x = XPortfolioAnalytics()
+    x.history_period = period
+    x.history_interval = interval
+    poslist = [deppos for deppos in poslist if deppos.history is not None and len( deppos.history ) > 0]
+    if not poslist:
+        return x
+    closeDf = _alignHistories( [deppos.history for deppos in poslist] ).ffill().bfill()
+    divDf = _alignHistories( [deppos.dividends if deppos.dividends is not None else Series( dtype=float )
+                              for deppos in poslist] ).reindex( closeDf.index ).fillna( 0 )
+    days = [str( ts )[:10] for ts in closeDf.index]
+    prices = closeDf.to_numpy( dtype=float )
+    # Bestände je Datum und Position: am Ende des Tages (für die Werte) und vor dem Tag (für die Dividenden)
+    bestand = numpy.column_stack( [orderIndex.getHoldings( deppos.wkn ).getBestand( days, inclusive=True )
+                                   for deppos in poslist] )
+    bestandVorTag = numpy.column_stack( [orderIndex.getHoldings( deppos.wkn ).getBestand( days )
+                                         for deppos in poslist] )
+    werte = (prices*bestand).sum( axis=1 )
+    dividenden = (divDf.to_numpy( dtype=float )*bestandVorTag).sum( axis=1 )
+    einzahlungen = _getOrderFlows( poslist, orderIndex, days )
+    x.gesamtwert = Series( werte, closeDf.index )
+    x.dividenden = int( round( dividenden.sum(), 2 ) )
+
+    # Perioden-Renditen ohne Ein- und Auszahlungen: r[t] = (W[t] + D[t] - E[t]) / W[t-1] - 1
+    prev = werte[:-1]
+    renditen = numpy.divide( werte[1:] + dividenden[1:] - einzahlungen[1:], prev,
+                             out=numpy.ones_like( prev ), where=prev > 0 ) - 1
+    wertentwicklung = numpy.cumprod( 1 + renditen )
+    if len( renditen ) > 0:
+        x.rendite_twr = round( (wertentwicklung[-1] - 1)*100, 2 )
+        x.max_drawdown = round( ((wertentwicklung/numpy.maximum.accumulate( wertentwicklung )).min() - 1)*100, 2 )
+
+    years = (closeDf.index - closeDf.index[0]).total_seconds().to_numpy()/SECONDS_PER_YEAR
+    cashflows = dividenden - einzahlungen
+    cashflows[0] = -werte[0]
+    cashflows[-1] += werte[-1]
+    irr = _computeIrr( cashflows, years )
+    x.rendite_irr = None if irr is None else round( irr*100, 2 )
+
+    periodsPerYear = _getPeriodsPerYear( years )
+    if not window:
+        window = max( 2, int( round( periodsPerYear/4 ) ) )
+    if len( renditen ) >= window:
+        vola = sliding_window_view( renditen, window ).std( axis=1, ddof=1 )*numpy.sqrt( periodsPerYear )*100
+        x.volatilitaet = Series( vola.round( 2 ), closeDf.index[window:] )
+    else:
+        x.volatilitaet = Series( dtype=float )
+
+    kursrenditen = prices[1:]/prices[:-1] - 1
+    with numpy.errstate( divide="ignore", invalid="ignore" ):
+        korr = numpy.corrcoef( kursrenditen, rowvar=False ) if len( kursrenditen ) > 1 \
+            else numpy.full( (len( poslist ), len( poslist )), numpy.nan )
+    tickers = [deppos.ticker for deppos in poslist]
+    x.korrelation = DataFrame( numpy.atleast_2d( korr ).round( 3 ), index=tickers, columns=tickers )
+    return x
+
+def _alignHistories( histories:List[Series] ) -> DataFrame:
+    """
+    Fasst die Historien auf ein gemeinsames Datumsraster (ohne Zeitzone) zusammen.
+    Zeitpunkte, die nicht in allen Historien vorkommen, sind in den übrigen NaN.
+    """
+    columns = dict()
+    for i, series in enumerate( histories ):
+        index = pandas.DatetimeIndex( series.index )
+        if index.tz is not None:
+            index = index.tz_localize( None )
+        columns[i] = Series( series.to_numpy( dtype=float ), index ).groupby( level=0 ).last()
+    return pandas.concat( columns, axis=1 ).sort_index()
+
+def _getOrderFlows( poslist:List[XDepotPosition], orderIndex:OrderIndex, days:List[str] ) -> numpy.ndarray:
+    """
+    Summe der Ordersummen (Kauf positiv, Verkauf negativ), die zwischen dem vorigen und dem jeweiligen Datum
+    in <days> angefallen sind. Orders vor dem ersten Datum sind im Anfangswert enthalten und zählen nicht.
+    """
+    flows = numpy.zeros( len( days ) )
+    orders = [order for wkn in dict.fromkeys( deppos.wkn for deppos in poslist ) for order in orderIndex.getOrders( wkn )]
+    if not orders:
+        return flows
+    orderDays = numpy.array( [order.delta_datum[:10] for order in orders], dtype="U10" )
+    amounts = numpy.array( [order.delta_stck*order.preis_stck for order in orders], dtype=float )
+    slots = numpy.searchsorted( numpy.array( days, dtype="U10" ), orderDays, side="left" )
+    inPeriod = (slots > 0) & (slots < len( days ))
+    numpy.add.at( flows, slots[inPeriod], amounts[inPeriod] )
+    return flows
+
+def _getPeriodsPerYear( years:numpy.ndarray ) -> float:
+    if len( years ) < 2:
+        return 1.0
+    step = numpy.median( numpy.diff( years ) )
+    return 1/step if step > 0 else 1.0
+
+def _computeIrr( cashflows:numpy.ndarray, years:numpy.ndarray, iterations:int=100 ) -> float or None:
+    """
+    Ermittelt den internen Zinsfuß p.a. per Bisektion: sum( cashflows / (1 + irr)**years ) == 0.
+    <cashflows> aus Sicht des Anlegers (Einzahlungen negativ). None, wenn es keinen Vorzeichenwechsel gibt.
+    """
+    if not (cashflows < 0).any() or not (cashflows > 0).any() or years[-1] <= 0:
+        return None
+    def npv( rate:float ) -> float:
+        return float( (cashflows/(1 + rate)**years).sum() )
+    low, high = -0.99, 10.0
+    npvLow = npv( low )
+    if npvLow*npv( high ) > 0:
+        return None
+    for i in range( iterations ):
+        mid = (low + high)/2
+        npvMid = npv( mid )
+        if npvLow*npvMid <= 0:
+            high = mid
+        else:
+            low, npvLow = mid, npvMid
+    return (low + high)/2
+
+
+#################   PortfolioAnalyticsCache   #################################
+class PortfolioAnalyticsCache:
+    """
+    Hält die zuletzt errechneten Kennzahlen je Periode und Intervall für die Dauer der Sitzung.
+    Es gibt nur einen Cache für alle InvestMonitorLogic-Instanzen (MainController, InfoPanelController):
+    eine Order, die über irgendeine Instanz eingefügt wird, verwirft ihn (siehe invalidate()).
+    Zu jedem Eintrag wird der Stand der Historien festgehalten, aus denen er errechnet wurde (Länge und Hashwert
+    des Inhalts, s. _getRevision()); erhalten die Positionen Historien mit anderem Inhalt, gilt der Eintrag
+    nicht mehr.
+    """
+    __instance = None
+    def __init__( self ):
+        if PortfolioAnalyticsCache.__instance:
+            raise Exception( "PortfolioAnalyticsCache is a Single. It may only be instantiated once." )
+        PortfolioAnalyticsCache.__instance = self
+        # key: (Period, Interval), value: (Stand der Historien, Kennzahlen)
+        self._analytics:Dict[Tuple[Period, Interval], Tuple[Tuple, XPortfolioAnalytics]] = dict()
+
+    @staticmethod
+    def inst() -> __instance:
+        if PortfolioAnalyticsCache.__instance is None:
+            PortfolioAnalyticsCache()
+        return PortfolioAnalyticsCache.__instance
+
+    def get( self, period:Period, interval:Interval, poslist:List[XDepotPosition] ) -> XPortfolioAnalytics or None:
+        """
+        Liefert die Kennzahlen für <period> und <interval>, sofern sie aus den aktuellen Historien der
+        Positionen in <poslist> errechnet wurden, sonst None.
+        """
+        cached = self._analytics.get( (period, interval) )
+        if cached and cached[0] == PortfolioAnalyticsCache._getRevision( poslist ):
+            return cached[1]
+        return None
+
+    def put( self, period:Period, interval:Interval, poslist:List[XDepotPosition], analytics:XPortfolioAnalytics ):
+        self._analytics[(period, interval)] = (PortfolioAnalyticsCache._getRevision( poslist ), analytics)
+
+    @staticmethod
+    def _getRevision( poslist:List[XDepotPosition] ) -> Tuple:
+        # Inhalt statt id() der Series: CPython vergibt die id einer freigegebenen Series neu
+        def revision( series:Series ) -> Tuple:
+            if series is None:
+                return None
+            return len( series ), int( pandas.util.hash_pandas_object( series ).sum() )
+        return tuple( (deppos.wkn, revision( deppos.history ), revision( deppos.dividends )) for deppos in poslist )
+
+    def invalidate( self ):
+        """
+        Verwirft alle Kennzahlen (nach dem Einfügen einer Order)
+        """
+        self._analytics.clear()
+
+
+################  TEST TEST TEST   ###########################
+def testPortfolioAnalytics():
+    """
+    Zwei Positionen über ein Jahr, wöchentlich; die zweite wird erst zur Jahresmitte gekauft.
+    Ohne Kursänderung und Dividenden müssen TWR, IRR und Drawdown 0 sein, auch wenn zwischendurch gekauft wird.
+    """
+    import time
+    from interface.interfaces import XDelta
+
+    def createDelta( wkn:str, datum:str, stck:int, preis:float ) -> XDelta:
+        d = XDelta()
+        d.wkn, d.delta_datum, d.delta_stck, d.preis_stck = wkn, datum, stck, preis
+        return d
+
+    index = pandas.date_range( "2023-01-02", periods=53, freq="W-MON", tz="Europe/Berlin" )
+    a, b = XDepotPosition(), XDepotPosition()
+    a.wkn, a.ticker, b.wkn, b.ticker = "A", "A.DE", "B", "B.DE"
+    a.history = Series( 10.0, index )
+    b.history = Series( 20.0, index )
+    orders = OrderIndex( [createDelta( "A", "2022-06-01", 100, 10.0 ), createDelta( "B", "2023-07-05", 50, 20.0 )] )
+    x = computePortfolioAnalytics( [a, b], orders, Period.oneYear, Interval.oneWeek )
+    assert x.gesamtwert.iloc[0] == 1000 and x.gesamtwert.iloc[-1] == 2000
+    assert x.rendite_twr == 0 and x.max_drawdown == 0 and x.rendite_irr == 0, (x.rendite_twr, x.rendite_irr)
+
+    # A steigt linear um 10 %, B fällt um 20 % und erholt sich wieder; eine Dividende auf A
+    a.history = Series( numpy.linspace( 10.0, 11.0, len( index ) ), index )
+    b.history = Series( numpy.concatenate( (numpy.linspace( 20.0, 16.0, 30 ), numpy.linspace( 16.0, 20.0, 23 )) ), index )
+    a.dividends = Series( 0.0, index )
+    a.dividends.iloc[20] = 0.5
+    orders = OrderIndex( [createDelta( "A", "2022-06-01", 100, 10.0 ),
+                          createDelta( "B", "2023-07-05", 50, float( b.history.iloc[27] ) )] )
+    x = computePortfolioAnalytics( [a, b], orders, Period.oneYear, Interval.oneWeek )
+    print( "TWR:", x.rendite_twr, "IRR:", x.rendite_irr, "MaxDD:", x.max_drawdown, "Dividenden:", x.dividenden )
+    print( x.korrelation )
+    assert x.dividenden == 50 and x.rendite_twr > 10 and x.rendite_irr > 0 and x.max_drawdown < 0
+
+    # Laufzeit für 40 Positionen über 5 Jahre, täglich
+    index = pandas.date_range( "2019-01-01", periods=5*252, freq="B" )
+    rng = numpy.random.default_rng( 4711 )
+    poslist, deltas = list(), list()
+    for i in range( 40 ):
+        x = XDepotPosition()
+        x.wkn, x.ticker = "W%d" % i, "T%d" % i
+        x.history = Series( 50*numpy.cumprod( 1 + rng.normal( 0, 0.01, len( index ) ) ), index )
+        poslist.append( x )
+        deltas += [createDelta( x.wkn, str( index[j] )[:10], 10, 50.0 ) for j in range( 0, len( index ), 60 )]
+    orders = OrderIndex( deltas )
+    t = time.perf_counter()
+    x = computePortfolioAnalytics( poslist, orders, Period.fiveYears, Interval.oneDay )
+    print( "40 Positionen, %d Tage: %.1f ms" % (len( index ), (time.perf_counter() - t)*1000) )
+
+    # der Cache muss eine neue Historie gleicher Länge erkennen, auch wenn sie die id der alten erhält
+    cache = PortfolioAnalyticsCache.inst()
+    cache.put( Period.fiveYears, Interval.oneDay, poslist, x )
+    t = time.perf_counter()
+    assert cache.get( Period.fiveYears, Interval.oneDay, poslist ) is x
+    print( "PortfolioAnalyticsCache.get(): %.1f ms" % ((time.perf_counter() - t)*1000) )
+    poslist[0].history = poslist[0].history * 1.01
+    assert cache.get( Period.fiveYears, Interval.oneDay, poslist ) is None
+    cache.invalidate()
+    print( "ok" )
@@ -0,0 +1,122 @@
+from typing import List, Dict, Iterable, Tuple
+
+import numpy
+from pandas import Series
+
+from interface.interfaces import XDelta
+
+
+class Holdings:
+    """
+    Depotbestand eines Wertpapiers (einer WKN) als Treppenfunktion über die Orderdaten.
+    Die Orders werden einmal sortiert und kumuliert; der Bestand zu beliebig vielen Tagen wird dann
+    mit einem einzigen numpy.searchsorted ermittelt statt die Orderliste je Tag von vorn zu durchlaufen.
+    """
+    def __init__( self, deltas:Iterable[XDelta] ):
+        deltas = sorted( deltas, key=lambda d: d.delta_datum )
+        self._dates = numpy.array( [d.delta_datum[:10] for d in deltas], dtype="U10" )
+        # Bestand nach der i-ten Order; gekaufte Stücke werden addiert, verkaufte subtrahiert.
+        # <verkauft_stck> braucht nicht berücksichtigt werden, da es nur eine Aufteilung der Verkäufe
+        # (die hier subtrahiert werden) auf die Käufe darstellt (im Sinne verfügbarer Stücke)
+        self._bestand = numpy.concatenate( ([0], numpy.cumsum( [d.delta_stck for d in deltas], dtype=float )) )
+
+    def getBestand( self, days:Iterable[str], inclusive:bool=False ) -> numpy.ndarray:
+        """
+        Liefert zu jedem Tag in <days> (ISO-Format) den Bestand, der sich aus allen Orders VOR diesem Tag ergibt.
+        :param inclusive: True: auch die Orders AN diesem Tag berücksichtigen (Bestand am Ende des Tages)
+        """
+        days = numpy.asarray( days, dtype="U10" )
+        return self._bestand[numpy.searchsorted( self._dates, days, side="right" if inclusive else "left" )]
+
+    def computeDividends( self, dividends:Series ) -> Tuple[List[str], List[float], List[int]]:
+        """
+        Errechnet für alle Ausschüttungstage in <dividends> die Dividende, die auf den am jeweiligen Tag
+        vorhandenen Bestand bezahlt wurde.
+        :param dividends: Dividenden pro Stück, Index: Ausschüttungstage. Werte <= 0 und NaN werden ignoriert.
+        :return: Ausschüttungstage (ISO), Dividende pro Stück, Dividende auf den Bestand (gerundet auf ganze Euro)
+        """
+        values = dividends.to_numpy( dtype=float )
+        paid = numpy.nan_to_num( values ) > 0
+        values = values[paid]
+        pay_days = [str( ts )[:10] for ts in dividends.index[paid]]
+        amounts = numpy.trunc( numpy.round( self.getBestand( pay_days )*values, 2 ) )
+        return pay_days, values.tolist(), [int( a ) for a in amounts]
+
+
+class OrderIndex:
+    """
+    Orders nach WKN gruppiert und die Zuordnung WKN <-> Ticker als Dictionaries, damit je WKN bzw. Ticker
+    nicht die gesamten Listen durchsucht werden müssen.
+    """
+    def __init__( self, allOrders:Iterable[XDelta], wkn_ticker_list:Iterable[Dict]=() ):
+        self._ordersByWkn:Dict[str, List[XDelta]] = dict()
+        for order in allOrders:
+            self._ordersByWkn.setdefault( order.wkn, list() ).append( order )
+        self._tickerByWkn = {dic["wkn"]: dic["ticker"] for dic in wkn_ticker_list}
+        self._wknByTicker = {dic["ticker"]: dic["wkn"] for dic in wkn_ticker_list}
+        self._holdings:Dict[str, Holdings] = dict()
+
+    def getOrders( self, wkn:str ) -> List[XDelta]:
+        return self._ordersByWkn.get( wkn, list() )
+
+    def getHoldings( self, wkn:str ) -> Holdings:
+        holdings = self._holdings.get( wkn )
+        if holdings is None:
+            holdings = Holdings( self.getOrders( wkn ) )
+            self._holdings[wkn] = holdings
+        return holdings
+
+    def getTicker( self, wkn:str ) -> str or None:
+        return self._tickerByWkn.get( wkn )
+
+    def getWkn( self, ticker:str ) -> str:
+        try:
+            return self._wknByTicker[ticker]
+        except KeyError:
+            raise Exception( "Ticker '%s' nicht in der Ticker-/WKN-Liste gefunden." % ticker )
+
+
+################  TEST TEST TEST   ###########################
+def testHoldings( nwkn=40, norders=200, years=5 ):
+    """
+    Vergleicht die Dividendenberechnung über Holdings mit der bisherigen, die je Ausschüttungstag
+    die sortierte Orderliste von vorn durchläuft.
+    """
+    import random
+    import time
+    import pandas
+
+    def computeDividendOnBestand( deltas:List[XDelta], dividend:float, paydate:str ) -> int:
+        summe_stck = 0
+        for delta in deltas:
+            if delta.delta_datum < paydate:
+                summe_stck += delta.delta_stck
+            else:
+                break
+        return int( round( summe_stck*dividend, 2 ) )
+
+    random.seed( 4711 )
+    index = pandas.date_range( end="2024-03-11", periods=years*52, freq="W-MON", tz="Europe/Berlin" )
+    orderlists, dividendlists = list(), list()
+    for w in range( nwkn ):
+        orders = list()
+        for i in range( norders ):
+            x = XDelta()
+            x.wkn = "WKN%d" % w
+            x.delta_datum = "%d-%02d-%02d" % (random.randint( 2015, 2024 ), random.randint( 1, 12 ), random.randint( 1, 28 ))
+            x.delta_stck = random.choice( (1, 1, 1, -1) )*random.randint( 1, 50 )
+            orders.append( x )
+        orders.sort( key=lambda d: d.delta_datum )
+        orderlists.append( orders )
+        dividendlists.append( Series( [round( random.random(), 3 ) if i % 13 == 0 else 0.0
+                                       for i in range( len( index ) )], index ) )
+
+    t = time.perf_counter()
+    old = [[computeDividendOnBestand( orders, float( v ), str( ts )[:10] ) for ts, v in divs.items() if v > 0]
+           for orders, divs in zip( orderlists, dividendlists )]
+    print( "je Zahltag: %.1f ms" % ((time.perf_counter() - t)*1000) )
+    t = time.perf_counter()
+    new = [Holdings( orders ).computeDividends( divs )[2] for orders, divs in zip( orderlists, dividendlists )]
+    print( "Holdings:   %.1f ms" % ((time.perf_counter() - t)*1000) )
+    assert old == new
+    print( "ok" )
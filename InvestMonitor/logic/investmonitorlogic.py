@@ -1,8 +1,9 @@
 import math
 import threading
 from operator import itemgetter, attrgetter
-from typing import List, Dict, Iterable
+from typing import List, Dict, Iterable, Tuple
 
+import numpy
 from pandas import DataFrame, Series
 import pandas as pd
 from yfinance.scrapers.quote import FastInfo
@@ -10,9 +11,13 @@ from yfinance.scrapers.quote import FastInfo
 import datehelper
 from base.basetablemodel import BaseTableModel, SumTableModel
 from data.db.investmonitordata import InvestMonitorData
+from data.finance.quotefetcher import QuoteFetcher, Quote
 from data.finance.tickerhistory import Period, Interval, TickerHistory, SeriesName
 from imon.enums import InfoPanelOrder
-from interface.interfaces import XDepotPosition, XDelta, XDetail, XDividend
+from logic.analytics import computePortfolioAnalytics, PortfolioAnalyticsCache
+from logic.holdings import Holdings, OrderIndex
+from logic.taxlots import TaxLotLedger, LotLedger
+from interface.interfaces import XDepotPosition, XDelta, XDetail, XDividend, XPortfolioAnalytics
 from imon.definitions import DATABASE_DIR, DEFAULT_PERIOD, DEFAULT_INTERVAL
 
 # class WorkerSignals( QObject ):
@@ -48,10 +53,12 @@ class InvestMonitorLogic:
     def __init__( self ):
         self._db = InvestMonitorData()
         self._tickerHist = TickerHistory()
+        self._quoteFetcher = QuoteFetcher()
         self._defaultPeriod = DEFAULT_PERIOD #Period.oneYear
         self._defaultInterval = DEFAULT_INTERVAL
         self._minPeriod = Period.oneDay
         self._minInterval = Interval.oneMin
+        self._taxLotLedger:TaxLotLedger = None
 
     # def saveMyHistories( self ):
     #     histDf:DataFrame = self.getMyTickerHistories( self._defaultPeriod, self._defaultInterval )
@@ -108,11 +115,11 @@ class InvestMonitorLogic:
         deppos:XDepotPosition = self._db.getDepotPosition( ticker )
         #self.provideTickerHistories( [deppos,], period=period, interval=interval )
         self._provideOrderData( deppos )
-        self.provideFastInfo( [deppos,] )
+        quote = self._quoteFetcher.fetchQuote( ticker )
         tickerHistory:DataFrame = self._tickerHist.getTickerHistoryByPeriod( ticker, period, interval )
         closeHist:Series = tickerHistory[SeriesName.Close.value]
         dividends:Series = tickerHistory[SeriesName.Dividends.value]
-        self._provideWertpapierData( deppos, closeHist, dividends )
+        self._provideWertpapierData( deppos, closeHist, dividends, quote )
         return deppos
 
     def getDepotPositions( self, period:Period, interval:Interval, TEST=False ) -> List[XDepotPosition]:
@@ -131,46 +138,80 @@ class InvestMonitorLogic:
         ###################################
         poslist:List[XDepotPosition] = self._db.getDepotPositions()
         # Wertpapierdaten in Positionen eintragen (Kursverlauf, Dividenden etc.)
-        # thread = threading.Thread( target=InvestMonitorLogic.provideFastInfo, args=(poslist,) )
+        # thread = threading.Thread( target=self.provideFastInfo, args=(poslist,) )
         # thread.start()
         poslist = self.provideTickerHistories( poslist, period, interval )
         # thread.join()
         return poslist
 
-    @staticmethod
-    def provideFastInfo( poslist:Iterable[XDepotPosition] ):
+    def provideFastInfo( self, poslist:Iterable[XDepotPosition] ):
         """
         Wird von getDepotPositions() in einem separaten Thread aufgerufen und versorgt
         in aas Attribut fastInfo in allen übergebenen XDepotPositon-Objekten
         :param poslist: Iterable of XDepotPosition
         :return:
         """
+        quotes = self._quoteFetcher.fetchQuotes( [deppos.ticker for deppos in poslist] )
         for deppos in poslist:
-            deppos.fastInfo =TickerHistory.getFastInfo( deppos.ticker )
+            deppos.fastInfo = quotes[deppos.ticker].fastInfo
 
     def provideTickerHistories( self, poslist:List[XDepotPosition], period:Period, interval:Interval ) -> List[XDepotPosition]:
         tickerlist = [pos.ticker for pos in poslist]
-        tickerHistories: DataFrame = self._tickerHist.getTickerHistoriesByPeriod( tickerlist,
+        histories = self.getHistorySeries( tickerlist, period, interval )
+        # FastInfo aller Positionen parallel holen statt je Position nacheinander:
+        quotes:Dict[str, Quote] = self._quoteFetcher.fetchQuotes( tickerlist )
+        for deppos in poslist:
+            self._provideOrderData( deppos )
+            if deppos.ticker not in histories:
+                print( deppos.ticker, " not found in DataFrame closeDf" )
+                continue
+            closeHist, dividends = histories[deppos.ticker]
+            self._provideWertpapierData( deppos, closeHist, dividends, quotes[deppos.ticker] )
+        return poslist
+
+    def getDepotPositionsWithoutMarketData( self ) -> List[XDepotPosition]:
+        """
+        Liefert die Depot-Positionen inkl. der Bestände, aber ohne Kurse, Historien und Dividenden.
+        Macht keine Netzzugriffe; die Marktdaten werden mit provideMarketData() nachgeliefert.
+        """
+        poslist:List[XDepotPosition] = self._db.getDepotPositions()
+        for deppos in poslist:
+            self._provideOrderData( deppos )
+        return poslist
+
+    def getDeltasByWkn( self, wkns:Iterable[str] ) -> Dict[str, List[XDelta]]:
+        """
+        Liefert die Orders zu den übergebenen WKN (key: wkn).
+        Muss im GUI-Thread aufgerufen werden, damit provideMarketData() ohne DB-Zugriff auskommt.
+        """
+        return {wkn: self._db.getDeltas( wkn ) for wkn in wkns}
+
+    def getHistorySeries( self, tickers:List[str], period:Period, interval:Interval ) -> Dict[str, Tuple[Series, Series]]:
+        """
+        Liefert je Ticker die Kurs- und die Dividenden-Historie (key: ticker, value: (close, dividends)).
+        Ticker, die in den Historien nicht enthalten sind, fehlen im Dictionary.
+        Macht keine DB-Zugriffe, darf also aus einem separaten Thread aufgerufen werden.
+        """
+        tickerHistories: DataFrame = self._tickerHist.getTickerHistoriesByPeriod( tickers,
                                                                                   period=period,
                                                                                   interval=interval )
         tickerHistories = self._checkForNaN( tickerHistories )
         closeDf: DataFrame = tickerHistories[SeriesName.Close.value]
         dividendsDf: DataFrame = tickerHistories[SeriesName.Dividends.value]
-        for deppos in poslist:
-            self._provideOrderData( deppos )
-            try:
-                if isinstance( closeDf, Series ):
-                    closeHist:Series = closeDf
-                    dividends: Series = dividendsDf
-                else:
-                    closeHist: Series = closeDf[deppos.ticker]
-                    dividends: Series = dividendsDf[deppos.ticker]
-            except Exception as ex:
-                print( deppos.ticker, " not found in DataFrame closeDf" )
-                return poslist
+        if isinstance( closeDf, Series ):
+            return {ticker: (closeDf, dividendsDf) for ticker in tickers}
+        return {ticker: (closeDf[ticker], dividendsDf[ticker]) for ticker in tickers if ticker in closeDf.columns}
 
-            self._provideWertpapierData( deppos, closeHist, dividends )
-        return poslist
+    def provideMarketData( self, deppos:XDepotPosition, closeHist:Series, dividends:Series, quote:Quote,
+                           deltas:List[XDelta], period:Period, interval:Interval ) -> None:
+        """
+        Trägt Historie, Kurs- und Dividendendaten in <deppos> ein.
+        Macht keine DB-Zugriffe, darf also aus einem separaten Thread aufgerufen werden.
+        :param deltas: die Orders zu deppos.wkn (siehe getDeltasByWkn())
+        """
+        self._provideWertpapierData( deppos, closeHist, dividends, quote, deltas )
+        deppos.history_period = period
+        deppos.history_interval = interval
 
     @staticmethod
     def _checkForNaN( df:DataFrame ) -> DataFrame:
@@ -178,19 +219,20 @@ class InvestMonitorLogic:
         for name, cellValues in row.items():
             # name: Spaltenkopf, z.B. EZTQ.F
             # cellValues: die Values von row
-            if math.isnan( cellValues[0] ):
+            if math.isnan( cellValues.iloc[0] ):
                 df = df[:-1]
                 break
         return df
 
-    def _provideWertpapierData( self, deppos:XDepotPosition, closeHist:Series, dividends:Series ) -> None:
+    def _provideWertpapierData( self, deppos:XDepotPosition, closeHist:Series, dividends:Series,
+                                quote:Quote=None, deltas:List[XDelta]=None ) -> None:
         deppos.history = closeHist
         deppos.history_period = self._defaultPeriod
         deppos.history_interval = self._defaultInterval
         deppos.dividends = dividends
         deppos.dividend_yield = 0.0
 
-        orig_currency = self._provideFastInfoData( deppos )
+        orig_currency = self._provideFastInfoData( deppos, quote )
         if not orig_currency:
             return
         if deppos.kurs_aktuell == 0:
@@ -208,58 +250,32 @@ class InvestMonitorLogic:
             first_kurs_period = closeHist.array[0]
             deppos.dividend_yield = self._computeDividendYield( first_kurs_period, deppos.dividend_period )
         self._provideGesamtwertAndDelta( deppos )
-        deltas = self._db.getDeltas( deppos.wkn )
+        if deltas is None:
+            deltas = self._db.getDeltas( deppos.wkn )
         deppos.dividend_paid_period = \
-            self._getPaidDividends( deppos.dividends, deltas ) # Summe der Dividendenzahlungen,
+            self._getPaidDividends( deppos.dividends, Holdings( deltas ) ) # Summe der Dividendenzahlungen,
                                                                # die während d. Perdiode
                                                                # auf meinen Bestand gezahlt wurden
 
-    def _getPaidDividends( self, dividends:Series, deltas:List[XDelta], callback=None ) -> int:
+    @staticmethod
+    def _getPaidDividends( dividends:Series, holdings:Holdings, callback=None ) -> int:
         """
         Ermittelt die Dividendenzahlungen, die für <deppos> gemäß Eintragungen in <dividends> angefallen sind.
         Für jede Dividendenzahlung wird nur der zum Zahlungszeitpunkt vorhandene Depotbestand berücksichtigt.
+        Die Bestände zu allen Zahltagen werden in einem Schritt aus <holdings> ermittelt.
         :param dividends: Die Dividenden-Serie. Es wird vorausgesetzt, dass sie in Euro übergeben wird.
-        :param deltas: Alle Orders, die sich auf <wkn> beziehen
-        :param callback: Funktion, die aufgerufen wird für jede Dividendensumme, die durch _computeDividendOnBestand
+        :param holdings: Der Bestand der Position, gebildet aus allen Orders, die sich auf <wkn> beziehen
+        :param callback: Funktion, die aufgerufen wird für jede Dividendensumme, die auf einen Bestand
                         ausgerechnet wurde.
                         Die Callback-Funktion muss 3 Argumente empfangen: den Div.-Zahltag (ISO), die Div. pro Stück
                         und die Gesamt-Dividende, die auf den am Zahltag vorhandenen Bestand ausgezahlt wurde.
         :return:
         """
-        deltas.sort( key=attrgetter( "delta_datum" ) )
-        sum_dividends = 0
-        for pay_ts, value in dividends.items():
-            if value > 0:
-                #print( "paid: ", str(pay_ts)[:10], ": ", value )
-                # den Depotbestand der Position <deppos> zum Datum <paydate> ermitteln:
-                div_pro_stck = float( value )
-                pay_day = str( pay_ts )[:10]
-                div = self._computeDividendOnBestand( deltas, div_pro_stck, pay_day )
-                if callback:
-                    callback( pay_day, div_pro_stck, div )
-                sum_dividends += div
-        return sum_dividends
-
-    @staticmethod
-    def _computeDividendOnBestand( deltas:List[XDelta], dividend:float, paydate:str ) -> int:
-        """
-        Errechnet die Dividende, die auf den am Ausschüttungstag <paydate> vorhandenen Bestand bezahlt wurde.
-        :param deltas: Alle Käufe u. Verkäufe eines bestimmten Fonds (oder Aktie)
-                       Es wird vorausgesetzt, dass deltas nach <delta_datum> aufsteigend sortiert ist.
-        :param dividend: an paydate bezahlte Dividende pro Stück
-        :param paydate: Ausschüttungstag (ISO-Format)
-        :return:
-        """
-        summe_stck = 0
-        for delta in deltas:
-            if delta.delta_datum < paydate:
-                summe_stck += delta.delta_stck # gekaufte Stücke werden addiert, verkaufte subtrahiert.
-                                               # <delta.verkauft_stck> braucht nicht berücksichtigt werden,
-                                               # da sie nur eine Aufteilung der Verkäufe (die hier subtrahiert werden)
-                                               # auf die Käufe darstellen (im Sinne verfügbarer Stücke)
-            else:
-                break
-        return int(round( summe_stck * dividend, 2 ) )
+        pay_days, divs_pro_stck, divs = holdings.computeDividends( dividends )
+        if callback:
+            for pay_day, div_pro_stck, div in zip( pay_days, divs_pro_stck, divs ):
+                callback( pay_day, div_pro_stck, div )
+        return sum( divs )
 
     @staticmethod
     def _provideGesamtwertAndDelta( deppos:XDepotPosition ):
@@ -287,12 +303,20 @@ class InvestMonitorLogic:
         x.history_period = period
         x.history_interval = interval
 
-    def updateKursAndDivYield( self, deppos:XDepotPosition ):
-        self._provideFastInfoData( deppos )
+    def updateKursAndDivYield( self, deppos:XDepotPosition, quote:Quote=None ) -> int:
+        """
+        Aktualisiert Kurs, Kursänderung zum Vortag, Dividendenrendite und Gesamtwert von <deppos>.
+        :param quote: der aktuelle Kurs. Wenn None, wird er hier abgefragt.
+        :return: die Änderung von deppos.gesamtwert_aktuell
+        """
+        gesamtwert_alt = deppos.gesamtwert_aktuell
+        self._provideFastInfoData( deppos, quote )
+        self._provideGesamtwertAndDelta( deppos )
         if deppos.kurs_aktuell > 0 and deppos.dividend_period > 0:
             first_kurs_period = deppos.history.array[0]
             # deppos.dividend_yield = self._computeDividendYield( deppos.kurs_aktuell, deppos.dividend_period )
             deppos.dividend_yield = self._computeDividendYield( first_kurs_period, deppos.dividend_period )
+        return deppos.gesamtwert_aktuell - gesamtwert_alt
 
     @staticmethod
     def _computeDividendYield( kurs:float, dividend:float ) -> float:
@@ -323,33 +347,31 @@ class InvestMonitorLogic:
             return round( avg_annual_yield/kurs_aktuell*100, 2 )
         return 0.0
 
-    def _provideFastInfoData( self, deppos:XDepotPosition ) -> str:
+    def _provideFastInfoData( self, deppos:XDepotPosition, quote:Quote=None ) -> str:
         """
         Ermittelt die yfinance.Ticker.fast_info des Wertpapiers und schreibt sie in <deppos>
         Transformiert den letzten Kurs (fast_info.last_price) in EUR, wenn er nicht in EUR geliefert wird.
         :param deppos: das XDepotPosition-Objekt, das mit den FastInfo-Daten versorgt werden soll.
+        :param quote: die bereits ermittelten FastInfo-Daten. Wenn None, werden sie hier abgefragt.
         :return: die ursprüngliche Währung (EUR oder Fremdwährung, die konvertiert wurde)
         """
-        fastInfo: FastInfo = self._tickerHist.getFastInfo( deppos.ticker )
-        if fastInfo:
-            deppos.fastInfo = fastInfo
-            last_price = fastInfo.last_price
-            currency = str( fastInfo.currency )
+        if quote is None:
+            quote = self._quoteFetcher.fetchQuote( deppos.ticker )
+        if quote.isValid():
+            deppos.fastInfo = quote.fastInfo
+            last_price = quote.last_price
+            currency = quote.currency
             if currency != "EUR":
                 last_price = TickerHistory.convertToEuro( last_price, currency )
             deppos.kurs_aktuell = round( last_price, 3 )
-            try:
-                # wegen des lazy loading der fast_info geht das hin und wieder schief
-                previous_close = fastInfo.previous_close
-                if previous_close:
-                    deltaPrice = fastInfo.last_price - previous_close
-                    # Verhältnis des akt. Kurses zum Schlusskurs des Vortages:
-                    deppos.delta_kurs_1_percent = round( deltaPrice / previous_close * 100, 2 )
-                else:
-                    deppos.delta_kurs_1_percent = 0
-                    print( deppos.ticker, ": fastInfo.previous_close is None." )
-            except Exception as ex:
-                print( deppos.ticker, ": Zugriff auf Feld previous_close nicht möglich." )
+            previous_close = quote.previous_close
+            if previous_close:
+                deltaPrice = quote.last_price - previous_close
+                # Verhältnis des akt. Kurses zum Schlusskurs des Vortages:
+                deppos.delta_kurs_1_percent = round( deltaPrice / previous_close * 100, 2 )
+            else:
+                deppos.delta_kurs_1_percent = 0
+                print( deppos.ticker, ": fastInfo.previous_close is None." )
             return currency
         else:
             print( "Ticker '%s':\nNo FastInfo available" % deppos.ticker )
@@ -363,10 +385,10 @@ class InvestMonitorLogic:
         :return: den letzten Kurs in Euro, gerundet auf 3 Stellen hinter dem Komma
                  UND die ursprüngliche Währung (EUR oder Fremdwährung, die konvertiert wurde)
         """
-        fastInfo: FastInfo = self._tickerHist.getFastInfo( ticker )
-        if fastInfo:
-            last_price = fastInfo.last_price
-            currency = str( fastInfo.currency )
+        quote = self._quoteFetcher.fetchQuote( ticker )
+        if quote.isValid():
+            last_price = quote.last_price
+            currency = quote.currency
             if currency != "EUR":
                 last_price = TickerHistory.convertToEuro( last_price, currency )
             return round( last_price, 3 ), currency
@@ -377,24 +399,14 @@ class InvestMonitorLogic:
     @staticmethod
     def _convertSeries( series:Series, currency:str ):
         """
-        Übersetzt alle Werte in series.values in Euro und schreibt sie in eine Liste.
-        Macht daraus und aus series.index eine neue Series und gibt diese zurück.
+        Übersetzt alle Werte in series.values in Euro (in einem Schritt, nicht Wert für Wert) und liefert sie
+        mit series.index als neue Series zurück. NaN-Werte werden 0.
         Das muss sein, damit die Beschriftung der y-Achse im Graphen stimmt.
         :param series:
         :param currency: Währung wie in FastInfo eingetragen. (GBp also noch nicht in GBP umgewandelt.)
         :return:
         """
-        values = series.values
-        vlist = list()
-        for value in values:
-            if not math.isnan( value ):
-                value = TickerHistory.convertToEuro( value, currency )
-            else:
-                value = 0
-            vlist.append( value )
-        index = series.index
-        serNew = Series(vlist, index)
-        return serNew
+        return TickerHistory.convertSeriesToEuro( series, currency )
 
     def _provideOrderData( self, deppos: XDepotPosition ):
         """
@@ -477,21 +489,60 @@ class InvestMonitorLogic:
         Fügt eine Order (Kauf oder Verkauf) in Tabelle delta ein.
         Danach werden die deppos-Attribute stueck, gesamtkaufpreis, preisprostueck und ggf. maxKaufpreis oder minKaufpreis
         geändert. Außerdem werden gesamtwert_aktuell und delta_proz neu berechnet.
+        Insert und ggf. die Buchung eines Verkaufs auf die Käufe erfolgen in einer Transaktion.
         :param delta: die Daten der neuen Order
         :param deppos: die Depotposition, die sich durch die Order verändert
         :return:
         """
         delta.order_summe = abs( round( delta.preis_stck * delta.delta_stck, 2 ) )
-        self._db.insertDelta( delta )
-        if delta.delta_stck < 0:
-            # es ist ein Verkauf, jetzt muss die verkaufte Stückzahl in einen oder mehrere Kauf-Sätze
-            # gebucht werden
-            self._bookShareSale( delta, deppos )
-        self._db.commit()
+        # Die Lots vor dem Insert holen: würden sie erst danach aus der DB gebildet, enthielten sie die neue Order
+        # schon, und addKauf() nähme sie ein zweites Mal auf.
+        ledger = self._getTaxLotLedger().getLotLedger( delta.wkn )
+        try:
+            delta.id = self._db.insertDelta( delta )
+            if delta.delta_stck < 0:
+                # es ist ein Verkauf, jetzt muss die verkaufte Stückzahl in einen oder mehrere Kauf-Sätze
+                # gebucht werden
+                self._bookShareSale( delta, ledger )
+            else:
+                ledger.addKauf( delta )
+            self._db.commit()
+        except Exception:
+            self._db.rollback()
+            self._taxLotLedger = None # wird beim nächsten Zugriff neu aus der DB gebildet
+            raise
+        PortfolioAnalyticsCache.inst().invalidate()
         self._provideOrderData( deppos )
         self._provideGesamtwertAndDelta( deppos )
 
-    def _bookShareSale( self, verkauf:XDelta, deppos:XDepotPosition ):
+    def _getTaxLotLedger( self ) -> TaxLotLedger:
+        """
+        Liefert die FIFO-Lots aller WKN. Sie werden beim ersten Aufruf mit einem einzigen Select gebildet
+        und danach bei jeder Order fortgeschrieben.
+        """
+        if not self._taxLotLedger:
+            self._taxLotLedger = TaxLotLedger( self._db.getAllKaeufe() )
+        return self._taxLotLedger
+
+    def getPortfolioAnalytics( self, poslist:List[XDepotPosition], period:Period,
+                               interval:Interval ) -> XPortfolioAnalytics:
+        """
+        Liefert die Kennzahlen (Wertverlauf, Renditen, Drawdown, Volatilität, Korrelationen) über alle Positionen
+        in <poslist>, deren Historien für <period> und <interval> geladen sein müssen.
+        Das Ergebnis wird je Periode und Intervall im PortfolioAnalyticsCache gespeichert, bis eine Order
+        eingefügt wird oder sich der Inhalt der Historien der Positionen ändert.
+        Muss im GUI-Thread aufgerufen werden (die Orders werden aus der DB gelesen).
+        """
+        cache = PortfolioAnalyticsCache.inst()
+        analytics = cache.get( period, interval, poslist )
+        if analytics:
+            return analytics
+        orderIndex = OrderIndex( self._db.getAllDeltas() )
+        analytics = computePortfolioAnalytics( poslist, orderIndex, period, interval )
+        cache.put( period, interval, poslist, analytics )
+        return analytics
+
+    def _bookShareSale( self, verkauf:XDelta, ledger:LotLedger ):
         """
         nach einem Anteilsverkauf muss zur späteren Berechnung der Abgeltungssteuer die Anzahl der verkauften Stücke
         auf die vorherigen Käufe verteilt werden.
@@ -500,63 +551,35 @@ class InvestMonitorLogic:
         Es gibt 2 Käufe, der ältere mit 80 Stück, der jüngere mit 40 Stück.
         Gem FIFO-Prinzip müssen nun im älteren Kauf 80 verkaufte Stück eingetragen werden und im neueren Kauf
         20 Stück.
-        Nach diesen Datenbank-Updates müssen in der Schnittstelle <deppos> die Felder stueck und einstandswert_restbestand
-        neu berechnet werden.
+        Die Verteilung erfolgt im <ledger>, die geänderten Kauf-Sätze werden mit einem Statement geschrieben.
+        Stück und Einstandswert der Depotposition werden danach von _provideOrderData() neu berechnet.
         :param verkauf:
-        :param deppos:
+        :param ledger: die Käufe der WKN des Verkaufs
         :return:
         """
-        # Zuerst die Kauf-Orders dieses Wertpapiers holen:
-        deltas:List[XDelta] = self._db.getKaeufe( verkauf.wkn ) # sortiert nach Kaufdatum aufsteigend, also ältester Kauf oben
-        verkaufte_stuecke = verkauf.delta_stck * -1
-        rest = verkaufte_stuecke
-        deppos.stueck = 0
-        deppos.einstandswert_restbestand = 0
-        for delta in deltas:
-            vfgbar = delta.delta_stck - delta.verkauft_stck
-            if vfgbar >= rest:
-                # es gibt in diesem Satz (Kauf) soviele verfügbare Stücke, dass der Verkauf aus ihnen bedient
-                # werden kann
-                delta.verkauft_stck += rest
-                rest = 0
-            else:
-                # nicht genügend Stücke für den Verkauf vorhanden. Die vorhandenen in verkauft_stck eintragen.
-                delta.verkauft_stck += vfgbar
-                rest -= vfgbar
-            self._db.updateDeltaVerkaufteStuecke( delta.id, delta.verkauft_stck )
-            deppos.stueck += rest
-            deppos.einstandswert_restbestand += (rest * delta.preis_stck)
-            if rest == 0:
-                break
-        if deppos.stueck > 0:
-            # Durchschnittl. Preis pro Stück:
-            deppos.preisprostueck = round( deppos.einstandswert_restbestand / deppos.stueck, 2 )
+        changes = ledger.bookSale( verkauf.delta_stck * -1 )
+        self._db.updateDeltasVerkaufteStuecke( changes )
 
     def computeAbgeltungssteuer( self, wkn:str, kurs:float, stck:int ) -> int:
         """
         Berechnet die Abgeltungssteuer, die bei einem Verkauf von <stck> Papieren <wkn> bei aktuellem Kurs <kurs>
-        fällig würden
+        fällig würden. Verkauft wird gem. FIFO aus den ältesten noch verfügbaren Käufen.
         :param wkn:
         :param kurs:
         :param stck:
         :return: die fällige Abgeltungssteuer
         """
-        deltas: List[XDelta] = self._db.getKaeufe( wkn )  # sortiert nach Kaufdatum aufsteigend, also ältester Kauf oben
-        rest = stck
-        steuer = 0 # fällige Abgeltungssteuer
-        for delta in deltas:
-            vfgbar = delta.delta_stck - delta.verkauft_stck # so viele Stücke sind von dieser Order noch verfügbar
-            if rest >= vfgbar:  # alle verfügbaren Stücke des Kaufes <delta> werden für den gewünschten Verkauf benötigt
-                vk = vfgbar
-                rest -= vk
-            else:
-                vk = rest
-            if vk > 0:
-                kaufpreis = vk * delta.preis_stck # das war der damalige Order-Preis
-                vk_preis = vk * kurs  # das wäre der aktuelle Verkaufspreis
-                delta = vk_preis - kaufpreis # Gewinn bzw. Verlust dieser Order bei jetzigem Verkauf; negativ bei Verlust
-                steuer += (delta * 0.25) # 25% Abgeltungssteuer auf das Delta
-        return int( round(steuer, 2) )
+        steuer = self._getTaxLotLedger().getLotLedger( wkn ).computeAbgeltungssteuer( stck, kurs )
+        return int( round( float( steuer ), 2 ) )
+
+    def getAbgeltungssteuerKurve( self, wkn:str, kurs:float, max_stck:int ) -> Tuple[List[int], List[int]]:
+        """
+        Berechnet die Abgeltungssteuer für jede Stückzahl von 0 bis <max_stck> (Was-wäre-wenn-Kurve).
+        :return: die Stückzahlen und die jeweils fällige Abgeltungssteuer
+        """
+        stueck = numpy.arange( max( int( max_stck ), 0 ) + 1 )
+        steuer = self._getTaxLotLedger().getLotLedger( wkn ).computeAbgeltungssteuer( stueck, kurs )
+        return stueck.tolist(), [int( v ) for v in numpy.round( steuer, 2 )]
 
     def getAllWknTickersForDividendComputation( self ) -> List[Dict]:
         """
@@ -574,11 +597,6 @@ class InvestMonitorLogic:
         :param period: Gibt die Periode an, für die die Dividendenzahlungen ermittelt werden sollen
         :return:
         """
-        def getTicker( wkn:str) -> str:
-            for dic in wkn_ticker_list:
-                if dic["wkn"] == wkn:
-                    return dic["ticker"]
-
         def createXDividendAndAddToList( pay_day, div_pro_stck, div ):
             #print( pay_day, div_pro_stck, div )
             xdiv = XDividend()
@@ -597,18 +615,23 @@ class InvestMonitorLogic:
         histlist: DataFrame = \
             self._tickerHist.getTickerHistoriesByPeriod( ticker_list, period=period, interval=Interval.oneWeek )
         dividends: DataFrame = histlist[SeriesName.Dividends.value]
-        allOrders: List[XDelta] = self.getAllOrdersList()
+        currencies = self._quoteFetcher.fetchCurrencies( ticker_list )
+        orderIndex = OrderIndex( self.getAllOrdersList(), wkn_ticker_list )
         wkn_list = [x["wkn"] for x in wkn_ticker_list]
         for wkn in wkn_list:
-            wkn_orders = [order for order in allOrders if order.wkn == wkn ]
+            wkn_orders = orderIndex.getOrders( wkn )
             if len( wkn_orders ) > 0:
                 name = wkn_orders[0].name
-                ticker = getTicker( wkn )
+                ticker = orderIndex.getTicker( wkn )
                 divs = dividends[ticker]
-                currency = TickerHistory.getCurrency( ticker )
+                currency = currencies[ticker]
+                if not currency:
+                    # Währung nicht ermittelbar (Abfrage fehlgeschlagen): ohne Umrechnung keine Dividenden
+                    print( "Ticker '%s':\ngetPaidDividendsTableModel(): no currency available" % ticker )
+                    continue
                 if currency != "EUR":
                     divs = self._convertSeries( divs, currency )
-                self._getPaidDividends( divs, wkn_orders, callback=createXDividendAndAddToList )
+                self._getPaidDividends( divs, orderIndex.getHoldings( wkn ), callback=createXDividendAndAddToList )
 
         tm = SumTableModel( xdiv_list, None, ("div_summe",) )
         tm.setKeyHeaderMappings2( ( "name", "wkn", "ticker", "pay_day", "div_pro_stck", "div_summe" ),
@@ -624,32 +647,27 @@ class InvestMonitorLogic:
         :param allOrders: Alle Orders aus Tabelle <delta>
         :return: die Dividendensumme
         """
-        def getWkn( tickr:str ) -> str:
-            for dic in wkn_ticker_list:
-                if tickr == dic["ticker"]:
-                    return dic["wkn"]
-            raise Exception( "Ticker '%s' nicht in der Ticker-/WKN-Liste gefunden." )
-
-        def getOrders( wkn:str ) -> List[XDelta]:
-            orderlist = [order for order in allOrders if order.wkn == wkn]
-            return orderlist
-
+        orderIndex = OrderIndex( allOrders, wkn_ticker_list )
         tickers = [d["ticker"] for d in wkn_ticker_list]
         histlist:DataFrame = \
             self._tickerHist.getTickerHistoriesByPeriod( tickers, period=Period.currentYear, interval=Interval.oneWeek )
         dividends:DataFrame = histlist[SeriesName.Dividends.value]
+        currencies = self._quoteFetcher.fetchCurrencies( tickers )
         sum_dividends = 0
         for ticker in tickers:
             if isinstance( dividends, Series ):
                 divs = dividends
             else:
                 divs = dividends[ticker]
-            currency = TickerHistory.getCurrency( ticker )
+            currency = currencies[ticker]
+            if not currency:
+                # Währung nicht ermittelbar (Abfrage fehlgeschlagen): ohne Umrechnung keine Dividenden
+                print( "Ticker '%s':\ngetSumDividendsCurrentYear(): no currency available" % ticker )
+                continue
             if currency != "EUR":
                 divs = self._convertSeries( divs, currency )
-            wkn = getWkn( ticker )
-            orders = getOrders( wkn )
-            sum_dividends += self._getPaidDividends( divs, orders )
+            wkn = orderIndex.getWkn( ticker )
+            sum_dividends += self._getPaidDividends( divs, orderIndex.getHoldings( wkn ) )
         return sum_dividends
 
 ##################################################################################
@@ -669,6 +687,40 @@ def testGetSumDividendsCurrentYear():
     sum = l.getSumDividendsCurrentYear()
     print( sum )
 
+def benchmarkOnRecordedData( recordingDir:str, latency:float=0.05, record:bool=False, runs:int=3 ):
+    """
+    Misst getDepotPositions, getPaidDividendsTableModel und getSumDividendsCurrentYear ohne Netzzugriff
+    mit den in <recordingDir> aufgezeichneten Marktdaten, so dass die Zeiten reproduzierbar sind.
+    Jeder Lauf beginnt mit leerem HistoryStore, die simulierte Antwortzeit je Anfrage ist <latency> Sekunden.
+    :param record: True: die Marktdaten vorher einmal über yfinance abrufen und in <recordingDir> aufzeichnen
+    """
+    import time
+    from data.finance.marketdata import RecordingMarketDataProvider, ReplayMarketDataProvider, \
+        YFinanceMarketDataProvider
+
+    def measure( logic:InvestMonitorLogic ) -> Dict[str, float]:
+        times = dict()
+        t = time.perf_counter()
+        logic.getDepotPositions( Period.oneYear, Interval.oneWeek )
+        times["getDepotPositions"] = time.perf_counter() - t
+        t = time.perf_counter()
+        logic.getPaidDividendsTableModel( Period.oneYear )
+        times["getPaidDividendsTableModel"] = time.perf_counter() - t
+        t = time.perf_counter()
+        logic.getSumDividendsCurrentYear( logic.getAllWknTickersForDividendComputation(), logic.getAllOrdersList() )
+        times["getSumDividendsCurrentYear"] = time.perf_counter() - t
+        return times
+
+    if record:
+        TickerHistory.setMarketDataProvider( RecordingMarketDataProvider( YFinanceMarketDataProvider(), recordingDir ) )
+        measure( InvestMonitorLogic() )
+    for run in range( runs ):
+        provider = ReplayMarketDataProvider( recordingDir, latency=latency )
+        TickerHistory.setMarketDataProvider( provider )
+        times = measure( InvestMonitorLogic() )
+        print( "Lauf %d (%d Anfragen): " % (run + 1, provider.calls) +
+               ", ".join( "%s: %.2f s" % (name, sec) for name, sec in times.items() ) )
+
 def testComputeAbgeltungssteuer():
     logic = InvestMonitorLogic()
     steuer = logic.computeAbgeltungssteuer( "ABCDEF", 31.00, 12 )
@@ -0,0 +1,168 @@
+from typing import List, Dict, Iterable, Tuple
+
+import numpy
+
+from interface.interfaces import XDelta
+
+ABGELTUNGSSTEUER_SATZ = 0.25
+
+
+class LotLedger:
+    """
+    Die Kauf-Orders (Lots) einer WKN in FIFO-Reihenfolge (ältester Kauf zuerst) mit den noch verfügbaren Stücken.
+    Über die verfügbaren Stücke und deren Einstandswerte werden Präfixsummen gehalten, so dass der Einstandswert
+    der ersten N verfügbaren Stücke mit einer binären Suche ermittelt wird, statt die Lots von vorn zu durchlaufen.
+    Die Präfixsummen werden nach jeder Änderung (Kauf, Verkauf) neu gebildet.
+    """
+    def __init__( self, kaeufe:Iterable[XDelta]=() ):
+        self._lots:List[XDelta] = sorted( kaeufe, key=lambda d: (d.delta_datum, d.id) )
+        self._cumStck:numpy.ndarray = None
+        self._cumWert:numpy.ndarray = None
+        self._preise:numpy.ndarray = None
+        self._update()
+
+    def _update( self ):
+        vfgbar = numpy.array( [d.delta_stck - d.verkauft_stck for d in self._lots], dtype=float )
+        self._preise = numpy.array( [d.preis_stck for d in self._lots], dtype=float )
+        self._cumStck = numpy.concatenate( ([0.0], numpy.cumsum( vfgbar )) )
+        self._cumWert = numpy.concatenate( ([0.0], numpy.cumsum( vfgbar*self._preise )) )
+
+    def getVerfuegbareStueck( self ) -> int:
+        return int( self._cumStck[-1] )
+
+    def getEinstandswert( self, stck ) -> numpy.ndarray or float:
+        """
+        Liefert den Einstandswert der ersten <stck> verfügbaren Stücke (FIFO). <stck> darf auch ein Array sein.
+        Mehr als die verfügbaren Stücke werden nicht berücksichtigt.
+        """
+        stck = numpy.minimum( numpy.asarray( stck, dtype=float ), self._cumStck[-1] )
+        if len( self._lots ) == 0:
+            return stck*0.0
+        # k: Anzahl der Lots, die vollständig benötigt werden; aus Lot k werden die restlichen Stücke genommen
+        k = numpy.searchsorted( self._cumStck, stck, side="right" ) - 1
+        k = numpy.minimum( k, len( self._lots ) - 1 )
+        return self._cumWert[k] + (stck - self._cumStck[k])*self._preise[k]
+
+    def computeAbgeltungssteuer( self, stck, kurs:float ) -> numpy.ndarray or float:
+        """
+        Liefert die Abgeltungssteuer auf den Gewinn (bzw. die Gutschrift bei Verlust, dann negativ),
+        der bei einem Verkauf von <stck> Stücken zu <kurs> anfiele. <stck> darf auch ein Array sein
+        (Steuer in Abhängigkeit von der Stückzahl).
+        """
+        stck = numpy.minimum( numpy.asarray( stck, dtype=float ), self._cumStck[-1] )
+        gewinn = stck*kurs - self.getEinstandswert( stck )
+        return gewinn*ABGELTUNGSSTEUER_SATZ
+
+    def addKauf( self, kauf:XDelta ):
+        """
+        Nimmt den Kauf <kauf> in die Lots auf. Ein Kauf, dessen id schon enthalten ist, wird nicht noch einmal
+        aufgenommen.
+        """
+        if any( lot.id == kauf.id for lot in self._lots ):
+            return
+        self._lots.append( kauf )
+        self._lots.sort( key=lambda d: (d.delta_datum, d.id) )
+        self._update()
+
+    def bookSale( self, stck:int ) -> List[Tuple[int, int]]:
+        """
+        Verteilt <stck> verkaufte Stücke gem. FIFO auf die Lots und erhöht dort verkauft_stck.
+        :return: je geändertem Lot (verkauft_stck, id), passend für InvestMonitorData.updateDeltasVerkaufteStuecke()
+        """
+        changes = list()
+        rest = stck
+        for lot in self._lots:
+            if rest <= 0:
+                break
+            vfgbar = lot.delta_stck - lot.verkauft_stck
+            if vfgbar <= 0:
+                continue
+            vk = min( vfgbar, rest )
+            lot.verkauft_stck += vk
+            rest -= vk
+            changes.append( (lot.verkauft_stck, lot.id) )
+        self._update()
+        return changes
+
+
+class TaxLotLedger:
+    """
+    Die LotLedger aller WKN, einmal aus allen Kauf-Orders gebildet.
+    """
+    def __init__( self, kaeufe:Iterable[XDelta] ):
+        byWkn:Dict[str, List[XDelta]] = dict()
+        for kauf in kaeufe:
+            byWkn.setdefault( kauf.wkn, list() ).append( kauf )
+        self._ledgers:Dict[str, LotLedger] = {wkn: LotLedger( lots ) for wkn, lots in byWkn.items()}
+
+    def getLotLedger( self, wkn:str ) -> LotLedger:
+        ledger = self._ledgers.get( wkn )
+        if ledger is None:
+            ledger = LotLedger()
+            self._ledgers[wkn] = ledger
+        return ledger
+
+
+################  TEST TEST TEST   ###########################
+def testLotLedger( nlots=2000, nqueries=2000 ):
+    """
+    Vergleicht LotLedger mit dem schrittweisen FIFO-Durchlauf über die Lots (Ergebnis und Laufzeit).
+    """
+    import copy
+    import random
+    import time
+
+    def computeSteuerLinear( lots:List[XDelta], kurs:float, stck:int ) -> float:
+        rest = stck
+        steuer = 0.0
+        for lot in lots:
+            vk = min( lot.delta_stck - lot.verkauft_stck, rest )
+            rest -= vk
+            steuer += (vk*kurs - vk*lot.preis_stck)*ABGELTUNGSSTEUER_SATZ
+            if rest == 0:
+                break
+        return steuer
+
+    random.seed( 4711 )
+    lots = list()
+    for i in range( nlots ):
+        x = XDelta()
+        x.id = i + 1
+        x.wkn = "ABCDEF"
+        x.delta_datum = "%d-%02d-%02d" % (2010 + i//200, random.randint( 1, 12 ), random.randint( 1, 28 ))
+        x.delta_stck = random.randint( 1, 100 )
+        x.verkauft_stck = 0
+        x.preis_stck = round( random.uniform( 10, 100 ), 2 )
+        lots.append( x )
+    ledger = LotLedger( lots )
+    assert ledger.bookSale( 150 ) and ledger.getVerfuegbareStueck() == sum( d.delta_stck for d in lots ) - 150
+    lotsSorted = sorted( lots, key=lambda d: (d.delta_datum, d.id) )
+    queries = [random.randint( 1, ledger.getVerfuegbareStueck() ) for i in range( nqueries )]
+    t = time.perf_counter()
+    old = [computeSteuerLinear( lotsSorted, 55.0, n ) for n in queries]
+    print( "linear:     %.1f ms" % ((time.perf_counter() - t)*1000) )
+    t = time.perf_counter()
+    new = [float( ledger.computeAbgeltungssteuer( n, 55.0 ) ) for n in queries]
+    print( "LotLedger:  %.1f ms" % ((time.perf_counter() - t)*1000) )
+    t = time.perf_counter()
+    curve = ledger.computeAbgeltungssteuer( numpy.array( queries ), 55.0 )
+    print( "Kurve:      %.1f ms" % ((time.perf_counter() - t)*1000) )
+    assert numpy.allclose( old, new ) and numpy.allclose( old, curve )
+
+    # erste Order auf eine WKN, deren Lots noch nicht geladen sind: werden sie erst nach dem Insert gebildet,
+    # enthalten sie den neuen Kauf schon - addKauf() darf ihn nicht ein zweites Mal aufnehmen
+    kaeufe = list()
+    for i in range( 2 ):
+        x = XDelta()
+        x.id = i + 1
+        x.wkn = "GHIJKL"
+        x.delta_datum = "2023-0%d-01" % (i + 1)
+        x.delta_stck = 10
+        x.verkauft_stck = 0
+        x.preis_stck = 20.0
+        kaeufe.append( x )
+    ledger = TaxLotLedger( kaeufe ).getLotLedger( "GHIJKL" )
+    ledger.addKauf( copy.copy( kaeufe[1] ) ) # die Order, die gerade eingefügt wurde
+    assert ledger.getVerfuegbareStueck() == 20
+    assert ledger.bookSale( 15 ) == [(10, 1), (5, 2)] and ledger.getVerfuegbareStueck() == 5
+    print( "ok" )
@@ -2,9 +2,8 @@ import copy
 import decimal
 import numbers
 import sys
-from functools import cmp_to_key
 from PySide2.QtCore import QAbstractTableModel, SIGNAL, Qt, QModelIndex, QSize, Signal
-from typing import Any, List, Dict, Tuple, Iterator, Iterable, Type
+from typing import Any, List, Dict, Tuple, Iterator, Iterable, Type, Callable
 from PySide2.QtGui import QColor, QBrush, QFont, QPixmap
 from pandas import Series
 
@@ -36,6 +35,149 @@ class Filter:
         self.key:str = key
         self.filterval:str = filterval
 
+##################  FilterIndex  ##################
+class FilterIndex:
+    """
+    Index für die Spaltenfilter eines BaseTableModel.
+    Enthält die Einträge (<items>) in Anzeigereihenfolge und je gefilterter Spalte deren Werte als kleingeschriebene
+    Texte (werden erst ermittelt, wenn sie zum Filtern gebraucht werden).
+    Die Treffer eines Filterwerts werden als Liste von Positionen in <items> gecached:
+    - wird der Filterwert verlängert (neues Zeichen eingetippt), werden nur die Treffer des kürzeren Werts geprüft
+    - wird er verkürzt (Backspace), liegt das Ergebnis meist schon im Cache.
+    Bei mehreren Filtern wird von der kleinsten gecachten Treffermenge ausgegangen und nur noch diese
+    mit den übrigen Filtern geprüft.
+    Da die Positionen aufsteigend sind, bleibt die Reihenfolge (Sortierung) von <items> im Ergebnis erhalten.
+    Der Index gilt nur, solange sich Einträge, Werte und Reihenfolge nicht ändern; das Model verwirft ihn dann.
+    """
+    MAX_CACHED_FILTERVALUES = 32  # je Spalte
+
+    def __init__( self, items:List[Any], getValue:Callable[[Any, str], Any],
+                  getValues:Callable[[str], Iterable[Any]] ):
+        """
+        :param items: die Einträge in Anzeigereihenfolge
+        :param getValue: liefert für einen Eintrag und einen Key den zu filternden Wert
+        :param getValues: liefert für einen Key die Werte aller Einträge in der Reihenfolge von <items>
+        """
+        self._items = items
+        self._getValue = getValue
+        self._getValues = getValues
+        self._texts:Dict[str, List[str or None]] = dict() # je Key die Texte aller items; None: noch nicht ermittelt
+        self._completeTexts:set = set() # die Keys, deren Texte vollständig ermittelt sind
+        self._matches:Dict[str, Dict[str, List[int]]] = dict() # je Key und Filterwert die Positionen der Treffer
+
+    @staticmethod
+    def getFilterText( val:Any ) -> str:
+        """
+        Liefert den Text, in dem ein Filterwert gesucht wird: None ergibt "", floats werden wie in
+        BaseTableModel.data() mit 2 Nachkommastellen dargestellt, alles andere wie von str() geliefert.
+        Ergebnis immer in Kleinbuchstaben.
+        """
+        if val is None: return ""
+        if isinstance( val, str ): return val.lower()
+        if isinstance( val, float ): return "%.2f" % val
+        return str( val ).lower()
+
+    def getMatchingItems( self, filters:Iterable[Filter] ) -> List[Any]:
+        """
+        Liefert die Einträge, die allen <filters> entsprechen, in der Reihenfolge von <items>.
+        """
+        filters = list( filters )
+        if not filters:
+            return list( self._items )
+        # Ausgangspunkt ist der Filter mit den wenigsten (bekannten) Treffern
+        def getCachedCount( f:Filter ) -> int:
+            matches = self._matches.get( f.key, {} ).get( f.filterval )
+            return len( self._items ) + 1 if matches is None else len( matches )
+        filters.sort( key=getCachedCount )
+        positions = self._getMatches( filters[0].key, filters[0].filterval )
+        for f in filters[1:]:
+            if len( positions ) == 0: break
+            texts = self._getTexts( f.key, positions )
+            filterval = f.filterval
+            positions = [pos for pos in positions if filterval in texts[pos]]
+        items = self._items
+        return [items[pos] for pos in positions]
+
+    def _getMatches( self, key:str, filterval:str ) -> List[int]:
+        cache = self._matches.get( key )
+        if cache is None:
+            cache = self._matches[key] = dict()
+        matches = cache.get( filterval )
+        if matches is None:
+            # Wer <filterval> enthält, enthält auch jeden Teilstring davon. Es genügt also, die kleinste
+            # gecachte Treffermenge eines Teilstrings von <filterval> zu durchsuchen.
+            candidates = None
+            for val, valmatches in cache.items():
+                if val in filterval and ( candidates is None or len( valmatches ) < len( candidates ) ):
+                    candidates = valmatches
+            if candidates is None:
+                texts = self._getTexts( key )
+                matches = [pos for pos, text in enumerate( texts ) if filterval in text]
+            else:
+                texts = self._getTexts( key, candidates )
+                matches = [pos for pos in candidates if filterval in texts[pos]]
+            if len( cache ) >= FilterIndex.MAX_CACHED_FILTERVALUES:
+                del cache[next( iter( cache ) )]
+            cache[filterval] = matches
+        return matches
+
+    def _getTexts( self, key:str, positions:List[int]=None ) -> List[str or None]:
+        """
+        Liefert die Texte der Spalte <key>. Ermittelt werden nur die noch fehlenden Texte der Einträge
+        an <positions> bzw. - wenn positions None ist - aller Einträge.
+        """
+        texts = self._texts.get( key )
+        if key in self._completeTexts:
+            return texts
+        items = self._items
+        getValue = self._getValue
+        getFilterText = FilterIndex.getFilterText
+        if texts is None and positions is None:
+            values = self._getValues( key )
+            texts = [v.lower() if type( v ) is str else getFilterText( v ) for v in values]
+            self._texts[key] = texts
+            self._completeTexts.add( key )
+            return texts
+        if texts is None:
+            texts = self._texts[key] = [None] * len( items )
+        for pos in ( range( len( items ) ) if positions is None else positions ):
+            if texts[pos] is None:
+                texts[pos] = getFilterText( getValue( items[pos], key ) )
+        if positions is None:
+            self._completeTexts.add( key )
+        return texts
+
+##################  UniqueKeyIndex  ##################
+class UniqueKeyIndex:
+    """
+    Index Wert -> Element für einen Key, dessen Werte die Elemente eines BaseTableModel eindeutig identifizieren
+    (z.B. "ea_id"). Wird vom BaseTableModel beim Hinzufügen, Entfernen und Ändern von Elementen nachgeführt.
+    Sollte ein Wert doch mehrfach vorkommen, enthält der Index das zuerst aufgenommene Element.
+    """
+    def __init__( self, key:str, elements:Iterable[XBase] ):
+        self.key = key
+        self._elements:Dict[Any, XBase] = dict()
+        self._values:Dict[int, Any] = dict() # je Element (id) der Wert, unter dem es im Index steht
+        for x in elements:
+            self.add( x )
+
+    def add( self, x:XBase ):
+        val = x.getValue( self.key )
+        self._values[id( x )] = val
+        self._elements.setdefault( val, x )
+
+    def remove( self, x:XBase ):
+        val = self._values.pop( id( x ), None )
+        if self._elements.get( val ) is x:
+            del self._elements[val]
+
+    def update( self, x:XBase ):
+        self.remove( x )
+        self.add( x )
+
+    def get( self, value:Any ) -> XBase or None:
+        return self._elements.get( value )
+
 ##################  BaseTableModel  ##################
 class BaseTableModel( QAbstractTableModel ):
     """
@@ -70,7 +212,17 @@ class BaseTableModel( QAbstractTableModel ):
         self._sortkey = ""
         self._sortkeys:List[str] = None
         self.sort_descending = False
+        self._activeSortKeys:Tuple[str] = None # die Keys der letzten Sortierung ...
+        self._activeSortAscending:Tuple[bool] = None # ... und je Key die Richtung (True: aufsteigend)
+        self._sortedElements:List[XBase] = None # *alle* Elemente der rowList in der Reihenfolge der letzten Sortierung.
+                                                # Daraus werden nach Filteränderungen die _visibleElements gebildet.
+                                                # None: muss neu ermittelt werden (s. _getSortedElements())
         self._filters: List[Filter] = list()  # aktuell gesetzte Spaltenfilter
+        self._filterIndex:FilterIndex = None # wird beim ersten Filtern aufgebaut und bei Änderungen verworfen
+        self._rowIndex:Dict[int, int] = None # id( x ) -> Zeile, in der x angezeigt wird. None: muss neu ermittelt werden
+        self._elementIds:set = None # ids aller Elemente der rowList. None: muss neu ermittelt werden
+        self._uniqueKeys:List[str] = list() # s. setUniqueKeys()
+        self._uniqueKeyIndexes:Dict[str, UniqueKeyIndex] = dict() # je unique key, wird beim ersten Zugriff aufgebaut
         #self._visibleRowIndexes:List[int] = list() # Indizes der Rows, die sichtbar sind. Per Default alle,
                                                     # das kann aber durch Filterung eingeschränkt werden
         if rowList:
@@ -125,13 +277,18 @@ class BaseTableModel( QAbstractTableModel ):
 
     def setRowList( self, rowList:List[XBase] ):
         self.rowList = rowList
+        self._sortedElements = None
+        self._filterIndex = None
+        self._rowIndex = None
+        self._elementIds = None
+        self._uniqueKeyIndexes.clear()
         if len( rowList ) > 0:
             self._setDefaultKeyHeaderMapping()
             self._initVisibleElements()
 
     def _initVisibleElements( self ):
-        for x in self.rowList:
-            self._visibleElements.append( x )
+        self._visibleElements = list( self._getSortedElements() )
+        self._rowIndex = None
 
     def setKeyHeaderMappings( self, mappings:List[KeyHeaderMapping] ):
         self.headers = [x.header for x in mappings]
@@ -195,39 +352,110 @@ class BaseTableModel( QAbstractTableModel ):
 
     def getRow( self, x:XBase ) -> int:
         """
-        Liefert die Zeile, in der das spezifizierte XBase-Objekt dargestellt wird
-        ACHTUNG: Die hier verwendete rowList.index() versucht, das Element <x> durch Adressenvergleich
-        zu identifizieren (x1 == x2).
-        Eine Kopie von <x> wird hier nicht gefunden!
+        Liefert die Zeile, in der das spezifizierte XBase-Objekt dargestellt wird.
+        Die Elemente des Models werden über ihre Identität gefunden (Index id( x ) -> Zeile).
+        Ist <x> kein Element dieses Models (z.B. eine Kopie), wird wie bisher das erste sichtbare Element
+        geliefert, das gleich <x> ist (x1 == x2).
         :param x:
         :return: the rowIndex of <x> resp. -1 if <x> cannot be found.
                  That may be caused by a filtered TableModel where <x> doesn't meet the filter conditions
         """
-        #idx = self.rowList.index( x )
+        row = self._getRowIndex().get( id( x ) )
+        if row is not None:
+            return row
+        if id( x ) in self._getElementIds():
+            return -1 # Element dieses Models, aber nicht sichtbar
         try:
-            return self._visibleElements.index( x )
-            #return self._visibleRowIndexes.index( idx )
+            return self.getVisibleElements().index( x )
         except ValueError:
             return -1
 
+    def _getRowIndex( self ) -> Dict[int, int]:
+        if self._rowIndex is None:
+            self._rowIndex = { id( x ): row for row, x in enumerate( self.getVisibleElements() ) }
+        return self._rowIndex
+
+    def _getElementIds( self ) -> set:
+        if self._elementIds is None:
+            self._elementIds = { id( x ) for x in self.rowList }
+        return self._elementIds
+
+    def setUniqueKeys( self, keys:Iterable[str] ):
+        """
+        Deklariert die Keys, deren Werte die Elemente eindeutig identifizieren (z.B. "ea_id").
+        Für diese Keys findet getElementByUniqueKeyValue() das Element über einen Index, der bei
+        addObject(), removeObject(), setValue() und objectUpdatedExternally() nachgeführt wird.
+        """
+        self._uniqueKeys = list( keys )
+        self._uniqueKeyIndexes.clear()
+
+    def getUniqueKeys( self ) -> List[str]:
+        return self._uniqueKeys
+
     def getElementByUniqueKeyValue( self, key:str, value:Any ) -> XBase or None:
         """
         Liefert das erste Objekt in self.rowList, dessen Key <key> den Wert <value> hat.
         Man sollte diese Methode also nur verwenden, um ein Objekt (Element) anhand seiner eindeutigen ID zu finden.
+        Ist <key> mit setUniqueKeys() deklariert, wird das Objekt über einen Index gefunden, sonst wird die rowList
+        durchsucht.
         Wird der gewünschte Key nicht gefunden, oder kein Element, dessen Key den Wert <value> aufweist, wird None
         zurückgegeben.
         :param key:
         :param value:
         :return:
         """
+        if key in self._uniqueKeys:
+            x = self._getUniqueKeyIndex( key ).get( value )
+            if x is not None and x.getValue( key ) == value:
+                return x
+            # nicht gefunden oder x wurde geändert: vielleicht wurde ein Element geändert, ohne dass das Model
+            # davon erfahren hat. Index neu aufbauen und noch einmal suchen.
+            del self._uniqueKeyIndexes[key]
+            return self._getUniqueKeyIndex( key ).get( value )
         for x in self.rowList:
             try:
                 val = x.getValue( key )
                 if val == value: return x
             except:
-                continue
+                pass
         return None
 
+    def _getUniqueKeyIndex( self, key:str ) -> UniqueKeyIndex:
+        index = self._uniqueKeyIndexes.get( key )
+        if index is None:
+            index = self._uniqueKeyIndexes[key] = UniqueKeyIndex( key, self.rowList )
+        return index
+
+    def _onElementAdded( self, x:XBase ):
+        """
+        Führt die Indizes nach, nachdem <x> in die rowList aufgenommen wurde.
+        """
+        self._filterIndex = None
+        self._rowIndex = None
+        if self._elementIds is not None:
+            self._elementIds.add( id( x ) )
+        for index in self._uniqueKeyIndexes.values():
+            index.add( x )
+
+    def _onElementRemoved( self, x:XBase ):
+        """
+        Führt die Indizes nach, nachdem <x> aus der rowList entfernt wurde.
+        """
+        self._filterIndex = None
+        self._rowIndex = None
+        if self._elementIds is not None:
+            self._elementIds.discard( id( x ) )
+        for index in self._uniqueKeyIndexes.values():
+            index.remove( x )
+
+    def _onElementUpdated( self, x:XBase ):
+        """
+        Führt die Indizes nach, nachdem Werte von <x> geändert wurden.
+        """
+        self._filterIndex = None
+        for index in self._uniqueKeyIndexes.values():
+            index.update( x )
+
     def getElement( self, indexrow: int ) -> XBase:
         """
         Liefert das Element, das an Zeile indexrow angezeigt wird.
@@ -302,6 +530,7 @@ class BaseTableModel( QAbstractTableModel ):
         e: XBase = self.getElement( indexrow )
         key = self.keys[indexcolumn]
         e.setValue( key, value )
+        self._onElementUpdated( e )
         index = self.createIndex( indexrow, indexcolumn )
         self.dataChanged.emit( index, index, [Qt.DisplayRole] )
 
@@ -310,6 +539,7 @@ class BaseTableModel( QAbstractTableModel ):
         Diese Methode behandelt ein XBase-Objekt, das außerhalb dieses Models geändert wurde.
         Sie löst ein dataChanged-Signal aus, damit die Anzeige aktualisiert wird.
         """
+        self._onElementUpdated( x )
         row = self.getRow( x ) # hier kann es eine Exception geben, wenn x nicht unter den sichtbaren Elementen ist
         indexA = self.createIndex( row, 0 )
         indexZ = self.createIndex( row, self.columnCount() - 1 )
@@ -319,6 +549,7 @@ class BaseTableModel( QAbstractTableModel ):
         """
         Diese Methode löst ein dataChanged-Signal für row <row> aus, damit die Anzeige aktualisiert wird.
         """
+        self._onElementUpdated( self.getElement( row ) )
         indexA = self.createIndex( row, 0 )
         indexZ = self.createIndex( row, self.columnCount() - 1 )
         self.dataChanged.emit( indexA, indexZ, [Qt.DisplayRole] )
@@ -331,7 +562,7 @@ class BaseTableModel( QAbstractTableModel ):
         :return:
         """
         row = 0
-        if self.sort_col < 0:
+        if not self._activeSortKeys:
             # rowList nicht sortiert
             # todo: Änderung wegen neuer Filterlogik --> erl.
             self.rowList.append( x )
@@ -339,16 +570,18 @@ class BaseTableModel( QAbstractTableModel ):
                 # an die visible Elements nur anhängen, wenn x den FilterConditions entspricht.
                 # _meetsFilterConditions returns True, wenn keine Filter gesetzt sind.
                 self._visibleElements.append( x )
+            row = len( self._visibleElements ) - 1
         else:
             # Daten sind sortiert, neues Objekt an der richtigen Stelle einfügen.
             self._insertObject( x, self.rowList )
+            if self._sortedElements is not None:
+                self._insertObject( x, self._sortedElements )
             #  todo: Änderung wegen neuer Filterlogik: Prüfen, ob neues Element auch in die _visibleElements
             #  aufgenommen werden muss --> erl.
             if self._meetsFilterConditions( x ):
                 # _meetsFilterConditions returns True, wenn keine Filter gesetzt sind.
-                self._insertObject( x, self._visibleElements )
-        if self.sort_col < 0:
-            row = self.rowCount() - 1
+                row = self._insertObject( x, self._visibleElements )
+        self._onElementAdded( x )
         indexA = self.createIndex( row, 0 )
         indexZ = self.createIndex( row, self.columnCount()-1 )
         self.dataChanged.emit( indexA, indexZ, [Qt.DisplayRole] )
@@ -365,10 +598,8 @@ class BaseTableModel( QAbstractTableModel ):
         :param targetList:
         :return:
         """
-        for e in targetList:
-            cmp = self.compare( x, e )
-            if cmp <= 0:
-                pos = targetList.index( e )
+        for pos, e in enumerate( targetList ):
+            if self._compareBySortKeys( x, e ) <= 0:
                 targetList.insert( pos, x )
                 return pos
 
@@ -388,8 +619,11 @@ class BaseTableModel( QAbstractTableModel ):
         try:
             row = self.getRow( x )  # Wenn x nicht zu den _visibleElements gehört, gibt's eine Exception
             self.rowList.remove( x )
+            if self._sortedElements is not None:
+                self._sortedElements.remove( x )
             # aus der Liste der _visibleElements löschen. Da muss es drin sein, sonst hätten wir die row gar nicht gefunden.
             self._visibleElements.remove( x )
+            self._onElementRemoved( x )
         except:
             # kann passieren wegen des EinAusWriteDispatcher.ea_deleted Signals.
             return
@@ -412,9 +646,9 @@ class BaseTableModel( QAbstractTableModel ):
         :param value:
         :return:
         """
-        for x in self.rowList:
-            if x.getValue( key ) == value:
-                self.removeObject( x )
+        # erst sammeln, dann entfernen: removeObject() ändert die rowList
+        for x in [x for x in self.rowList if x.getValue( key ) == value]:
+            self.removeObject( x )
 
     def rowCount( self, parent:QModelIndex=None ) -> int:
         # todo: Änderung wegen neuer Filterlogik --> erl.
@@ -511,36 +745,27 @@ class BaseTableModel( QAbstractTableModel ):
         self.layoutChanged.emit()
 
     def applyFilter( self, header:str, filterval:str ):
-        f:Filter = self._updateFilters( header, filterval )
-        if f:
-            # neuer Filter, wir brauchen die filterIndexList nicht ganz neu aufbauen, sondern nur ergänzen,
-            # sprich: die Objekte rauswerfen, die dem neuen Filter nicht genügen
-            self._updateFilterIndexList( f.key, f.filterval )
-        else:
-            # ein bereits bestehender Filter hat sich geändert. Die ganze filterIndexList neu aufbauen
-            self._buildFilterIndexList()
+        # Ob der Filter neu ist oder sich ein bestehender geändert hat: die Treffer liefert der FilterIndex,
+        # der dabei nur die Kandidaten des vorigen Filterwerts prüft (s. FilterIndex)
+        self._updateFilters( header, filterval )
+        self._buildFilterIndexList()
         self.layoutChanged.emit()
 
-    def _updateFilterIndexList( self, key:str, filterval:str ):
-        """
-        Diese Methode wird aufgerufen, wenn ein neuer Filter (für <header> mit dem Wert <filterval> gesetzt worden ist.
-        Sie prüft, welche Objekte in der _visibleElements-List dem neuen Filterwert
-        entsprechen und entfernt diejenigen Objektreferenzen, die das nicht tun.
-        :param key:
-        :param filterval:
-        :return:
-        """
-        self._visibleElements = [x for x in self._visibleElements if self._meetsFilterCondition( x, key, filterval)]
-
     def _buildFilterIndexList( self ):
         """
-        Baut die _visibleElements-Liste auf unter Verwendung aller aktiven Filter (filterList)
+        Baut die _visibleElements-Liste auf unter Verwendung aller aktiven Filter (filterList).
+        Eine bestehende Sortierung bleibt erhalten, ohne dass neu sortiert werden muss (s. _getSortedElements()).
         :return:
         """
-        self._visibleElements.clear()
-        for x in self.rowList:
-            if self._meetsFilterConditions( x ):
-                self._visibleElements.append( x )
+        self._visibleElements = self._getFilterIndex().getMatchingItems( self._filters )
+        self._rowIndex = None
+
+    def _getFilterIndex( self ) -> FilterIndex:
+        if self._filterIndex is None:
+            elements = list( self._getSortedElements() )
+            self._filterIndex = FilterIndex( elements, lambda x, key: x.getValue( key ),
+                                             lambda key: [x.getValue( key ) for x in elements] )
+        return self._filterIndex
 
     def _meetsFilterConditions( self, x:XBase ) -> bool:
         for f in self._filters:
@@ -550,10 +775,11 @@ class BaseTableModel( QAbstractTableModel ):
 
     @staticmethod
     def _meetsFilterCondition( x:XBase, key:str, filterval:str ) -> bool:
-        val = x.getValue( key )
-        if isinstance( val, str ):
-            val = val.lower()
-        return filterval in val
+        return BaseTableModel._meetsFilterValue( x.getValue( key ), filterval )
+
+    @staticmethod
+    def _meetsFilterValue( val:Any, filterval:str ) -> bool:
+        return filterval in FilterIndex.getFilterText( val )
 
     def _updateFilters( self, header: str, filterval: str ) -> Filter or None:
         """
@@ -577,11 +803,6 @@ class BaseTableModel( QAbstractTableModel ):
     def setSortable( self, sortable:bool=True ):
         self.sortable = sortable
 
-    class Tmp:
-        def __init__( self, row: int, x: XBase ):
-            self.row = row
-            self.x = x
-
     def sortMultipleColumns( self, keys:Iterable[str], order:Qt.SortOrder=None ) -> List[int]:
         """
         Sortiert die Elemente in der _visibleElements-List.
@@ -596,16 +817,29 @@ class BaseTableModel( QAbstractTableModel ):
             self.sort_descending = (order == Qt.SortOrder.DescendingOrder)
         else:
             self.sort_descending = not self.sort_descending
-        self._visibleElements = sorted( self._visibleElements, key=cmp_to_key( self._compareMultiple ) )
+        keys = tuple( keys )
+        # sort_descending == True sortiert aufsteigend, s. compare()
+        self._sortElements( keys, ( self.sort_descending, ) * len( keys ) )
         self.layoutChanged.emit()
         self.multi_sorting_finished.emit()
 
-    def _compareMultiple( self, x1:XBase, x2:XBase ):
-        for key in self._sortkeys:
-            self._sortkey = key
-            rc = self.compare( x1, x2 )
-            if rc != 0: return rc
-        return 0
+    def sortByKeys( self, keys:Iterable[str], ascending:bool or Iterable[bool]=True ):
+        """
+        Sortiert die Elemente nach den Werten von <keys>, wobei für jeden Key die Richtung angegeben werden kann.
+        Bei gleichen Werten bleibt die bisherige Reihenfolge erhalten.
+        :param keys: die Keys, nach denen sortiert wird, der wichtigste zuerst
+        :param ascending: True: aufsteigend, False: absteigend; entweder für alle Keys oder je Key
+        """
+        keys = tuple( keys )
+        ascending = ( ascending, ) * len( keys ) if isinstance( ascending, bool ) else tuple( ascending )
+        if len( ascending ) != len( keys ):
+            raise Exception( "BaseTableModel.sortByKeys(): je Key muss eine Sortierrichtung angegeben werden" )
+        self._sortkeys = keys
+        self.layoutAboutToBeChanged.emit()
+        self.before_multi_sorting.emit()
+        self._sortElements( keys, ascending )
+        self.layoutChanged.emit()
+        self.multi_sorting_finished.emit()
 
     def sort( self, col:int, order: Qt.SortOrder=Qt.SortOrder.DescendingOrder ) -> None:
         # todo: Änderung wegen neuer Filterlogik --> erl.
@@ -617,14 +851,94 @@ class BaseTableModel( QAbstractTableModel ):
         self.layoutAboutToBeChanged.emit()
         self.before_sorting.emit()
         self.sort_descending = True if order == Qt.SortOrder.DescendingOrder else False
-        self._visibleElements = sorted( self._visibleElements, key=cmp_to_key( self.compare ) )
+        # sort_descending == True sortiert aufsteigend, s. compare()
+        self._sortElements( ( self._sortkey, ), ( self.sort_descending, ) )
         self.sorting_finished.emit()
         self.layoutChanged.emit()
 
-    # def compare2( self, row1:int, row2:int ) -> int:
-    #     x1 = self.rowList[row1]
-    #     x2 = self.rowList[row2]
-    #     return self.compare( x1, x2 )
+    def _sortElements( self, keys:Tuple[str], ascending:Tuple[bool] ):
+        """
+        Sortiert die _visibleElements nach <keys> und merkt sich die Sortierung für addObject() und
+        Filteränderungen.
+        Ist kein Filter aktiv, ist das Ergebnis gleichzeitig die Sortierung aller Elemente (_sortedElements),
+        andernfalls wird diese erst bei Bedarf ermittelt.
+        """
+        self._activeSortKeys = keys
+        self._activeSortAscending = ascending
+        self._filterIndex = None
+        self._rowIndex = None
+        elements = list( self._visibleElements )
+        self._sortInPlace( elements, [self._getElementSortKeyFunction( key ) for key in keys], ascending )
+        self._visibleElements = elements
+        self._sortedElements = list( elements ) if len( elements ) == len( self.rowList ) else None
+
+    def _getSortedElements( self ) -> List[XBase]:
+        """
+        Liefert alle Elemente der rowList in der Reihenfolge der aktuellen Sortierung.
+        Die Reihenfolge wird nur ermittelt, wenn sie nicht schon bekannt ist.
+        """
+        if not self._activeSortKeys:
+            return self.rowList
+        if self._sortedElements is None:
+            elements = list( self.rowList )
+            self._sortInPlace( elements, [self._getElementSortKeyFunction( key ) for key in self._activeSortKeys],
+                               self._activeSortAscending )
+            self._sortedElements = elements
+        return self._sortedElements
+
+    def _getElementSortKeyFunction( self, key:str ) -> Callable[[XBase], Tuple]:
+        getSortValueKey = self.getSortValueKey
+        return lambda x: getSortValueKey( x.getValue( key ) )
+
+    @staticmethod
+    def getSortValueKey( v:Any ) -> Tuple:
+        """
+        Liefert den Sortierschlüssel für den Wert <v>:
+        None ist kleiner als jeder andere Wert, Zahlen sind kleiner als Strings,
+        Strings werden ohne Beachtung der Groß-/Kleinschreibung verglichen.
+        """
+        if v is None: return ( 0, )
+        if isinstance( v, str ): return ( 2, v.lower() )
+        if isinstance( v, numbers.Number ): return ( 1, v )
+        return ( 3, v )
+
+    @staticmethod
+    def _sortInPlace( items:List, keyFunctions:List[Callable[[Any], Tuple]], ascending:Tuple[bool] ):
+        """
+        Sortiert <items> nach den Schlüsseln, die <keyFunctions> liefern (der wichtigste zuerst).
+        Je Eintrag wird ein Schlüssel nur einmal ermittelt.
+        Haben alle Keys dieselbe Richtung, wird in einem Durchgang nach dem zusammengesetzten Schlüssel sortiert.
+        Andernfalls wird - beginnend mit dem unwichtigsten Key - je Key sortiert. Weil Pythons Sortierung stabil ist,
+        bleibt dabei die Reihenfolge der weniger wichtigen Keys innerhalb gleicher Werte erhalten.
+        """
+        if len( keyFunctions ) == 1 or len( set( ascending ) ) == 1:
+            if len( keyFunctions ) == 1:
+                keyFunction = keyFunctions[0]
+            else:
+                keyFunction = lambda item: tuple( f( item ) for f in keyFunctions )
+            items.sort( key=keyFunction, reverse=not ascending[0] )
+        else:
+            for keyFunction, asc in reversed( list( zip( keyFunctions, ascending ) ) ):
+                items.sort( key=keyFunction, reverse=not asc )
+
+    def _compareBySortKeys( self, x1:XBase, x2:XBase ) -> int:
+        """
+        Vergleicht x1 und x2 gemäß der aktuellen Sortierung (_activeSortKeys, _activeSortAscending).
+        :return: -1, wenn x1 vor x2 einzuordnen ist, 1, wenn danach, 0 bei Gleichheit
+        """
+        getSortValueKey = self.getSortValueKey
+        return self._compareSortKeys( [getSortValueKey( x1.getValue( key ) ) for key in self._activeSortKeys],
+                                      [getSortValueKey( x2.getValue( key ) ) for key in self._activeSortKeys] )
+
+    def _compareSortKeys( self, keys1:List[Tuple], keys2:List[Tuple] ) -> int:
+        """
+        Vergleicht zwei Listen von Sortierschlüsseln (je Key in _activeSortKeys einer, s. getSortValueKey())
+        unter Beachtung der Sortierrichtung je Key.
+        """
+        for k1, k2, ascending in zip( keys1, keys2, self._activeSortAscending ):
+            if k1 != k2:
+                return ( -1 if k1 < k2 else 1 ) if ascending else ( 1 if k1 < k2 else -1 )
+        return 0
 
     def compare( self, x1:XBase, x2:XBase ) -> int:
         """
@@ -639,59 +953,340 @@ class BaseTableModel( QAbstractTableModel ):
                     wenn value x1 < value x2: -1
                     wenn value x1 > value x2: 1
                  Bei Gleichheit der beiden Werte: 0
+                 (None ist kleiner als jeder andere Wert, s. getSortValueKey())
         """
-        v1 = x1.getValue( self._sortkey )
-        v2 = x2.getValue( self._sortkey )
-        if v1 is None: return -1 if self.sort_descending else 1
-        if v2 is None: return 1 if self.sort_descending else -1
-        if isinstance( v1, str ):
-            v1 = v1.lower()
-            v2 = v2.lower()
+        v1 = self.getSortValueKey( x1.getValue( self._sortkey ) )
+        v2 = self.getSortValueKey( x2.getValue( self._sortkey ) )
         if v1 < v2: return -1 if self.sort_descending else 1
         if v1 > v2: return 1 if self.sort_descending else -1
         return 0 # v1 == v2
 
+##################  ColumnarTableModel  ##################
+class ColumnarTableModel( BaseTableModel ):
+    """
+    BaseTableModel für große Datenmengen (z.B. alle Ein- und Auszahlungen eines Jahres).
+    Welche Elemente in welcher Reihenfolge sichtbar sind, bestimmt _visibleRows: die Liste der Indizes der sichtbaren
+    Elemente in der rowList. Filtern und Sortieren ändern nur diese Indexliste.
+    Sortiert wird immer die ganze rowList (_sortedRows), sodass beim Ändern oder Aufheben eines Filters nicht
+    neu sortiert werden muss.
+    Die Zellwerte werden wie beim BaseTableModel bei jedem Zugriff aus den Elementen gelesen; ein außerhalb
+    des Models geändertes Element wird also (spätestens nach einem layoutChanged-Signal) richtig angezeigt.
+    Die öffentliche Schnittstelle entspricht der des BaseTableModel, ColumnarTableModel kann also anstelle von
+    BaseTableModel als Basisklasse verwendet werden.
+    """
+    def __init__( self, rowList:List[XBase]=None, jahr:int=None ):
+        self._visibleRows:List[int] = list() # Indizes der sichtbaren Elemente in der rowList, in Anzeigereihenfolge
+        self._rowListIndexes:Dict[int, int] = None # id( x ) -> Index von x in der rowList
+        self._sortedRows:List[int] = None # Indizes *aller* Elemente der rowList in der Reihenfolge der letzten
+                                          # Sortierung; daraus werden nach Filteränderungen die _visibleRows gebildet
+        BaseTableModel.__init__( self, rowList, jahr )
+
+    def setRowList( self, rowList:List[XBase] ):
+        self._visibleRows = list()
+        self._rowListIndexes = None
+        self._sortedRows = None
+        BaseTableModel.setRowList( self, rowList )
+
+    def _initVisibleElements( self ):
+        # Sortierung bleibt beim Aufheben von Filtern erhalten
+        self._visibleRows = list( self._getSortedRows() )
+        self._rowIndex = None
+
+    def _getRowListIndex( self, x:XBase ) -> int:
+        """
+        :return: die Position von <x> (Identität, nicht Gleichheit) in der rowList oder -1
+        """
+        if self._rowListIndexes is None:
+            self._rowListIndexes = { id( e ): idx for idx, e in enumerate( self.rowList ) }
+        return self._rowListIndexes.get( id( x ), -1 )
+
+    def getVisibleElements( self ) -> List[XBase]:
+        rowList = self.rowList
+        return [rowList[idx] for idx in self._visibleRows]
+
+    def getElement( self, indexrow: int ) -> XBase:
+        return self.rowList[self._visibleRows[indexrow]]
+
+    def rowCount( self, parent:QModelIndex=None ) -> int:
+        return len( self._visibleRows )
+
+    def addObject( self, x:XBase ):
+        """
+        Fügt ein neues Objekt (eine neue Tabellenzeile) hinzu.
+        <x> wird an die rowList angehängt; ist die Tabelle sortiert, wird es an der der Sortierung entsprechenden
+        Stelle angezeigt.
+        Löst ein dataChanged-, ein layoutChanged- und ein rowAdded-Signal aus.
+        :param x: das neue Objekt
+        :return:
+        """
+        self.rowList.append( x )
+        idx = len( self.rowList ) - 1
+        if self._rowListIndexes is not None:
+            self._rowListIndexes[id( x )] = idx
+        row = len( self._visibleRows )
+        if self._sortedRows is not None:
+            self._insertSorted( idx, self._sortedRows )
+        if self._meetsFilterConditions( x ):
+            if self._activeSortKeys:
+                row = self._insertSorted( idx, self._visibleRows )
+            else:
+                self._visibleRows.append( idx )
+        self._onElementAdded( x )
+        indexA = self.createIndex( row, 0 )
+        indexZ = self.createIndex( row, self.columnCount()-1 )
+        self.dataChanged.emit( indexA, indexZ, [Qt.DisplayRole] )
+        self.layoutChanged.emit()
+        self.rowsAddedSignal.emit()
+
+    def _insertSorted( self, idx:int, rows:List[int] ) -> int:
+        """
+        Fügt den rowList-Index <idx> an der der aktuellen Sortierung entsprechenden Stelle in <rows> ein
+        (wie BaseTableModel._insertObject() vor dem ersten Element, das gleich oder "größer" ist).
+        :return: die Position von <idx> in <rows>
+        """
+        keyFunctions = [self._getRowSortKeyFunction( key ) for key in self._activeSortKeys]
+        newKeys = [f( idx ) for f in keyFunctions]
+        for pos, other in enumerate( rows ):
+            if self._compareSortKeys( newKeys, [f( other ) for f in keyFunctions] ) <= 0:
+                rows.insert( pos, idx )
+                return pos
+        rows.append( idx )
+        return len( rows ) - 1
+
+    def removeObject( self, x:XBase ):
+        """
+        Entfernt ein Objekt (eine Tabellenzeile) aus der Tabelle.
+        <x> wird über seine Identität gesucht, nicht über Gleichheit: ein anderes Element mit gleichen Werten
+        bleibt erhalten.
+        Ist das Objekt nicht sichtbar, wird es nur aus der rowList entfernt, und es werden keine Signale gesendet.
+        Löst ein dataChanged- und ein layoutChanged-Signal aus.
+        :param x: das zu löschende Objekt
+        :return:
+        """
+        idx = self._getRowListIndex( x )
+        if idx < 0:
+            return
+        try:
+            row = self._visibleRows.index( idx )
+        except ValueError:
+            row = -1
+        self.rowList.pop( idx )
+        self._rowListIndexes = None
+        self._onElementRemoved( x )
+        self._visibleRows = [i if i < idx else i - 1 for i in self._visibleRows if i != idx]
+        if self._sortedRows is not None:
+            self._sortedRows = [i if i < idx else i - 1 for i in self._sortedRows if i != idx]
+        if row < 0:
+            return
+        indexA = self.createIndex( row, 0 )
+        indexZ = self.createIndex( row, self.columnCount()-1 )
+        self.dataChanged.emit( indexA, indexZ, [Qt.DisplayRole] )
+        self.layoutChanged.emit()
+
+    def removeObjectsByKeyValue( self, key:str, value:Any ):
+        """
+        Entfernt alle Objekte aus der rowlist, auf die die Bedingung x.getValue( key ) == value zutrifft.
+        """
+        xlist = [x for x in self.rowList if x.getValue( key ) == value]
+        for x in xlist:
+            self.removeObject( x )
+
+    def _buildFilterIndexList( self ):
+        self._visibleRows = self._getFilterIndex().getMatchingItems( self._filters )
+        self._rowIndex = None
+
+    def _getFilterIndex( self ) -> FilterIndex:
+        if self._filterIndex is None:
+            rows = list( self._getSortedRows() )
+            rowList = self.rowList
+            self._filterIndex = FilterIndex( rows, lambda idx, key: rowList[idx].getValue( key ),
+                                             lambda key: [rowList[idx].getValue( key ) for idx in rows] )
+        return self._filterIndex
+
+    def _sortElements( self, keys:Tuple[str], ascending:Tuple[bool] ):
+        """
+        Sortiert alle Zeilen (_sortedRows) nach den Werten von <keys> und übernimmt die Reihenfolge in _visibleRows.
+        Ausgangspunkt ist die Reihenfolge der vorigen Sortierung, damit bleibt diese (wie bei BaseTableModel)
+        bei gleichen Werten erhalten.
+        """
+        self._activeSortKeys = keys
+        self._activeSortAscending = ascending
+        self._filterIndex = None
+        self._rowIndex = None
+        if self._sortedRows is None:
+            self._sortedRows = list( range( len( self.rowList ) ) )
+        self._sortInPlace( self._sortedRows, [self._getRowSortKeyFunction( key ) for key in keys], ascending )
+        if len( self._visibleRows ) == len( self._sortedRows ):
+            self._visibleRows = list( self._sortedRows )
+        else:
+            visible = set( self._visibleRows )
+            self._visibleRows = [idx for idx in self._sortedRows if idx in visible]
+
+    def _getSortedRows( self ) -> List[int]:
+        """
+        Liefert die Indizes aller Elemente der rowList in der Reihenfolge der aktuellen Sortierung.
+        """
+        if not self._activeSortKeys:
+            return range( len( self.rowList ) )
+        if self._sortedRows is None:
+            self._sortedRows = list( range( len( self.rowList ) ) )
+            self._sortInPlace( self._sortedRows,
+                               [self._getRowSortKeyFunction( key ) for key in self._activeSortKeys],
+                               self._activeSortAscending )
+        return self._sortedRows
+
+    def _getRowSortKeyFunction( self, key:str ) -> Callable[[int], Tuple]:
+        rowList = self.rowList
+        getSortValueKey = self.getSortValueKey
+        return lambda idx: getSortValueKey( rowList[idx].getValue( key ) )
+
+##################  ColumnAggregate  #########################
+class ColumnAggregate:
+    """
+    Laufende Aggregate der Werte einer Spalte: Summe, Anzahl, Durchschnitt, Minimum und Maximum.
+    Werte werden einzeln hinzugefügt und entfernt, die Summe wird also nie komplett neu berechnet.
+    Summiert wird mit Decimal (floats mit ihrer kürzesten Darstellung, z.B. 0.1 als Decimal("0.1")),
+    damit sich beim Hinzufügen und Entfernen keine Rundungsfehler ansammeln.
+    Geliefert wird die Summe als int, wenn nur ints summiert wurden, als Decimal, wenn Decimals dabei waren,
+    sonst als float.
+    None und "" werden nicht berücksichtigt.
+    """
+    SUM = "sum"
+    COUNT = "count"
+    AVG = "avg"
+    MIN = "min"
+    MAX = "max"
+
+    def __init__( self, key:str, getValues:Callable[[], Iterable[Any]] ):
+        """
+        :param key: der Key der Spalte
+        :param getValues: liefert alle aktuell aggregierten Werte. Wird nur benötigt, um Minimum oder Maximum
+                          neu zu ermitteln, nachdem das bisherige Minimum oder Maximum entfernt wurde.
+        """
+        self.key = key
+        self._getValues = getValues
+        self.clear()
+
+    def clear( self ):
+        self._sum = decimal.Decimal( 0 )
+        self._count = 0
+        self._nFloats = 0
+        self._nDecimals = 0
+        self._min = self._max = None
+        self._minMaxValid = True
+
+    def add( self, val:Any ):
+        if val is None or val == "": return
+        self._sum += self._toDecimal( val )
+        self._count += 1
+        self._countType( val, 1 )
+        if self._minMaxValid:
+            if self._min is None or val < self._min: self._min = val
+            if self._max is None or val > self._max: self._max = val
+
+    def remove( self, val:Any ):
+        if val is None or val == "": return
+        self._sum -= self._toDecimal( val )
+        self._count -= 1
+        self._countType( val, -1 )
+        if val == self._min or val == self._max:
+            self._minMaxValid = False
+
+    def get( self, aggregate:str=SUM ) -> Any:
+        if aggregate == ColumnAggregate.SUM: return self.getSum()
+        if aggregate == ColumnAggregate.COUNT: return self._count
+        if aggregate == ColumnAggregate.AVG: return self.getAvg()
+        if aggregate == ColumnAggregate.MIN: return self.getMin()
+        if aggregate == ColumnAggregate.MAX: return self.getMax()
+        raise Exception( "ColumnAggregate.get(): unbekanntes Aggregat '%s'" % aggregate )
+
+    def getSum( self ) -> int or float or decimal.Decimal:
+        if self._nDecimals > 0: return self._sum
+        if self._nFloats > 0: return float( self._sum )
+        return int( self._sum )
+
+    def getCount( self ) -> int:
+        return self._count
+
+    def getAvg( self ) -> float or decimal.Decimal or None:
+        if self._count == 0: return None
+        avg = self._sum / self._count
+        return avg if self._nDecimals > 0 else float( avg )
+
+    def getMin( self ) -> Any:
+        self._ensureMinMax()
+        return self._min
+
+    def getMax( self ) -> Any:
+        self._ensureMinMax()
+        return self._max
+
+    def _ensureMinMax( self ):
+        if self._minMaxValid: return
+        values = [v for v in self._getValues() if not ( v is None or v == "" )]
+        self._min = min( values ) if values else None
+        self._max = max( values ) if values else None
+        self._minMaxValid = True
+
+    def _countType( self, val:Any, n:int ):
+        if isinstance( val, float ): self._nFloats += n
+        elif isinstance( val, decimal.Decimal ): self._nDecimals += n
+
+    @staticmethod
+    def _toDecimal( val:Any ) -> decimal.Decimal:
+        if isinstance( val, float ): return decimal.Decimal( repr( val ) )
+        return decimal.Decimal( val )
+
 ##################  SumTableModel  #########################
 class SumTableModel( BaseTableModel ):
     """
-    A BaseTableModel displaying a sum row below all other rows
+    A BaseTableModel displaying a sum row below all other rows.
+    Die Summen beziehen sich auf die sichtbaren (nicht weggefilterten) Zeilen. Sie werden je Spalte in einem
+    ColumnAggregate geführt und bei setValue(), addObject(), removeObject() und objectUpdatedExternally()
+    angepasst, bei Filteränderungen neu ermittelt.
+    Neben der Summe liefert getAggregate() auch Anzahl, Durchschnitt, Minimum und Maximum einer Summenspalte.
     """
     def __init__( self, objectList:List[XBase], jahr:int, colsToSum:Iterable[str] ):
-        BaseTableModel.__init__( self, objectList, jahr )
         if not objectList or len(objectList) == 0:
             raise Exception( "SumTableModel: Construction needs an objectList with at least one element." )
-        self._colsToSum = colsToSum # Liste mit den keys (Attributnamen des XBase-Objekts) der Spalten,
-                                    # die summiert werden sollen
-        self._summen:List[Dict] = list() # enthält die Summen,
-                                         # die unter den in _colsToSum spezifierten Spalten anzuzeigen sind
-        self._rowCount = len( objectList ) + 1  # wegen Summenzeile
+        self._colsToSum = tuple( colsToSum ) # keys (Attributnamen des XBase-Objekts) der Spalten,
+                                             # die summiert werden sollen
+        # je Summenspalte die Aggregate über die sichtbaren Zeilen:
+        self._aggregates:Dict[str, ColumnAggregate] = \
+            { key: ColumnAggregate( key, self._makeValueProvider( key ) ) for key in self._colsToSum }
+        # je aggregiertem Element (id) die Werte, mit denen es in die Aggregate eingegangen ist:
+        self._aggregatedValues:Dict[int, Tuple] = dict()
+        BaseTableModel.__init__( self, objectList, jahr )
         self._fontSumme = QFont( "Arial", 12, weight=QFont.Bold )
-        for col in self._colsToSum:
-            summe = sum([e.getValue( col ) for e in objectList])
-            dic = {"key": col, "sum" : summe}
-            self._summen.append( dic )
 
     @classmethod
     def fromSeries( cls, series:Series, indexLen:int, jahr:int, colsToSum:Iterable[str] ):
         itemlist = BaseTableModel.createRowListFromSeries( series, indexLen )
         return cls( itemlist, jahr, colsToSum )
 
+    def _makeValueProvider( self, key:str ) -> Callable[[], Iterable[Any]]:
+        pos = self._colsToSum.index( key )
+        return lambda: [values[pos] for values in self._aggregatedValues.values()]
+
     def rowCount( self, parent: QModelIndex = None ) -> int:
-        return self._rowCount
+        return BaseTableModel.rowCount( self ) + 1  # wegen Summenzeile
+
+    def getAggregate( self, key:str, aggregate:str=ColumnAggregate.SUM ) -> Any:
+        """
+        Liefert ein Aggregat (s. ColumnAggregate.SUM, COUNT, AVG, MIN, MAX) der sichtbaren Werte der
+        Summenspalte <key>.
+        """
+        return self._aggregates[key].get( aggregate )
 
     def getValue( self, indexrow: int, indexcolumn: int ) -> Any:
-        if indexrow == self._rowCount - 1: # letzte Zeile, in der ersten Spalte "SUMME" ausgeben.
-                                           # in den Spalten, deren Werte summiert werden sollen, die Summen ausgeben.
+        if indexrow == self.rowCount() - 1: # letzte Zeile, in der ersten Spalte "SUMME" ausgeben.
+                                            # in den Spalten, deren Werte summiert werden sollen, die Summen ausgeben.
             if indexcolumn == 0:
                 return "SUMME"
             else:
-                key = self.keys[indexcolumn]
-                if key in self._colsToSum: # die Summe der Spalte, die die Werte von key enthält, soll angezeigt werden
-                    dic = [d for d in self._summen if d["key"] == key][0]
-                    return dic["sum"]
-                else:
-                    return ""
-        key = self.keys[indexcolumn]
+                aggregate = self._aggregates.get( self.keys[indexcolumn] )
+                # die Summe der Spalte, die die Werte von key enthält, soll angezeigt werden
+                return "" if aggregate is None else aggregate.getSum()
         return self.internalGetValue( indexrow, indexcolumn )
 
     def internalGetValue( self, indexrow:int, indexcolumn:int ) -> Any:
@@ -706,18 +1301,192 @@ class SumTableModel( BaseTableModel ):
         return e.getValue( self.keys[indexcolumn] )
 
     def getFont( self, indexrow: int, indexcolumn: int ) -> QFont or None:
-        if indexrow == self._rowCount - 1:
+        if indexrow == self.rowCount() - 1:
             key = self.keys[indexcolumn]
             if key in self._colsToSum:
                 return self._fontSumme
             else:
                 return None
 
+    def _initVisibleElements( self ):
+        BaseTableModel._initVisibleElements( self )
+        self._resetAggregates()
+
+    def _buildFilterIndexList( self ):
+        BaseTableModel._buildFilterIndexList( self )
+        self._resetAggregates()
+
+    def _onElementAdded( self, x:XBase ):
+        BaseTableModel._onElementAdded( self, x )
+        if self._meetsFilterConditions( x ):
+            self._addToAggregates( x )
+
+    def _onElementRemoved( self, x:XBase ):
+        BaseTableModel._onElementRemoved( self, x )
+        self._removeFromAggregates( x )
+
+    def _onElementUpdated( self, x:XBase ):
+        BaseTableModel._onElementUpdated( self, x )
+        if id( x ) in self._aggregatedValues:
+            self._removeFromAggregates( x )
+            self._addToAggregates( x )
+            row = self.rowCount() - 1
+            self.dataChanged.emit( self.createIndex( row, 0 ), self.createIndex( row, self.columnCount() - 1 ),
+                                   [Qt.DisplayRole] )
+
+    def _resetAggregates( self ):
+        for aggregate in self._aggregates.values():
+            aggregate.clear()
+        self._aggregatedValues.clear()
+        for x in self.getVisibleElements():
+            self._addToAggregates( x )
+
+    def _addToAggregates( self, x:XBase ):
+        values = tuple( x.getValue( key ) for key in self._colsToSum )
+        self._aggregatedValues[id( x )] = values
+        for key, val in zip( self._colsToSum, values ):
+            self._aggregates[key].add( val )
+
+    def _removeFromAggregates( self, x:XBase ):
+        values = self._aggregatedValues.pop( id( x ), None )
+        if values is None: return
+        for key, val in zip( self._colsToSum, values ):
+            self._aggregates[key].remove( val )
+
 ################################################################
 
 def test2():
     tm = SumTableModel
 
+def testColumnarTableModel( nrows=50000 ):
+    """
+    Vergleicht BaseTableModel und ColumnarTableModel beim Scrollen durch <nrows> Zeilen:
+    für jede "Bildschirmseite" (40 Zeilen) werden alle Zellen mit allen Rollen abgefragt, die eine View beim
+    Repaint abfragt. Außerdem werden Sortieren und Filtern gemessen.
+    """
+    import time
+    class X( XBase ):
+        def __init__( self, i:int ):
+            XBase.__init__( self )
+            self.ea_id = i
+            self.master_name = "Haus_%d" % ( i % 37 )
+            self.mobj_id = "whg_%d" % ( i % 101 )
+            self.debi_kredi = "Mieter %d" % ( i % 997 )
+            self.leistung = None if i % 5 else "Wartung"
+            self.jahr = 2022
+            self.monat = "jan"
+            self.betrag = ( i % 1000 ) * 1.5 - 300
+            self.buchungstext = "Text %d" % i
+
+    roles = ( Qt.DisplayRole, Qt.TextAlignmentRole, Qt.BackgroundRole, Qt.ForegroundRole, Qt.FontRole,
+              Qt.DecorationRole, Qt.SizeHintRole )
+    pagesize = 40
+    for cls in ( BaseTableModel, ColumnarTableModel ):
+        tm = cls( [X( i ) for i in range( nrows )], 2022 )
+        start = time.perf_counter()
+        for _ in range( 2 ): # 2. Durchlauf: Zellen wurden schon einmal angezeigt
+            for top in range( 0, nrows, pagesize * 50 ): # jede 50. Seite
+                for row in range( top, min( top + pagesize, nrows ) ):
+                    for col in range( tm.columnCount() ):
+                        index = tm.index( row, col )
+                        for role in roles:
+                            tm.data( index, role )
+        tdata = time.perf_counter() - start
+        start = time.perf_counter()
+        tm.sort( tm.getColumnIndexByKey( "betrag" ), Qt.SortOrder.AscendingOrder )
+        tm.sortMultipleColumns( ( "master_name", "mobj_id", "leistung" ) )
+        tsort = time.perf_counter() - start
+        start = time.perf_counter()
+        tm.applyFilter( "debi_kredi", "mieter 9" )
+        tm.applyFilter( "debi_kredi", "mieter 99" )
+        tm.clearFilter( "debi_kredi" )
+        tfilter = time.perf_counter() - start
+        print( "%-20s: data() %.3f s, sort %.3f s, filter %.3f s" % ( cls.__name__, tdata, tsort, tfilter ) )
+
+    # außerhalb des Models geänderte Elemente werden ohne objectUpdatedExternally() richtig angezeigt, sortiert
+    # und gefiltert; removeObject() entfernt das übergebene Element, nicht ein gleiches
+    xlist = [X( i ) for i in range( 10 )]
+    tm = ColumnarTableModel( xlist, 2022 )
+    col = tm.getColumnIndexByKey( "buchungstext" )
+    tm.getValue( 3, col )
+    xlist[3].buchungstext = "geändert"
+    assert tm.getValue( 3, col ) == "geändert"
+    tm.sort( col, Qt.SortOrder.DescendingOrder ) # aufsteigend, s. sort()
+    assert tm.getElement( 0 ) is xlist[3]
+    tm.applyFilter( "buchungstext", "geä" )
+    assert tm.getVisibleElements() == [xlist[3]]
+    tm.clearFilter( "buchungstext" )
+    twin = X( 5 )
+    tm.addObject( twin )
+    tm.removeObject( twin )
+    assert any( x is xlist[5] for x in tm.rowList ) and all( x is not twin for x in tm.rowList )
+    assert len( tm.rowList ) == 10
+    print( "ok" )
+
+def testGetElementByUniqueKeyValue():
+    """
+    Elemente, deren eindeutiger Key außerhalb des Models geändert wurde, werden (wie bei der Suche durch die
+    rowList) unter dem neuen Wert gefunden und unter dem alten nicht mehr.
+    """
+    class X( XBase ):
+        def __init__( self, i:int ):
+            XBase.__init__( self )
+            self.ea_id = i
+            self.buchungstext = "Text %d" % i
+
+    xlist = [X( i ) for i in range( 10 )]
+    tm = BaseTableModel( xlist, 2022 )
+    tm.setUniqueKeys( ( "ea_id", ) )
+    assert tm.getElementByUniqueKeyValue( "ea_id", 3 ) is xlist[3]
+    xlist[3].ea_id = 42 # ohne objectUpdatedExternally()
+    assert tm.getElementByUniqueKeyValue( "ea_id", 42 ) is xlist[3] # Fehltreffer im Index
+    assert tm.getElementByUniqueKeyValue( "ea_id", 3 ) is None
+    xlist[4].ea_id = 3
+    assert tm.getElementByUniqueKeyValue( "ea_id", 3 ) is xlist[4]
+    assert tm.getElementByUniqueKeyValue( "ea_id", 99 ) is None
+    print( "ok" )
+
+def testFilterIndex( nrows=100000 ):
+    """
+    Misst das Filtern beim Tippen in einer FilterEdit: jeder Tastendruck ist ein applyFilter()-Aufruf.
+    Filtert auch Spalten mit Zahlen und None-Werten.
+    """
+    import time
+    class X( XBase ):
+        def __init__( self, i:int ):
+            XBase.__init__( self )
+            self.ea_id = i
+            self.debi_kredi = "Mieter %d" % ( i % 997 )
+            self.leistung = None if i % 5 else "Wartung"
+            self.betrag = ( i % 1000 ) * 1.5 - 300
+            self.buchungstext = "Text %d" % i
+
+    for cls in ( BaseTableModel, ColumnarTableModel ):
+        tm = cls( [X( i ) for i in range( nrows )], 2022 )
+        tm.sort( tm.getColumnIndexByKey( "buchungstext" ), Qt.SortOrder.DescendingOrder )
+        times = list()
+        firstTimes = list() # 1. Tastendruck je Spalte: die Texte der Spalte werden ermittelt
+        def typeText( header:str, text:str ):
+            for n in range( 1, len( text ) + 1 ):
+                start = time.perf_counter()
+                tm.applyFilter( header, text[:n] )
+                ( firstTimes if n == 1 else times ).append( time.perf_counter() - start )
+        typeText( "debi_kredi", "mieter 12" )
+        typeText( "betrag", "1.50" )
+        for n in range( 3, -1, -1 ): # Backspace...
+            start = time.perf_counter()
+            tm.applyFilter( "betrag", "1.50"[:n] )
+            times.append( time.perf_counter() - start )
+        typeText( "leistung", "wart" )
+        count = tm.rowCount()
+        start = time.perf_counter()
+        tm.clearFilter( "leistung" )
+        tm.clearFilter( "betrag" )
+        tm.clearFilter( "debi_kredi" )
+        times.append( time.perf_counter() - start )
+        print( "%-20s: %d Tastendrücke, max. %.1f ms (1. Tastendruck je Spalte max. %.1f ms), zuletzt %d Zeilen" %
+               ( cls.__name__, len( times ) + len( firstTimes ), max( times ) * 1000, max( firstTimes ) * 1000, count ) )
+
 def test():
     class X(XBase):
         def __init__(self, v1, v2 ):
@@ -1,13 +1,17 @@
 import sqlite3
 from datetime import datetime
 from sqlite3 import Connection
-from typing import List, Tuple, Dict, Type
+from typing import List, Tuple, Dict, Type, Sequence, Union, Any
 
 #from definitions import DATABASE
 from base.interfaces import XBase
 
+# Parameter eines SQL-Statements: entweder eine Sequenz (für "?"-Platzhalter) oder ein Dict (für ":name"-Platzhalter)
+SqlParams = Union[Sequence[Any], Dict[str, Any]]
+
 ###########################  DatabaseConnection  ###########################
 class DatabaseConnection:
+    STATEMENT_CACHE_SIZE = 256 # Anzahl der prepared statements, die die Connection vorhält (sqlite3-Default: 128)
     __instance = None
     def __init__( self ):
         self._con = None
@@ -27,7 +31,7 @@ class DatabaseConnection:
 
     def createConnection( self, pathToDb:str ) -> Connection:
         self._pathToDb = pathToDb
-        self._con = sqlite3.connect( pathToDb )
+        self._con = sqlite3.connect( pathToDb, cached_statements=DatabaseConnection.STATEMENT_CACHE_SIZE )
         return self._con
 
     def getConnection( self ):
@@ -96,10 +100,10 @@ class DatabaseCommon:
     #     l = [x[0] for x in tupleList]
     #     return l
 
-    def read( self, sql: str ) -> List[Tuple]:
+    def read( self, sql: str, params:SqlParams=() ) -> List[Tuple]:
         cur = self._con.cursor() # sieht umständlich aus, muss aber so gemacht werden:
                                  # mit jedem cursor()-call wird ein neuer Cursor erzeugt!
-        cur.execute( sql )
+        cur.execute( sql, params )
         records = cur.fetchall()
         return records
 
@@ -109,36 +113,37 @@ class DatabaseCommon:
             d[col[0]] = row[idx]
         return d
 
-    def readOneGetDict( self, sql: str ) -> Dict or None:
+    def readOneGetDict( self, sql: str, params:SqlParams=() ) -> Dict or None:
         self._con.row_factory = self.dict_factory
         cur = self._con.cursor()
-        cur.execute( sql )
+        cur.execute( sql, params )
         dic = cur.fetchone()
         self._con.row_factory = None
         return dic
 
-    def readAllGetDict( self, sql: str ) -> List[Dict] or None:
+    def readAllGetDict( self, sql: str, params:SqlParams=() ) -> List[Dict] or None:
         self._con.row_factory = self.dict_factory
         cur = self._con.cursor()
-        cur.execute( sql )
+        cur.execute( sql, params )
         dicList = cur.fetchall()
         self._con.row_factory = None
         return dicList
 
-    def readOneGetObject( self, sql, xbase: Type[XBase] ) -> XBase:
-        dic = self.readOneGetDict( sql )
+    def readOneGetObject( self, sql, xbase: Type[XBase], params:SqlParams=() ) -> XBase:
+        dic = self.readOneGetDict( sql, params )
         x = xbase( dic )
         return x
 
-    def readAllGetObjectList( self, sql, xbase:Type[XBase] ) -> List[XBase]:
+    def readAllGetObjectList( self, sql, xbase:Type[XBase], params:SqlParams=() ) -> List[XBase]:
         """
         :param sql:
         :param xbase: der gewünschte Rückgabetyp: eine von XBase abgeleitete Klasse
+        :param params: die Werte für die Platzhalter in <sql>
         :return: eine Liste von Objekten, die der gewünschten Klasse entsprechen - oder eine leere Liste
         """
         self._con.row_factory = self.dict_factory
         cur = self._con.cursor()
-        cur.execute( sql )
+        cur.execute( sql, params )
         dictlist = cur.fetchall()
         retList = list()
         for d in dictlist:
@@ -147,8 +152,8 @@ class DatabaseCommon:
         self._con.row_factory = None
         return retList
 
-    def write( self, sql: str ) -> int:
-        c = self._con.cursor().execute( sql )
+    def write( self, sql: str, params:SqlParams=() ) -> int:
+        c = self._con.cursor().execute( sql, params )
         if not self.isInTransaction():
             self._con.commit()
         return c.rowcount
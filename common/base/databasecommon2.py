@@ -1,14 +1,30 @@
 import sqlite3
 from datetime import datetime
-from typing import List, Tuple, Dict, Type
-from base.interfaces import XBase
+from typing import List, Tuple, Dict, Type, Sequence, Union, Iterable, Any, Callable
+from base.interfaces import XBase, XRecord, createRecordClass
+
+# Parameter eines SQL-Statements: entweder eine Sequenz (für "?"-Platzhalter) oder ein Dict (für ":name"-Platzhalter)
+SqlParams = Union[Sequence[Any], Dict[str, Any]]
 
 ###########################  DatabaseCommon  ############################
 class DatabaseCommon:
     """
     Basisklasse für Anmeldung und Zugriffe auf eine Sqlite-Datenbank.
     Mit jeder Instanzierung wird eine Sqlite3.dbapi2.Connection erzeugt.
+
+    Alle read- und write-Methoden akzeptieren optional <params>, die an die Platzhalter ("?" bzw. ":name") des
+    SQL-Statements gebunden werden.
+    Parametrisierte Statements haben - unabhängig von den Werten - immer denselben SQL-Text. Sqlite3 hält die
+    bereits vorbereiteten (geparsten und geplanten) Statements in einem LRU-Cache der Größe STATEMENT_CACHE_SIZE vor
+    und kann sie deshalb wiederverwenden.
+    Werden die Werte dagegen per %-Formatierung in den SQL-String eingebaut, ist jedes Statement neu und muss neu
+    vorbereitet werden.
     """
+    STATEMENT_CACHE_SIZE = 256 # Anzahl der prepared statements, die die Connection vorhält (sqlite3-Default: 128)
+    # Datentypen, deren Defaultwerte sich mehrere Objekte gefahrlos teilen können (s. _getObjectFactory)
+    _IMMUTABLE_TYPES = ( type( None ), bool, int, float, str, bytes )
+    # je XBase-Klasse und Spaltenliste der Konstruktor für readAllGetObjectListFast()
+    _objectFactories:Dict[Tuple[Type[XBase], Tuple[str]], Callable[[Sequence], XBase]] = dict()
     _sqliteCon: sqlite3.dbapi2.Connection = None
     _pathToDatabase = None
     def __init__( self, pathToDatabase:str ):
@@ -16,7 +32,8 @@ class DatabaseCommon:
             raise Exception( "Each application may connect to only one database" )
         DatabaseCommon._pathToDatabase = pathToDatabase
         if not DatabaseCommon._sqliteCon:
-            DatabaseCommon._sqliteCon:sqlite3.dbapi2.Connection = sqlite3.connect( pathToDatabase )
+            DatabaseCommon._sqliteCon:sqlite3.dbapi2.Connection = \
+                sqlite3.connect( pathToDatabase, cached_statements=DatabaseCommon.STATEMENT_CACHE_SIZE )
         # self._pathToDatabase = pathToDatabase
         self._transId = 0
         self._transIdFile = pathToDatabase + "transid.txt"
@@ -54,10 +71,10 @@ class DatabaseCommon:
     def getCurrentTimestamp( self ):
         return datetime.now().strftime( "%Y-%m-%d:%H.%M.%S" )
 
-    def read( self, sql: str ) -> List[Tuple]:
+    def read( self, sql: str, params:SqlParams=() ) -> List[Tuple]:
         cur = self._sqliteCon.cursor() # sieht umständlich aus, muss aber so gemacht werden:
                                  # mit jedem cursor()-call wird ein neuer Cursor erzeugt!
-        cur.execute( sql )
+        cur.execute( sql, params )
         records = cur.fetchall()
         cur.close()
         return records
@@ -68,59 +85,118 @@ class DatabaseCommon:
             d[col[0]] = row[idx]
         return d
 
-    def readOneGetDict( self, sql: str ) -> Dict or None:
+    @staticmethod
+    def _getColumnNames( cursor ) -> Tuple[str]:
+        """
+        Liefert die Spaltennamen des zuletzt ausgeführten Statements.
+        Wird einmal je Cursor ermittelt, nicht wie bei dict_factory() für jede Row.
+        """
+        return tuple( col[0] for col in cursor.description )
+
+    def readOneGetDict( self, sql: str, params:SqlParams=() ) -> Dict or None:
         self._sqliteCon.row_factory = self.dict_factory
         cur = self._sqliteCon.cursor()
-        cur.execute( sql )
+        cur.execute( sql, params )
         dic = cur.fetchone()
         self._sqliteCon.row_factory = None
         cur.close()
         return dic
 
-    def readAllGetDict( self, sql: str ) -> List[Dict] or None:
-        self._sqliteCon.row_factory = self.dict_factory
+    def readAllGetDict( self, sql: str, params:SqlParams=() ) -> List[Dict] or None:
         cur = self._sqliteCon.cursor()
-        cur.execute( sql )
-        dicList = cur.fetchall()
-        self._sqliteCon.row_factory = None
+        cur.execute( sql, params )
+        columns = self._getColumnNames( cur )
+        dicList = [dict( zip( columns, row ) ) for row in cur.fetchall()]
         cur.close()
         return dicList
 
-    def readOneGetObject( self, sql, xbase: Type[XBase] ) -> XBase or None:
-        dic = self.readOneGetDict( sql )
+    def readOneGetObject( self, sql, xbase: Type[XBase], params:SqlParams=() ) -> XBase or None:
+        dic = self.readOneGetDict( sql, params )
         if dic:
             x = xbase( dic )
             return x
         return None
 
-    def readAllGetObjectList( self, sql, xbase:Type[XBase] ) -> List[XBase]:
+    def readAllGetObjectList( self, sql, xbase:Type[XBase], params:SqlParams=() ) -> List[XBase]:
         """
         :param sql:
         :param xbase: der gewünschte Rückgabetyp: eine von XBase abgeleitete Klasse
+        :param params: die Werte für die Platzhalter in <sql>
         :return: eine Liste von Objekten, die der gewünschten Klasse entsprechen - oder eine leere Liste
         """
-        self._sqliteCon.row_factory = self.dict_factory
         cur = self._sqliteCon.cursor()
-        cur.execute( sql )
-        dictlist = cur.fetchall()
-        retList = list()
-        for d in dictlist:
-            x = xbase( d )
-            retList.append( x )
-        self._sqliteCon.row_factory = None
+        cur.execute( sql, params )
+        columns = self._getColumnNames( cur )
+        retList = [xbase( dict( zip( columns, row ) ) ) for row in cur.fetchall()]
+        cur.close()
+        return retList
+
+    def readAllGetObjectListFast( self, sql, xbase:Type[XBase], params:SqlParams=() ) -> List[XBase]:
+        """
+        Wie readAllGetObjectList(), aber für große Ergebnismengen:
+        die Objekte werden direkt aus den Row-Tupeln erzeugt, ohne Umweg über ein Dictionary je Row und ohne
+        für jede Row xbase.__init__() zu durchlaufen (s. _getObjectFactory()).
+        Voraussetzung: xbase.__init__() setzt nur Defaultwerte und übernimmt dann ggf. das übergebene Dictionary
+        per setFromDict() - so wie es bei den Interfaces üblich ist.
+        :param sql:
+        :param xbase: der gewünschte Rückgabetyp: eine von XBase abgeleitete Klasse
+        :param params: die Werte für die Platzhalter in <sql>
+        :return: eine Liste von Objekten, die der gewünschten Klasse entsprechen - oder eine leere Liste
+        """
+        cur = self._sqliteCon.cursor()
+        cur.execute( sql, params )
+        factory = self._getObjectFactory( xbase, self._getColumnNames( cur ) )
+        retList = [factory( row ) for row in cur.fetchall()]
         cur.close()
         return retList
 
-    def write( self, sql: str ) -> int:
+    @staticmethod
+    def _getObjectFactory( xbase:Type[XBase], columns:Tuple[str] ) -> Callable[[Sequence], XBase]:
+        """
+        Liefert einen Konstruktor, der aus einem Row-Tupel mit den Spalten <columns> ein <xbase>-Objekt erzeugt.
+        Der Konstruktor wird je Klasse und Spaltenliste nur einmal erzeugt und gecached.
+        Für XRecord-Klassen liefert XRecord.getRowConstructor() den Konstruktor.
+        Sind alle Defaultwerte von <xbase> unveränderlich (int, str, None,...), wird xbase.__init__() nur ein
+        einziges Mal aufgerufen; jedes weitere Objekt bekommt eine Kopie der Defaultwerte, die mit den Werten der Row
+        überschrieben werden.
+        Enthalten die Defaults veränderliche Objekte (z.B. eine Liste), müssen diese für jedes Objekt neu erzeugt
+        werden, dann wird xbase.__init__() weiterhin für jede Row aufgerufen.
+        """
+        factory = DatabaseCommon._objectFactories.get( ( xbase, columns ) )
+        if factory:
+            return factory
+        if issubclass( xbase, XRecord ):
+            factory = xbase.getRowConstructor( columns )
+        else:
+            defaults = xbase().__dict__
+            if all( isinstance( v, DatabaseCommon._IMMUTABLE_TYPES ) for v in defaults.values() ):
+                defaults = dict( defaults )
+                new = object.__new__
+                def factory( row:Sequence ) -> XBase:
+                    x = new( xbase )
+                    d = defaults.copy()
+                    d.update( zip( columns, row ) )
+                    x.__dict__ = d
+                    return x
+            else:
+                def factory( row:Sequence ) -> XBase:
+                    x = xbase()
+                    x.__dict__.update( zip( columns, row ) )
+                    return x
+        DatabaseCommon._objectFactories[( xbase, columns )] = factory
+        return factory
+
+    def write( self, sql: str, params:SqlParams=() ) -> int:
         """
         Macht einen Schreibzugriff auf die Datenbank, ABER KEINEN COMMIT.
         Ein Commit wird nur nach Aufruf von DatabaseCommon.commit() ausgeführt.
         :param sql: das auszuführende SQL-Stmt
+        :param params: die Werte für die Platzhalter in <sql>
         :return: die lastrowid eines eingefügten Satzes bzw. rowcount nach einem Update
         """
         if self._transId == 0:
             self._createNewTransId()
-        c = self._sqliteCon.cursor().execute( sql )
+        c = self._sqliteCon.cursor().execute( sql, params )
         s = sql.lower()
         isInsert = True if "insert" in s else False
         if isInsert:
@@ -128,6 +204,75 @@ class DatabaseCommon:
         else:
             return c.rowcount
 
+    def writeMany( self, sql:str, paramsList:Iterable[SqlParams] ) -> int:
+        """
+        Führt <sql> einmal je Eintrag in <paramsList> aus (sqlite3 executemany).
+        Das Statement wird nur einmal vorbereitet; die Ausführung erfolgt wie bei write() innerhalb der laufenden
+        Transaktion, also OHNE COMMIT.
+        :param sql: das auszuführende SQL-Stmt mit Platzhaltern
+        :param paramsList: je auszuführender Row die Werte für die Platzhalter in <sql>
+        :return: die Summe der betroffenen Rows
+        """
+        if self._transId == 0:
+            self._createNewTransId()
+        c = self._sqliteCon.cursor()
+        c.executemany( sql, paramsList )
+        rowcount = c.rowcount
+        c.close()
+        return rowcount
+
+    def getTableColumns( self, table:str ) -> List[Tuple[str, str]]:
+        """
+        :param table: Name der Tabelle
+        :return: Liste von Tupeln (Spaltenname, deklarierter Typ) in der Reihenfolge der Tabellendefinition
+        """
+        records = self.read( "pragma table_info(%s)" % table ) # Tabellenname kann nicht gebunden werden
+        if not records:
+            raise Exception( "DatabaseCommon.getTableColumns(): Tabelle '%s' existiert nicht" % table )
+        # table_info liefert je Spalte: cid, name, type, notnull, dflt_value, pk
+        return [( r[1], r[2] ) for r in records]
+
+    @staticmethod
+    def getDefaultForColumnType( coltype:str ) -> Any:
+        """
+        Liefert den Defaultwert, den die Interfaces üblicherweise für eine Spalte des Typs <coltype> verwenden:
+        0 für Integer-, 0.0 für Fließkomma- und "" für alle anderen Spalten (Bestimmung wie Sqlites "type affinity").
+        """
+        t = coltype.upper()
+        if "INT" in t:
+            return 0
+        if "REAL" in t or "FLOA" in t or "DOUB" in t:
+            return 0.0
+        return ""
+
+    def getRecordFieldsFromTable( self, table:str ) -> Dict[str, Any]:
+        """
+        Leitet aus den Spalten von <table> die Attribute einer XRecord-Klasse samt Defaultwerten ab.
+        """
+        return { name: self.getDefaultForColumnType( coltype ) for name, coltype in self.getTableColumns( table ) }
+
+    def createRecordClassFromTable( self, table:str, classname:str ) -> Type[XRecord]:
+        """
+        Erzeugt zur Laufzeit eine XRecord-Klasse, deren Attribute den Spalten von <table> entsprechen.
+        """
+        return createRecordClass( classname, self.getRecordFieldsFromTable( table ) )
+
+    def generateRecordClassSource( self, table:str, classname:str ) -> str:
+        """
+        Erzeugt den Quellcode einer XRecord-Klasse, deren Attribute den Spalten von <table> entsprechen.
+        Gedacht zum Einfügen in ein interfaces-Modul: die Interfaces sollen beim Import keine Datenbankverbindung
+        brauchen.
+        """
+        fields = self.getRecordFieldsFromTable( table )
+        lines = ["%sRecord = createRecordClass( \"%sRecord\", {" % ( classname, classname )]
+        lines += ["    \"%s\": %s," % ( name, '"%s"' % default if isinstance( default, str ) else repr( default ) )
+                  for name, default in fields.items()]
+        lines.append( "} )" )
+        lines.append( "" )
+        lines.append( "class %s( %sRecord ):" % ( classname, classname ) )
+        lines.append( "    __slots__ = ()" )
+        return "\n".join( lines ) + "\n"
+
     def _createNewTransId( self ):
         try:
             f = open( self._transIdFile, "r" )
@@ -141,4 +286,96 @@ class DatabaseCommon:
             f.write( str( self._transId ) )
             f.close()
         except Exception as ex:
-            raise Exception( "DatabaseCommon._createNewTransId(): Fehler beim Schreiben der TransactionId:\n" + str(ex) )
\ No newline at end of file
+            raise Exception( "DatabaseCommon._createNewTransId(): Fehler beim Schreiben der TransactionId:\n" + str(ex) )
+#########################################################################
+def testMaterialization( nrows=100000 ):
+    """
+    Vergleicht die Laufzeiten von readAllGetObjectList(), readAllGetObjectListFast() und dem bisherigen Weg
+    (dict_factory und XBase( dict ) je Row) an <nrows> Sätzen einer einaus-ähnlichen Tabelle.
+    Zum Vergleich wird auch die Zeit für das reine fetchall() ausgegeben. Gemessen wird der beste von 3 Durchläufen.
+    Außerdem wird der Speicherbedarf der XBase-Objekte mit dem einer aus der Tabelle erzeugten XRecord-Klasse
+    verglichen.
+    """
+    import time, tempfile, os, tracemalloc
+    class XEinAus( XBase ):
+        def __init__( self, valuedict:Dict=None ):
+            XBase.__init__( self )
+            self.ea_id = 0
+            self.master_name = ""
+            self.mobj_id = ""
+            self.debi_kredi = ""
+            self.leistung = ""
+            self.sab_id = 0
+            self.hga_id = 0
+            self.nka_id = 0
+            self.reise_id = 0
+            self.jahr = 0
+            self.monat = ""
+            self.betrag = 0.0
+            self.ea_art = ""
+            self.verteilt_auf = 1
+            self.umlegbar = ""
+            self.buchungsdatum = ""
+            self.buchungstext = ""
+            self.write_time = ""
+            if valuedict:
+                self.setFromDict( valuedict )
+
+    db = DatabaseCommon( ":memory:" )
+    db._transIdFile = os.path.join( tempfile.gettempdir(), "testMaterialization_transid.txt" )
+    db.write( "create table einaus ( ea_id integer primary key, master_name text, mobj_id text, debi_kredi text, "
+              "leistung text, sab_id integer, hga_id integer, nka_id integer, reise_id integer, jahr integer, "
+              "monat text, betrag float, ea_art text, verteilt_auf integer, umlegbar text, buchungsdatum text, "
+              "buchungstext text, write_time text )" )
+    db.writeMany( "insert into einaus ( master_name, mobj_id, debi_kredi, leistung, jahr, monat, betrag, ea_art, "
+                  "verteilt_auf, umlegbar, buchungsdatum, buchungstext, write_time ) "
+                  "values ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )",
+                  ( ( "SB_Kaiser", "kaiser_%d" % ( i % 10 ), "Mieter %d" % i, "", 2022, "jan", 500.0 + i,
+                      "bruttomiete", 1, "", "2022-01-03", "Miete", "2022-01-03 10:00:00" ) for i in range( nrows ) ) )
+    db.commit()
+    sql = "select * from einaus where jahr = ?"
+
+    def readOld() -> List[XBase]:
+        db._sqliteCon.row_factory = db.dict_factory
+        cur = db._sqliteCon.cursor()
+        cur.execute( sql, (2022,) )
+        l = [XEinAus( d ) for d in cur.fetchall()]
+        db._sqliteCon.row_factory = None
+        cur.close()
+        return l
+
+    def readTuples() -> List[Tuple]:
+        return db.read( sql, (2022,) )
+
+    XEinAusRecord = db.createRecordClassFromTable( "einaus", "XEinAusRecord" )
+    print( db.generateRecordClassSource( "einaus", "XEinAus" ) )
+
+    results = list()
+    for name, fnc in ( ( "fetchall (nur Tupel)", readTuples ),
+                       ( "dict_factory + XBase( dict )", readOld ),
+                       ( "readAllGetObjectList", lambda: db.readAllGetObjectList( sql, XEinAus, (2022,) ) ),
+                       ( "readAllGetObjectListFast", lambda: db.readAllGetObjectListFast( sql, XEinAus, (2022,) ) ),
+                       ( "readAllGetObjectListFast XRecord",
+                         lambda: db.readAllGetObjectListFast( sql, XEinAusRecord, (2022,) ) ) ):
+        best = None
+        for _ in range( 3 ):
+            start = time.perf_counter()
+            xlist = fnc()
+            duration = time.perf_counter() - start
+            best = duration if best is None else min( best, duration )
+        print( "%-34s: %d rows in %.3f s" % ( name, len( xlist ), best ) )
+        results.append( xlist )
+    if not ( results[1] == results[2] == results[3] == results[4] ):
+        raise Exception( "testMaterialization(): die Ergebnislisten unterscheiden sich" )
+    results = None
+    for xbase in ( XEinAus, XEinAusRecord ):
+        tracemalloc.start()
+        xlist = db.readAllGetObjectListFast( sql, xbase, (2022,) )
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print( "%-34s: %d rows belegen %.1f MB" % ( xbase.__name__, len( xlist ), size / 1024 / 1024 ) )
+        xlist = None
+    db.closeConnection()
+
+if __name__ == "__main__":
+    testMaterialization()
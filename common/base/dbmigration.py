@@ -0,0 +1,86 @@
+import sqlite3
+from typing import List, Sequence, Iterable
+
+from base.databasecommon2 import SqlParams
+
+
+###########################  Migration  ############################
+class Migration:
+    """
+    Ein Versionsschritt des Datenbankschemas: die Statements, mit denen eine Datenbank der Version
+    <version> - 1 auf die Version <version> gebracht wird.
+    Die Statements sollten wiederholbar sein ("create index if not exists ..."), da Datenbanken, die bereits
+    von Hand angepasst wurden, noch die Version 0 haben.
+    """
+    def __init__( self, version:int, description:str, statements:Sequence[str] ):
+        self.version = version
+        self.description = description
+        self.statements = statements
+
+
+###########################  DbMigrator  ############################
+class DbMigrator:
+    """
+    Bringt eine Sqlite-Datenbank auf den Stand der übergebenen Migrationen.
+    Die Version der Datenbank wird in PRAGMA user_version gespeichert (0 = noch nie migriert).
+    Jede Migration läuft in einer eigenen Transaktion; schlägt ein Statement fehl, bleibt die Datenbank auf der
+    Version der letzten erfolgreichen Migration.
+    Außerdem bietet DbMigrator Prüfungen der Ausführungspläne (EXPLAIN QUERY PLAN), mit denen sich testen lässt,
+    dass die häufigen Abfragen die angelegten Indizes auch verwenden.
+    """
+    def __init__( self, con:sqlite3.Connection ):
+        self._con = con
+
+    def getVersion( self ) -> int:
+        return self._con.execute( "pragma user_version" ).fetchone()[0]
+
+    def migrate( self, migrations:Iterable[Migration] ) -> List[int]:
+        """
+        Führt alle Migrationen aus, deren Version größer als die Version der Datenbank ist - in aufsteigender
+        Reihenfolge. Wurde mindestens eine Migration ausgeführt, werden anschließend mit ANALYZE die Statistiken
+        für den Query Planner aktualisiert.
+        :return: die Versionen der ausgeführten Migrationen
+        """
+        if self._con.in_transaction:
+            raise Exception( "DbMigrator.migrate(): Es gibt eine offene Transaktion.\n"
+                             "Migrationen müssen vor dem ersten Schreibzugriff ausgeführt werden." )
+        version = self.getVersion()
+        done = list()
+        for migration in sorted( migrations, key=lambda m: m.version ):
+            if migration.version <= version:
+                continue
+            try:
+                self._con.execute( "begin" )
+                for stmt in migration.statements:
+                    self._con.execute( stmt )
+                # pragma erlaubt keine Platzhalter; version ist ein int
+                self._con.execute( "pragma user_version = %d" % migration.version )
+                self._con.commit()
+            except Exception as ex:
+                self._con.rollback()
+                raise Exception( "DbMigrator.migrate(): Migration %d ('%s') fehlgeschlagen:\n%s"
+                                 % (migration.version, migration.description, str( ex )) )
+            done.append( migration.version )
+        if done:
+            self._con.execute( "analyze" )
+            self._con.commit()
+        return done
+
+    def explainQueryPlan( self, sql:str, params:SqlParams=() ) -> List[str]:
+        """
+        Liefert die Schritte des Ausführungsplans von <sql>, z.B. "SEARCH einaus USING INDEX einaus_jahr_ea_art
+        (jahr=? AND ea_art=?)" oder "SCAN einaus".
+        """
+        return [row[3] for row in self._con.execute( "explain query plan " + sql, params ).fetchall()]
+
+    def getFullScans( self, sql:str, params:SqlParams=(), table:str=None ) -> List[str]:
+        """
+        Liefert die Schritte des Ausführungsplans von <sql>, die eine Tabelle oder einen Index vollständig
+        durchlaufen (auch "SCAN ... USING COVERING INDEX ..."). Leere Liste, wenn alle Zugriffe gezielt erfolgen.
+        :param table: nur die vollständigen Durchläufe dieser Tabelle liefern (z.B. bei Joins mit kleinen Tabellen)
+        """
+        steps = [step for step in self.explainQueryPlan( sql, params )
+                 if step.startswith( "SCAN" ) and not step.startswith( "SCAN CONSTANT ROW" )]
+        if table:
+            steps = [step for step in steps if step.split()[1] == table]
+        return steps
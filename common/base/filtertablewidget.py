@@ -1,6 +1,5 @@
-import numbers
 from enum import IntEnum, auto
-from typing import List, Dict, Callable, Collection, Any
+from typing import List, Dict, Callable, Collection, Any, Tuple
 
 from PySide2 import QtCore
 from PySide2.QtCore import QModelIndex, Qt, Signal, QSize, QItemSelectionModel, QObject, QThreadPool
@@ -22,6 +21,7 @@ from base.interfaces import XBase, TestItem
 
 #####################################################################
 from base.printhandler import PrintHandler
+from base.searchhandler import SearchIndex
 
 class HeaderTableModel( BaseTableModel ):
     class XFilter( XBase ):
@@ -567,9 +567,6 @@ class SearchHandler2( QObject ):
     def __init__( self, tv: BaseTableView, searchWidget:SearchWidget2 ):
         QObject.__init__( self )
         self._searchValueOrig = None # so wurde der Suchbegriff vom Anwender ins Suchfeld eingetragen
-        self._searchValue = None # enthält den aufbereiteten Suchbegriff (siehe _prepareSearchValue)
-        self._searchValueNum = None # der Suchbegriff in numerischer Form
-                                    # (not None nur, wenn z.B. nach "123" gesucht werden soll)
         self._tv = tv
         self._searchWidget = searchWidget
         self._searchFieldBackground = None
@@ -581,8 +578,8 @@ class SearchHandler2( QObject ):
                                                 # geholt werden, da sich das Model ändern kann (durch Filterung)
         self._caseSensitive = False
         self._exactMatch = False
-        self._row = 0
-        self._col = 0
+        self._searchIndex = SearchIndex()
+        self._lastMatch:Tuple[int, int] = None # (row, col) der zuletzt angezeigten Fundstelle
 
     def onCaseSensitiveToggled( self, isCaseSensitive:bool ):
         self._caseSensitive = isCaseSensitive
@@ -594,23 +591,6 @@ class SearchHandler2( QObject ):
         self._searchWidget.setSearchFieldBackgroundColor( "#ffffff" )
         self._tv.clearSelection()
 
-    def _makeComparable( self, val ):
-        valNum = None
-        if isinstance(val, numbers.Number):
-            valNum = val
-            val = str( val )
-        else:  # string (hopefully)
-            try:
-                valNum = int( val )
-            except ValueError:
-                try:
-                    valNum = float( val )
-                except ValueError:
-                    pass
-        if not self._caseSensitive:
-            val = val.lower()
-        return val, valNum
-
     def onDoSearch( self, searchValue ):
         self.search( searchValue, self._caseSensitive, self._exactMatch )
 
@@ -619,40 +599,26 @@ class SearchHandler2( QObject ):
                 self._caseSensitive != caseSensitive or \
                 self._exactMatch != exactMatch:
             # Anwender hat die Suchkriterien geändert, neue Suche beginnen
-            self._row = self._col = 0
+            self._lastMatch = None
             self._searchValueOrig = searchValue
             self._caseSensitive = caseSensitive
             self._exactMatch = exactMatch
-            self._searchValue, self._searchValueNum = self._makeComparable( searchValue )
         self._searchNextMatch()
 
     def _searchNextMatch( self ):
-        if self._row == 0 and self._col == 0:
+        """
+        Zeigt die nächste Fundstelle an. Die Fundstellen liefert der SearchIndex, der die Zellen nur einmal je
+        Stand des Models durchsucht.
+        """
+        if self._lastMatch is None:
             self._searchWidget.setSearchFieldBackgroundColor( "#ffffff" )
         tm = self._tv.model()
-        for r in range( self._row, tm.rowCount() ):
-            for c in range( self._col, tm.columnCount() ):
-                tmval = tm.getValue( r, c )
-                if not tmval: continue
-                tmval, tmvalNum = self._makeComparable( tmval )
-                match = False
-                if( self._exactMatch and self._searchValue == tmval) or \
-                        (not self._exactMatch and self._searchValue in tmval ):
-                    match = True
-                if match or (tmvalNum is not None and
-                             self._searchValueNum is not None and
-                             tmvalNum == self._searchValueNum):
-                    self._showMatch( tm.index( r, c ) )
-                    self._row, self._col = r, c+1
-                    if self._col >= tm.columnCount():
-                        self._row += 1
-                        self._col = 0
-                        if self._row >= tm.rowCount():
-                            self._row = 0
-                    return
-            self._col = 0
-        self._row = self._col = 0
-        self._searchWidget.setSearchFieldBackgroundColor( "#eb8795" )
+        self._searchIndex.findAll( tm, self._searchValueOrig, self._caseSensitive, self._exactMatch )
+        self._lastMatch = self._searchIndex.getNextMatch( self._lastMatch )
+        if self._lastMatch is None:
+            self._searchWidget.setSearchFieldBackgroundColor( "#eb8795" )
+            return
+        self._showMatch( tm.index( *self._lastMatch ) )
 
     def _showMatch( self, index: QModelIndex ):
         self._tv.selectionModel().select( index, QItemSelectionModel.ClearAndSelect )
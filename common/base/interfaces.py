@@ -1,6 +1,8 @@
 
+import copy
+import sys
 from enum import Enum
-from typing import Dict, Any, List, Type, Iterable, Callable
+from typing import Dict, Any, List, Type, Iterable, Callable, Tuple
 
 from PySide2.QtCore import QObject
 
@@ -14,6 +16,9 @@ class XBase:
 
     XBase wird *intensivst* vom ImmoControlCenter benutzt, also Vorsicht beim Ändern.
     """
+    __slots__ = () # damit XRecord ohne __dict__ auskommt. Abgeleitete Klassen ohne eigene __slots__-Angabe
+                   # bekommen automatisch ein __dict__, für sie ändert sich also nichts.
+
     def __init__( self, valuedict:Dict=None ):
         if valuedict:
             self.setFromDict( valuedict )
@@ -78,6 +83,182 @@ class XSeriesItem( XBase ):
         self.index:Any = index
         self.value:Any = value
 
+#################   XRecord   #######################
+class _XRecordDict( dict ):
+    """
+    Wird von XRecord.__dict__ geliefert: eine Momentaufnahme der Attributwerte eines XRecord-Objekts,
+    bei der jede Änderung auf das XRecord-Objekt durchgeschrieben wird.
+    Damit funktioniert Code wie x.__dict__[key] = value auch für XRecord-Objekte.
+    """
+    def __init__( self, record:"XRecord" ):
+        dict.__init__( self, zip( record._fields, record._getValues() ) )
+        self._record = record
+
+    def __setitem__( self, key, value ):
+        self._record.setValue( key, value )
+        dict.__setitem__( self, key, value )
+
+    def update( self, other=(), **kwargs ):
+        for k, v in dict( other, **kwargs ).items():
+            self[k] = v
+
+    def setdefault( self, key, default=None ):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __delitem__( self, key ):
+        raise Exception( "XRecord: Attribut '%s' kann nicht gelöscht werden" % key )
+
+    def pop( self, key, *args ):
+        raise Exception( "XRecord: Attribut '%s' kann nicht gelöscht werden" % key )
+
+    def popitem( self ):
+        raise Exception( "XRecord: Attribute können nicht gelöscht werden" )
+
+    def clear( self ):
+        raise Exception( "XRecord: Attribute können nicht gelöscht werden" )
+
+
+class XRecord( XBase ):
+    """
+    Kompakte Alternative zu XBase für Interfaces, von denen sehr viele Objekte gleichzeitig gehalten werden
+    (z.B. alle XEinAus eines Jahres in einem TableModel).
+    Die Attribute werden nicht in einem __dict__ je Objekt, sondern in __slots__ gespeichert. Das spart Speicher und
+    macht den Attributzugriff schneller.
+    Die Attribute und ihre Defaultwerte sind für jede Klasse fest vorgegeben (_fields bzw. _defaults), anders als
+    bei XBase können also keine Attribute nachträglich hinzugefügt werden.
+    XRecord-Klassen werden nicht von Hand geschrieben, sondern mit createRecordClass() erzeugt (bzw. mit
+    DatabaseCommon.createRecordClassFromTable() aus den Spalten einer Tabelle).
+    Für eine abgeleitete Klasse, die nur Methoden hinzufügt, muss __slots__ = () angegeben werden, sonst bekommt
+    sie wieder ein __dict__:
+        class XEinAus( createRecordClass( "XEinAusRecord", {"ea_id": 0, "jahr": 0, ...} ) ):
+            __slots__ = ()
+            def getMonthIdx( self ) -> int: ...
+    Die Methoden von XBase verhalten sich unverändert. x.__dict__ liefert ein Dictionary mit den Attributwerten,
+    Änderungen daran werden auf das Objekt durchgeschrieben.
+    """
+    __slots__ = ()
+    _fields:Tuple[str, ...] = ()
+    _defaults:Tuple[Any, ...] = ()
+
+    def __init__( self, valuedict:Dict=None ):
+        XBase.__init__( self )
+        for key, value in zip( self._fields, self._defaults ):
+            # veränderliche Defaults (z.B. eine Liste) bekommt jedes Objekt als eigene Kopie
+            setattr( self, key, value if isinstance( value, _IMMUTABLE_TYPES ) else copy.copy( value ) )
+        if valuedict:
+            self.setFromDict( valuedict )
+
+    def _getValues( self ) -> List[Any]:
+        return [getattr( self, key ) for key in self._fields]
+
+    @property
+    def __dict__( self ) -> Dict:
+        return _XRecordDict( self )
+
+    def __eq__( self, other ) -> bool:
+        if other is None: return False
+        return self.__dict__ == other.__dict__
+
+    def __getstate__( self ) -> Dict:
+        return dict( zip( self._fields, self._getValues() ) )
+
+    def __setstate__( self, state:Dict ):
+        self.setFromDict( state )
+
+    def getValue( self, key ) -> Any:
+        try:
+            return getattr( self, key )
+        except AttributeError:
+            raise KeyError( key )
+
+    def setValue( self, key, value ):
+        try:
+            setattr( self, key, value )
+        except AttributeError:
+            raise Exception( "%s.setValue(): unbekanntes Attribut '%s'" % ( self.__class__.__name__, key ) )
+
+    def setFromDict( self, d: Dict ):
+        for k, v in d.items():
+            self.setValue( k, v )
+
+    def getDifferences( self, other ) -> Dict:
+        diffs = dict()
+        for key in self._fields:
+            otherval = other.getValue( key )
+            if otherval != getattr( self, key ):
+                diffs[key] = otherval
+        return diffs
+
+    def copyByKey( self, x ):
+        """
+        Übernimmt die Werte gleicher Keys von <x> in dieses Objekt.
+        :param x: ein anderes XBase-Objekt, das nicht den gleichen Typ haben muss wie dieses Objekt
+        :return:
+        """
+        otherdict = x.__dict__
+        for k in self._fields:
+            if k in otherdict:
+                setattr( self, k, otherdict[k] )
+
+    def getKeys( self ) -> List:
+        return list( self._fields )
+
+    @classmethod
+    def getRowConstructor( cls, columns:Iterable[str] ) -> Callable[[Any], "XRecord"]:
+        """
+        Erzeugt eine Funktion, die aus einer Row (Tupel mit den Werten der Spalten <columns>) ein Objekt dieser
+        Klasse macht. Gedacht für das Einlesen vieler Rows (DatabaseCommon.readAllGetObjectListFast()).
+        Die Funktion wird als Quellcode generiert (wie bei collections.namedtuple): die Row wird in einem Schritt
+        auf die Attribute verteilt, die übrigen Attribute bekommen ihre Defaultwerte, __init__() wird nicht
+        durchlaufen.
+        :param columns: die Spaltennamen, die alle Attribute dieser Klasse sein müssen
+        """
+        columns = tuple( columns )
+        unknown = [c for c in columns if c not in cls._fields]
+        if unknown:
+            raise Exception( "%s.getRowConstructor(): unbekannte Attribute %s" % ( cls.__name__, str( unknown ) ) )
+        if not columns:
+            return lambda row: cls()
+        env = { "new": object.__new__, "cls": cls, "copy": copy.copy }
+        lines = ["def construct( row ):",
+                 "    x = new( cls )",
+                 "    %s, = row" % ", ".join( "x." + c for c in columns )]
+        for idx, ( key, value ) in enumerate( zip( cls._fields, cls._defaults ) ):
+            if key not in columns:
+                env["d%d" % idx] = value
+                mutable = not isinstance( value, _IMMUTABLE_TYPES )
+                lines.append( "    x.%s = %s" % ( key, ( "copy( d%d )" if mutable else "d%d" ) % idx ) )
+        lines.append( "    return x" )
+        exec( "\n".join( lines ), env )
+        return env["construct"]
+
+# Typen, deren Werte sich mehrere Objekte gefahrlos teilen können
+_IMMUTABLE_TYPES = ( type( None ), bool, int, float, str, bytes )
+
+def createRecordClass( classname:str, fields:Dict[str, Any], base:Type[XRecord]=XRecord ) -> Type[XRecord]:
+    """
+    Erzeugt eine von <base> abgeleitete XRecord-Klasse.
+    :param classname: Name der zu erzeugenden Klasse
+    :param fields: die Attribute (in der gewünschten Reihenfolge) und ihre Defaultwerte, z.B. {"ea_id": 0, "monat": ""}
+    :param base: XRecord oder eine davon abgeleitete Klasse, deren Attribute übernommen und um <fields>
+                 ergänzt werden
+    :return: die neue Klasse. Wird sie unter <classname> auf Modulebene abgelegt, lassen sich ihre Objekte auch
+             pickeln (wie bei collections.namedtuple).
+    """
+    newfields = [k for k in fields.keys() if k not in base._fields]
+    for k in newfields:
+        if not k.isidentifier():
+            raise Exception( "createRecordClass(): '%s' ist kein gültiger Attributname" % k )
+    defaults = dict( zip( base._fields, base._defaults ) )
+    defaults.update( fields )
+    fieldnames = base._fields + tuple( newfields )
+    return type( classname, ( base, ), { "__slots__": tuple( newfields ),
+                                         "_fields": fieldnames,
+                                         "_defaults": tuple( defaults[k] for k in fieldnames ),
+                                         "__module__": sys._getframe( 1 ).f_globals.get( "__name__", __name__ ) } )
+
 #################   ButtonDefinition   #######################
 class ButtonDefinition:
     def __init__( self, text:str, callback:Callable, tooltip:str=None, ident:Any=None, iconpath:str=None,
@@ -1,4 +1,3 @@
-from functools import cmp_to_key
 from typing import List, Iterable
 
 from PySide2.QtCore import QObject, Qt, SIGNAL
@@ -147,23 +146,8 @@ class MultiSortHandler( QObject ):
             self._sortKeys.append( self._tm.getKeyByHeader( header ) )
 
     def _doSort( self ):
-        rowlist:List[XBase] = self._tm.getRowList()
-        self._tm.emit( SIGNAL( "layoutAboutToBeChanged()" ) )
-        self._sort_reverse = not self._sort_reverse
-        rowlist = sorted( rowlist, key=cmp_to_key( self._compareMultiple ) )
-        self._tm.rowList = rowlist
-        self.emit( SIGNAL( "layoutChanged()" ) )
-
-    def _compareMultiple( self, x1:XBase, x2:XBase ):
-        for key in self._sortKeys:
-            v1 = x1.__dict__[key]
-            v2 = x2.__dict__[key]
-            if isinstance( v1, str ):
-                v1 = v1.lower()
-                v2 = v2.lower()
-            if v1 < v2: return -1 if self._sort_reverse else 1
-            if v1 > v2: return 1 if self._sort_reverse else -1
-        return 0
+        # Das Model ermittelt die Sortierschlüssel je Element nur einmal und sendet selbst die Layout-Signale
+        self._tm.sortByKeys( self._sortKeys, not self._sort_reverse )
 
 
 ########################   TEST  TEST  TEST  TEST   ####################################
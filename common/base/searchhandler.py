@@ -1,5 +1,7 @@
 import numbers
-from typing import Any, List
+import re
+from bisect import bisect_right
+from typing import Any, List, Tuple
 
 from PySide2.QtCore import QModelIndex, QItemSelectionModel, Signal, QObject
 from PySide2.QtWidgets import QGridLayout, QDialog
@@ -49,13 +51,141 @@ class SearchSettingsDialog( BaseDialog ):
         return sese
 
 
+class SearchIndex:
+    """
+    Index über die Zellen eines BaseTableModel für die Suche ("Weitersuchen").
+    Die Werte aller Zellen werden einmal je Stand des Models ermittelt und als Texte vorgehalten;
+    sobald das Model layoutChanged, dataChanged, modelReset, rowsInserted oder rowsRemoved sendet,
+    wird der Index verworfen und bei der nächsten Suche neu aufgebaut.
+    findAll() liefert alle Fundstellen eines Suchbegriffs auf einmal (zeilenweise, wie sie in der
+    Tabelle aufeinander folgen), getNextMatch() springt von einer Fundstelle zur nächsten.
+    Gesucht wird:
+    - ohne oder mit Beachtung der Groß-/Kleinschreibung (caseSensitive)
+    - als Teilstring oder - bei wholeWord - nur als ganzes Wort
+    - bei einem numerischen Suchbegriff außerdem nach Zellen mit gleichem Zahlenwert (z.B. "1.5" findet 1.50)
+    Leere Zellen (None, "") werden nicht durchsucht.
+    """
+    def __init__( self ):
+        self._model:BaseTableModel = None
+        self._cells:List[Tuple[int, int]] = None # (row, col) der nicht leeren Zellen, zeilenweise
+        self._texts:List[str] = None # Text je Zelle in _cells
+        self._lowerTexts:List[str] = None # wird erst bei der ersten Suche ohne caseSensitive ermittelt
+        self._nums:List[Any] = None # Zahlenwert je Zelle (oder None), wird erst bei der ersten numerischen Suche ermittelt
+        self._lastSearch:Tuple[str, bool, bool] = None
+        self._matches:List[Tuple[int, int]] = list()
+        self._matchIdx = -1 # Position der zuletzt von getNextMatch() gelieferten Fundstelle in _matches
+
+    def setModel( self, tm:BaseTableModel ):
+        if tm is self._model: return
+        if self._model is not None:
+            for signal in self._getModelSignals( self._model ):
+                signal.disconnect( self.onModelChanged )
+        self._model = tm
+        for signal in self._getModelSignals( tm ):
+            signal.connect( self.onModelChanged )
+        self.onModelChanged()
+
+    @staticmethod
+    def _getModelSignals( tm:BaseTableModel ) -> List:
+        return [tm.layoutChanged, tm.dataChanged, tm.modelReset, tm.rowsInserted, tm.rowsRemoved]
+
+    def onModelChanged( self, *args ):
+        self._cells = self._texts = self._lowerTexts = self._nums = None
+        self._lastSearch = None
+
+    def findAll( self, tm:BaseTableModel, searchValue:str, caseSensitive:bool=False,
+                 wholeWord:bool=False ) -> List[Tuple[int, int]]:
+        """
+        Liefert alle Fundstellen von <searchValue> in <tm> als (row, col)-Tupel, zeilenweise sortiert.
+        Solange sich Model und Suchkriterien nicht ändern, wird das letzte Ergebnis geliefert.
+        """
+        self.setModel( tm )
+        search = ( searchValue, caseSensitive, wholeWord )
+        if search == self._lastSearch:
+            return self._matches
+        self._ensureIndex()
+        if caseSensitive:
+            texts = self._texts
+            term = searchValue
+        else:
+            if self._lowerTexts is None:
+                self._lowerTexts = [text.lower() for text in self._texts]
+            texts = self._lowerTexts
+            term = searchValue.lower()
+        positions = [pos for pos, text in enumerate( texts ) if term in text]
+        if wholeWord and positions:
+            pattern = re.compile( r"(?<!\w)" + re.escape( term ) + r"(?!\w)" )
+            positions = [pos for pos in positions if pattern.search( texts[pos] )]
+        searchNum = self._toNumber( searchValue )
+        if searchNum is not None:
+            nums = self._getNums()
+            positions = sorted( set( positions ).union( pos for pos, num in enumerate( nums ) if num == searchNum ) )
+        cells = self._cells
+        self._matches = [cells[pos] for pos in positions]
+        self._matchIdx = -1
+        self._lastSearch = search
+        return self._matches
+
+    def getNextMatch( self, lastMatch:Tuple[int, int] or None ) -> Tuple[int, int] or None:
+        """
+        Liefert die Fundstelle des letzten findAll() nach <lastMatch>.
+        Ist <lastMatch> None, wird die erste Fundstelle geliefert.
+        :return: (row, col) oder None, wenn es nach <lastMatch> keine Fundstelle mehr gibt.
+        """
+        if lastMatch is None:
+            idx = 0
+        elif 0 <= self._matchIdx < len( self._matches ) and self._matches[self._matchIdx] == lastMatch:
+            idx = self._matchIdx + 1
+        else:
+            # Index wurde neu aufgebaut: weitersuchen nach der Zelle, in der zuletzt etwas gefunden wurde
+            idx = bisect_right( self._matches, lastMatch )
+        if idx >= len( self._matches ):
+            self._matchIdx = -1
+            return None
+        self._matchIdx = idx
+        return self._matches[idx]
+
+    def _ensureIndex( self ):
+        if self._cells is not None: return
+        tm = self._model
+        cells = list()
+        texts = list()
+        cols = range( tm.columnCount() )
+        for r in range( tm.rowCount() ):
+            for c in cols:
+                val = tm.getValue( r, c )
+                if val is None or val == "": continue
+                cells.append( ( r, c ) )
+                texts.append( val if isinstance( val, str ) else str( val ) )
+        self._cells = cells
+        self._texts = texts
+
+    def _getNums( self ) -> List[Any]:
+        if self._nums is None:
+            tm = self._model
+            toNumber = self._toNumber
+            nums = list()
+            for ( r, c ), text in zip( self._cells, self._texts ):
+                val = tm.getValue( r, c )
+                nums.append( val if isinstance( val, numbers.Number ) else toNumber( text ) )
+            self._nums = nums
+        return self._nums
+
+    @staticmethod
+    def _toNumber( val:str ) -> Any:
+        try:
+            return int( val )
+        except ValueError:
+            try:
+                return float( val )
+            except ValueError:
+                return None
+
+##############################################################################
 class SearchHandler( QObject ):
     def __init__( self, tv: BaseTableView, searchWidget:SearchWidget ):
         QObject.__init__( self )
         self._searchValueOrig = None # so wurde der Suchbegriff vom Anwender ins Suchfeld eingetragen
-        self._searchValue = None # enthält den aufbereiteten Suchbegriff (siehe _prepareSearchValue)
-        self._searchValueNum = None # der Suchbegriff in numerischer Form
-                                    # (not None nur, wenn z.B. nach "123" gesucht werden soll)
         self._tv = tv
         self._searchWidget = searchWidget
         self._searchFieldBackground = None
@@ -66,31 +196,14 @@ class SearchHandler( QObject ):
                                                 # geholt werden, da sich das Model ändern kann (durch Filterung)
         self._caseSensitive = False
         self._exactMatch = False
-        self._row = 0
-        self._col = 0
+        self._searchIndex = SearchIndex()
+        self._lastMatch:Tuple[int, int] = None # (row, col) der zuletzt angezeigten Fundstelle
         self._dlg = None
 
     def onSearchfieldChanged( self ):
         self._searchWidget.setSearchFieldBackgroundColor( "#ffffff" )
         self._tv.clearSelection()
 
-    def _makeComparable( self, val ):
-        valNum = None
-        if isinstance(val, numbers.Number):
-            valNum = val
-            val = str( val )
-        else:  # string (hopefully)
-            try:
-                valNum = int( val )
-            except ValueError:
-                try:
-                    valNum = float( val )
-                except ValueError:
-                    pass
-        if not self._caseSensitive:
-            val = val.lower()
-        return val, valNum
-
     def onDoSearch( self, searchValue ):
         self.search( searchValue, self._caseSensitive, self._exactMatch )
 
@@ -99,40 +212,22 @@ class SearchHandler( QObject ):
                 self._caseSensitive != caseSensitive or \
                 self._exactMatch != exactMatch:
             # Anwender hat die Suchkriterien geändert, neue Suche beginnen
-            self._row = self._col = 0
+            self._lastMatch = None
             self._searchValueOrig = searchValue
             self._caseSensitive = caseSensitive
             self._exactMatch = exactMatch
-            self._searchValue, self._searchValueNum = self._makeComparable( searchValue )
         self._searchNextMatch()
 
     def _searchNextMatch( self ):
-        if self._row == 0 and self._col == 0:
+        if self._lastMatch is None:
             self._searchWidget.setSearchFieldBackgroundColor( "#ffffff" )
         tm = self._tv.model()
-        for r in range( self._row, tm.rowCount() ):
-            for c in range( self._col, tm.columnCount() ):
-                tmval = tm.getValue( r, c )
-                if not tmval: continue
-                tmval, tmvalNum = self._makeComparable( tmval )
-                match = False
-                if( self._exactMatch and self._searchValue == tmval) or \
-                        (not self._exactMatch and self._searchValue in tmval ):
-                    match = True
-                if match or (tmvalNum is not None and
-                             self._searchValueNum is not None and
-                             tmvalNum == self._searchValueNum):
-                    self._showMatch( tm.index( r, c ) )
-                    self._row, self._col = r, c+1
-                    if self._col >= tm.columnCount():
-                        self._row += 1
-                        self._col = 0
-                        if self._row >= tm.rowCount():
-                            self._row = 0
-                    return
-            self._col = 0
-        self._row = self._col = 0
-        self._searchWidget.setSearchFieldBackgroundColor( "#eb8795" )
+        self._searchIndex.findAll( tm, self._searchValueOrig, self._caseSensitive, self._exactMatch )
+        self._lastMatch = self._searchIndex.getNextMatch( self._lastMatch )
+        if self._lastMatch is None:
+            self._searchWidget.setSearchFieldBackgroundColor( "#eb8795" )
+            return
+        self._showMatch( tm.index( *self._lastMatch ) )
 
     def _showMatch( self, index: QModelIndex ):
         self._tv.selectionModel().select( index, QItemSelectionModel.ClearAndSelect )